@@ -92,7 +92,7 @@ const AppContent: React.FC = () => {
     loadData,
     cancelCurrentLoad,
   } = marketData;
-  const indicators = useIndicators(candles);
+  const indicators = useIndicators(candles, { asset: activeSymbol, timeframe: activeTimeframe });
   const strategies = useStrategies();
   const normalization = useNormalizationSettings(activeSymbol);
   const availableFrames = useAvailableFrames(activeSymbol);
@@ -234,9 +234,29 @@ const AppContent: React.FC = () => {
     };
   }, [activeSymbol, activeTimeframe, activeView]);
 
-  const handleRunBacktest = () => {
-    runSimulation(candles);
-    setActiveView(ViewState.ANALYSIS);
+  const handleRunBacktest = async () => {
+    const strategy = strategies.activeStrategy;
+    if (!strategy) {
+      runSimulation(candles);
+      setActiveView(ViewState.ANALYSIS);
+      return;
+    }
+    try {
+      // Native engine: runs the strategy's init/handle_data in-process, no Lean startup.
+      const { result } = await apiClient.runNativeBacktest({
+        asset: activeSymbol,
+        timeframe: activeTimeframe,
+        code: strategy.code,
+        cash: leanBacktest.params.cash,
+        feeBps: leanBacktest.params.feeBps,
+        slippageBps: leanBacktest.params.slippageBps,
+      });
+      setExternalResult({ ...result, source: 'native' });
+      setActiveView(ViewState.ANALYSIS);
+    } catch (error) {
+      addToast(`Native backtest failed: ${(error as Error).message}`, 'error');
+      console.warn('[backtest] native run failed', error);
+    }
   };
 
   const handleRunLeanBacktest = async (codeOverride?: string) => {
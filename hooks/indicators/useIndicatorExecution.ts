@@ -9,8 +9,30 @@ import {
 import { apiClient } from '../../services/api/client';
 
 const MAX_INDICATOR_CANDLES = 1000;
+// The window start stays anchored while the window grows up to this many
+// candles, so a new candle extends the previous request instead of shifting
+// it and warm workers only feed the new bar (calculate_incremental "append").
+const MAX_ANCHORED_CANDLES = 2 * MAX_INDICATOR_CANDLES;
 const INDICATOR_DEBOUNCE_MS = 250;
 
+type WindowAnchor = { stream: string; time: string | number };
+
+/**
+ * Index of the first candle sent to the backend. Keeps the previous anchor
+ * while it is still in `data` and the window has between
+ * MAX_INDICATOR_CANDLES and MAX_ANCHORED_CANDLES candles (or all of `data`
+ * when it is shorter); otherwise re-anchors to the last MAX_INDICATOR_CANDLES.
+ */
+const anchoredWindowStart = (data: Candle[], stream: string, anchor: WindowAnchor | null): number => {
+  const latest = Math.max(0, data.length - MAX_INDICATOR_CANDLES);
+  if (!anchor || anchor.stream !== stream) return latest;
+  const earliest = Math.max(0, data.length - MAX_ANCHORED_CANDLES);
+  for (let i = latest; i >= earliest; i -= 1) {
+    if (data[i].time === anchor.time) return i;
+  }
+  return latest;
+};
+
 export type IndicatorSeriesPoint = { time: string | number; value: number };
 
 type CachedIndicatorResult = {
@@ -23,6 +45,9 @@ type IndicatorExecutionArgs = {
   data: Candle[];
   indicators: CustomIndicator[];
   indicatorSettings: Record<string, IndicatorSettingsValues>;
+  // Identifies the candle stream so the backend can reuse incremental indicator state.
+  asset?: string;
+  timeframe?: string;
 };
 
 type IndicatorExecutionState = {
@@ -37,6 +62,8 @@ export const useIndicatorExecution = ({
   data,
   indicators,
   indicatorSettings,
+  asset,
+  timeframe,
 }: IndicatorExecutionArgs): IndicatorExecutionState => {
   const [indicatorData, setIndicatorData] = useState<Record<string, IndicatorSeriesPoint[]>>({});
   const [indicatorOverlays, setIndicatorOverlays] = useState<Record<string, IndicatorOverlay>>({});
@@ -48,6 +75,7 @@ export const useIndicatorExecution = ({
   const executionCacheRef = useRef<Record<string, CachedIndicatorResult>>({});
   const debounceRef = useRef<ReturnType<typeof setTimeout> | null>(null);
   const runTokenRef = useRef(0);
+  const windowAnchorRef = useRef<WindowAnchor | null>(null);
   const [refreshEpochs, setRefreshEpochs] = useState<Record<string, number>>({});
 
   useEffect(() => {
@@ -65,7 +93,9 @@ export const useIndicatorExecution = ({
     }
 
     const cache = executionCacheRef.current;
-    const windowStart = data.length > MAX_INDICATOR_CANDLES ? data.length - MAX_INDICATOR_CANDLES : 0;
+    const stream = `${asset || ''}|${timeframe || ''}`;
+    const windowStart = anchoredWindowStart(data, stream, windowAnchorRef.current);
+    windowAnchorRef.current = { stream, time: data[windowStart].time };
     const windowCandles = data.slice(windowStart);
     const lastCandle = windowCandles[windowCandles.length - 1];
     const baseKey = lastCandle ? `${lastCandle.time}|${windowCandles.length}` : 'empty';
@@ -83,87 +113,100 @@ export const useIndicatorExecution = ({
       const errors: Record<string, string | null> = {};
       const details: Record<string, StrategyLabError | null> = {};
 
-      await Promise.all(
-        activeIndicators.map(async (indicator) => {
-          const versionKey =
-            indicator.appliedVersion || indicator.updatedAt || indicator.lastModified || 0;
-          const refreshEpoch = refreshEpochs[indicator.id] || 0;
-          const settingsForIndicator = indicatorSettings[indicator.id] || {};
-          const settingsKey =
-            settingsForIndicator && Object.keys(settingsForIndicator).length
-              ? JSON.stringify(settingsForIndicator)
-              : 'default';
-          const cacheKey = `${indicator.id}|${versionKey}|${refreshEpoch}|${baseKey}|${settingsKey}`;
-          const cached = cache[cacheKey];
-          if (cached) {
-            series[indicator.id] = cached.series;
-            overlays[indicator.id] = cached.overlay;
-            errors[indicator.id] = cached.error;
-            details[indicator.id] = cached.error
-              ? {
-                  source: 'indicator',
-                  type: 'CachedError',
-                  message: cached.error,
-                  createdAt: Date.now(),
-                }
-              : null;
-            return;
-          }
-
-          try {
-            const response = await apiClient.runIndicator(indicator.id, windowCandles, settingsForIndicator);
-            const line = Array.isArray(response.series) ? response.series : [];
-            const overlay: IndicatorOverlay = {
-              series: (response.overlay && response.overlay.series) || { main: line },
-              markers: (response.overlay && response.overlay.markers) || [],
-              levels: (response.overlay && response.overlay.levels) || [],
-              plots: (response.overlay && response.overlay.plots) || [],
-            };
-            const result: CachedIndicatorResult = {
-              series: line,
-              overlay,
-              error: null,
-            };
-            cache[cacheKey] = result;
-            series[indicator.id] = line;
-            overlays[indicator.id] = overlay;
-            errors[indicator.id] = null;
-            details[indicator.id] = null;
-          } catch (error) {
-            const err = error as Error & { details?: any };
-            const message = err?.message || 'Failed to run indicator';
-            console.warn('[useIndicators] runIndicator failed', indicator.id, err);
-            const fallbackOverlay: IndicatorOverlay = {
-              series: { main: [] },
-              markers: [],
-              levels: [],
-            };
-            const result: CachedIndicatorResult = {
-              series: [],
-              overlay: fallbackOverlay,
-              error: message,
-            };
-            cache[cacheKey] = result;
-            series[indicator.id] = [];
-            overlays[indicator.id] = fallbackOverlay;
-            errors[indicator.id] = message;
-            const raw = err && err.details ? err.details : undefined;
-            const createdAt = Date.now();
-            const base: StrategyLabError = {
-              source: 'indicator',
-              type: (raw && raw.type) || 'IndicatorError',
-              message,
-              file: raw && raw.file ? String(raw.file) : undefined,
-              line: typeof raw?.line === 'number' ? raw.line : undefined,
-              column: typeof raw?.column === 'number' ? raw.column : undefined,
-              phase: raw && raw.phase ? String(raw.phase) : undefined,
-              traceback: raw && raw.traceback ? String(raw.traceback) : undefined,
-              createdAt,
-            };
-            details[indicator.id] = base;
-          }
-        })
-      );
+      const storeResult = (indicatorId: string, cacheKey: string, response: any) => {
+        const line = Array.isArray(response.series) ? response.series : [];
+        const overlay: IndicatorOverlay = {
+          series: (response.overlay && response.overlay.series) || { main: line },
+          markers: (response.overlay && response.overlay.markers) || [],
+          levels: (response.overlay && response.overlay.levels) || [],
+          plots: (response.overlay && response.overlay.plots) || [],
+        };
+        cache[cacheKey] = { series: line, overlay, error: null };
+        series[indicatorId] = line;
+        overlays[indicatorId] = overlay;
+        errors[indicatorId] = null;
+        details[indicatorId] = null;
+      };
+
+      const storeError = (indicatorId: string, cacheKey: string, message: string, raw?: any) => {
+        const fallbackOverlay: IndicatorOverlay = {
+          series: { main: [] },
+          markers: [],
+          levels: [],
+        };
+        cache[cacheKey] = { series: [], overlay: fallbackOverlay, error: message };
+        series[indicatorId] = [];
+        overlays[indicatorId] = fallbackOverlay;
+        errors[indicatorId] = message;
+        details[indicatorId] = {
+          source: 'indicator',
+          type: (raw && raw.type) || 'IndicatorError',
+          message,
+          file: raw && raw.file ? String(raw.file) : undefined,
+          line: typeof raw?.line === 'number' ? raw.line : undefined,
+          column: typeof raw?.column === 'number' ? raw.column : undefined,
+          phase: raw && raw.phase ? String(raw.phase) : undefined,
+          traceback: raw && raw.traceback ? String(raw.traceback) : undefined,
+          createdAt: Date.now(),
+        };
+      };
+
+      const pending: { id: string; cacheKey: string; settings: IndicatorSettingsValues }[] = [];
+      activeIndicators.forEach((indicator) => {
+        const versionKey =
+          indicator.appliedVersion || indicator.updatedAt || indicator.lastModified || 0;
+        const refreshEpoch = refreshEpochs[indicator.id] || 0;
+        const settingsForIndicator = indicatorSettings[indicator.id] || {};
+        const settingsKey =
+          settingsForIndicator && Object.keys(settingsForIndicator).length
+            ? JSON.stringify(settingsForIndicator)
+            : 'default';
+        const cacheKey = `${indicator.id}|${versionKey}|${refreshEpoch}|${baseKey}|${settingsKey}`;
+        const cached = cache[cacheKey];
+        if (cached) {
+          series[indicator.id] = cached.series;
+          overlays[indicator.id] = cached.overlay;
+          errors[indicator.id] = cached.error;
+          details[indicator.id] = cached.error
+            ? {
+                source: 'indicator',
+                type: 'CachedError',
+                message: cached.error,
+                createdAt: Date.now(),
+              }
+            : null;
+          return;
+        }
+        pending.push({ id: indicator.id, cacheKey, settings: settingsForIndicator });
+      });
+
+      if (pending.length) {
+        // All uncached indicators share one request, one encode of the candles
+        // and one runner invocation on the backend.
+        try {
+          const { results } = await apiClient.runIndicatorBatch(
+            pending.map(({ id, settings }) => ({ id, settings })),
+            windowCandles,
+            { asset, timeframe }
+          );
+          pending.forEach(({ id, cacheKey }, index) => {
+            const result = results[index];
+            if (result && result.ok) {
+              storeResult(id, cacheKey, result);
+              return;
+            }
+            const raw = result && !result.ok ? result.error : undefined;
+            const message = (raw && (raw.message || raw)) || 'Failed to run indicator';
+            console.warn('[useIndicators] runIndicator failed', id, raw);
+            storeError(id, cacheKey, String(message), raw);
+          });
+        } catch (error) {
+          const err = error as Error & { details?: any };
+          const message = err?.message || 'Failed to run indicator';
+          console.warn('[useIndicators] runIndicatorBatch failed', err);
+          pending.forEach(({ id, cacheKey }) => storeError(id, cacheKey, message, err && err.details));
+        }
+      }
 
       if (!cancelled && runToken === runTokenRef.current) {
         setIndicatorData(series);
@@ -182,7 +225,7 @@ export const useIndicatorExecution = ({
         debounceRef.current = null;
       }
     };
-  }, [data, indicators, indicatorSettings, refreshEpochs]);
+  }, [data, indicators, indicatorSettings, refreshEpochs, asset, timeframe]);
 
   const forceRefreshIndicator = (id: string) => {
     setRefreshEpochs((prev) => ({
@@ -37,7 +37,10 @@ const seedIndicator = (): CustomIndicator => {
   };
 };
 
-export const useIndicators = (data: Candle[]) => {
+export const useIndicators = (
+  data: Candle[],
+  stream: { asset?: string; timeframe?: string } = {}
+) => {
   const [indicators, setIndicators] = useState<CustomIndicator[]>([]);
   const [selectedIndicatorId, setSelectedIndicatorIdState] = useState<string | null>(loadSelectedIndicatorId);
   const [appliedVersions, setAppliedVersions] = useState<Record<string, number>>(loadAppliedVersions);
@@ -60,6 +63,8 @@ export const useIndicators = (data: Candle[]) => {
     data,
     indicators,
     indicatorSettings,
+    asset: stream.asset,
+    timeframe: stream.timeframe,
   });
 
   const setSelectedIndicatorId = (id: string | null) => {
@@ -1,12 +1,21 @@
-import talib
 import numpy as np
 
+from thelab import ta
+
+try:
+    import talib  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    talib = None
+
 
 def calculate(inputs):
     """
     Example: EMA 200 indicator.
     Receives numpy arrays in inputs['close'].
-    Returns an array with the 200-period exponential moving average.
+    Returns an array with the 200-period exponential moving average
+    (TA-Lib when installed, otherwise the bundled thelab.ta kernel).
     """
-    close_prices = np.array(inputs['close'])
-    return talib.EMA(close_prices, timeperiod=200)
+    close_prices = np.asarray(inputs['close'], dtype=float)
+    if talib is not None:
+        return talib.EMA(close_prices, timeperiod=200)
+    return ta.ema(close_prices, 200)
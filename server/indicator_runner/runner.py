@@ -1,13 +1,33 @@
+import base64
+import contextlib
+import hashlib
 import json
 import math
 import os
+import struct
 import sys
+import threading
 import time
 import traceback
-from typing import Any, Dict
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
 import inspect
 
 
+_UINT32 = struct.Struct("<I")
+
+# Helpers bundled with the runner (`from thelab import ta`) are importable
+# from every indicator workspace.
+_BUNDLED_DIR = os.path.dirname(os.path.abspath(__file__))
+if _BUNDLED_DIR not in sys.path:
+  sys.path.append(_BUNDLED_DIR)
+
+# Binary columnar payload, see server/src/services/indicatorBinaryCodec.js.
+_BINARY_MAGIC = b"TLB1"
+_BINARY_DTYPES = ("<f8", "<i8")
+
+
 def _print_json(payload: Dict[str, Any]) -> None:
   """
   Write a single JSON object to stdout. Fallback to a minimal error if serialization fails.
@@ -45,6 +65,14 @@ def _to_serializable(obj: Any) -> Any:
     if isinstance(obj, np.generic):
       return _to_serializable(obj.item())
     if isinstance(obj, np.ndarray):
+      if obj.ndim == 1 and obj.dtype.kind in "iub":
+        return obj.tolist()
+      if obj.ndim == 1 and obj.dtype.kind == "f":
+        # Mask NaN/inf in bulk; only the offending slots are touched in Python.
+        values = obj.tolist()
+        for i in np.flatnonzero(~np.isfinite(obj)).tolist():
+          values[i] = None
+        return values
       # Convert to list and recurse so that NaN/inf are normalized
       return _to_serializable(obj.tolist())
 
@@ -66,7 +94,179 @@ def _to_serializable(obj: Any) -> Any:
   return obj
 
 
-def _load_indicator_module(script_path: str):
+class SeriesPacker:
+  """
+  Packs numeric series as little-endian float64 plus a validity bitmap
+  (LSB-first, bit set = finite value) instead of JSON lists.
+
+  Each packed series is replaced in the response by a descriptor:
+
+    {"$packed": {"dtype": "<f8", "length": n, "offset": o, "validOffset": v}}
+
+  where offsets point into the frame attachment (worker mode), or, with
+  `inline=True`, by {"$packed": {"dtype", "length", "data", "valid"}} holding
+  base64 strings (one-shot stdout mode).
+  Decoded by `decodePackedSeries` in server/src/services/indicatorBinaryCodec.js.
+  """
+
+  def __init__(self, inline: bool = False) -> None:
+    self.inline = inline
+    self._chunks = []
+    self._size = 0
+    # Batch runs serialize several indicators into one packer from threads.
+    self._lock = threading.Lock()
+
+  @staticmethod
+  def accepts(value: Any) -> bool:
+    try:
+      import numpy as np  # type: ignore
+    except Exception:  # pragma: no cover - environments without numpy
+      return False
+    return isinstance(value, np.ndarray) and value.ndim == 1 and value.dtype.kind in "fiub"
+
+  def _append(self, raw: bytes) -> int:
+    offset = self._size
+    pad = (-len(raw)) % 8
+    self._chunks.append(raw)
+    if pad:
+      self._chunks.append(b"\0" * pad)
+    self._size += len(raw) + pad
+    return offset
+
+  def add(self, value: Any) -> Dict[str, Any]:
+    import numpy as np  # type: ignore
+
+    values = np.ascontiguousarray(value, dtype="<f8")
+    valid = np.packbits(np.isfinite(values), bitorder="little")
+    descriptor: Dict[str, Any] = {"dtype": "<f8", "length": int(values.size)}
+    if self.inline:
+      descriptor["data"] = base64.b64encode(values.tobytes()).decode("ascii")
+      descriptor["valid"] = base64.b64encode(valid.tobytes()).decode("ascii")
+    else:
+      with self._lock:
+        descriptor["offset"] = self._append(values.tobytes())
+        descriptor["validOffset"] = self._append(valid.tobytes())
+    return {"$packed": descriptor}
+
+  def attachment(self) -> bytes:
+    return b"".join(self._chunks)
+
+
+def _wants_packed(payload: Any) -> bool:
+  return isinstance(payload, dict) and payload.get("output") == "packed"
+
+
+def _serialize_series(series: Any, packer: Optional[SeriesPacker]) -> Any:
+  if packer is None or not isinstance(series, dict):
+    return _to_serializable(series)
+  return {
+    str(key): packer.add(value) if packer.accepts(value) else _to_serializable(value)
+    for key, value in series.items()
+  }
+
+
+def _decode_binary_payload(buffer) -> Dict[str, Any]:
+  """
+  Decode a TLB1 payload (magic, uint32 header length, JSON header, columns)
+  into {"inputs": {name: ndarray}, "settings": ...}.
+
+  Columns are mapped with `np.frombuffer`, so the arrays share memory with
+  `buffer` (pass a bytearray to get writable arrays).
+  """
+  import numpy as np  # type: ignore
+
+  view = memoryview(buffer)
+  if bytes(view[:4]) != _BINARY_MAGIC:
+    raise ValueError("binary payload must start with TLB1")
+  (header_len,) = _UINT32.unpack_from(view, 4)
+  offset = 4 + _UINT32.size
+  header = json.loads(bytes(view[offset:offset + header_len]).decode("utf-8"))
+  offset += header_len
+
+  length = int(header.get("length") or 0)
+  inputs: Dict[str, Any] = {}
+  for column in header.get("columns") or []:
+    name = str(column.get("name"))
+    dtype = np.dtype(column.get("dtype") or "<f8")
+    if dtype.str not in _BINARY_DTYPES:
+      raise ValueError(f"unsupported column dtype {dtype.str!r} for {name!r}")
+    size = length * dtype.itemsize
+    if offset + size > len(view):
+      raise ValueError(f"binary payload truncated in column {name!r}")
+    inputs[name] = np.frombuffer(view, dtype=dtype, count=length, offset=offset)
+    offset += size
+
+  payload = {k: v for k, v in header.items() if k not in ("columns", "length")}
+  payload["inputs"] = inputs
+  return payload
+
+
+_DEFAULT_COLUMN_STORE = os.path.join(os.path.dirname(_BUNDLED_DIR), "data", "columns")
+
+
+def _source_inputs(payload: Any) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+  """
+  Inputs for a payload that names stored bars instead of carrying them:
+  {"source": {"asset", "timeframe", "offset"?, "length"?, "from"?, "to"?,
+  "limit"?, "store"?, "db"?}}. The columns are read-only `np.memmap` views of
+  the column store (`thelab.store`, default root THELAB_COLUMN_STORE_DIR or
+  server/data/columns), or with `"db": true | path` a from/to/limit window
+  of the SQLite market store (`thelab.marketdb`). They take precedence over
+  inline inputs. Returns (inputs, meta.source) or None without a source.
+  """
+  source = payload.get("source") if isinstance(payload, dict) else None
+  if not isinstance(source, dict):
+    return None
+  if source.get("db"):
+    from thelab import marketdb
+
+    db_path = source["db"] if isinstance(source["db"], str) else None
+    bars = marketdb.window(
+      source.get("asset"),
+      source.get("timeframe"),
+      start=source.get("from"),
+      end=source.get("to"),
+      limit=source.get("limit"),
+      db_path=db_path,
+    )
+    return bars, {
+      "asset": str(source.get("asset")).lower(),
+      "timeframe": str(source.get("timeframe")).lower(),
+      "db": True,
+      "length": len(bars["time"]),
+    }
+  from thelab import store
+
+  root = source.get("store") or os.environ.get("THELAB_COLUMN_STORE_DIR") or _DEFAULT_COLUMN_STORE
+  columns, manifest = store.open_columns(root, source.get("asset"), source.get("timeframe"))
+  views, offset = store.select(
+    columns,
+    start=source.get("from"),
+    end=source.get("to"),
+    limit=source.get("limit"),
+    offset=source.get("offset"),
+    length=source.get("length"),
+  )
+  return views, {
+    "asset": manifest.get("asset"),
+    "timeframe": manifest.get("timeframe"),
+    "revision": manifest.get("revision"),
+    "offset": offset,
+    "length": len(views["time"]),
+  }
+
+
+def _payload_columns(payload: Any) -> Any:
+  """The payload's inline `inputs`, or the bars its `source` names (see `_source_inputs`)."""
+  inputs = payload.get("inputs") if isinstance(payload, dict) else None
+  if not isinstance(inputs, dict):
+    stored = _source_inputs(payload)
+    if stored is not None:
+      inputs = stored[0]
+  return inputs
+
+
+def _load_indicator_module(script_path: str, module_name: str = "__thelab_indicator__"):
   """
   Dynamically load a Python module from the given path and return it.
   """
@@ -78,7 +278,6 @@ def _load_indicator_module(script_path: str):
   indicator_root = os.path.dirname(script_path)
   if indicator_root not in sys.path:
     sys.path.insert(0, indicator_root)
-  module_name = "__thelab_indicator__"
 
   spec = importlib.util.spec_from_file_location(module_name, script_path)
   if spec is None or spec.loader is None:
@@ -148,46 +347,149 @@ def _extract_location(exc: BaseException, script_path: str) -> Dict[str, Any]:
   return info
 
 
-def main() -> None:
-  start_ts = time.time()
-  api_version = 1
+def _error(api_version: int, error: Dict[str, Any]) -> Dict[str, Any]:
+  return {"ok": False, "apiVersion": api_version, "error": error}
 
-  if len(sys.argv) < 2:
-    _print_json(
+
+class PhaseTimer:
+  """
+  Wall time per request phase, reported as `meta.phases` in milliseconds:
+  "parse" (stdin / frame decoding), "inputs" (numpy conversion), "import",
+  "execute" (the indicator's own code) and "serialize" (normalizing and
+  packing the result). JSON encoding of the response happens after `meta`
+  is built and is not included.
+  """
+
+  def __init__(self, initial: Optional[Dict[str, float]] = None) -> None:
+    self.phases: Dict[str, float] = dict(initial or {})
+
+  @contextlib.contextmanager
+  def phase(self, name: str):
+    started = time.perf_counter()
+    try:
+      yield
+    finally:
+      self.phases[name] = self.phases.get(name, 0.0) + (time.perf_counter() - started) * 1000.0
+
+
+_PROFILE_DEFAULT_TOP = 20
+_PROFILE_MAX_TOP = 200
+
+
+def _diagnostics(payload: Any) -> Tuple[Optional[int], bool]:
+  """
+  Opt-in diagnostics requested by the payload: `profile` (true or the number
+  of functions to return) and `traceMemory` (true). Returns (top_n, trace).
+  """
+  if not isinstance(payload, dict):
+    return None, False
+  profile = payload.get("profile")
+  top: Optional[int] = None
+  if profile is True:
+    top = _PROFILE_DEFAULT_TOP
+  elif isinstance(profile, (int, float)) and not isinstance(profile, bool) and profile > 0:
+    top = min(int(profile), _PROFILE_MAX_TOP)
+  return top, payload.get("traceMemory") is True
+
+
+def _profile_rows(profiler, top: int):
+  import pstats
+
+  stats = pstats.Stats(profiler)
+  own_file = os.path.abspath(__file__)
+  rows = []
+  for (filename, line, function), (primitive, calls, own, cumulative, _) in stats.stats.items():
+    # Skip the profiler itself and the runner's call wrapper.
+    if (filename == "~" and "_lsprof" in function) or filename == own_file:
+      continue
+    rows.append(
       {
-        "ok": False,
-        "apiVersion": api_version,
-        "error": {
-          "type": "UsageError",
-          "message": "Usage: runner.py <indicator_path>",
-          "phase": "bootstrap",
-        },
+        "function": function,
+        "file": filename,
+        "line": line,
+        "calls": calls,
+        "primitiveCalls": primitive,
+        "selfMs": own * 1000.0,
+        "cumulativeMs": cumulative * 1000.0,
       }
     )
-    return
+  rows.sort(key=lambda row: row["cumulativeMs"], reverse=True)
+  return rows[:top], stats.total_calls
 
-  script_path = sys.argv[1]
 
-  # Read payload from stdin
+def _instrumented(call, profile_top: Optional[int], trace_memory: bool):
+  """
+  Run `call()` under cProfile and/or tracemalloc as requested and return
+  (result, diagnostics) where diagnostics holds "profile" ({"top": [...],
+  "totalCalls"}) and/or "memory" ({"peakBytes", "retainedBytes"}).
+  """
+  if profile_top is None and not trace_memory:
+    return call(), {}
+  import tracemalloc
+
+  profiler = None
+  if profile_top is not None:
+    import cProfile
+
+    profiler = cProfile.Profile()
+  started_tracing = trace_memory and not tracemalloc.is_tracing()
+  if started_tracing:
+    tracemalloc.start()
+  if trace_memory:
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+  diagnostics: Dict[str, Any] = {}
   try:
-    stdin_data = sys.stdin.read()
-    payload = json.loads(stdin_data) if stdin_data.strip() else {}
-  except Exception as exc:
-    _print_json(
-      {
-        "ok": False,
-        "apiVersion": api_version,
-        "error": {
-          "type": "InputError",
-          "message": f"Failed to parse JSON from stdin: {exc}",
-          "phase": "inputs",
-        },
-      }
-    )
-    return
+    if profiler is not None:
+      profiler.enable()
+    try:
+      result = call()
+    finally:
+      if profiler is not None:
+        profiler.disable()
+    if trace_memory:
+      current, peak = tracemalloc.get_traced_memory()
+      diagnostics["memory"] = {"peakBytes": max(peak - baseline, 0), "retainedBytes": max(current - baseline, 0)}
+  finally:
+    if started_tracing:
+      tracemalloc.stop()
+  if profiler is not None:
+    rows, total_calls = _profile_rows(profiler, profile_top)
+    diagnostics["profile"] = {"top": rows, "totalCalls": total_calls}
+  return result, diagnostics
+
+
+def execute(
+  script_path: str,
+  payload: Any,
+  start_ts: float,
+  loader=None,
+  packer: Optional[SeriesPacker] = None,
+  incremental: Optional["IncrementalCache"] = None,
+  phases: Optional[Dict[str, float]] = None,
+) -> Dict[str, Any]:
+  """
+  Run a single indicator request and return the response dict (never raises).
+
+  `loader` resolves the indicator module for `script_path`; one-shot runs use
+  `_load_indicator_module`, worker mode passes a cached loader. When `packer`
+  is given, numeric series are packed into it instead of JSON lists. When
+  `incremental` is given and the indicator defines `calculate_incremental`,
+  only bars not seen by a previous request on the same stream are computed.
 
-  # Support both {"inputs": {...}} and flat {"open": [...], ...}
+  `meta.phases` breaks the request down by `PhaseTimer` phase (`phases`
+  seeds it with time spent before this call, e.g. "parse"). With
+  `"profile"` / `"traceMemory"` in the payload, `meta.profile` and
+  `meta.memory` describe the indicator's own code (see `_instrumented`).
+  """
+  api_version = 1
+  loader = loader or _load_indicator_module
+  timer = PhaseTimer(phases)
+  profile_top, trace_memory = _diagnostics(payload)
+
+  # Support {"inputs": {...}}, flat {"open": [...], ...} and {"source": {...}} (column store)
   raw_inputs = payload.get("inputs") if isinstance(payload, dict) else None
+  source_meta = None
   if not isinstance(raw_inputs, dict):
     if isinstance(payload, dict):
       raw_inputs = {k: v for k, v in payload.items() if isinstance(v, (list, tuple))}
@@ -202,24 +504,24 @@ def main() -> None:
     except Exception:  # pragma: no cover - allow running without numpy
       np = None
 
-    for key, value in raw_inputs.items():
-      if np is not None and isinstance(value, (list, tuple)):
-        inputs[key] = np.array(value)
-      else:
-        inputs[key] = value
+    with timer.phase("inputs"):
+      stored = _source_inputs(payload)
+      if stored is not None:
+        raw_inputs, source_meta = stored
+      for key, value in raw_inputs.items():
+        if np is not None and isinstance(value, (list, tuple)):
+          inputs[key] = np.array(value)
+        else:
+          inputs[key] = value
   except Exception as exc:
-    _print_json(
+    return _error(
+      api_version,
       {
-        "ok": False,
-        "apiVersion": api_version,
-        "error": {
-          "type": "InputError",
-          "message": f"Failed to prepare inputs: {exc}",
-          "phase": "inputs",
-        },
-      }
+        "type": "InputError",
+        "message": f"Failed to prepare inputs: {exc}",
+        "phase": "inputs",
+      },
     )
-    return
 
   # Optional settings dict forwarded by the frontend.
   raw_settings = payload.get("settings") if isinstance(payload, dict) else None
@@ -231,7 +533,8 @@ def main() -> None:
 
   # Load indicator module
   try:
-    module = _load_indicator_module(script_path)
+    with timer.phase("import"):
+      module = loader(script_path)
   except Exception as exc:
     location = _extract_location(exc, script_path)
     error_payload: Dict[str, Any] = {
@@ -242,47 +545,48 @@ def main() -> None:
       "exceptionType": exc.__class__.__name__,
     }
     error_payload.update(location)
-    _print_json(
-      {
-        "ok": False,
-        "apiVersion": api_version,
-        "error": error_payload,
-      }
-    )
-    return
+    return _error(api_version, error_payload)
 
   calculate = getattr(module, "calculate", None)
   if not callable(calculate):
-    _print_json(
+    return _error(
+      api_version,
       {
-        "ok": False,
-        "apiVersion": api_version,
-        "error": {
-          "type": "MissingEntryPoint",
-          "message": "Indicator module must define a callable 'calculate(inputs)'",
-          "phase": "import",
-        },
-      }
+        "type": "MissingEntryPoint",
+        "message": "Indicator module must define a callable 'calculate(inputs)'",
+        "phase": "import",
+      },
     )
-    return
+
+  calculate_incremental = getattr(module, "calculate_incremental", None)
+  use_incremental = incremental is not None and callable(calculate_incremental) and "time" in inputs
+  incremental_meta: Optional[Dict[str, Any]] = None
 
   # Execute user code
   try:
     exec_start = time.time()
-    try:
-      sig = inspect.signature(calculate)
-      param_count = len(sig.parameters)
-    except Exception:
-      param_count = getattr(getattr(calculate, "__code__", None), "co_argcount", 1)
-
-    if param_count >= 2:
-      result = calculate(inputs, settings)
+    if use_incremental:
+      stream = payload.get("stream") if isinstance(payload, dict) else None
+      call = lambda: incremental.run(script_path, module, inputs, settings, stream)
     else:
-      result = calculate(inputs)
+      try:
+        sig = inspect.signature(calculate)
+        param_count = len(sig.parameters)
+      except Exception:
+        param_count = getattr(getattr(calculate, "__code__", None), "co_argcount", 1)
+
+      if param_count >= 2:
+        call = lambda: calculate(inputs, settings)
+      else:
+        call = lambda: calculate(inputs)
+    with timer.phase("execute"):
+      result, diagnostics = _instrumented(call, profile_top, trace_memory)
+    if use_incremental:
+      result, incremental_meta = result
     exec_ms = (time.time() - exec_start) * 1000.0
   except Exception as exc:
     location = _extract_location(exc, script_path)
-    error_payload: Dict[str, Any] = {
+    error_payload = {
       "type": "ExecutionError",
       "message": str(exc),
       "phase": "execute",
@@ -290,57 +594,865 @@ def main() -> None:
       "exceptionType": exc.__class__.__name__,
     }
     error_payload.update(location)
-    _print_json(
-      {
-        "ok": False,
-        "apiVersion": api_version,
-        "error": error_payload,
-      }
-    )
-    return
+    return _error(api_version, error_payload)
 
   # Normalize result
   try:
-    # Default shape: assume array-like -> main series
-    if isinstance(result, dict):
-      normalized = _to_serializable(result)
-      series = normalized.get("series") or {}
-      markers = normalized.get("markers") or []
-      levels = normalized.get("levels") or []
-    else:
-      main = _to_serializable(result)
-      series = {"main": main}
-      markers = []
-      levels = []
+    with timer.phase("serialize"):
+      # Default shape: assume array-like -> main series
+      if isinstance(result, dict):
+        normalized = _to_serializable({k: v for k, v in result.items() if k != "series"})
+        series = _serialize_series(result.get("series"), packer) or {}
+        markers = normalized.get("markers") or []
+        levels = normalized.get("levels") or []
+      else:
+        series = _serialize_series({"main": result}, packer)
+        markers = []
+        levels = []
 
     total_ms = (time.time() - start_ts) * 1000.0
 
-    output = {
+    meta: Dict[str, Any] = {
+      "scriptPath": os.path.abspath(script_path),
+      "executionMs": exec_ms,
+      "totalMs": total_ms,
+      "phases": timer.phases,
+    }
+    if incremental_meta is not None:
+      meta["incremental"] = incremental_meta
+    if source_meta is not None:
+      meta["source"] = source_meta
+    meta.update(diagnostics)
+
+    return {
       "ok": True,
       "apiVersion": api_version,
       "series": series,
       "markers": markers,
       "levels": levels,
-      "meta": {
-        "scriptPath": os.path.abspath(script_path),
-        "executionMs": exec_ms,
-        "totalMs": total_ms,
+      "meta": meta,
+    }
+  except Exception as exc:
+    return _error(
+      api_version,
+      {
+        "type": "ResultError",
+        "message": f"Failed to normalize result: {exc}",
+        "phase": "serialize",
+        "traceback": traceback.format_exc(limit=5),
       },
+    )
+
+
+def _batch_threads(count: int) -> int:
+  try:
+    configured = int(os.environ.get("THELAB_INDICATOR_BATCH_THREADS") or 0)
+  except ValueError:
+    configured = 0
+  limit = configured if configured > 0 else min(4, os.cpu_count() or 1)
+  return max(1, min(count, limit))
+
+
+def execute_batch(
+  payload: Dict[str, Any],
+  start_ts: float,
+  loader=None,
+  packer: Optional[SeriesPacker] = None,
+  incremental: Optional["IncrementalCache"] = None,
+  phases: Optional[Dict[str, float]] = None,
+) -> Dict[str, Any]:
+  """
+  Run several indicators over one set of inputs and return
+  {"ok": True, "results": [<execute() result>, ...], "meta": {...}}.
+
+  `payload["batch"]` lists {"scriptPath", "settings"} items; every other
+  payload field (inputs or source, stream, output) is shared. Input arrays
+  are built once and handed to every indicator read-only. Modules are
+  imported up front on the calling thread, then the `calculate` calls run
+  in a thread pool: numpy releases the GIL in its kernels, so independent
+  indicators overlap. Results keep the order of `batch`; a failing item
+  only fails its own entry.
+
+  `meta.phases` covers the shared work (parse, inputs, import); every result
+  carries its own phases. Profiling or memory tracing runs the items on one
+  thread, since neither cProfile nor tracemalloc can tell threads apart.
+  """
+  import numpy as np  # type: ignore
+
+  timer = PhaseTimer(phases)
+
+  items = payload.get("batch")
+  if not isinstance(items, list):
+    return _error(1, {"type": "UsageError", "message": "'batch' must be a list", "phase": "bootstrap"})
+
+  raw_inputs = payload.get("inputs")
+  inputs: Dict[str, Any] = {}
+  stored = None
+  with timer.phase("inputs"):
+    try:
+      stored = _source_inputs(payload)
+    except Exception as exc:
+      return _error(1, {"type": "InputError", "message": f"Failed to open source: {exc}", "phase": "inputs"})
+    if stored is not None:
+      raw_inputs = stored[0]
+    for key, value in (raw_inputs if isinstance(raw_inputs, dict) else {}).items():
+      array = np.asarray(value)
+      if array.flags.writeable:
+        array = array.view()
+        array.flags.writeable = False
+      inputs[key] = array
+  shared = {k: v for k, v in payload.items() if k not in ("batch", "inputs", "settings", "source")}
+  shared["inputs"] = inputs
+
+  loader = loader or _load_indicator_module
+  modules: Dict[str, Any] = {}
+  with timer.phase("import"):
+    for item in items:
+      script_path = item.get("scriptPath") if isinstance(item, dict) else None
+      if isinstance(script_path, str) and script_path not in modules:
+        try:
+          modules[script_path] = (loader(script_path), None)
+        except Exception as exc:
+          modules[script_path] = (None, exc)
+
+  def preloaded(script_path: str):
+    module, exc = modules[script_path]
+    if exc is not None:
+      raise exc
+    return module
+
+  def run_item(item: Any) -> Dict[str, Any]:
+    item_start = time.time()
+    script_path = item.get("scriptPath") if isinstance(item, dict) else None
+    if not isinstance(script_path, str) or not script_path:
+      return _error(
+        1,
+        {"type": "UsageError", "message": "batch item requires 'scriptPath'", "phase": "bootstrap"},
+      )
+    item_payload = dict(shared, settings=item.get("settings"))
+    return execute(
+      script_path, item_payload, item_start, loader=preloaded, packer=packer, incremental=incremental
+    )
+
+  profile_top, trace_memory = _diagnostics(payload)
+  threads = 1 if profile_top is not None or trace_memory else _batch_threads(len(items))
+  if threads > 1:
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+      results = list(pool.map(run_item, items))
+  else:
+    results = [run_item(item) for item in items]
+
+  return {
+    "ok": True,
+    "apiVersion": 1,
+    "results": results,
+    "meta": {
+      "totalMs": (time.time() - start_ts) * 1000.0,
+      "threads": threads,
+      "phases": timer.phases,
+      **({"source": stored[1]} if stored is not None else {}),
+    },
+  }
+
+
+def _backtest_costs(payload: Dict[str, Any]) -> Dict[str, float]:
+  return {
+    "cash": float(payload.get("cash") or 100000.0),
+    "fee_bps": float(payload.get("feeBps") if payload.get("feeBps") is not None else 0.5),
+    "slippage_bps": float(payload.get("slippageBps") if payload.get("slippageBps") is not None else 1.0),
+  }
+
+
+def execute_backtest(
+  script_path: str,
+  payload: Dict[str, Any],
+  start_ts: float,
+  packer: Optional[SeriesPacker] = None,
+) -> Dict[str, Any]:
+  """
+  Run a strategy (`init(context)` / `handle_data(context, data)`) through
+  `thelab.backtest` over the payload's columnar bars and return the response
+  dict (never raises). Bars come from `inputs` or a `source` (as for indicator
+  runs). Other payload fields: `cash`, `feeBps`,
+  `slippageBps`, `settings` (exposed as `context.params`), an optional
+  `workspace` directory made importable for scripts living outside it and
+  `indicatorsWorkspace`, where `thelab.indicators` finds indicator scripts.
+
+  Strategies defining `signals(inputs, params)` run through
+  `thelab.vectorized` instead: when they have no `handle_data`, or when the
+  payload asks for `"mode": "vectorized"`.
+  """
+  api_version = 1
+  from thelab import backtest, indicators
+
+  try:
+    inputs = _payload_columns(payload)
+  except Exception as exc:
+    return _error(api_version, {"type": "InputError", "message": f"Failed to open source: {exc}", "phase": "inputs"})
+  if not isinstance(inputs, dict) or "close" not in inputs:
+    return _error(
+      api_version,
+      {"type": "InputError", "message": "backtest payload requires columnar inputs", "phase": "inputs"},
+    )
+
+  workspace = payload.get("workspace")
+  if isinstance(workspace, str) and workspace and workspace not in sys.path:
+    sys.path.insert(0, workspace)
+  indicators.set_workspace(payload.get("indicatorsWorkspace"))
+
+  try:
+    module = _load_indicator_module(script_path, "__thelab_strategy__")
+  except Exception as exc:
+    error_payload: Dict[str, Any] = {
+      "type": "ImportError",
+      "message": f"Failed to import strategy: {exc}",
+      "phase": "import",
+      "traceback": traceback.format_exc(limit=5),
+      "exceptionType": exc.__class__.__name__,
     }
-    _print_json(output)
+    error_payload.update(_extract_location(exc, script_path))
+    return _error(api_version, error_payload)
+
+  mode = backtest.strategy_mode(module, payload.get("mode"))
+  if mode is None:
+    return _error(
+      api_version,
+      {
+        "type": "MissingEntryPoint",
+        "message": "Strategy module must define a callable 'handle_data(context, data)' or 'signals(inputs, params)'",
+        "phase": "import",
+      },
+    )
+
+  settings = payload.get("settings")
+  params = settings if isinstance(settings, dict) else {}
+  costs = _backtest_costs(payload)
+  try:
+    exec_start = time.time()
+    result = backtest.run_strategy(module, inputs, params, mode=mode, **costs)
+    exec_ms = (time.time() - exec_start) * 1000.0
   except Exception as exc:
-    _print_json(
+    error_payload = {
+      "type": "ExecutionError",
+      "message": str(exc),
+      "phase": "execute",
+      "traceback": traceback.format_exc(limit=10),
+      "exceptionType": exc.__class__.__name__,
+    }
+    error_payload.update(_extract_location(exc, script_path))
+    return _error(api_version, error_payload)
+
+  try:
+    equity = result.pop("equity")
+    response = _to_serializable(result)
+    response.update(
       {
-        "ok": False,
+        "ok": True,
         "apiVersion": api_version,
+        "series": _serialize_series({"equity": equity}, packer),
+        "meta": {
+          "scriptPath": os.path.abspath(script_path),
+          "mode": mode,
+          "executionMs": exec_ms,
+          "totalMs": (time.time() - start_ts) * 1000.0,
+        },
+      }
+    )
+    return response
+  except Exception as exc:
+    return _error(
+      api_version,
+      {
+        "type": "ResultError",
+        "message": f"Failed to serialize backtest result: {exc}",
+        "phase": "serialize",
+        "traceback": traceback.format_exc(limit=5),
+      },
+    )
+
+
+def _stream_events(script_path: str, payload: Dict[str, Any], label: str, run, required=("space",)) -> None:
+  """
+  Shared plumbing of --optimize / --walkforward: validate the payload, call
+  `run(inputs, space, options, emit, cancelled)` and write every event it
+  emits to stdout as one JSON line. SIGTERM sets the `cancelled` flag.
+  Failures are reported as a single {"type": "error", "error": {...}} line.
+  """
+  import signal
+
+  def emit(event: Dict[str, Any]) -> None:
+    sys.stdout.write(json.dumps(_to_serializable(event), ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+  cancel = threading.Event()
+  signal.signal(signal.SIGTERM, lambda *_: cancel.set())
+
+  try:
+    inputs = _payload_columns(payload)
+  except Exception as exc:
+    emit({"type": "error", "error": {"type": "InputError", "message": f"Failed to open source: {exc}", "phase": "inputs"}})
+    return
+  space = payload.get("space")
+  missing = [name for name in required if not payload.get(name)]
+  if not isinstance(inputs, dict) or "close" not in inputs or not isinstance(space, dict) or missing:
+    fields = ", ".join(repr(name) for name in required)
+    emit(
+      {
+        "type": "error",
         "error": {
-          "type": "ResultError",
-          "message": f"Failed to normalize result: {exc}",
-          "phase": "serialize",
-          "traceback": traceback.format_exc(limit=5),
+          "type": "InputError",
+          "message": f"{label} payload requires columnar inputs and non-empty {fields}",
+          "phase": "inputs",
         },
       }
     )
+    return
+
+  options = {
+    "sampler": payload.get("sampler") or "grid",
+    "samples": payload.get("samples"),
+    "seed": payload.get("seed"),
+    "objective": payload.get("objective") or "totalProfit",
+    "max_workers": payload.get("maxWorkers"),
+    "mode": payload.get("mode"),
+    "workspace": payload.get("workspace"),
+    "indicators_workspace": payload.get("indicatorsWorkspace"),
+    **_backtest_costs(payload),
+  }
+  try:
+    run(inputs, space, options, emit, cancel.is_set)
+  except Exception as exc:
+    error_payload: Dict[str, Any] = {
+      "type": "OptimizeError",
+      "message": str(exc),
+      "phase": "execute",
+      "traceback": traceback.format_exc(limit=10),
+      "exceptionType": exc.__class__.__name__,
+    }
+    error_payload.update(_extract_location(exc, script_path))
+    emit({"type": "error", "error": error_payload})
+
+
+def execute_optimize(script_path: str, payload: Dict[str, Any]) -> None:
+  """
+  Run a parameter sweep with `thelab.optimize` and stream newline-delimited
+  JSON events to stdout ("start", one "result" per evaluation, "done"; or a
+  single "error"). Payload fields: `inputs`, `space`, `sampler`, `samples`,
+  `seed`, `objective`, `maxWorkers`, `mode`, `workspace`,
+  `indicatorsWorkspace` and the backtest costs. SIGTERM cancels: no new
+  evaluations start, workers are terminated and "done" reports
+  `cancelled: true`.
+  """
+  from thelab import optimize
+
+  def run(inputs, space, options, emit, cancelled) -> None:
+    optimize.optimize(script_path, inputs, space, emit=emit, cancelled=cancelled, **options)
+
+  _stream_events(script_path, payload, "optimize", run)
+
+
+def execute_walkforward(script_path: str, payload: Dict[str, Any]) -> None:
+  """
+  Run a walk-forward analysis with `thelab.walkforward`, streaming events
+  like `execute_optimize` ("start", one "fold" per fold, "done"). Extra
+  payload fields: `inSample`, `outOfSample`, `step` and `anchored` (fold
+  sizes in bars). The stitched out-of-sample `equity` / `equityIndex` of
+  the "done" event are sent packed under `series`.
+  """
+  from thelab import walkforward
+
+  def run(inputs, space, options, emit, cancelled) -> None:
+    def forward(event: Dict[str, Any]) -> None:
+      if event.get("type") == "done":
+        event = dict(event)
+        packer = SeriesPacker(inline=True)
+        event["series"] = _serialize_series(
+          {"equity": event.pop("equity"), "equityIndex": event.pop("equityIndex")}, packer
+        )
+      emit(event)
+
+    walkforward.walk_forward(
+      script_path,
+      inputs,
+      space,
+      in_sample=payload.get("inSample"),
+      out_of_sample=payload.get("outOfSample"),
+      step=payload.get("step"),
+      anchored=bool(payload.get("anchored")),
+      emit=forward,
+      cancelled=cancelled,
+      **options,
+    )
+
+  _stream_events(script_path, payload, "walk-forward", run, required=("space", "inSample", "outOfSample"))
+
+
+def main() -> None:
+  start_ts = time.time()
+  api_version = 1
+
+  if len(sys.argv) < 2:
+    _print_json(
+      _error(
+        api_version,
+        {
+          "type": "UsageError",
+          "message": "Usage: runner.py <indicator_path> | runner.py --batch"
+          " | runner.py --backtest|--optimize|--walkforward <strategy_path>"
+          " | runner.py --worker",
+          "phase": "bootstrap",
+        },
+      )
+    )
+    return
+
+  if sys.argv[1] == "--worker":
+    worker_main()
+    return
+
+  script_path = sys.argv[1]
+  backtest_path = None
+  if script_path in ("--backtest", "--optimize", "--walkforward"):
+    if len(sys.argv) < 3:
+      _print_json(
+        _error(
+          api_version,
+          {"type": "UsageError", "message": f"Usage: runner.py {script_path} <strategy_path>", "phase": "bootstrap"},
+        )
+      )
+      return
+    backtest_path = sys.argv[2]
+
+  # Read payload from stdin (JSON or TLB1 binary columns)
+  timer = PhaseTimer()
+  try:
+    with timer.phase("parse"):
+      stdin_data = sys.stdin.buffer.read()
+      if stdin_data.startswith(_BINARY_MAGIC):
+        payload = _decode_binary_payload(bytearray(stdin_data))
+      else:
+        payload = json.loads(stdin_data.decode("utf-8")) if stdin_data.strip() else {}
+  except Exception as exc:
+    _print_json(
+      _error(
+        api_version,
+        {
+          "type": "InputError",
+          "message": f"Failed to parse payload from stdin: {exc}",
+          "phase": "inputs",
+        },
+      )
+    )
+    return
+
+  packer = SeriesPacker(inline=True) if _wants_packed(payload) else None
+  if script_path == "--optimize":
+    execute_optimize(backtest_path, payload)
+  elif script_path == "--walkforward":
+    execute_walkforward(backtest_path, payload)
+  elif backtest_path is not None:
+    _print_json(execute_backtest(backtest_path, payload, start_ts, packer=packer))
+  elif script_path == "--batch":
+    _print_json(execute_batch(payload, start_ts, packer=packer, phases=timer.phases))
+  else:
+    _print_json(execute(script_path, payload, start_ts, packer=packer, phases=timer.phases))
+
+
+# ---------------------------------------------------------------------------
+# Worker mode
+#
+# `runner.py --worker` keeps the interpreter (numpy, talib and the indicator
+# modules) warm across requests. Requests and responses are frames:
+#
+#   uint32 frameLen | uint32 jsonLen | JSON envelope | binary attachment
+#
+# (little-endian; the attachment takes the remaining frameLen - 4 - jsonLen
+# bytes and may be empty).
+#
+#   request:  {"id": <any>, "scriptPath": "<path>", "payload": {inputs, settings}}
+#             or {"id", "scriptPath"} + a TLB1 columnar attachment
+#   response: <execute() result> + {"id": <same id>}
+#
+# A payload carrying "batch" (a list of {scriptPath, settings}) is run by
+# `execute_batch` instead; "scriptPath" is then ignored.
+#
+# The worker exits cleanly when stdin is closed.
+# ---------------------------------------------------------------------------
+
+
+def _read_exact(stream, size: int) -> Optional[bytearray]:
+  buffer = bytearray(size)
+  view = memoryview(buffer)
+  filled = 0
+  while filled < size:
+    count = stream.readinto(view[filled:])
+    if not count:
+      return None
+    filled += count
+  return buffer
+
+
+def _read_frame(stream) -> Optional[Tuple[bytes, memoryview]]:
+  header = _read_exact(stream, _UINT32.size)
+  if header is None:
+    return None
+  (length,) = _UINT32.unpack(header)
+  body = _read_exact(stream, length) if length else bytearray()
+  if body is None:
+    return None
+  if len(body) < _UINT32.size:
+    return bytes(body), memoryview(bytearray())
+  (json_len,) = _UINT32.unpack_from(body, 0)
+  view = memoryview(body)
+  envelope_end = _UINT32.size + json_len
+  return bytes(view[_UINT32.size:envelope_end]), view[envelope_end:]
+
+
+def _write_frame(stream, payload: Dict[str, Any], attachment: bytes = b"") -> None:
+  try:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+  except Exception as exc:  # pragma: no cover - extremely unlikely
+    fallback = _error(
+      1,
+      {
+        "type": "SerializationError",
+        "message": f"Failed to serialize JSON: {exc}",
+        "phase": "serialize",
+      },
+    )
+    fallback["id"] = payload.get("id")
+    body = json.dumps(fallback).encode("utf-8")
+    attachment = b""
+  if attachment:
+    # Keep the attachment 8-byte aligned within the frame body.
+    body += b" " * ((-(_UINT32.size + len(body))) % 8)
+  stream.write(_UINT32.pack(_UINT32.size + len(body) + len(attachment)))
+  stream.write(_UINT32.pack(len(body)))
+  stream.write(body)
+  if attachment:
+    stream.write(attachment)
+  stream.flush()
+
+
+class ModuleCache:
+  """
+  Keeps indicator modules loaded between requests.
+
+  A script is re-imported when its mtime changes. Workspace modules imported
+  by indicators (e.g. the `market_structure/` package) are tracked as well:
+  if any of them changes on disk, every cached module is dropped so the next
+  request imports fresh code instead of mixing old and new submodules. The
+  bundled `thelab` package is tracked the same way.
+  """
+
+  def __init__(self) -> None:
+    self._scripts: Dict[str, Any] = {}  # abs path -> (mtime_ns, module)
+    self._deps: Dict[str, Any] = {}  # sys.modules name -> (file, mtime_ns)
+
+  @staticmethod
+  def _mtime(path: str) -> Optional[int]:
+    try:
+      return os.stat(path).st_mtime_ns
+    except OSError:
+      return None
+
+  @staticmethod
+  def _module_name(script_abs: str) -> str:
+    digest = hashlib.sha1(script_abs.encode("utf-8")).hexdigest()[:12]
+    return f"__thelab_indicator_{digest}__"
+
+  def _purge(self) -> None:
+    for name in self._deps:
+      sys.modules.pop(name, None)
+    for script_abs in self._scripts:
+      sys.modules.pop(self._module_name(script_abs), None)
+    self._deps.clear()
+    self._scripts.clear()
+
+  def _track_workspace_modules(self, root: str) -> None:
+    prefix = root.rstrip(os.sep) + os.sep
+    for name, module in list(sys.modules.items()):
+      if name in self._deps or name.startswith("__thelab_indicator"):
+        continue
+      path = getattr(module, "__file__", None)
+      if not path:
+        continue
+      path = os.path.abspath(path)
+      if path.startswith(prefix):
+        self._deps[name] = (path, self._mtime(path))
+
+  def load(self, script_path: str):
+    script_abs = os.path.abspath(script_path)
+
+    if any(self._mtime(path) != mtime for path, mtime in self._deps.values()):
+      self._purge()
+
+    mtime = self._mtime(script_abs)
+    cached = self._scripts.get(script_abs)
+    if cached is not None and cached[0] == mtime:
+      return cached[1]
+
+    module = _load_indicator_module(script_abs, module_name=self._module_name(script_abs))
+    self._scripts[script_abs] = (mtime, module)
+    self._track_workspace_modules(os.path.dirname(script_abs))
+    self._track_workspace_modules(os.path.join(_BUNDLED_DIR, "thelab"))
+    return module
+
+
+class IncrementalCache:
+  """
+  Carries `calculate_incremental` state between worker requests.
+
+  Indicators may define `calculate_incremental(state, new_inputs, settings)`
+  returning `(new_state, result)`, where `state` is None for a fresh start and
+  `result` has the same shape as `calculate()` output but covers only the
+  bars in `new_inputs` (marker/level indices are relative to them). The state
+  must be treated as immutable: return a new object instead of mutating it.
+
+  Entries are keyed by (script, stream, settings). Each entry remembers the
+  window it covered (all input columns), the per-bar series, the state after
+  the last bar and a checkpoint before it. A new window is served by:
+
+  - "append": the old window is a prefix of the new one; only the new bars
+    are fed from the last state.
+  - "revise": same as append, but the last known bar changed (a live bar
+    still forming); it is re-fed from the checkpoint.
+  - "full": anything else (window start moved, history rewritten, gaps,
+    settings/module change); the whole window is fed from a fresh state.
+
+  A window whose first bar moved is always "full": the carried state would
+  include bars the request no longer sends, and the result must be the same
+  `calculate()` output whichever worker (warm or cold) serves it.
+  """
+
+  MAX_STREAMS = 64
+  _SHIFTED_KEYS = ("index", "from", "to")
+
+  def __init__(self) -> None:
+    self._entries: "OrderedDict[Any, Dict[str, Any]]" = OrderedDict()
+    self._lock = threading.Lock()
+
+  @staticmethod
+  def _columns(inputs: Dict[str, Any]):
+    import numpy as np  # type: ignore
+
+    times = np.asarray(inputs["time"])
+    return {
+      key: np.array(value, copy=True)
+      for key, value in inputs.items()
+      if isinstance(value, np.ndarray) and value.ndim == 1 and value.size == times.size
+    }
+
+  @staticmethod
+  def _same(new: Dict[str, Any], old: Dict[str, Any], start: int, count: int) -> bool:
+    import numpy as np  # type: ignore
+
+    for key, values in new.items():
+      head = values[:count]
+      tail = old[key][start:start + count]
+      if head.size != count or tail.size != count:
+        return False
+      if not np.array_equal(head, tail, equal_nan=head.dtype.kind == "f"):
+        return False
+    return True
+
+  def _plan(self, entry: Optional[Dict[str, Any]], columns: Dict[str, Any], module):
+    """Return (mode, first_reused_bar, reused_count, resume_state)."""
+    fresh = ("full", 0, 0, None)
+    if entry is None or entry["module"] is not module or set(columns) != set(entry["columns"]):
+      return fresh
+    old_times = entry["columns"]["time"]
+    times = columns["time"]
+    if not times.size or not old_times.size or old_times[0] != times[0]:
+      return fresh
+    known = old_times.size
+    if times.size >= known and self._same(columns, entry["columns"], 0, known):
+      return "append", 0, known, entry["state"]
+    if (
+      times.size >= known
+      and times[known - 1] == old_times[-1]
+      and self._same(columns, entry["columns"], 0, known - 1)
+    ):
+      return "revise", 0, known - 1, entry["checkpoint"]
+    return fresh
+
+  @staticmethod
+  def _chunk(columns: Dict[str, Any], start: int, stop: int) -> Dict[str, Any]:
+    return {key: values[start:stop] for key, values in columns.items()}
+
+  @classmethod
+  def _shift(cls, items, offset: int):
+    shifted = []
+    for item in items or []:
+      if not isinstance(item, dict):
+        continue
+      item = dict(item)
+      for key in cls._SHIFTED_KEYS:
+        value = item.get(key)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+          item[key] = int(value) + offset
+      shifted.append(item)
+    return shifted
+
+  @classmethod
+  def _keep_within(cls, items, limit: int):
+    """Keep markers/levels anchored inside [0, limit) after a shift."""
+    kept = []
+    for item in items:
+      anchors = [item[key] for key in cls._SHIFTED_KEYS if isinstance(item.get(key), int)]
+      if anchors and (max(anchors) < 0 or min(anchors) >= limit):
+        continue
+      if isinstance(item.get("from"), int) and item["from"] < 0:
+        item["from"] = 0
+      kept.append(item)
+    return kept
+
+  @staticmethod
+  def _split_result(result: Any, length: int):
+    import numpy as np  # type: ignore
+
+    if not isinstance(result, dict):
+      result = {"series": {"main": result}}
+    series = {}
+    for key, values in (result.get("series") or {}).items():
+      array = np.asarray(values, dtype=float).reshape(-1)
+      if array.size != length:
+        raise ValueError(
+          f"calculate_incremental returned {array.size} values for series '{key}' "
+          f"but received {length} new bars"
+        )
+      series[str(key)] = array
+    return series, list(result.get("markers") or []), list(result.get("levels") or [])
+
+  def run(self, script_path: str, module, inputs: Dict[str, Any], settings: Dict[str, Any], stream: Any):
+    import numpy as np  # type: ignore
+
+    key = (
+      os.path.abspath(script_path),
+      str(stream or "default"),
+      json.dumps(settings, sort_keys=True, default=str),
+    )
+    with self._lock:
+      entry = self._entries.pop(key, None)
+    columns = self._columns(inputs)
+    total = int(columns["time"].size)
+    if not total:
+      return {"series": {}, "markers": [], "levels": []}, {"mode": "full", "newBars": 0, "reusedBars": 0}
+    mode, start, reused, state = self._plan(entry, columns, module)
+
+    parts: Dict[str, Any] = {}
+    markers = []
+    levels = []
+    if reused:
+      for name, values in entry["series"].items():
+        parts[name] = [values[start:start + reused]]
+      markers = self._keep_within(self._shift(entry["markers"], -start), reused)
+      levels = self._keep_within(self._shift(entry["levels"], -start), reused)
+
+    def feed(chunk_start: int, chunk_stop: int) -> None:
+      nonlocal state
+      length = chunk_stop - chunk_start
+      state, result = module.calculate_incremental(state, self._chunk(columns, chunk_start, chunk_stop), settings)
+      chunk_series, chunk_markers, chunk_levels = self._split_result(result, length)
+      for name in set(parts) | set(chunk_series):
+        series_parts = parts.setdefault(name, [np.full(chunk_start, np.nan)])
+        series_parts.append(chunk_series.get(name, np.full(length, np.nan)))
+      markers.extend(self._shift(chunk_markers, chunk_start))
+      levels.extend(self._shift(chunk_levels, chunk_start))
+
+    if reused == total:
+      checkpoint = entry["checkpoint"]
+    else:
+      # Feed everything but the last bar, then the last bar on its own, so the
+      # next request can revise a still-forming bar from the checkpoint.
+      if total - 1 > reused:
+        feed(reused, total - 1)
+      checkpoint = state
+      feed(total - 1, total)
+
+    series = {name: np.concatenate(chunks) for name, chunks in parts.items()}
+    with self._lock:
+      self._entries[key] = {
+        "module": module,
+        "columns": columns,
+        "series": series,
+        "markers": markers,
+        "levels": levels,
+        "state": state,
+        "checkpoint": checkpoint,
+      }
+      while len(self._entries) > self.MAX_STREAMS:
+        self._entries.popitem(last=False)
+
+    meta = {"mode": mode, "newBars": total - reused, "reusedBars": reused}
+    return {"series": series, "markers": markers, "levels": levels}, meta
+
+
+def worker_main() -> None:
+  channel_in = sys.stdin.buffer
+  channel_out = sys.stdout.buffer
+  # Indicator code may print(); keep stdout reserved for frames.
+  sys.stdout = sys.stderr
+
+  cache = ModuleCache()
+  incremental = IncrementalCache()
+  while True:
+    frame = _read_frame(channel_in)
+    if frame is None:
+      return
+    envelope, attachment = frame
+    start_ts = time.time()
+    request_id = None
+    packer = None
+    timer = PhaseTimer()
+    try:
+      with timer.phase("parse"):
+        request = json.loads(envelope.decode("utf-8")) if envelope.strip() else {}
+        request_id = request.get("id") if isinstance(request, dict) else None
+        if isinstance(request, dict) and len(attachment):
+          request["payload"] = _decode_binary_payload(attachment)
+      script_path = request.get("scriptPath") if isinstance(request, dict) else None
+      payload = (request.get("payload") or {}) if isinstance(request, dict) else {}
+      packer = SeriesPacker() if _wants_packed(payload) else None
+      if isinstance(payload, dict) and "batch" in payload:
+        response = execute_batch(
+          payload,
+          start_ts,
+          loader=cache.load,
+          packer=packer,
+          incremental=incremental,
+          phases=timer.phases,
+        )
+      elif not isinstance(script_path, str) or not script_path:
+        response = _error(
+          1,
+          {
+            "type": "UsageError",
+            "message": "worker request requires 'scriptPath'",
+            "phase": "bootstrap",
+          },
+        )
+      else:
+        response = execute(
+          script_path,
+          payload,
+          start_ts,
+          loader=cache.load,
+          packer=packer,
+          incremental=incremental,
+          phases=timer.phases,
+        )
+    except Exception as exc:
+      response = _error(
+        1,
+        {
+          "type": "InputError",
+          "message": f"Failed to parse worker request: {exc}",
+          "phase": "inputs",
+        },
+      )
+    response["id"] = request_id
+    _write_frame(channel_out, response, packer.attachment() if packer is not None else b"")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,4 @@
+"""
+Helpers bundled with the indicator runner and importable from any indicator
+workspace (runner.py puts this directory on sys.path).
+"""
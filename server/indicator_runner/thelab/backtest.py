@@ -0,0 +1,398 @@
+"""
+Event-driven backtest engine for `strategies/` scripts.
+
+A strategy module defines:
+
+    def init(context):              # optional, called once before the first bar
+        context.counter = 0
+
+    def handle_data(context, data):  # called after every bar closes
+        if data.close[-1] > data.close[-20:].mean() and context.position == 0:
+            return {"orders": [{"side": "buy", "quantity": 1}]}
+
+`data` is a `BarWindow`: `data["close"]` / `data.close` is a numpy view of
+every bar up to and including the current one (no copies). `context` carries
+the portfolio (`cash`, `position`, `avg_price`, `equity`, `bar_index`), the
+run settings (`context.params`) and whatever attributes the strategy sets.
+
+Orders are returned from `handle_data` (a dict with "orders", or a list of
+order dicts) or placed with `context.order(...)` / `context.order_target(...)`:
+
+    {"side": "buy" | "sell", "quantity": 2}     # or a signed "quantity"
+    {"target": -1}                              # trade to a target position
+    {"type": "limit", "price": 101.5, ...}      # "market" (default) | "limit" | "stop"
+
+Orders fill on the next bar, never the bar that produced them:
+
+- market: at the open, moved against the order by `slippage_bps`;
+- limit: when the bar trades through the price, at the price or the better
+  open on a gap, without slippage;
+- stop: when the bar reaches the price, at the price or the worse open on a
+  gap, plus slippage.
+
+Limit and stop orders stay working until filled or `context.cancel_all()`.
+Every fill pays `fee_bps` of its notional. Closing fills produce round-trip
+trades; a position still open at the end is marked to the last close.
+"""
+
+import math
+
+import numpy as np
+
+__all__ = ["BarWindow", "Context", "run", "run_strategy", "strategy_mode"]
+
+_ORDER_TYPES = ("market", "limit", "stop")
+
+
+class BarWindow:
+    """Columnar bars up to the current one; columns are read-only views."""
+
+    __slots__ = ("_columns", "index")
+
+    def __init__(self, columns, index=-1):
+        self._columns = columns
+        self.index = index
+
+    def __getitem__(self, name):
+        return self._columns[name][: self.index + 1]
+
+    def __getattr__(self, name):
+        try:
+            return self._columns[name][: self.index + 1]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def __len__(self):
+        return self.index + 1
+
+    def keys(self):
+        return self._columns.keys()
+
+    def current(self, name="close"):
+        """Value of column `name` on the current bar."""
+        return self._columns[name][self.index].item()
+
+
+class Context:
+    """Portfolio state shared with the strategy; free for its own attributes."""
+
+    def __init__(self, cash, params):
+        self.params = params
+        self.cash = float(cash)
+        self.position = 0.0
+        self.avg_price = 0.0
+        self.equity = float(cash)
+        self.bar_index = -1
+        self._orders = []
+        self._cancel = False
+
+    def order(self, quantity, type="market", price=None):
+        """Place a signed order: positive buys, negative sells."""
+        self._orders.append({"quantity": quantity, "type": type, "price": price})
+
+    def order_target(self, target, type="market", price=None):
+        """Trade to `target` position (signed), sized when the order fills."""
+        self._orders.append({"target": target, "type": type, "price": price})
+
+    def cancel_all(self):
+        """Cancel working limit/stop orders, including ones placed this bar."""
+        self._orders.clear()
+        self._cancel = True
+
+
+class _Order:
+    __slots__ = ("quantity", "target", "type", "price")
+
+    def __init__(self, quantity, target, type, price):
+        self.quantity = quantity
+        self.target = target
+        self.type = type
+        self.price = price
+
+
+def _parse_order(raw, bar):
+    if not isinstance(raw, dict):
+        raise ValueError(f"bar {bar}: order must be a dict, got {type(raw).__name__}")
+    kind = str(raw.get("type") or "market").lower()
+    if kind not in _ORDER_TYPES:
+        raise ValueError(f"bar {bar}: unknown order type {kind!r}")
+    price = raw.get("price")
+    if kind != "market":
+        if price is None or not math.isfinite(float(price)) or float(price) <= 0:
+            raise ValueError(f"bar {bar}: {kind} order needs a positive price")
+        price = float(price)
+
+    if raw.get("target") is not None:
+        return _Order(None, float(raw["target"]), kind, price)
+
+    quantity = float(raw.get("quantity") or 0.0)
+    side = raw.get("side")
+    if side is not None:
+        side = str(side).lower()
+        if side not in ("buy", "sell"):
+            raise ValueError(f"bar {bar}: order side must be 'buy' or 'sell', got {side!r}")
+        quantity = abs(quantity) if side == "buy" else -abs(quantity)
+    if not math.isfinite(quantity):
+        raise ValueError(f"bar {bar}: order quantity must be finite")
+    return _Order(quantity, None, kind, price)
+
+
+class _Book:
+    """Position, cash and round-trip trade accounting for one instrument."""
+
+    def __init__(self, context, fee_rate):
+        self.context = context
+        self.fee_rate = fee_rate
+        self.entry_index = -1
+        self.entry_fees = 0.0
+        self.trades = []
+
+    def fill(self, quantity, price, bar):
+        context = self.context
+        fee = abs(quantity) * price * self.fee_rate
+        context.cash -= quantity * price + fee
+        position = context.position
+
+        if position == 0.0 or (position > 0.0) == (quantity > 0.0):
+            size = abs(position) + abs(quantity)
+            context.avg_price = (abs(position) * context.avg_price + abs(quantity) * price) / size
+            self.entry_fees += fee
+            if position == 0.0:
+                self.entry_index = bar
+            context.position = position + quantity
+            return
+
+        closed = min(abs(quantity), abs(position))
+        direction = 1.0 if position > 0.0 else -1.0
+        share = closed / abs(position)
+        fees = self.entry_fees * share + fee * closed / abs(quantity)
+        profit = (price - context.avg_price) * closed * direction - fees
+        cost = context.avg_price * closed
+        self.trades.append(
+            {
+                "id": f"TRD-{len(self.trades)}",
+                "entryIndex": self.entry_index,
+                "exitIndex": bar,
+                "entryPrice": context.avg_price,
+                "exitPrice": price,
+                "direction": "long" if direction > 0 else "short",
+                "quantity": closed,
+                "profit": profit,
+                "profitPercent": profit / cost if cost else 0.0,
+            }
+        )
+        self.entry_fees -= self.entry_fees * share
+
+        remaining = abs(quantity) - closed
+        context.position = position + quantity
+        if remaining > 0.0:
+            # Reversal: the rest of the order opens a position the other way.
+            context.avg_price = price
+            self.entry_fees = fee * remaining / abs(quantity)
+            self.entry_index = bar
+        elif abs(context.position) <= 1e-12 * closed:
+            context.position = 0.0
+            context.avg_price = 0.0
+            self.entry_fees = 0.0
+
+
+def _fill_price(order, buy, open_, high, low, slippage):
+    """Fill price of `order` on a bar, or None when it doesn't trigger."""
+    if order.type == "market":
+        price = open_
+    elif order.type == "limit":
+        if buy:
+            if low > order.price:
+                return None
+            return min(open_, order.price)
+        if high < order.price:
+            return None
+        return max(open_, order.price)
+    elif buy:
+        if high < order.price:
+            return None
+        price = max(open_, order.price)
+    else:
+        if low > order.price:
+            return None
+        price = min(open_, order.price)
+    return price * (1.0 + slippage) if buy else price * (1.0 - slippage)
+
+
+def _collect_orders(result, context, bar):
+    raw_orders = list(context._orders)
+    context._orders.clear()
+    metadata = None
+    if isinstance(result, dict):
+        raw_orders.extend(result.get("orders") or [])
+        metadata = result.get("metadata")
+    elif isinstance(result, (list, tuple)):
+        raw_orders.extend(result)
+    elif result is not None:
+        raise ValueError(f"bar {bar}: handle_data must return a dict, a list of orders or None")
+    return [_parse_order(raw, bar) for raw in raw_orders], metadata
+
+
+def _read_only(inputs):
+    columns = {}
+    for name, values in inputs.items():
+        column = np.asarray(values)
+        if column.flags.writeable:
+            column = column.view()
+            column.flags.writeable = False
+        columns[name] = column
+    return columns
+
+
+def _max_drawdown(equity):
+    if equity.size == 0:
+        return 0.0
+    peak = np.maximum.accumulate(equity)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        drawdown = np.where(peak > 0.0, (peak - equity) / peak, 0.0)
+    return float(drawdown.max())
+
+
+def run(strategy, inputs, cash=100000.0, fee_bps=0.5, slippage_bps=1.0, params=None, trade_from=0):
+    """
+    Run `strategy` (a module or object with `handle_data` and optionally
+    `init`) over the columnar bars in `inputs` ({"open": ndarray, ...}).
+
+    Bars before `trade_from` only warm the strategy up: `handle_data` sees
+    them, but nothing fills before that bar and orders placed earlier than
+    the bar just before it are dropped.
+
+    Returns a dict with the BacktestResult statistics (`totalTrades`,
+    `winRate` and `drawdown` as fractions, `totalProfit`), `trades` keyed by
+    bar index, the per-bar `equity` array and the last `metadata` the
+    strategy returned.
+    """
+    handle_data = getattr(strategy, "handle_data", None)
+    if not callable(handle_data):
+        raise TypeError("strategy must define a callable 'handle_data(context, data)'")
+
+    columns = _read_only(inputs)
+    for name in ("open", "high", "low", "close"):
+        if name not in columns:
+            raise ValueError(f"inputs must include a {name!r} column")
+    count = columns["close"].size
+
+    # Python floats for the fill loop: indexing lists is far cheaper than
+    # pulling numpy scalars out one bar at a time.
+    opens = columns["open"].tolist()
+    highs = columns["high"].tolist()
+    lows = columns["low"].tolist()
+    closes = columns["close"].tolist()
+
+    context = Context(cash, dict(params or {}))
+    book = _Book(context, float(fee_bps) / 1e4)
+    slippage = float(slippage_bps) / 1e4
+    data = BarWindow(columns)
+    equity = np.empty(count, dtype=np.float64)
+    working = []
+    metadata = None
+    filled = 0
+
+    init = getattr(strategy, "init", None)
+    if callable(init):
+        init(context)
+    # Orders placed in init() go out on the first bar.
+    working, _ = _collect_orders(None, context, -1)
+    context._cancel = False
+
+    trade_from = max(int(trade_from), 0)
+    for bar in range(count):
+        if working and bar >= trade_from:
+            open_, high, low = opens[bar], highs[bar], lows[bar]
+            remaining = []
+            for order in working:
+                quantity = order.quantity
+                if quantity is None:
+                    quantity = order.target - context.position
+                if quantity == 0.0:
+                    continue
+                price = _fill_price(order, quantity > 0.0, open_, high, low, slippage)
+                if price is None:
+                    remaining.append(order)
+                    continue
+                book.fill(quantity, price, bar)
+                filled += 1
+            working = remaining
+
+        context.equity = context.cash + context.position * closes[bar]
+        equity[bar] = context.equity
+        context.bar_index = bar
+        data.index = bar
+
+        result = handle_data(context, data)
+        if result is None and not context._orders and not context._cancel:
+            continue
+        orders, bar_metadata = _collect_orders(result, context, bar)
+        if bar_metadata is not None:
+            metadata = bar_metadata
+        if context._cancel:
+            working = []
+            context._cancel = False
+        if orders and bar >= trade_from - 1:
+            working.extend(orders)
+
+    trades = book.trades
+    wins = sum(1 for trade in trades if trade["profit"] > 0.0)
+    final_equity = float(equity[-1]) if count else float(cash)
+    return {
+        "totalTrades": len(trades),
+        "winRate": wins / len(trades) if trades else 0.0,
+        "totalProfit": final_equity - float(cash),
+        "drawdown": _max_drawdown(equity),
+        "trades": trades,
+        "equity": equity,
+        "metadata": metadata,
+        "stats": {
+            "bars": count,
+            "fills": filled,
+            "workingOrders": len(working),
+            "openPosition": context.position,
+            "finalEquity": final_equity,
+            "cash": context.cash,
+        },
+    }
+
+
+def strategy_mode(strategy, mode=None):
+    """
+    How `strategy` runs: "vectorized" when it defines `signals(inputs,
+    params)` and either has no `handle_data` or `mode` asks for it, "event"
+    when it has `handle_data`, None when it has neither.
+    """
+    has_signals = callable(getattr(strategy, "signals", None))
+    if has_signals and (mode == "vectorized" or not callable(getattr(strategy, "handle_data", None))):
+        return "vectorized"
+    return "event" if callable(getattr(strategy, "handle_data", None)) else None
+
+
+def run_strategy(strategy, inputs, params=None, mode=None, trade_from=0, **costs):
+    """
+    Run `strategy` with the engine `strategy_mode` picks. `costs` are the
+    `cash` / `fee_bps` / `slippage_bps` keywords of `run`; `trade_from` is
+    the first bar allowed to trade, as in `run`.
+    """
+    chosen = strategy_mode(strategy, mode)
+    if chosen is None:
+        raise TypeError("strategy must define 'handle_data(context, data)' or 'signals(inputs, params)'")
+    params = dict(params or {})
+    if chosen == "event":
+        return run(strategy, inputs, params=params, trade_from=trade_from, **costs)
+
+    from .vectorized import run_signals
+
+    inputs = _read_only(inputs)
+    spec = strategy.signals(inputs, params)
+    if not isinstance(spec, dict):
+        raise TypeError("signals() must return a dict of signal arrays")
+    options = {k: v for k, v in spec.items() if k != "metadata"}
+    result = run_signals(inputs, **options, trade_from=trade_from, **costs)
+    result["metadata"] = spec.get("metadata")
+    return result
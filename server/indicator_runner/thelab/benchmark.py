@@ -0,0 +1,123 @@
+"""
+Benchmark `thelab.ta` against TA-Lib.
+
+    cd server/indicator_runner
+    python -m thelab.benchmark [--bars 10000 100000 1000000] [--repeat 5]
+
+For each kernel and size, prints the best-of-N wall time of `thelab.ta`, of
+TA-Lib (when installed) and the largest absolute difference between the two.
+Without TA-Lib, EMA is also timed against the per-bar Python loop it
+replaces so there is still a reference point.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from thelab import ta
+
+try:
+    import talib  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    talib = None
+
+
+def _python_ema(values, period):
+    alpha = 2.0 / (period + 1.0)
+    out = np.full(values.size, np.nan)
+    if values.size < period:
+        return out
+    ema = float(values[:period].mean())
+    out[period - 1] = ema
+    for i in range(period, values.size):
+        ema = alpha * float(values[i]) + (1.0 - alpha) * ema
+        out[i] = ema
+    return out
+
+
+def _synthetic(bars, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 100.0 + np.cumsum(rng.normal(0.0, 0.5, bars))
+    spread = rng.uniform(0.05, 1.0, bars)
+    return {"high": close + spread, "low": close - spread, "close": close}
+
+
+def _cases(data):
+    high, low, close = data["high"], data["low"], data["close"]
+    cases = [
+        ("sma(30)", lambda: ta.sma(close, 30), "SMA", (close,), {"timeperiod": 30}),
+        ("ema(100)", lambda: ta.ema(close, 100), "EMA", (close,), {"timeperiod": 100}),
+        ("wma(30)", lambda: ta.wma(close, 30), "WMA", (close,), {"timeperiod": 30}),
+        ("rsi(14)", lambda: ta.rsi(close, 14), "RSI", (close,), {"timeperiod": 14}),
+        ("true_range", lambda: ta.true_range(high, low, close), "TRANGE", (high, low, close), {}),
+        ("atr(14)", lambda: ta.atr(high, low, close, 14), "ATR", (high, low, close), {"timeperiod": 14}),
+        (
+            "bollinger(20)",
+            lambda: ta.bollinger(close, 20, 2.0)[0],
+            "BBANDS",
+            (close,),
+            {"timeperiod": 20, "nbdevup": 2.0, "nbdevdn": 2.0, "matype": 0},
+        ),
+        ("rolling_max(50)", lambda: ta.rolling_max(high, 50), "MAX", (high,), {"timeperiod": 50}),
+        ("rolling_min(50)", lambda: ta.rolling_min(low, 50), "MIN", (low,), {"timeperiod": 50}),
+    ]
+    return cases
+
+
+def _best_of(func, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _max_diff(ours, theirs):
+    if isinstance(theirs, tuple):
+        theirs = theirs[0]
+    both = np.isfinite(ours) & np.isfinite(theirs)
+    if not np.array_equal(np.isfinite(ours), np.isfinite(theirs)):
+        return float("nan")
+    return float(np.max(np.abs(ours[both] - theirs[both]))) if both.any() else 0.0
+
+
+def run(sizes, repeat):
+    header = f"{'kernel':<16} {'bars':>9} {'thelab ms':>10} {'ref ms':>10} {'speedup':>8} {'max diff':>10}"
+    print(header)
+    print("-" * len(header))
+    for bars in sizes:
+        data = _synthetic(bars)
+        for name, ours, talib_name, args, kwargs in _cases(data):
+            ours_s, ours_out = _best_of(ours, repeat)
+            if talib is not None:
+                ref = lambda: getattr(talib, talib_name)(*args, **kwargs)  # noqa: E731
+            elif talib_name == "EMA" and bars <= 1_000_000:
+                ref = lambda: _python_ema(data["close"], 100)  # noqa: E731
+            else:
+                ref = None
+            if ref is None:
+                print(f"{name:<16} {bars:>9} {ours_s * 1e3:>10.2f} {'-':>10} {'-':>8} {'-':>10}")
+                continue
+            ref_s, ref_out = _best_of(ref, 1 if talib is None else repeat)
+            diff = _max_diff(ours_out, ref_out)
+            print(
+                f"{name:<16} {bars:>9} {ours_s * 1e3:>10.2f} {ref_s * 1e3:>10.2f} "
+                f"{ref_s / ours_s:>7.1f}x {diff:>10.2e}"
+            )
+    print()
+    print("reference: " + ("TA-Lib " + getattr(talib, "__version__", "") if talib else "python loop (EMA only)"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bars", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.bars, max(1, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
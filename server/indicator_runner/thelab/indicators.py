@@ -0,0 +1,262 @@
+"""
+Indicator columns for strategies, memoized by (indicator, settings, range).
+
+    from thelab import indicators
+
+    def signals(inputs, params):
+        slow = indicators.column("ta.sma", inputs, {"period": params["slow"]})
+        trend = indicators.column("ema_100", inputs, {"length": 200})
+
+`indicator` is either "ta.<kernel>" for a `thelab.ta` kernel (its array
+arguments - values/high/low/close - come from `inputs`, `values` from the
+"source" setting, default "close"; the other settings are passed as
+keywords) or the name of an `indicators/` script with the usual
+`calculate(inputs, settings)`. `compute` returns every series as a dict,
+`column` one of them ("main" by default; bollinger gives upper / middle /
+lower).
+
+Outside a cache scope the indicator is simply computed. Inside
+`IndicatorCache.scope()` (walk-forward folds, optimizer sweeps) inputs that
+are slices of the cache's columns are located by their offset, and results
+are kept under (indicator, settings, first bar) together with the last bar
+computed:
+
+- a range that ends at or before a cached one is served as a read-only
+  prefix of it;
+- a longer range continues from the cached state for indicators with
+  `calculate_incremental`, so only the new bars are fed; `ta` kernels are
+  recomputed once up to the scope's `horizon` (the end of the fold, or of
+  the last fold for anchored walk-forward runs), which every later,
+  shorter request then reuses.
+
+Prefix reuse relies on the indicator being causal (bar i depends only on
+bars up to i), which holds for the `ta` kernels and is what
+`calculate_incremental` already promises. Scripts with only `calculate`
+are reused for the exact same range only.
+"""
+
+import contextlib
+import importlib.util
+import inspect
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from . import ta
+
+__all__ = ["IndicatorCache", "column", "compute", "set_workspace"]
+
+_ARRAY_ARGS = ("values", "high", "low", "close")
+_TUPLE_NAMES = {"bollinger": ("upper", "middle", "lower")}
+_DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_state = {"cache": None, "workspace": None}
+_modules = {}
+
+
+def set_workspace(path):
+    """Directory `indicators/` scripts are loaded from outside a cache scope."""
+    _state["workspace"] = os.path.abspath(path) if path else None
+
+
+def _load_script(name, workspace):
+    if not workspace:
+        raise ValueError(f"indicator {name!r}: no indicators workspace configured")
+    rel = name if name.endswith(".py") else f"{name}.py"
+    path = os.path.abspath(os.path.join(workspace, rel))
+    module = _modules.get(path)
+    if module is None:
+        if not os.path.isfile(path):
+            raise ValueError(f"indicator {name!r} not found in {workspace}")
+        spec = importlib.util.spec_from_file_location(f"__thelab_indicator_{len(_modules)}__", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        if not callable(getattr(module, "calculate", None)):
+            raise ValueError(f"indicator {name!r} must define 'calculate(inputs, settings)'")
+        _modules[path] = module
+    return module
+
+
+def _series(result, count, names=None):
+    """Normalize an indicator result into {name: float64 array of `count`}."""
+    if isinstance(result, dict):
+        result = result.get("series", result)
+    if isinstance(result, tuple):
+        names = names or tuple(str(i) for i in range(len(result)))
+        result = dict(zip(names, result))
+    if not isinstance(result, dict):
+        result = {"main": result}
+    series = {}
+    for name, values in result.items():
+        array = np.asarray(values, dtype=np.float64).reshape(-1)
+        if array.size != count:
+            raise ValueError(f"series {name!r} has {array.size} values, expected {count}")
+        series[str(name)] = array
+    return series
+
+
+def _run_kernel(name, inputs, settings):
+    kernel = getattr(ta, name, None)
+    if name.startswith("_") or not callable(kernel):
+        raise ValueError(f"unknown thelab.ta kernel {name!r}")
+    settings = dict(settings)
+    source = settings.pop("source", "close")
+    arguments = {}
+    for parameter in inspect.signature(kernel).parameters:
+        if parameter in _ARRAY_ARGS:
+            arguments[parameter] = inputs[source if parameter == "values" else parameter]
+        elif parameter in settings:
+            arguments[parameter] = settings.pop(parameter)
+    if settings:
+        raise ValueError(f"ta.{name} got unexpected settings {sorted(settings)}")
+    count = len(inputs["close"])
+    return _series(kernel(**arguments), count, _TUPLE_NAMES.get(name))
+
+
+class _Indicator:
+    """One resolved indicator: how to compute it and whether it streams."""
+
+    def __init__(self, indicator, workspace):
+        self.name = str(indicator)
+        if self.name.startswith("ta."):
+            kernel = self.name[3:]
+            self.module = None
+            self.calculate = lambda inputs, settings: _run_kernel(kernel, inputs, settings)
+            self.incremental = None
+            self.causal = True
+        else:
+            self.module = _load_script(self.name, workspace)
+            calculate = self.module.calculate
+            self.calculate = lambda inputs, settings: _series(calculate(inputs, settings), len(inputs["close"]))
+            self.incremental = getattr(self.module, "calculate_incremental", None)
+            self.causal = callable(self.incremental)
+
+    def feed(self, state, inputs, settings):
+        state, result = self.incremental(state, inputs, settings)
+        return state, _series(result, len(inputs["close"]))
+
+
+def _read_only(series):
+    views = {}
+    for name, values in series.items():
+        view = values.view()
+        view.flags.writeable = False
+        views[name] = view
+    return views
+
+
+class IndicatorCache:
+    """
+    Indicator results over slices of `columns`, bounded to `max_bytes`
+    (least recently used entries are dropped first).
+    """
+
+    def __init__(self, columns, workspace=None, max_bytes=_DEFAULT_MAX_BYTES):
+        self.columns = {name: np.asarray(values) for name, values in columns.items()}
+        self.workspace = os.path.abspath(workspace) if workspace else None
+        self.max_bytes = int(max_bytes)
+        self.horizon = None
+        self.stats = {"hits": 0, "prefixHits": 0, "extended": 0, "computed": 0, "bypassed": 0}
+        self._entries = OrderedDict()
+        self._indicators = {}
+        self._bytes = 0
+
+    @contextlib.contextmanager
+    def scope(self, horizon=None):
+        """Route `compute` / `column` through this cache; `horizon` is the last bar worth precomputing."""
+        previous = _state["cache"], self.horizon
+        _state["cache"], self.horizon = self, horizon
+        try:
+            yield self
+        finally:
+            _state["cache"], self.horizon = previous
+
+    def locate(self, inputs):
+        """(start, stop) of `inputs` within the cache's columns, or None."""
+        values = inputs.get("close") if hasattr(inputs, "get") else None
+        base = self.columns.get("close")
+        if not isinstance(values, np.ndarray) or base is None or values.ndim != 1 or values.dtype != base.dtype:
+            return None
+        if values.strides != base.strides:
+            return None
+        offset = values.__array_interface__["data"][0] - base.__array_interface__["data"][0]
+        start, remainder = divmod(offset, base.itemsize)
+        if remainder or start < 0 or start + values.size > base.size:
+            return None
+        return int(start), int(start + values.size)
+
+    def _slice(self, start, stop):
+        return {name: values[start:stop] for name, values in self.columns.items()}
+
+    def _indicator(self, indicator):
+        resolved = self._indicators.get(indicator)
+        if resolved is None:
+            resolved = self._indicators[indicator] = _Indicator(indicator, self.workspace or _state["workspace"])
+        return resolved
+
+    def _store(self, key, entry):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old["bytes"]
+        entry["bytes"] = sum(values.nbytes for values in entry["series"].values())
+        self._entries[key] = entry
+        self._bytes += entry["bytes"]
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, dropped = self._entries.popitem(last=False)
+            self._bytes -= dropped["bytes"]
+
+    def get(self, indicator, settings, start, stop):
+        """Series of `indicator` over bars [start, stop) of the cache's columns."""
+        resolved = self._indicator(indicator)
+        settings = dict(settings or {})
+        key = (resolved.name, json.dumps(settings, sort_keys=True, default=str), start)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            if entry["stop"] == stop or (resolved.causal and entry["stop"] > stop):
+                self.stats["hits" if entry["stop"] == stop else "prefixHits"] += 1
+                return _read_only({name: values[: stop - start] for name, values in entry["series"].items()})
+            if entry["state"] is not None and entry["stop"] < stop:
+                state, tail = resolved.feed(entry["state"], self._slice(entry["stop"], stop), settings)
+                series = {
+                    name: np.concatenate([entry["series"].get(name, np.full(entry["stop"] - start, np.nan)), values])
+                    for name, values in tail.items()
+                }
+                self.stats["extended"] += 1
+                self._store(key, {"stop": stop, "series": series, "state": state})
+                return _read_only(series)
+
+        end = stop
+        if resolved.causal and self.horizon is not None and start < stop <= self.horizon <= len(self.columns["close"]):
+            end = self.horizon
+        if resolved.incremental is not None:
+            state, series = resolved.feed(None, self._slice(start, end), settings)
+        else:
+            state, series = None, resolved.calculate(self._slice(start, end), settings)
+        self.stats["computed"] += 1
+        self._store(key, {"stop": end, "series": series, "state": state})
+        return _read_only({name: values[: stop - start] for name, values in series.items()})
+
+
+def compute(indicator, inputs, settings=None):
+    """All series of `indicator` over `inputs`, as {name: read-only array}."""
+    cache = _state["cache"]
+    located = cache.locate(inputs) if cache is not None else None
+    if located is not None:
+        return cache.get(indicator, settings, *located)
+    if cache is not None:
+        cache.stats["bypassed"] += 1
+    resolved = _Indicator(indicator, (cache.workspace if cache is not None else None) or _state["workspace"])
+    return _read_only(resolved.calculate(inputs, dict(settings or {})))
+
+
+def column(indicator, inputs, settings=None, series="main"):
+    """One series of `indicator` over `inputs` ("main" unless named)."""
+    values = compute(indicator, inputs, settings)
+    if series not in values:
+        if series == "main" and len(values) == 1:
+            return next(iter(values.values()))
+        raise KeyError(f"{indicator} has no series {series!r}; available: {sorted(values)}")
+    return values[series]
@@ -0,0 +1,357 @@
+"""
+Vendor CSV ingest straight into the market store (SQLite `bars`) and the
+column store.
+
+    python -m thelab.ingest                          # server/data/cl-futures -> db/market.db + data/columns
+    python -m thelab.ingest --segments --workers 4   # also rewrite the JSON segments
+
+Replaces the `importClFuturesFromCsv.js` + `ingestClFuturesToDb.js` round
+trip through JSON. Vendor lines are `dd/mm/yyyy;HH:MM:SS;open;high;low;close;volume`
+in a fixed per-file UTC offset (VENDOR_FILES, same offsets as the Node
+importer). Files are read in byte chunks; in each chunk the fixed-width
+date/time prefix is decoded with array arithmetic and the numeric fields
+with one `np.fromstring` call, falling back to line-by-line parsing only
+for chunks that do not have that exact shape.
+
+The CSVs are parsed in parallel (one process per file), then each
+timeframe is written once: M1 plus M5 ... H4 resampled from it
+(`thelab.resample`, UTC clock-aligned like `aggregateCandles`), D1 from
+cl-1d.csv, D7/D30 from cl-1w/cl-1mo.csv. SQLite gets one transaction per
+timeframe that deletes the previous rows and `executemany`-inserts the new
+ones (and its `bars_summary` row), so a timeframe is replaced atomically.
+The schema is `thelab.marketdb.SCHEMA`.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from . import marketdb, resample, store
+
+__all__ = ["DERIVED", "VENDOR_FILES", "ingest", "read_csv", "write_segments", "write_sqlite"]
+
+# file -> (timeframe, UTC offset of the vendor timestamps in minutes)
+VENDOR_FILES = {
+    "cl-1m.csv": ("M1", -360),
+    "cl-1d.csv": ("D1", 60),
+    "cl-1w.csv": ("D7", 60),
+    "cl-1mo.csv": ("D30", 60),
+}
+# Built from M1, as the Node importer does.
+DERIVED = ("M5", "M15", "M30", "H1", "H4")
+# Timeframes loaded into SQLite (the set `ingestClFuturesToDb.js` used).
+DB_TIMEFRAMES = ("M1",) + DERIVED + ("D1",)
+
+_FIELDS = ("time", "open", "high", "low", "close", "volume")
+_PREFIX = 20  # "dd/mm/yyyy;HH:MM:SS;"
+_SEPARATORS = {2: ord("/"), 5: ord("/"), 10: ord(";"), 13: ord(":"), 16: ord(":"), 19: ord(";")}
+_DATE = re.compile(r"^(\d{2})/(\d{2})/(\d{4})")
+
+
+def _empty():
+    return {"time": np.empty(0, np.int64), **{name: np.empty(0) for name in _FIELDS[1:]}}
+
+
+def _digits(raw, starts, offset, count):
+    value = np.zeros(starts.size, dtype=np.int64)
+    for i in range(count):
+        value = value * 10 + (raw[starts + offset + i].astype(np.int64) - 48)
+    return value
+
+
+def _parse_lines(lines, offset_minutes):
+    """Line-by-line parse with the Node importer's rules; used for irregular chunks."""
+    rows = []
+    tz = timezone(timedelta(minutes=offset_minutes))
+    for line in lines:
+        parts = line.split(";")
+        if len(parts) < 6:
+            continue
+        match = _DATE.match(parts[0].strip())
+        if not match:
+            continue
+        day, month, year = (int(group) for group in match.groups())
+        clock = parts[1].strip() or "00:00:00"
+        try:
+            if not 1 <= day <= 31:
+                raise ValueError(day)
+            moment = datetime.strptime(clock, "%H:%M:%S").time()
+            stamp = datetime.combine(datetime(year, month, 1), moment, tz) + timedelta(days=day - 1)
+            values = [float(part) for part in parts[2:6]]
+            volume = float(parts[6]) if len(parts) > 6 and parts[6].strip() else 0.0
+        except ValueError:
+            continue
+        if any(np.isnan(values)) or np.isnan(volume):
+            continue
+        rows.append((int(stamp.timestamp() * 1000), *values, volume))
+    if not rows:
+        return _empty()
+    table = np.array(rows, dtype=np.float64)
+    return {"time": table[:, 0].astype(np.int64), **{name: table[:, i] for i, name in enumerate(_FIELDS[1:], 1)}}
+
+
+def _parse_chunk(data, offset_minutes):
+    """Columns of a block of complete lines."""
+    data = data.replace(b"\r", b"")
+    raw = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(raw == ord("\n"))
+    starts = np.r_[0, ends[:-1] + 1]
+    keep = ends > starts
+    starts, ends = starts[keep], ends[keep]
+    if not starts.size:
+        return _empty()
+    regular = bool(np.all(ends - starts > _PREFIX)) and all(
+        np.all(raw[starts + position] == value) for position, value in _SEPARATORS.items()
+    )
+    values = None
+    if regular:
+        text = raw.copy()
+        text[(starts[:, None] + np.arange(_PREFIX)).ravel()] = ord(" ")
+        text[(text == ord(";")) | (text == ord("\n"))] = ord(" ")
+        values = np.fromstring(text.tobytes().decode("ascii", "replace"), dtype=np.float64, sep=" ")
+    if values is None or values.size != starts.size * 5:
+        lines = data.decode("utf-8", "replace").split("\n")
+        return _parse_lines((line for line in lines if line.strip()), offset_minutes)
+
+    values = values.reshape(-1, 5)
+    day, month, year = _digits(raw, starts, 0, 2), _digits(raw, starts, 3, 2), _digits(raw, starts, 6, 4)
+    hour, minute, second = _digits(raw, starts, 11, 2), _digits(raw, starts, 14, 2), _digits(raw, starts, 17, 2)
+    valid = (
+        (month >= 1) & (month <= 12) & (day >= 1) & (day <= 31)
+        & (hour <= 23) & (minute <= 59) & (second <= 59)
+        & np.all(np.isfinite(values), axis=1)
+    )
+    # Month start plus day - 1: an overflowing day (30/02) rolls into the next month, as `new Date` does.
+    months = ((year - 1970) * 12 + month - 1).astype("datetime64[M]")
+    days = months.astype("datetime64[D]").astype(np.int64) + day - 1
+    times = (days * 86_400 + hour * 3600 + minute * 60 + second - offset_minutes * 60) * 1000
+    return {
+        "time": times[valid],
+        **{name: values[valid, i] for i, name in enumerate(_FIELDS[1:])},
+    }
+
+
+def read_csv(path, offset_minutes=0, chunk_bytes=32 << 20):
+    """Yield the bars of a vendor CSV as column chunks of about `chunk_bytes` of text."""
+    carry = b""
+    with open(path, "rb") as handle:
+        while True:
+            block = handle.read(chunk_bytes)
+            if not block:
+                break
+            block = carry + block
+            cut = block.rfind(b"\n") + 1
+            carry = block[cut:]
+            if cut:
+                yield _parse_chunk(block[:cut], offset_minutes)
+    if carry.strip():
+        yield _parse_chunk(carry + b"\n", offset_minutes)
+
+
+def _sorted_unique(parts):
+    """Concatenate chunks, sort by time and keep the last bar of duplicate times."""
+    if not parts:
+        return _empty()
+    columns = {name: np.concatenate([part[name] for part in parts]) for name in _FIELDS}
+    times = columns["time"]
+    if times.size and np.any(times[1:] <= times[:-1]):
+        order = np.argsort(times, kind="stable")
+        times = times[order]
+        keep = np.r_[times[1:] != times[:-1], True]
+        columns = {name: values[order][keep] for name, values in columns.items()}
+    return columns
+
+
+def _load_file(path, offset_minutes, chunk_bytes):
+    return _sorted_unique(list(read_csv(path, offset_minutes, chunk_bytes)))
+
+
+def write_sqlite(db_path, asset, frames):
+    """
+    Replace the `bars` rows (and the `bars_summary` row) of asset for every
+    {timeframe: columns} in `frames`, one transaction per timeframe. A
+    legacy database is migrated to the clustered layout first. Returns
+    {timeframe: row count}.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    connection = sqlite3.connect(db_path, isolation_level=None)
+    asset = str(asset).upper()
+    counts = {}
+    try:
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        marketdb.ensure_schema(connection, migrate=True)
+        for timeframe, columns in frames.items():
+            timeframe = str(timeframe).upper()
+            times = columns["time"]
+            rows = zip(
+                itertools.repeat(asset),
+                itertools.repeat(timeframe),
+                *(columns[name].tolist() for name in _FIELDS),
+            )
+            connection.execute("BEGIN")
+            try:
+                connection.execute("DELETE FROM bars WHERE asset = ? AND timeframe = ?", (asset, timeframe))
+                connection.executemany(
+                    "INSERT OR REPLACE INTO bars(asset, timeframe, time, open, high, low, close, volume) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                connection.execute(
+                    "INSERT OR REPLACE INTO bars_summary(asset, timeframe, start_time, end_time, bar_count) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (
+                        asset,
+                        timeframe,
+                        int(times[0]) if times.size else None,
+                        int(times[-1]) if times.size else None,
+                        int(times.size),
+                    ),
+                )
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            counts[timeframe] = int(times.size)
+    finally:
+        connection.close()
+    return counts
+
+
+def _iso(times):
+    return [f"{value}Z" for value in np.datetime_as_string(times.astype("datetime64[ms]"), unit="ms")]
+
+
+def write_segments(data_dir, asset, timeframe, columns):
+    """Per-year JSON segments plus `<asset>-<tf>-meta.json`, in the importer's format."""
+    asset, tf = str(asset).lower(), str(timeframe).lower()
+    os.makedirs(data_dir, exist_ok=True)
+    times = columns["time"]
+    years = times.astype("datetime64[ms]").astype("datetime64[Y]")
+    bounds = np.flatnonzero(np.r_[True, years[1:] != years[:-1], True])
+    segments = []
+    for first, stop in zip(bounds[:-1], bounds[1:]):
+        year = str(years[first])
+        stamps = _iso(times[first:stop])
+        candles = [
+            {"time": stamp, "open": o, "high": h, "low": lo, "close": c, "volume": v}
+            for stamp, o, h, lo, c, v in zip(
+                stamps, *(columns[name][first:stop].tolist() for name in _FIELDS[1:])
+            )
+        ]
+        name = f"{asset}-{tf}-{year}.json"
+        payload = {
+            "asset": asset,
+            "timeframe": tf,
+            "segment": year,
+            "range": {"start": stamps[0], "end": stamps[-1]},
+            "candles": candles,
+        }
+        with open(os.path.join(data_dir, name), "w", encoding="utf-8") as handle:
+            json.dump(payload, handle, indent=2)
+        segments.append({"segment": year, "file": name, "start": stamps[0], "end": stamps[-1], "count": len(candles)})
+    meta = {
+        "asset": asset,
+        "timeframe": tf,
+        "range": {"start": segments[0]["start"], "end": segments[-1]["end"]} if segments else {},
+        "totalCount": int(times.size),
+        "segments": segments,
+        "lastUpdated": f"{np.datetime64(int(time.time() * 1000), 'ms')}Z",
+    }
+    with open(os.path.join(data_dir, f"{asset}-{tf}-meta.json"), "w", encoding="utf-8") as handle:
+        json.dump(meta, handle, indent=2)
+    return segments
+
+
+def ingest(csv_dir, asset="CL1!", db_path=None, store_root=None, data_dir=None, workers=None,
+           chunk_bytes=32 << 20, log=None):
+    """
+    Parse every VENDOR_FILES file present in `csv_dir` and write the result
+    to SQLite (`db_path`), the column store (`store_root`) and JSON segments
+    (`data_dir`); each target is skipped when None. Returns
+    {timeframe: bar count}.
+    """
+    log = log or (lambda message: None)
+    files = [(name, spec) for name, spec in VENDOR_FILES.items() if os.path.isfile(os.path.join(csv_dir, name))]
+    if not files:
+        raise FileNotFoundError(f"no vendor CSVs ({', '.join(VENDOR_FILES)}) in {csv_dir}")
+    workers = max(1, min(len(files), workers or os.cpu_count() or 1))
+
+    started = time.perf_counter()
+    jobs = [(os.path.join(csv_dir, name), offset, chunk_bytes) for name, (_, offset) in files]
+    if workers == 1:
+        parsed = [_load_file(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parsed = list(executor.map(_load_file, *zip(*jobs)))
+    log(f"parsed {len(files)} files in {(time.perf_counter() - started) * 1000.0:.0f} ms ({workers} workers)")
+
+    frames = {}
+    for (name, (timeframe, _)), columns in zip(files, parsed):
+        frames[timeframe] = (name, columns)
+        if timeframe == "M1":
+            for code in DERIVED:
+                frames[code] = (name, resample.resample(columns, code))
+
+    counts = {}
+    for timeframe, (name, columns) in frames.items():
+        step = time.perf_counter()
+        if data_dir is not None:
+            write_segments(data_dir, asset, timeframe, columns)
+        if store_root is not None:
+            store.write_columns(store_root, asset, timeframe, columns, source={"csv": name})
+        counts[timeframe] = int(columns["time"].size)
+        if data_dir is not None or store_root is not None:
+            log(f"{asset} {timeframe}: {counts[timeframe]} bars written in {(time.perf_counter() - step) * 1000.0:.0f} ms")
+    if db_path is not None:
+        step = time.perf_counter()
+        loaded = write_sqlite(db_path, asset, {tf: frames[tf][1] for tf in DB_TIMEFRAMES if tf in frames})
+        log(f"sqlite: {sum(loaded.values())} rows in {(time.perf_counter() - step) * 1000.0:.0f} ms")
+    return counts
+
+
+def main():
+    server_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    data_dir = os.path.join(server_dir, "data")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv-dir", default=os.path.join(data_dir, "cl-futures"))
+    parser.add_argument("--asset", default="CL1!")
+    parser.add_argument("--db", default=os.path.join(server_dir, "db", "market.db"))
+    parser.add_argument("--no-db", action="store_true", help="skip SQLite")
+    parser.add_argument("--store", default=os.environ.get("THELAB_COLUMN_STORE_DIR") or os.path.join(data_dir, "columns"))
+    parser.add_argument("--no-store", action="store_true", help="skip the column store")
+    parser.add_argument("--segments", nargs="?", const=data_dir, default=None,
+                        help="also write JSON segments (default dir: server/data)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-mb", type=float, default=32.0)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    try:
+        ingest(
+            args.csv_dir,
+            asset=args.asset,
+            db_path=None if args.no_db else args.db,
+            store_root=None if args.no_store else args.store,
+            data_dir=args.segments,
+            workers=args.workers,
+            chunk_bytes=max(1 << 16, int(args.chunk_mb * (1 << 20))),
+            log=lambda message: print(f"[ingest] {message}", flush=True),
+        )
+    except (OSError, ValueError, sqlite3.Error) as exc:
+        print(f"ingest: {exc}", file=sys.stderr)
+        sys.exit(1)
+    print(f"[ingest] done in {(time.perf_counter() - started) * 1000.0:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,425 @@
+"""
+Market store (`server/db/market.db`) schema and bulk access from numpy.
+
+    from thelab import marketdb
+    bars = marketdb.window("CL1!", "M15", end="2024-06-01", limit=50000)
+    many = marketdb.windows(["CL1!", "ES1!"], "H1", start="2024-01-01")
+    marketdb.summary("CL1!", "M1")  # {"start", "end", "count"} from bars_summary
+
+    python -m thelab.marketdb migrate          # legacy rowid table -> clustered layout
+    python -m thelab.marketdb bench --rows 2000000
+
+Schema (SCHEMA_VERSION 2, the same DDL as `marketStoreSqlite.js`): `bars`
+is a WITHOUT ROWID table clustered on (asset, timeframe, time), so a
+window is one covering range scan of the primary key and there is no
+second index to maintain on writes. `bars_summary` keeps start / end /
+count per asset/timeframe and is updated by every writer (`upsertBars`,
+`deleteBars`, `thelab.ingest`), so summaries no longer aggregate `bars`.
+The legacy layout (rowid table plus `idx_bars_asset_tf_time`) is still
+readable; `migrate` rewrites it in place.
+
+Each window is one range query on the primary key. The rows are counted
+first and streamed straight into a preallocated structured array
+(`np.fromiter` with `count`), so no per-row objects or date strings are
+built; columns come back as contiguous `time` (int64 epoch ms) and
+open/high/low/close/volume (float64) arrays, ascending in time, the same
+shape as `thelab.store.load`.
+
+Readers open the database read-only (`mode=ro`, `PRAGMA query_only`); in
+WAL mode they never block the Node writer, and each window is read inside
+one read transaction so its count and rows come from the same snapshot.
+The path defaults to THELAB_MARKET_DB or server/db/market.db.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+__all__ = [
+    "DEFAULT_DB",
+    "SCHEMA",
+    "SCHEMA_VERSION",
+    "benchmark",
+    "connect",
+    "ensure_schema",
+    "layout_version",
+    "migrate",
+    "summary",
+    "window",
+    "windows",
+]
+
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "db", "market.db")
+
+_FIELDS = ("time", "open", "high", "low", "close", "volume")
+_ROW = np.dtype([("time", "<i8")] + [(name, "<f8") for name in _FIELDS[1:]])
+
+SCHEMA_VERSION = 2
+_BARS_TABLE = """
+CREATE TABLE IF NOT EXISTS {name} (
+  asset TEXT NOT NULL,
+  timeframe TEXT NOT NULL,
+  time INTEGER NOT NULL,
+  open REAL NOT NULL,
+  high REAL NOT NULL,
+  low REAL NOT NULL,
+  close REAL NOT NULL,
+  volume REAL NOT NULL,
+  PRIMARY KEY (asset, timeframe, time)
+) WITHOUT ROWID;
+"""
+_SUMMARY_TABLE = """
+CREATE TABLE IF NOT EXISTS bars_summary (
+  asset TEXT NOT NULL,
+  timeframe TEXT NOT NULL,
+  start_time INTEGER,
+  end_time INTEGER,
+  bar_count INTEGER NOT NULL,
+  PRIMARY KEY (asset, timeframe)
+) WITHOUT ROWID;
+"""
+SCHEMA = _BARS_TABLE.format(name="bars") + _SUMMARY_TABLE
+# Schema version 1, kept to read old databases and for the benchmark baseline.
+LEGACY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bars (
+  asset TEXT NOT NULL,
+  timeframe TEXT NOT NULL,
+  time INTEGER NOT NULL,
+  open REAL NOT NULL,
+  high REAL NOT NULL,
+  low REAL NOT NULL,
+  close REAL NOT NULL,
+  volume REAL NOT NULL,
+  PRIMARY KEY (asset, timeframe, time)
+);
+CREATE INDEX IF NOT EXISTS idx_bars_asset_tf_time
+  ON bars(asset, timeframe, time);
+"""
+_REFRESH_SUMMARY = (
+    "INSERT OR REPLACE INTO bars_summary(asset, timeframe, start_time, end_time, bar_count) "
+    "SELECT asset, timeframe, MIN(time), MAX(time), COUNT(*) FROM bars GROUP BY asset, timeframe"
+)
+
+
+def _has_table(connection, name):
+    row = connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone()
+    return row is not None
+
+
+def layout_version(connection):
+    """2 for the clustered `bars` table, 1 for the legacy rowid table, 0 when there is none."""
+    row = connection.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'bars'").fetchone()
+    if row is None:
+        return 0
+    return SCHEMA_VERSION if "WITHOUT ROWID" in row[0].upper() else 1
+
+
+def ensure_schema(connection, migrate=False):
+    """
+    Create the schema on an empty database, add (and backfill) `bars_summary`
+    on one that predates it, and with `migrate` rewrite a legacy `bars`
+    table into the clustered layout. Returns the layout version found.
+    """
+    found = layout_version(connection)
+    if found == 0:
+        connection.executescript(SCHEMA)
+        connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        return found
+    if not _has_table(connection, "bars_summary"):
+        connection.executescript(_SUMMARY_TABLE)
+        connection.execute(_REFRESH_SUMMARY)
+    if found == 1 and migrate:
+        _migrate(connection)
+    return found
+
+
+def _migrate(connection):
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        connection.execute("DROP TABLE IF EXISTS bars_v2")
+        connection.execute(_BARS_TABLE.format(name="bars_v2"))
+        connection.execute(
+            "INSERT INTO bars_v2 SELECT asset, timeframe, time, open, high, low, close, volume "
+            "FROM bars ORDER BY asset, timeframe, time"
+        )
+        connection.execute("DROP TABLE bars")
+        connection.execute("ALTER TABLE bars_v2 RENAME TO bars")
+        connection.execute("DELETE FROM bars_summary")
+        connection.execute(_REFRESH_SUMMARY)
+        connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        connection.execute("COMMIT")
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+
+
+def _file_bytes(db_path):
+    return sum(os.path.getsize(db_path + suffix) for suffix in ("", "-wal") if os.path.isfile(db_path + suffix))
+
+
+def migrate(db_path=None, vacuum=True):
+    """
+    Rewrite a legacy market database into the clustered layout (one
+    transaction; the old table is only dropped once the copy succeeded) and
+    VACUUM it. Returns {"from", "to", "rows", "bytesBefore", "bytesAfter", "ms"}.
+    """
+    path = os.path.abspath(db_path or os.environ.get("THELAB_MARKET_DB") or DEFAULT_DB)
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"no market database at {path}")
+    started = time.perf_counter()
+    connection = sqlite3.connect(path, isolation_level=None)
+    try:
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        before = _file_bytes(path)
+        found = ensure_schema(connection, migrate=True)
+        if vacuum and found == 1:
+            connection.execute("VACUUM")
+        connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        rows = connection.execute("SELECT COALESCE(SUM(bar_count), 0) FROM bars_summary").fetchone()[0]
+    finally:
+        connection.close()
+    return {
+        "from": found,
+        "to": SCHEMA_VERSION,
+        "rows": int(rows),
+        "bytesBefore": before,
+        "bytesAfter": _file_bytes(path),
+        "ms": (time.perf_counter() - started) * 1000.0,
+    }
+
+
+def connect(db_path=None):
+    """Read-only connection to the market store; FileNotFoundError when it does not exist."""
+    path = os.path.abspath(db_path or os.environ.get("THELAB_MARKET_DB") or DEFAULT_DB)
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"no market database at {path}")
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True, isolation_level=None, check_same_thread=False)
+    connection.execute("PRAGMA query_only = 1")
+    return connection
+
+
+def _epoch_ms(value):
+    if value is None or isinstance(value, (int, float, np.integer, np.floating)):
+        return None if value is None else int(value)
+    return int(np.datetime64(str(value).rstrip("Z"), "ms").astype(np.int64))
+
+
+def _query(connection, asset, timeframe, start, end, limit):
+    where = "asset = ? AND timeframe = ?"
+    params = [str(asset).upper(), str(timeframe).upper()]
+    if start is not None:
+        where += " AND time >= ?"
+        params.append(_epoch_ms(start))
+    if end is not None:
+        where += " AND time <= ?"
+        params.append(_epoch_ms(end))
+    safe_limit = int(limit) if limit is not None and int(limit) > 0 else 0
+    columns = ", ".join(_FIELDS)
+    if safe_limit:
+        # The last `limit` bars of the range, newest first (reversed after the fill);
+        # the count only walks those bars, not the whole range.
+        count = connection.execute(
+            f"SELECT COUNT(*) FROM (SELECT 1 FROM bars WHERE {where} ORDER BY time DESC LIMIT ?)",
+            params + [safe_limit],
+        ).fetchone()[0]
+        sql = f"SELECT {columns} FROM bars WHERE {where} ORDER BY time DESC LIMIT ?"
+        return sql, params + [safe_limit], count, True
+    count = connection.execute(f"SELECT COUNT(*) FROM bars WHERE {where}", params).fetchone()[0]
+    return f"SELECT {columns} FROM bars WHERE {where} ORDER BY time", params, count, False
+
+
+def window(asset, timeframe, start=None, end=None, limit=None, db_path=None, connection=None):
+    """
+    Bars of asset/timeframe with `start <= time <= end` (epoch ms or ISO
+    strings, both optional), keeping the last `limit`. Returns a dict of
+    numpy columns (empty arrays when nothing matches).
+    """
+    own = connection is None
+    connection = connection or connect(db_path)
+    try:
+        # One read transaction: the count and the rows come from the same WAL snapshot.
+        connection.execute("BEGIN")
+        try:
+            sql, params, count, descending = _query(connection, asset, timeframe, start, end, limit)
+            rows = np.fromiter(connection.execute(sql, params), dtype=_ROW, count=count)
+            if descending:
+                rows = rows[::-1]
+        finally:
+            connection.execute("COMMIT")
+    finally:
+        if own:
+            connection.close()
+    return {name: np.ascontiguousarray(rows[name]) for name in _FIELDS}
+
+
+def summary(asset, timeframe, db_path=None, connection=None):
+    """{"start", "end", "count"} (epoch ms) of asset/timeframe, or None without bars."""
+    own = connection is None
+    connection = connection or connect(db_path)
+    try:
+        key = (str(asset).upper(), str(timeframe).upper())
+        if _has_table(connection, "bars_summary"):
+            row = connection.execute(
+                "SELECT start_time, end_time, bar_count FROM bars_summary WHERE asset = ? AND timeframe = ?", key
+            ).fetchone()
+        else:
+            row = connection.execute(
+                "SELECT MIN(time), MAX(time), COUNT(*) FROM bars WHERE asset = ? AND timeframe = ?", key
+            ).fetchone()
+    finally:
+        if own:
+            connection.close()
+    if not row or not row[2]:
+        return None
+    return {"start": row[0], "end": row[1], "count": row[2]}
+
+
+def windows(assets, timeframe, start=None, end=None, limit=None, db_path=None):
+    """`window` for every asset in `assets` over one connection: {asset: columns}."""
+    connection = connect(db_path)
+    try:
+        return {
+            asset: window(asset, timeframe, start, end, limit, connection=connection)
+            for asset in assets
+        }
+    finally:
+        connection.close()
+
+
+def _bench_layout(path, ddl, clustered, rows, queries, window, rng):
+    assets = ("BENCH", "OTHER")
+    per_asset = rows // len(assets)
+    times = 1_262_304_000_000 + np.arange(per_asset, dtype=np.int64) * 60_000
+    columns = [times.tolist()] + [(100 + rng.random(per_asset)).tolist() for _ in _FIELDS[1:]]
+    connection = sqlite3.connect(path, isolation_level=None)
+    try:
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.executescript(ddl)
+        started = time.perf_counter()
+        for asset in assets:
+            connection.execute("BEGIN")
+            connection.executemany(
+                "INSERT INTO bars(asset, timeframe, time, open, high, low, close, volume) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                zip(itertools.repeat(asset), itertools.repeat("M1"), *columns),
+            )
+            if clustered:
+                connection.execute(
+                    "INSERT OR REPLACE INTO bars_summary VALUES (?, 'M1', ?, ?, ?)",
+                    (asset, int(times[0]), int(times[-1]), per_asset),
+                )
+            connection.execute("COMMIT")
+        ingest_s = time.perf_counter() - started
+        connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+        window_sql = (
+            "SELECT time, open, high, low, close, volume FROM bars "
+            "WHERE asset = ? AND timeframe = ? AND time <= ? ORDER BY time DESC LIMIT ?"
+        )
+        plan = " / ".join(row[-1] for row in connection.execute(f"EXPLAIN QUERY PLAN {window_sql}", ("BENCH", "M1", 0, 1)))
+        points = rng.choice(times[window:], size=queries).tolist()
+        started = time.perf_counter()
+        for point in points:
+            connection.execute(window_sql, ("BENCH", "M1", point, window)).fetchall()
+        window_ms = (time.perf_counter() - started) * 1000.0 / queries
+
+        summary_sql = (
+            "SELECT start_time, end_time, bar_count FROM bars_summary WHERE asset = ? AND timeframe = ?"
+            if clustered
+            else "SELECT MIN(time), MAX(time), COUNT(*) FROM bars WHERE asset = ? AND timeframe = ?"
+        )
+        repeats = 20
+        started = time.perf_counter()
+        for _ in range(repeats):
+            connection.execute(summary_sql, ("BENCH", "M1")).fetchone()
+        summary_ms = (time.perf_counter() - started) * 1000.0 / repeats
+    finally:
+        connection.close()
+    return {
+        "ingestRowsPerSec": rows / ingest_s,
+        "ingestMs": ingest_s * 1000.0,
+        "bytes": _file_bytes(path),
+        "windowMs": window_ms,
+        "summaryMs": summary_ms,
+        "windowPlan": plan,
+    }
+
+
+def benchmark(rows=1_000_000, queries=200, window=5000, seed=7, workdir=None):
+    """
+    Ingest `rows` bars into a legacy and a clustered database and time the
+    load, a `to`/`limit` window query (`queries` random end points, `window`
+    bars each) and the summary lookup. Returns
+    {"rows", "window", "queries", "layouts": {"legacy": {...}, "clustered": {...}}}.
+    """
+    results = {"rows": rows, "window": window, "queries": queries, "layouts": {}}
+    with tempfile.TemporaryDirectory(dir=workdir) as directory:
+        for name, ddl, clustered in (("legacy", LEGACY_SCHEMA, False), ("clustered", SCHEMA, True)):
+            results["layouts"][name] = _bench_layout(
+                os.path.join(directory, f"{name}.db"), ddl, clustered, rows, queries, window, np.random.default_rng(seed)
+            )
+    return results
+
+
+def _print_benchmark(results):
+    layouts = results["layouts"]
+    print(f"{results['rows']} rows, {results['queries']} windows of {results['window']} bars")
+    print(f"{'':<22}{'legacy':>14}{'clustered':>14}{'change':>10}")
+    for key, label, scale, fmt in (
+        ("ingestRowsPerSec", "ingest rows/s", 1.0, "{:>14,.0f}"),
+        ("bytes", "file MB", 1.0 / (1 << 20), "{:>14.1f}"),
+        ("windowMs", "window ms", 1.0, "{:>14.3f}"),
+        ("summaryMs", "summary ms", 1.0, "{:>14.3f}"),
+    ):
+        before, after = layouts["legacy"][key] * scale, layouts["clustered"][key] * scale
+        change = f"{after / before:>9.3g}x" if before else f"{'-':>10}"
+        print(f"{label:<22}" + fmt.format(before) + fmt.format(after) + change)
+    for name in ("legacy", "clustered"):
+        print(f"{name} plan: {layouts[name]['windowPlan']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    migrate_cmd = commands.add_parser("migrate", help="rewrite a legacy database into the clustered layout")
+    migrate_cmd.add_argument("--db", default=None)
+    migrate_cmd.add_argument("--no-vacuum", action="store_true")
+    bench_cmd = commands.add_parser("bench", help="legacy vs clustered ingest and query throughput")
+    bench_cmd.add_argument("--rows", type=int, default=1_000_000)
+    bench_cmd.add_argument("--queries", type=int, default=200)
+    bench_cmd.add_argument("--window", type=int, default=5000)
+    bench_cmd.add_argument("--out", default=None, help="also write the results as JSON")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "migrate":
+            result = migrate(args.db, vacuum=not args.no_vacuum)
+            if result["from"] == 1:
+                print(
+                    f"migrated {result['rows']} bars in {result['ms']:.0f} ms "
+                    f"({result['bytesBefore'] / (1 << 20):.1f} MB -> {result['bytesAfter'] / (1 << 20):.1f} MB)"
+                )
+            else:
+                print(f"already on schema {SCHEMA_VERSION} ({result['rows']} bars)")
+        else:
+            window_size = max(1, args.window)
+            results = benchmark(max(2 * window_size, args.rows), max(1, args.queries), window_size)
+            _print_benchmark(results)
+            if args.out:
+                with open(args.out, "w", encoding="utf-8") as handle:
+                    json.dump(results, handle, indent=2)
+    except (OSError, sqlite3.Error) as exc:
+        print(f"marketdb: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
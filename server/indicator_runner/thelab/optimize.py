@@ -0,0 +1,349 @@
+"""
+Parallel parameter sweeps for strategies.
+
+    optimize(script_path, inputs, {"fast": [5, 9, 13], "slow": {"min": 20, "max": 60, "step": 10}},
+             objective="sharpe", emit=print)
+
+Each evaluation is one `thelab.backtest.run_strategy` call with the sampled
+parameters as `params`. Evaluations are spread over a `ProcessPoolExecutor`;
+the candle columns are copied once into a `multiprocessing.shared_memory`
+block that every worker maps read-only, so tasks carry only their
+parameters. Cancelling sets a shared `multiprocessing.Event` that every
+worker waits on in a daemon thread, and the worker exits as soon as it is
+set, even in the middle of an evaluation. Results are handed to `emit` as they complete, as
+
+    {"type": "result", "index": i, "params": {...}, "score": s, "metrics": {...}}
+
+(or with "error" instead of score/metrics), bracketed by a "start" and a
+"done" event. `score` is the objective oriented so that higher is better.
+
+Space entries are a list of values, {"values": [...]}, or
+{"min", "max", "step"} (grid) / {"min", "max"} (random; integers when both
+bounds are integers). Samplers: "grid" (cartesian product, in order) and
+"random" (`samples` draws, reproducible with `seed`).
+"""
+
+import importlib.util
+import itertools
+import math
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .backtest import run_strategy, strategy_mode
+from .indicators import IndicatorCache
+
+__all__ = ["OBJECTIVES", "optimize", "sample_space"]
+
+# Objective -> (metric, sign): the score is sign * metric.
+OBJECTIVES = {
+    "totalProfit": ("totalProfit", 1.0),
+    "sharpe": ("sharpe", 1.0),
+    "winRate": ("winRate", 1.0),
+    "drawdown": ("drawdown", -1.0),
+}
+_YEAR_MS = 365.0 * 24 * 3600 * 1000
+# Tasks kept queued per worker: enough to keep workers busy, few enough that
+# cancelling drops almost everything not yet started.
+_IN_FLIGHT_PER_WORKER = 2
+
+_worker = {}
+
+
+def _axis(name, spec):
+    if isinstance(spec, dict) and "values" in spec:
+        spec = spec["values"]
+    if isinstance(spec, (list, tuple)):
+        if not spec:
+            raise ValueError(f"parameter {name!r} has no values")
+        return list(spec)
+    if isinstance(spec, dict) and "min" in spec and "max" in spec:
+        low, high = spec["min"], spec["max"]
+        step = spec.get("step") or (1 if isinstance(low, int) and isinstance(high, int) else None)
+        if not step or step <= 0:
+            raise ValueError(f"parameter {name!r} needs a positive 'step' for a grid")
+        count = int(math.floor((high - low) / step + 1e-9)) + 1
+        values = [low + i * step for i in range(max(count, 0))]
+        if all(isinstance(v, int) for v in (low, step)):
+            return [int(v) for v in values]
+        return [round(v, 12) for v in values]
+    return [spec]
+
+
+def _draw(name, spec, rng):
+    if isinstance(spec, dict) and "values" in spec:
+        spec = spec["values"]
+    if isinstance(spec, (list, tuple)):
+        return spec[int(rng.integers(len(spec)))]
+    if isinstance(spec, dict) and "min" in spec and "max" in spec:
+        low, high = spec["min"], spec["max"]
+        if isinstance(low, int) and isinstance(high, int):
+            return int(rng.integers(low, high + 1))
+        return float(rng.uniform(low, high))
+    return spec
+
+
+def sample_space(space, sampler="grid", samples=None, seed=None):
+    """Return (total, iterator of params dicts) for `space`."""
+    names = list(space)
+    if sampler == "grid":
+        axes = [_axis(name, space[name]) for name in names]
+        total = math.prod(len(axis) for axis in axes)
+        return total, (dict(zip(names, combo)) for combo in itertools.product(*axes))
+    if sampler == "random":
+        total = int(samples or 0)
+        if total <= 0:
+            raise ValueError("random sampler needs a positive 'samples' count")
+        rng = np.random.default_rng(seed)
+        return total, ({name: _draw(name, space[name], rng) for name in names} for _ in range(total))
+    raise ValueError(f"unknown sampler {sampler!r}")
+
+
+def _periods_per_year(inputs):
+    times = inputs.get("time")
+    if times is None or len(times) < 2:
+        return None
+    spacing = float(np.median(np.diff(np.asarray(times, dtype=np.float64))))
+    return _YEAR_MS / spacing if spacing > 0 else None
+
+
+def _metrics(result, periods_per_year):
+    equity = result["equity"]
+    sharpe = 0.0
+    if equity.size > 2:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            returns = np.diff(equity) / equity[:-1]
+        returns = returns[np.isfinite(returns)]
+        deviation = float(returns.std()) if returns.size else 0.0
+        if deviation > 0.0:
+            sharpe = float(returns.mean()) / deviation * math.sqrt(periods_per_year or returns.size)
+    return {
+        "totalProfit": float(result["totalProfit"]),
+        "drawdown": float(result["drawdown"]),
+        "winRate": float(result["winRate"]),
+        "totalTrades": int(result["totalTrades"]),
+        "sharpe": sharpe,
+    }
+
+
+def _evaluate_with(module, inputs, index, params, objective, mode, costs, periods_per_year):
+    metric, sign = OBJECTIVES[objective]
+    try:
+        metrics = _metrics(run_strategy(module, inputs, params, mode=mode, **costs), periods_per_year)
+    except Exception as exc:
+        return {"type": "result", "index": index, "params": params,
+                "error": {"type": exc.__class__.__name__, "message": str(exc)}}
+    score = sign * metrics[metric]
+    return {
+        "type": "result",
+        "index": index,
+        "params": params,
+        "score": score if math.isfinite(score) else None,
+        "metrics": metrics,
+    }
+
+
+def load_strategy(script_path, workspace=None, module_name="__thelab_strategy__"):
+    """Import a strategy file (its directory and `workspace` become importable)."""
+    script_path = os.path.abspath(script_path)
+    for root in (workspace, os.path.dirname(script_path)):
+        if root and root not in sys.path:
+            sys.path.insert(0, root)
+    spec = importlib.util.spec_from_file_location(module_name, script_path)
+    if spec is None or spec.loader is None:
+        raise ImportError(f"Cannot load spec for strategy: {script_path}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _share(inputs):
+    """Copy columns into one shared-memory block; return (block, layout)."""
+    layout = []
+    offset = 0
+    arrays = {}
+    for name, values in inputs.items():
+        array = np.ascontiguousarray(values)
+        arrays[name] = array
+        layout.append((name, array.dtype.str, offset, array.size))
+        offset += -(-array.nbytes // 8) * 8
+    block = shared_memory.SharedMemory(create=True, size=max(offset, 8))
+    for name, dtype, start, length in layout:
+        np.ndarray((length,), dtype=dtype, buffer=block.buf, offset=start)[:] = arrays[name]
+    return block, layout
+
+
+def _attach(block_name, layout, stop):
+    """
+    Map the columns of a `_share` block read-only; return (block, inputs).
+    The worker process exits once `stop` (a `_stop_event`) is set.
+    """
+    # Forked workers inherit the parent's SIGTERM handler; restore the default
+    # so a SIGTERM sent to a worker still ends it.
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    threading.Thread(target=_exit_on, args=(stop,), name="thelab-stop", daemon=True).start()
+    block = shared_memory.SharedMemory(name=block_name)
+    inputs = {}
+    for name, dtype, start, length in layout:
+        column = np.ndarray((length,), dtype=dtype, buffer=block.buf, offset=start)
+        column.flags.writeable = False
+        inputs[name] = column
+    return block, inputs
+
+
+def _exit_on(stop):
+    stop.wait()
+    os._exit(1)
+
+
+def _stop_event():
+    """Event shared with pool workers (pass it in `initargs`) to end them on cancel."""
+    return multiprocessing.Event()
+
+
+def _init_worker(block_name, layout, stop, script_path, workspace, indicators_workspace, objective, mode, costs,
+                 periods_per_year):
+    block, inputs = _attach(block_name, layout, stop)
+    _worker.update(
+        block=block,
+        inputs=inputs,
+        cache=IndicatorCache(inputs, indicators_workspace),
+        module=load_strategy(script_path, workspace),
+        args=(objective, mode, costs, periods_per_year),
+    )
+
+
+def _evaluate_task(task):
+    index, params = task
+    with _worker["cache"].scope():
+        return _evaluate_with(_worker["module"], _worker["inputs"], index, params, *_worker["args"])
+
+
+def _drain(executor, function, tasks, workers, record, cancelled):
+    """
+    Submit `tasks` to `executor` a few at a time, passing each result to
+    `record` as it completes. Returns True when stopped by `cancelled()`.
+    """
+    pending = set()
+    exhausted = False
+    while True:
+        if cancelled():
+            return True
+        while not exhausted and len(pending) < workers * _IN_FLIGHT_PER_WORKER:
+            task = next(tasks, None)
+            if task is None:
+                exhausted = True
+                break
+            pending.add(executor.submit(function, task))
+        if not pending:
+            return False
+        done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+        for future in done:
+            record(future.result())
+
+
+def _shutdown(executor, block, stop, cancelled):
+    if cancelled:
+        # Workers exit on their own; the executor then reports the pool as
+        # broken and shutdown() only reaps them.
+        stop.set()
+    executor.shutdown(wait=True, cancel_futures=True)
+    block.close()
+    block.unlink()
+
+
+def _default_workers():
+    try:
+        configured = int(os.environ.get("THELAB_OPTIMIZER_WORKERS") or 0)
+    except ValueError:
+        configured = 0
+    return configured if configured > 0 else (os.cpu_count() or 1)
+
+
+def optimize(
+    script_path,
+    inputs,
+    space,
+    sampler="grid",
+    samples=None,
+    seed=None,
+    objective="totalProfit",
+    max_workers=None,
+    mode=None,
+    workspace=None,
+    indicators_workspace=None,
+    emit=None,
+    cancelled=None,
+    **costs,
+):
+    """
+    Evaluate `script_path` over the parameter space and stream results to
+    `emit`. `max_workers` is capped by THELAB_OPTIMIZER_WORKERS (default:
+    CPU count). `cancelled()` is polled between completions; once it returns
+    True no new tasks start and running workers are terminated.
+    `thelab.indicators` columns are memoized per worker (scripts resolved
+    in `indicators_workspace`), so parameter sets sharing an indicator
+    setting compute it once.
+
+    Returns the "done" event: {"completed", "failed", "total", "cancelled",
+    "best", "totalMs", "workers"}.
+    """
+    started = time.time()
+    emit = emit or (lambda event: None)
+    cancelled = cancelled or (lambda: False)
+    if objective not in OBJECTIVES:
+        raise ValueError(f"unknown objective {objective!r}; expected one of {sorted(OBJECTIVES)}")
+    total, tasks = sample_space(space, sampler, samples, seed)
+    tasks = enumerate(tasks)
+
+    module = load_strategy(script_path, workspace)
+    if strategy_mode(module, mode) is None:
+        raise TypeError("strategy must define 'handle_data(context, data)' or 'signals(inputs, params)'")
+    periods_per_year = _periods_per_year(inputs)
+    limit = _default_workers()
+    workers = max(1, min(int(max_workers or limit), limit, total or 1))
+    emit({"type": "start", "total": total, "workers": workers, "objective": objective})
+
+    summary = {"type": "done", "completed": 0, "failed": 0, "total": total, "cancelled": False, "best": None}
+
+    def record(event):
+        summary["completed"] += 1
+        if "error" in event:
+            summary["failed"] += 1
+        elif event["score"] is not None and (summary["best"] is None or event["score"] > summary["best"]["score"]):
+            summary["best"] = event
+        emit(event)
+
+    if workers == 1:
+        cache = IndicatorCache(inputs, indicators_workspace)
+        for index, params in tasks:
+            if cancelled():
+                summary["cancelled"] = True
+                break
+            with cache.scope():
+                record(_evaluate_with(module, inputs, index, params, objective, mode, costs, periods_per_year))
+    else:
+        block, layout = _share(inputs)
+        stop = _stop_event()
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(block.name, layout, stop, script_path, workspace, indicators_workspace, objective, mode,
+                      costs, periods_per_year),
+        )
+        try:
+            summary["cancelled"] = _drain(executor, _evaluate_task, tasks, workers, record, cancelled)
+        finally:
+            _shutdown(executor, block, stop, summary["cancelled"])
+
+    summary.update({"workers": workers, "totalMs": (time.time() - started) * 1000.0})
+    emit(summary)
+    return summary
@@ -0,0 +1,380 @@
+"""
+Scaling benchmarks for the bundled indicators and the runner.
+
+    cd server/indicator_runner
+    python -m thelab.perfsuite --out perf-baseline.json
+    python -m thelab.perfsuite --compare perf-baseline.json [--threshold 0.25]
+
+Every stage runs at each size (default 1k, 10k, 100k and 1M bars) on every
+dataset:
+
+- "trending", "ranging", "gaps": seeded synthetic OHLCV (drifting random
+  walk, mean-reverting walk, and a walk where a third of the bars open away
+  from the previous close);
+- "cl1": recorded CL1! bars, from the local dataset segments
+  (`server/data/cl1!-<tf>-meta.json`) or the weekly CSV kept at the repo
+  root. Sizes beyond the recording are reached by chaining copies of it,
+  each shifted to open where the previous one closed.
+
+Stages are `ema_100.calculate`, each step of `market_structure.core`
+(swings, break index, levels/markers, structure enrichment) and the whole
+`calculate`, plus `runner.py` end to end on both scripts (subprocess, TLB1
+payload). Wall time is the best of `--repeat` runs; peak memory comes from
+one extra run under tracemalloc (the runner reports its own, see
+`traceMemory` in runner.py).
+
+`--out` writes the results as a JSON baseline. `--compare` reruns the
+suite with the baseline's sizes and datasets and exits with status 1 when
+a stage got slower or bigger than the baseline by more than `--threshold`;
+wall-time differences under `--min-ms` are treated as noise.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import struct
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from .indicators import _load_script
+
+__all__ = ["DATASETS", "compare", "load_recorded", "run_suite", "synthetic"]
+
+RUNNER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER_DIR = os.path.dirname(RUNNER_DIR)
+RUNNER_PATH = os.path.join(RUNNER_DIR, "runner.py")
+INDICATORS_DIR = os.path.join(SERVER_DIR, "indicators")
+DATA_DIR = os.path.join(SERVER_DIR, "data")
+RECORDED_CSV = os.path.join(os.path.dirname(SERVER_DIR), "temp_cl_1w", "cl-1w.csv")
+
+DATASETS = ("trending", "ranging", "gaps", "cl1")
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+_COLUMNS = ("open", "high", "low", "close", "volume")
+_MINUTE_MS = 60_000
+
+
+def synthetic(bars, regime="trending", seed=7):
+    """Seeded OHLCV columns (plus epoch-ms `time`) for one of the synthetic regimes."""
+    rng = np.random.default_rng(seed)
+    if regime == "trending":
+        steps = rng.normal(0.02, 0.5, bars)
+        close = 100.0 + np.cumsum(steps)
+    elif regime == "ranging":
+        # Ornstein-Uhlenbeck around 100: swings without a net drift.
+        noise = rng.normal(0.0, 0.5, bars)
+        close = np.empty(bars)
+        level = 100.0
+        theta = 0.05
+        for i in range(bars):
+            level += theta * (100.0 - level) + noise[i]
+            close[i] = level
+    elif regime == "gaps":
+        steps = rng.normal(0.0, 0.5, bars)
+        gaps = np.where(rng.random(bars) < 0.33, rng.normal(0.0, 3.0, bars), 0.0)
+        close = 100.0 + np.cumsum(steps + gaps)
+    else:
+        raise ValueError(f"unknown regime {regime!r}; expected trending, ranging or gaps")
+    open_ = np.r_[close[0], close[:-1]]
+    if regime == "gaps":
+        open_ = open_ + np.where(rng.random(bars) < 0.33, rng.normal(0.0, 1.5, bars), 0.0)
+    spread = rng.uniform(0.05, 1.0, bars)
+    return {
+        "time": np.arange(bars, dtype=np.int64) * _MINUTE_MS,
+        "open": open_,
+        "high": np.maximum(open_, close) + spread,
+        "low": np.minimum(open_, close) - spread,
+        "close": close,
+        "volume": rng.integers(1, 1000, bars).astype(float),
+    }
+
+
+def _read_segments(asset, timeframe, data_dir):
+    base = f"{asset.lower()}-{timeframe.lower()}"
+    meta_path = os.path.join(data_dir, f"{base}-meta.json")
+    if not os.path.isfile(meta_path):
+        return None
+    with open(meta_path, encoding="utf-8") as handle:
+        meta = json.load(handle)
+    candles = []
+    for segment in sorted(meta.get("segments") or [], key=lambda s: str(s.get("start") or "")):
+        path = os.path.join(data_dir, segment.get("file") or f"{base}-{segment.get('segment')}.json")
+        if os.path.isfile(path):
+            with open(path, encoding="utf-8") as handle:
+                candles.extend((json.load(handle) or {}).get("candles") or [])
+    if not candles:
+        return None
+    return {name: np.array([float(c.get(name) or 0.0) for c in candles]) for name in _COLUMNS}
+
+
+def _read_csv(path):
+    # date;time;open;high;low;close;volume, as exported for the golden tests.
+    rows = np.loadtxt(path, delimiter=";", usecols=(2, 3, 4, 5, 6), ndmin=2)
+    return {name: rows[:, i].copy() for i, name in enumerate(_COLUMNS)}
+
+
+def load_recorded(bars=None, asset="cl1!", timeframe="m15", data_dir=DATA_DIR, csv_path=RECORDED_CSV):
+    """
+    Recorded bars as OHLCV columns: the local dataset segments when present,
+    otherwise the CSV at `csv_path`. With `bars`, the recording is cut or
+    chained (each copy shifted to open at the previous close) to that length.
+    Returns (columns, source) or (None, None) when nothing is recorded.
+    """
+    columns, source = _read_segments(asset, timeframe, data_dir), f"{asset}-{timeframe} segments"
+    if columns is None and csv_path and os.path.isfile(csv_path):
+        columns, source = _read_csv(csv_path), os.path.basename(csv_path)
+    if columns is None:
+        return None, None
+    size = columns["close"].size
+    if bars is not None and bars != size:
+        copies = -(-bars // size)
+        prices = ("open", "high", "low", "close")
+        shift = np.zeros(copies)
+        shift[1:] = np.cumsum(np.full(copies - 1, columns["close"][-1] - columns["open"][0]))
+        columns = {
+            name: (np.tile(values, copies) + (np.repeat(shift, size) if name in prices else 0.0))[:bars]
+            for name, values in columns.items()
+        }
+    columns["time"] = np.arange(columns["close"].size, dtype=np.int64) * _MINUTE_MS
+    return columns, source
+
+
+def _best_of(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000.0
+
+
+def _peak_bytes(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _structure_steps(inputs):
+    """market_structure.core.calculate split into its steps, as (name, call(state)) pairs."""
+    from market_structure.breaks import BreakIndex
+    from market_structure.structure import build_levels_and_markers, enrich_with_structure
+    from market_structure.swings import detect_swing_array, extract_external_structure_array, swings_to_dicts
+
+    o, h, l, c = (np.asarray(inputs[name], dtype=float) for name in ("open", "high", "low", "close"))
+
+    def swings(state):
+        state["swings"] = swings_to_dicts(extract_external_structure_array(detect_swing_array(h, l)))
+
+    def breaks(state):
+        state["breaks"] = BreakIndex(o, h, l, c)
+
+    def levels(state):
+        state["built"] = build_levels_and_markers(o, h, l, c, state["swings"], break_index=state["breaks"])
+
+    def enrich(state):
+        lv, mk, break_map = state["built"]
+        enrich_with_structure(state["swings"], lv, mk, o, h, l, c, break_map, break_index=state["breaks"])
+
+    return [("swings", swings), ("breaks", breaks), ("levels", levels), ("enrich", enrich)]
+
+
+def _time_steps(steps, repeat):
+    best = {name: float("inf") for name, _ in steps}
+    for _ in range(repeat):
+        state = {}
+        for name, step in steps:
+            started = time.perf_counter()
+            step(state)
+            best[name] = min(best[name], (time.perf_counter() - started) * 1000.0)
+    peaks = {}
+    state = {}
+    tracemalloc.start()
+    try:
+        for name, step in steps:
+            tracemalloc.reset_peak()
+            held = tracemalloc.get_traced_memory()[0]
+            step(state)
+            peaks[name] = tracemalloc.get_traced_memory()[1] - held
+    finally:
+        tracemalloc.stop()
+    return best, peaks
+
+
+def _encode_payload(inputs, header):
+    """TLB1 payload (see `_decode_binary_payload` in runner.py) for `inputs`."""
+    names = [name for name in ("time",) + _COLUMNS if name in inputs]
+    length = int(inputs["close"].size)
+    columns = [{"name": name, "dtype": "<i8" if name == "time" else "<f8"} for name in names]
+    raw = json.dumps(dict(header, apiVersion=1, length=length, columns=columns)).encode("utf-8")
+    raw += b" " * (-(8 + len(raw)) % 8)
+    parts = [b"TLB1", struct.pack("<I", len(raw)), raw]
+    for column in columns:
+        parts.append(np.ascontiguousarray(inputs[column["name"]], dtype=column["dtype"]).tobytes())
+    return b"".join(parts)
+
+
+def _run_runner(script, payload, python):
+    started = time.perf_counter()
+    proc = subprocess.run([python, RUNNER_PATH, script], input=payload, capture_output=True, check=False)
+    wall = (time.perf_counter() - started) * 1000.0
+    try:
+        result = json.loads(proc.stdout.decode("utf-8"))
+    except ValueError:
+        raise RuntimeError(f"runner produced no JSON for {script}: {proc.stderr.decode('utf-8', 'replace')[-500:]}")
+    if not result.get("ok"):
+        raise RuntimeError(f"runner failed for {script}: {result.get('error')}")
+    return wall, result.get("meta") or {}
+
+
+def _measure(inputs, repeat, python, workspace):
+    if workspace not in sys.path:
+        sys.path.insert(0, workspace)
+    from market_structure.core import calculate as structure_calculate
+
+    ema = _load_script("ema_100", workspace)
+    rows = []
+
+    def record(stage, wall_ms, peak_bytes, **extra):
+        rows.append(dict(stage=stage, wallMs=wall_ms, peakBytes=int(peak_bytes), **extra))
+
+    call = lambda: ema.calculate(inputs, {"length": 100})  # noqa: E731
+    record("ema_100.calculate", _best_of(call, repeat), _peak_bytes(call))
+    best, peaks = _time_steps(_structure_steps(inputs), repeat)
+    for name in best:
+        record(f"market_structure.{name}", best[name], peaks[name])
+    call = lambda: structure_calculate(inputs)  # noqa: E731
+    record("market_structure.calculate", _best_of(call, repeat), _peak_bytes(call))
+
+    for stage, script in (("runner.ema_100", "ema_100.py"), ("runner.market_structure", "market-structure.py")):
+        path = os.path.join(workspace, script)
+        header = {"settings": {}, "output": "packed"}
+        runs = [_run_runner(path, _encode_payload(inputs, header), python) for _ in range(repeat)]
+        wall, meta = min(runs, key=lambda run: run[0])
+        # tracemalloc slows allocation-heavy code down, so memory gets its own run.
+        _, traced = _run_runner(path, _encode_payload(inputs, dict(header, traceMemory=True)), python)
+        record(stage, wall, (traced.get("memory") or {}).get("peakBytes", 0), phases=meta.get("phases") or {})
+    return rows
+
+
+def run_suite(sizes=DEFAULT_SIZES, datasets=DATASETS, repeat=3, seed=7, python=None, workspace=INDICATORS_DIR,
+              log=None):
+    """
+    Run every stage on every (dataset, size) and return the baseline document:
+    {"version", "createdAt", "environment", "repeat", "seed", "sizes", "datasets",
+     "results": [{"dataset", "bars", "stage", "wallMs", "peakBytes", ...}]}.
+    Datasets without data (no recording for "cl1") are listed under "skipped".
+    """
+    log = log or (lambda message: None)
+    python = python or sys.executable
+    results, skipped, sources = [], [], {}
+    for dataset in datasets:
+        for bars in sizes:
+            if dataset == "cl1":
+                inputs, source = load_recorded(bars)
+                if inputs is None:
+                    skipped.append(dataset)
+                    log("cl1: no recorded bars found, skipping")
+                    break
+                sources[dataset] = source
+            else:
+                inputs = synthetic(bars, dataset, seed)
+            for row in _measure(inputs, repeat, python, workspace):
+                results.append(dict(dataset=dataset, bars=bars, **row))
+                log(f"{dataset:<9} {bars:>9} {row['stage']:<28} {row['wallMs']:>10.2f} ms "
+                    f"{row['peakBytes'] / 1048576:>9.2f} MiB")
+    return {
+        "version": 1,
+        "createdAt": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "repeat": repeat,
+        "seed": seed,
+        "sizes": list(sizes),
+        "datasets": [dataset for dataset in datasets if dataset not in skipped],
+        "sources": sources,
+        "skipped": skipped,
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold=0.25, min_ms=2.0):
+    """
+    Regressions of `current` against `baseline`: one entry per (dataset, bars,
+    stage, metric) that grew by more than `threshold` (0.25 = 25%). Wall time
+    must also grow by at least `min_ms`. Stages missing from either side are
+    ignored.
+    """
+    previous = {(row["dataset"], row["bars"], row["stage"]): row for row in baseline.get("results") or []}
+    regressions = []
+    for row in current.get("results") or []:
+        key = (row["dataset"], row["bars"], row["stage"])
+        before = previous.get(key)
+        if before is None:
+            continue
+        for metric, floor in (("wallMs", min_ms), ("peakBytes", 0)):
+            old, new = float(before.get(metric) or 0.0), float(row.get(metric) or 0.0)
+            if old <= 0.0 or new - old <= floor:
+                continue
+            if new > old * (1.0 + threshold):
+                regressions.append(
+                    {"dataset": key[0], "bars": key[1], "stage": key[2], "metric": metric,
+                     "baseline": old, "current": new, "ratio": new / old}
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=None)
+    parser.add_argument("--datasets", nargs="+", choices=DATASETS, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="write the results to this JSON file")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare against a baseline written by --out")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--min-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+    sizes = args.sizes or (baseline or {}).get("sizes") or DEFAULT_SIZES
+    datasets = args.datasets or (baseline or {}).get("datasets") or DATASETS
+    seed = args.seed if baseline is None else baseline.get("seed", args.seed)
+
+    log = lambda message: print(message, flush=True)  # noqa: E731
+    current = run_suite(sizes, datasets, max(1, args.repeat), seed, log=log)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as handle:
+            json.dump(current, handle, indent=2)
+        print(f"wrote {len(current['results'])} results to {args.out}")
+    if baseline is None:
+        return
+
+    regressions = compare(baseline, current, args.threshold, args.min_ms)
+    print()
+    if not regressions:
+        print(f"no regressions beyond {args.threshold:.0%} against {args.compare}")
+        return
+    print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%} against {args.compare}:")
+    for item in regressions:
+        print(f"  {item['dataset']:<9} {item['bars']:>9} {item['stage']:<28} {item['metric']:<9} "
+              f"{item['baseline']:.2f} -> {item['current']:.2f} ({item['ratio']:.2f}x)")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
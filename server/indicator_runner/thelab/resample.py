@@ -0,0 +1,175 @@
+"""
+Vectorized OHLCV resampling from M1 columns.
+
+    from thelab import resample
+    h4 = resample.resample(m1, "H4")
+    daily = resample.resample(m1, "D1", session="cme")
+
+    python -m thelab.resample --asset cl1! --session cme   # M1 store -> M5 ... MN stores
+
+Every timeframe is one pass over the M1 arrays: each bar gets the start of
+its bucket, bucket boundaries are where that start changes, and the
+columns are reduced with `np.maximum.reduceat` / `np.minimum.reduceat` /
+`np.add.reduceat` (open and close are the first and last bar of each
+bucket). Input must be sorted by time; empty buckets produce no bar.
+
+Intraday buckets (M5 ... H4) are clock-aligned in UTC, as in
+`timeframeBuilder.aggregateCandles`. D1, W1 and MN follow the trading
+session: `session` is where the trading day starts, in minutes from UTC
+midnight (or a name from SESSIONS). "cme" is 17:00 Chicago on the fixed
+GMT-6 offset the CL importer uses for cl-1m.csv, i.e. 23:00 UTC the day
+before, so a D1 bar runs 23:00 -> 23:00 UTC and is stamped with its start.
+W1 buckets open at the session start on Monday (Sunday evening for "cme")
+and MN buckets at the session start of the first calendar day.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from . import store
+
+__all__ = ["SESSIONS", "TIMEFRAMES", "bucket_starts", "resample", "resample_store"]
+
+_MINUTE = 60_000
+_DAY = 1440 * _MINUTE
+_WEEK = 7 * _DAY
+# 1970-01-01 was a Thursday; weeks are counted from Monday 1970-01-05.
+_MONDAY = 4 * _DAY
+
+TIMEFRAMES = {
+    "M1": 1,
+    "M5": 5,
+    "M15": 15,
+    "M30": 30,
+    "H1": 60,
+    "H4": 240,
+    "D1": "day",
+    "W1": "week",
+    "MN": "month",
+}
+SESSIONS = {"utc": 0, "cme": -60}
+# Bucket width in minutes, for ordering timeframes (a month counts as its shortest length).
+_WIDTH = {code: width if isinstance(width, int) else {"day": 1440, "week": 10080, "month": 28 * 1440}[width]
+          for code, width in TIMEFRAMES.items()}
+
+
+def _session_ms(session):
+    if session is None:
+        return 0
+    if isinstance(session, str):
+        key = session.lower()
+        if key not in SESSIONS:
+            raise ValueError(f"unknown session {session!r}; expected minutes or one of {sorted(SESSIONS)}")
+        return SESSIONS[key] * _MINUTE
+    return int(session) * _MINUTE
+
+
+def bucket_starts(times, timeframe, session=None):
+    """Start (epoch ms) of the `timeframe` bucket of every timestamp in `times`."""
+    code = str(timeframe).upper()
+    if code not in TIMEFRAMES:
+        raise ValueError(f"unknown timeframe {timeframe!r}; expected one of {list(TIMEFRAMES)}")
+    times = np.asarray(times, dtype=np.int64)
+    width = TIMEFRAMES[code]
+    if isinstance(width, int):
+        step = width * _MINUTE
+        return times - np.mod(times, step)
+    offset = _session_ms(session)
+    shifted = times - offset
+    if width == "day":
+        return shifted - np.mod(shifted, _DAY) + offset
+    if width == "week":
+        return shifted - np.mod(shifted - _MONDAY, _WEEK) + offset
+    months = shifted.astype("datetime64[ms]").astype("datetime64[M]")
+    return months.astype("datetime64[ms]").astype(np.int64) + offset
+
+
+def resample(columns, timeframe, session=None):
+    """
+    OHLCV columns (`time` in epoch ms, open/high/low/close, optional volume)
+    of `timeframe` built from finer, time-sorted bars.
+    """
+    times = np.asarray(columns["time"], dtype=np.int64)
+    if times.size and np.any(times[1:] < times[:-1]):
+        raise ValueError("bars must be sorted by time")
+    starts = bucket_starts(times, timeframe, session)
+    if not times.size:
+        return {name: np.asarray(columns.get(name, []))[:0] for name in ("time", "open", "high", "low", "close", "volume")}
+    first = np.flatnonzero(np.r_[True, starts[1:] != starts[:-1]])
+    last = np.r_[first[1:] - 1, times.size - 1]
+    volume = columns.get("volume")
+    return {
+        "time": starts[first],
+        "open": np.asarray(columns["open"], dtype=np.float64)[first],
+        "high": np.maximum.reduceat(np.asarray(columns["high"], dtype=np.float64), first),
+        "low": np.minimum.reduceat(np.asarray(columns["low"], dtype=np.float64), first),
+        "close": np.asarray(columns["close"], dtype=np.float64)[last],
+        "volume": (
+            np.zeros(first.size)
+            if volume is None
+            else np.add.reduceat(np.asarray(volume, dtype=np.float64), first)
+        ),
+    }
+
+
+def resample_store(root, asset, timeframes=None, source="M1", session=None):
+    """
+    Resample the `source` column store of `asset` into every timeframe in
+    `timeframes` (default: all coarser than `source`) and write each one to
+    the store. Targets finer than `source` raise ValueError. Returns
+    {timeframe: manifest}.
+    """
+    base = str(source).upper()
+    if base not in _WIDTH:
+        raise ValueError(f"unknown source timeframe {source!r}; expected one of {list(TIMEFRAMES)}")
+    if timeframes:
+        codes = [str(code).upper() for code in timeframes]
+        for code in codes:
+            if code not in _WIDTH:
+                raise ValueError(f"unknown timeframe {code!r}; expected one of {list(TIMEFRAMES)}")
+            if _WIDTH[code] < _WIDTH[base]:
+                raise ValueError(f"cannot resample {base} into the finer {code}")
+    else:
+        codes = [code for code in TIMEFRAMES if _WIDTH[code] > _WIDTH[base]]
+    columns = store.load(root, asset, source)
+    written = {}
+    for code in codes:
+        if code == base:
+            continue
+        bars = resample(columns, code, session)
+        meta = {"resampledFrom": base.lower(), "session": session}
+        written[code] = store.write_columns(root, asset, code, bars, source=meta)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", default=os.environ.get("THELAB_COLUMN_STORE_DIR")
+                        or os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                        "data", "columns"))
+    parser.add_argument("--asset", required=True)
+    parser.add_argument("--source", default="M1")
+    parser.add_argument("--timeframes", nargs="+", default=None)
+    parser.add_argument("--session", default=None, help="minutes from UTC midnight or one of: " + ", ".join(SESSIONS))
+    args = parser.parse_args()
+    session = args.session
+    if session is not None and session.lstrip("-").isdigit():
+        session = int(session)
+
+    started = time.perf_counter()
+    try:
+        written = resample_store(args.store, args.asset, args.timeframes, args.source, session)
+    except (FileNotFoundError, ValueError) as exc:
+        print(f"resample: {exc}", file=sys.stderr)
+        sys.exit(1)
+    for code, manifest in written.items():
+        print(f"{args.asset} {code}: {manifest['length']} bars")
+    print(f"done in {(time.perf_counter() - started) * 1000.0:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Columnar candle store, opened with `np.memmap`.
+
+    from thelab import store
+    bars = store.load("server/data/columns", "cl1!", "m15", start="2024-01-01", limit=50000)
+    bars["close"]  # read-only float64 view of the file, no copy
+
+One directory per asset/timeframe (`<asset>-<timeframe>`, lower case, as
+the JSON segments in `server/data`) holding a contiguous little-endian
+column file per field and a manifest:
+
+    manifest.json  {"version": 1, "asset", "timeframe", "length", "start", "end",
+                    "revision", "columns": [{"name": "time", "dtype": "<i8", "file": "time.i64"}, ...]}
+    time.i64       epoch milliseconds, ascending and unique
+    open.f64 high.f64 low.f64 close.f64 volume.f64
+
+The Node side (`columnStoreService.js`) writes the same layout. Writers
+replace the column files first and the manifest last, each with an atomic
+rename, so readers that load the manifest first always see complete
+columns; `revision` changes on every write.
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+
+__all__ = ["COLUMNS", "load", "open_columns", "read_manifest", "select", "store_path", "write_columns"]
+
+COLUMNS = (("time", "<i8", "time.i64"),) + tuple(
+    (name, "<f8", f"{name}.f64") for name in ("open", "high", "low", "close", "volume")
+)
+MANIFEST = "manifest.json"
+
+
+def store_path(root, asset, timeframe):
+    return os.path.join(root, f"{str(asset).lower()}-{str(timeframe).lower()}")
+
+
+def read_manifest(root, asset, timeframe):
+    """The store's manifest, or None when there is no store for asset/timeframe."""
+    path = os.path.join(store_path(root, asset, timeframe), MANIFEST)
+    if not os.path.isfile(path):
+        return None
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def open_columns(root, asset, timeframe):
+    """
+    Map every column of the store read-only. Returns (columns, manifest);
+    raises FileNotFoundError when the store does not exist and ValueError
+    when a column file is shorter than the manifest says.
+    """
+    manifest = read_manifest(root, asset, timeframe)
+    if manifest is None:
+        raise FileNotFoundError(f"no column store for {asset} {timeframe} under {root}")
+    directory = store_path(root, asset, timeframe)
+    length = int(manifest["length"])
+    columns = {}
+    for column in manifest["columns"]:
+        dtype = np.dtype(column["dtype"])
+        path = os.path.join(directory, column["file"])
+        if os.path.getsize(path) < length * dtype.itemsize:
+            raise ValueError(f"column {column['name']!r} of {asset} {timeframe} is truncated")
+        # np.memmap refuses empty files; an empty store maps to empty arrays.
+        columns[column["name"]] = (
+            np.memmap(path, dtype=dtype, mode="r", shape=(length,)) if length else np.empty(0, dtype)
+        )
+    return columns, manifest
+
+
+def _epoch_ms(value):
+    if value is None or isinstance(value, (int, float, np.integer, np.floating)):
+        return value
+    return np.datetime64(str(value).rstrip("Z"), "ms").astype(np.int64)
+
+
+def select(columns, start=None, end=None, limit=None, offset=None, length=None):
+    """
+    Views of `columns` for one range, as (views, offset). Either an explicit
+    `offset` / `length`, or bars with `start <= time <= end` (epoch ms or ISO
+    strings, both optional) of which the last `limit` are kept. Views share
+    memory with the store.
+    """
+    count = len(columns["time"])
+    if offset is not None:
+        first = min(max(int(offset), 0), count)
+        stop = count if length is None else min(first + max(int(length), 0), count)
+    else:
+        times = columns["time"]
+        first = 0 if start is None else int(np.searchsorted(times, _epoch_ms(start), side="left"))
+        stop = count if end is None else int(np.searchsorted(times, _epoch_ms(end), side="right"))
+        if limit is not None and int(limit) > 0:
+            first = max(first, stop - int(limit))
+    stop = max(stop, first)
+    return {name: values[first:stop] for name, values in columns.items()}, first
+
+
+def load(root, asset, timeframe, start=None, end=None, limit=None, offset=None, length=None):
+    """`open_columns` followed by `select`; returns only the column views."""
+    columns, _ = open_columns(root, asset, timeframe)
+    return select(columns, start, end, limit, offset, length)[0]
+
+
+def _replace(path, data):
+    temp = f"{path}.{os.getpid()}.tmp"
+    with open(temp, "wb") as handle:
+        handle.write(data)
+    os.replace(temp, path)
+
+
+def write_columns(root, asset, timeframe, columns, source=None):
+    """
+    Write OHLCV columns (`time` in epoch ms plus open/high/low/close and an
+    optional volume) as the store for asset/timeframe, replacing any
+    previous one. Bars are sorted by time and duplicate times keep the last
+    bar. `source` is recorded in the manifest with `writtenAt` (epoch ms),
+    which makes `columnStoreService` keep this store over JSON segments
+    written before it. Returns the manifest.
+    """
+    times = np.asarray(columns["time"], dtype=np.int64)
+    order = np.argsort(times, kind="stable")
+    times = times[order]
+    # Keep the last bar of every run of equal times.
+    keep = np.r_[times[1:] != times[:-1], True] if times.size else np.zeros(0, bool)
+    directory = store_path(root, asset, timeframe)
+    os.makedirs(directory, exist_ok=True)
+    for name, dtype, file in COLUMNS:
+        if name == "time":
+            values = times[keep]
+        else:
+            raw = columns.get(name)
+            values = np.zeros(times.size) if raw is None else np.asarray(raw, dtype=np.float64)[order]
+            values = values[keep]
+        _replace(os.path.join(directory, file), np.ascontiguousarray(values, dtype=dtype).tobytes())
+    kept = times[keep]
+    manifest = {
+        "version": 1,
+        "asset": str(asset).lower(),
+        "timeframe": str(timeframe).lower(),
+        "length": int(kept.size),
+        "start": int(kept[0]) if kept.size else None,
+        "end": int(kept[-1]) if kept.size else None,
+        "revision": f"{time.time_ns():x}",
+        "columns": [{"name": name, "dtype": dtype, "file": file} for name, dtype, file in COLUMNS],
+    }
+    manifest["source"] = dict(source or {})
+    manifest["source"].setdefault("writtenAt", int(time.time() * 1000))
+    _replace(os.path.join(directory, MANIFEST), json.dumps(manifest, indent=2).encode("utf-8"))
+    return manifest
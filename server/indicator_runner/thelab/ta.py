@@ -0,0 +1,285 @@
+"""
+Vectorized technical-analysis kernels for indicators.
+
+Drop-in replacements for the TA-Lib functions indicators use, written with
+numpy only so they work on machines without TA-Lib or a C toolchain:
+
+    from thelab import ta
+    ema = ta.ema(inputs["close"], 100)
+
+Outputs follow TA-Lib conventions: float64 arrays of the input length, NaN
+during the warm-up (lookback) period, EMA/RSI/ATR seeded with a simple
+average. Leading NaNs in the input are skipped, as TA-Lib does, and the
+warm-up starts at the first finite value.
+
+Recursive smoothers (EMA, Wilder's RSI/ATR averages) have no numpy
+primitive; `_smooth` evaluates the recurrence a block at a time with a
+scaled cumulative sum instead of a Python loop per bar.
+"""
+
+import math
+
+import numpy as np
+
+__all__ = [
+    "sma",
+    "ema",
+    "wma",
+    "rsi",
+    "true_range",
+    "atr",
+    "bollinger",
+    "rolling_max",
+    "rolling_min",
+]
+
+# `_smooth` scales block terms by decay**-k; keep that factor below 1e100 so
+# neither it nor decay**k leaves the float64 range.
+_MAX_BLOCK_SCALE_LOG = 100.0 * math.log(10.0)
+# Minimum windows per row in `_rolling_moments`.
+_MOMENT_ROW = 64
+
+
+def _as_float(values):
+    return np.asarray(values, dtype=np.float64).reshape(-1)
+
+
+def _check_period(period, minimum=1):
+    period = int(period)
+    if period < minimum:
+        raise ValueError(f"period must be >= {minimum}, got {period}")
+    return period
+
+
+def _first_finite(values):
+    finite = np.flatnonzero(np.isfinite(values))
+    return int(finite[0]) if finite.size else values.size
+
+
+def _smooth(values, alpha, initial):
+    """
+    Evaluate y[i] = alpha * values[i] + (1 - alpha) * y[i - 1], y[-1] = initial.
+
+    Within a block of length B starting after y_prev:
+
+        y[k] = decay**k * (decay * y_prev + sum_{j<=k} alpha * x[j] * decay**-j)
+
+    so each block is one cumsum. B is chosen so decay**-B stays finite.
+    """
+    out = np.empty(values.size, dtype=np.float64)
+    if values.size == 0:
+        return out
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        out[:] = values
+        return out
+
+    block = values.size
+    if decay < 1.0:
+        block = max(1, min(block, int(_MAX_BLOCK_SCALE_LOG / -math.log(decay))))
+    steps = np.arange(block, dtype=np.float64)
+    powers = decay ** steps
+    scaled_alpha = alpha / powers
+
+    previous = float(initial)
+    for start in range(0, values.size, block):
+        chunk = values[start:start + block]
+        size = chunk.size
+        acc = np.cumsum(chunk * scaled_alpha[:size])
+        acc += decay * previous
+        acc *= powers[:size]
+        out[start:start + size] = acc
+        previous = acc[-1]
+    return out
+
+
+def _window_sums(values, period):
+    """Rolling sums of `period` values (length n - period + 1)."""
+    # Centering on the first value keeps the running sum small, which limits
+    # cancellation when long series are differenced.
+    centered = values - values[0]
+    total = np.cumsum(centered)
+    sums = total[period - 1:].copy()
+    sums[1:] -= total[:-period]
+    return sums + period * values[0]
+
+
+def sma(values, period=30):
+    """Simple moving average (TA-Lib SMA)."""
+    values = _as_float(values)
+    period = _check_period(period)
+    out = np.full(values.size, np.nan)
+    start = _first_finite(values)
+    if values.size - start < period:
+        return out
+    out[start + period - 1:] = _window_sums(values[start:], period) / period
+    return out
+
+
+def ema(values, period=30):
+    """Exponential moving average, alpha = 2 / (period + 1), SMA seed (TA-Lib EMA)."""
+    values = _as_float(values)
+    period = _check_period(period)
+    return _seeded_smooth(values, period, 2.0 / (period + 1.0), offset=0)
+
+
+def _seeded_smooth(values, period, alpha, offset):
+    """
+    Smooth `values[offset:]` with `alpha`, seeding with the mean of its first
+    `period` finite values. Output is aligned with `values`.
+    """
+    out = np.full(values.size, np.nan)
+    start = offset + _first_finite(values[offset:])
+    seed_at = start + period - 1
+    if seed_at >= values.size:
+        return out
+    seed = float(values[start:seed_at + 1].mean())
+    out[seed_at] = seed
+    out[seed_at + 1:] = _smooth(values[seed_at + 1:], alpha, seed)
+    return out
+
+
+def wma(values, period=30):
+    """Linearly weighted moving average, newest bar weighted `period` (TA-Lib WMA)."""
+    values = _as_float(values)
+    period = _check_period(period)
+    out = np.full(values.size, np.nan)
+    start = _first_finite(values)
+    if values.size - start < period:
+        return out
+    weights = np.arange(period, 0, -1, dtype=np.float64)
+    weighted = np.convolve(values[start:], weights, mode="valid")
+    out[start + period - 1:] = weighted / (period * (period + 1) / 2.0)
+    return out
+
+
+def rsi(values, period=14):
+    """Relative strength index with Wilder smoothing (TA-Lib RSI)."""
+    values = _as_float(values)
+    period = _check_period(period, minimum=2)
+    out = np.full(values.size, np.nan)
+    start = _first_finite(values)
+    if values.size - start <= period:
+        return out
+
+    change = np.diff(values[start:])
+    gains = np.maximum(change, 0.0)
+    losses = np.maximum(-change, 0.0)
+    alpha = 1.0 / period
+    avg_gain = _seeded_smooth(gains, period, alpha, offset=0)[period - 1:]
+    avg_loss = _seeded_smooth(losses, period, alpha, offset=0)[period - 1:]
+    total = avg_gain + avg_loss
+    with np.errstate(invalid="ignore", divide="ignore"):
+        strength = np.where(total != 0.0, 100.0 * avg_gain / total, 0.0)
+    out[start + period:] = strength
+    return out
+
+
+def true_range(high, low, close):
+    """True range; NaN on the first bar, which has no previous close (TA-Lib TRANGE)."""
+    high = _as_float(high)
+    low = _as_float(low)
+    close = _as_float(close)
+    out = np.full(high.size, np.nan)
+    if high.size < 2:
+        return out
+    previous = close[:-1]
+    out[1:] = np.maximum(
+        high[1:] - low[1:],
+        np.maximum(np.abs(high[1:] - previous), np.abs(low[1:] - previous)),
+    )
+    return out
+
+
+def atr(high, low, close, period=14):
+    """Average true range with Wilder smoothing (TA-Lib ATR)."""
+    period = _check_period(period)
+    ranges = true_range(high, low, close)
+    return _seeded_smooth(ranges, period, 1.0 / period, offset=1)
+
+
+def _rolling_moments(values, period):
+    """
+    Rolling mean and population variance of `period` values (length
+    n - period + 1).
+
+    Sums of squares are only accurate when taken close to the data: windows
+    are grouped in rows of max(period, _MOMENT_ROW) and each row's sums run
+    on values centered at the row's first bar, so cumulative sums stay within
+    a small multiple of a single window's.
+    """
+    count = values.size - period + 1
+    row = max(period, _MOMENT_ROW)
+    rows = -(-count // row)
+    width = row + period - 1
+    padded = np.empty((rows - 1) * row + width)
+    padded[:values.size] = values
+    padded[values.size:] = values[-1]
+    segments = np.lib.stride_tricks.sliding_window_view(padded, width)[::row]
+    reference = segments[:, :1]
+    centered = segments - reference
+
+    zeros = np.zeros((rows, 1))
+    sums = np.cumsum(np.hstack([zeros, centered]), axis=1)
+    squares = np.cumsum(np.hstack([zeros, centered * centered]), axis=1)
+    mean = (sums[:, period:] - sums[:, :-period]) / period
+    mean_sq = (squares[:, period:] - squares[:, :-period]) / period
+    variance = np.maximum(mean_sq - mean * mean, 0.0)
+    mean += reference
+    return mean.reshape(-1)[:count], variance.reshape(-1)[:count]
+
+
+def bollinger(values, period=20, deviations=2.0):
+    """
+    Bollinger bands around an SMA with population standard deviation
+    (TA-Lib BBANDS with nbdevup = nbdevdn = deviations, matype SMA).
+    Returns (upper, middle, lower).
+    """
+    values = _as_float(values)
+    period = _check_period(period)
+    middle = np.full(values.size, np.nan)
+    spread = np.full(values.size, np.nan)
+    start = _first_finite(values)
+    if values.size - start >= period:
+        if period == 1:
+            middle[start:] = values[start:]
+            spread[start:] = 0.0
+        else:
+            mean, variance = _rolling_moments(values[start:], period)
+            middle[start + period - 1:] = mean
+            spread[start + period - 1:] = deviations * np.sqrt(variance)
+    return middle + spread, middle, middle - spread
+
+
+def _rolling_extreme(values, period, reduce):
+    """
+    Rolling max/min in O(n) with the van Herk / Gil-Werman scheme: split the
+    series in blocks of `period`, take running extremes forward and backward
+    within each block; every window spans one block boundary, so its extreme
+    is reduce(backward[i], forward[i + period - 1]).
+    """
+    values = _as_float(values)
+    period = _check_period(period)
+    n = values.size
+    out = np.full(n, np.nan)
+    if n < period:
+        return out
+    blocks = -(-n // period)
+    fill = -np.inf if reduce is np.maximum else np.inf
+    padded = np.full(blocks * period, fill)
+    padded[:n] = values
+    grid = padded.reshape(blocks, period)
+    forward = reduce.accumulate(grid, axis=1).reshape(-1)
+    backward = reduce.accumulate(grid[:, ::-1], axis=1)[:, ::-1].reshape(-1)
+    out[period - 1:] = reduce(backward[: n - period + 1], forward[period - 1:n])
+    return out
+
+
+def rolling_max(values, period=30):
+    """Highest value over the last `period` bars (TA-Lib MAX)."""
+    return _rolling_extreme(values, period, np.maximum)
+
+
+def rolling_min(values, period=30):
+    """Lowest value over the last `period` bars (TA-Lib MIN)."""
+    return _rolling_extreme(values, period, np.minimum)
@@ -0,0 +1,261 @@
+"""
+Streaming tick-to-candle aggregation over numpy arrays.
+
+    from thelab import ticks
+    agg = ticks.TickAggregator("M1")
+    for chunk in ticks.read_jsonl("server/data/raw/cl1!-ticks.jsonl"):
+        bars = agg.update(chunk["time"], chunk["price"], chunk["volume"])  # finished bars only
+    rest = agg.flush()                      # open bar + bars rebuilt from late ticks
+    bars = ticks.merge([...all updates..., rest])
+
+    python -m thelab.ticks --asset cl1! --timeframes M1 M5 H1   # raw ticks -> column store
+
+Each chunk is bucketed with `resample.bucket_starts` and reduced with
+`np.maximum.reduceat` / `np.minimum.reduceat` / `np.add.reduceat`, so no
+per-bucket price list is ever built. Only the open (last) bucket is
+carried to the next chunk; every other bucket is final and returned
+right away, so memory is bounded by the chunk size plus the bars already
+emitted.
+
+Within a chunk ticks are sorted. Across chunks they are usually in time
+order, but the raw JSONL is appended download by download and a backfill
+of an earlier range lands after newer ticks. A tick older than the open
+bucket is therefore not dropped: late ticks are reduced into partial bars
+of their own (counted in `late`) and returned by `flush()`. Every bar
+carries the times of its first and last tick, and `merge` combines bars
+of the same bucket (open from the earliest tick, close from the latest),
+so the result matches sorting all ticks first, as the Node importer does.
+
+Prices and volumes follow the Node importer (`dukascopyService`): the
+mid of bid/ask when both are present, otherwise whichever side exists;
+volume is the ask volume, or the bid volume when the ask volume is 0 or
+missing.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from . import resample, store
+
+__all__ = ["TickAggregator", "aggregate_file", "merge", "read_jsonl", "tick_prices"]
+
+# `first` / `last` are the times of the first and last tick of each bar.
+_FIELDS = ("time", "open", "high", "low", "close", "volume", "first", "last")
+_TIMES = ("time", "first", "last")
+
+
+def _empty():
+    return {name: np.empty(0, np.int64 if name in _TIMES else np.float64) for name in _FIELDS}
+
+
+def _concat(parts):
+    if not parts:
+        return _empty()
+    return {name: np.concatenate([part[name] for part in parts]) for name in _FIELDS}
+
+
+def tick_prices(bid=None, ask=None, bid_volume=None, ask_volume=None):
+    """(price, volume) arrays from bid/ask columns; NaN marks a missing side."""
+    side = ask if ask is not None else bid
+    n = len(side)
+    bid = np.full(n, np.nan) if bid is None else np.asarray(bid, dtype=np.float64)
+    ask = np.full(n, np.nan) if ask is None else np.asarray(ask, dtype=np.float64)
+    has_bid, has_ask = np.isfinite(bid), np.isfinite(ask)
+    price = np.where(has_bid & has_ask, (bid + ask) / 2.0, np.where(has_ask, ask, bid))
+    ask_v = np.zeros(n) if ask_volume is None else np.nan_to_num(np.asarray(ask_volume, dtype=np.float64))
+    bid_v = np.zeros(n) if bid_volume is None else np.nan_to_num(np.asarray(bid_volume, dtype=np.float64))
+    return price, np.where(ask_v != 0, ask_v, bid_v)
+
+
+class TickAggregator:
+    """OHLCV bars of one timeframe built from tick chunks, carrying only the open bucket."""
+
+    def __init__(self, timeframe="M1", session=None):
+        self.timeframe = timeframe
+        self.session = session
+        self.late = 0
+        self.ticks = 0
+        self._open = None
+        self._late = []
+
+    def update(self, times, prices, volumes=None):
+        """Feed one chunk; returns the bars finished by it (possibly none)."""
+        times = np.asarray(times, dtype=np.int64)
+        prices = np.asarray(prices, dtype=np.float64)
+        volumes = np.zeros(times.size) if volumes is None else np.asarray(volumes, dtype=np.float64)
+        valid = np.isfinite(prices)
+        if not valid.all():
+            times, prices, volumes = times[valid], prices[valid], volumes[valid]
+        if times.size and np.any(times[1:] < times[:-1]):
+            order = np.argsort(times, kind="stable")
+            times, prices, volumes = times[order], prices[order], volumes[order]
+        starts = resample.bucket_starts(times, self.timeframe, self.session)
+        self.ticks += int(times.size)
+        if self._open is not None:
+            late = starts < self._open["time"][0]
+            if late.any():
+                self.late += int(late.sum())
+                self._late.append(_reduce(times[late], prices[late], volumes[late], starts[late]))
+                keep = ~late
+                times, prices, volumes, starts = times[keep], prices[keep], volumes[keep], starts[keep]
+        if not times.size:
+            return _empty()
+
+        bars = _reduce(times, prices, volumes, starts)
+        finished = []
+        if self._open is not None:
+            carry = self._open
+            if bars["time"][0] == carry["time"][0]:
+                if carry["first"][0] <= bars["first"][0]:
+                    bars["open"][0], bars["first"][0] = carry["open"][0], carry["first"][0]
+                if carry["last"][0] > bars["last"][0]:
+                    bars["close"][0], bars["last"][0] = carry["close"][0], carry["last"][0]
+                bars["high"][0] = max(bars["high"][0], carry["high"][0])
+                bars["low"][0] = min(bars["low"][0], carry["low"][0])
+                bars["volume"][0] += carry["volume"][0]
+            else:
+                finished.append(carry)
+        finished.append({name: values[:-1] for name, values in bars.items()})
+        self._open = {name: values[-1:].copy() for name, values in bars.items()}
+        return _concat(finished)
+
+    def flush(self):
+        """
+        The open bar plus the partial bars rebuilt from late ticks (merged
+        among themselves, not with bars `update` already returned: pass
+        everything to `merge`). The aggregator is reset.
+        """
+        carry, self._open = self._open, None
+        late, self._late = self._late, []
+        return merge(([carry] if carry is not None else []) + late)
+
+
+def _reduce(times, prices, volumes, starts):
+    """OHLCV (+ first/last tick time) of sorted ticks, one bar per run of equal bucket starts."""
+    first = np.flatnonzero(np.r_[True, starts[1:] != starts[:-1]])
+    last = np.r_[first[1:] - 1, times.size - 1]
+    return {
+        "time": starts[first],
+        "open": prices[first],
+        "high": np.maximum.reduceat(prices, first),
+        "low": np.minimum.reduceat(prices, first),
+        "close": prices[last],
+        "volume": np.add.reduceat(volumes, first),
+        "first": times[first],
+        "last": times[last],
+    }
+
+
+def merge(parts):
+    """
+    Bars from `parts` (lists of bar columns) as one time-sorted set with one
+    bar per bucket: bars sharing a bucket are combined, taking the open of
+    the one with the earliest first tick and the close of the one with the
+    latest last tick.
+    """
+    bars = _concat([part for part in parts if part["time"].size])
+    times = bars["time"]
+    if not times.size or np.all(times[1:] > times[:-1]):
+        return bars
+    order = np.lexsort((bars["first"], times))
+    bars = {name: values[order] for name, values in bars.items()}
+    times = bars["time"]
+    first = np.flatnonzero(np.r_[True, times[1:] != times[:-1]])
+    closing = np.lexsort((bars["last"], times))
+    last = closing[np.r_[first[1:] - 1, times.size - 1]]
+    return {
+        "time": times[first],
+        "open": bars["open"][first],
+        "high": np.maximum.reduceat(bars["high"], first),
+        "low": np.minimum.reduceat(bars["low"], first),
+        "close": bars["close"][last],
+        "volume": np.add.reduceat(bars["volume"], first),
+        "first": bars["first"][first],
+        "last": bars["last"][last],
+    }
+
+
+def read_jsonl(path, chunk_size=500_000):
+    """
+    Yield the raw tick file (`{"timestamp", "bid", "ask", "bidVolume",
+    "askVolume"}` per line) as chunks of {"time", "price", "volume"} arrays.
+    Each chunk is parsed with one `json.loads` call.
+    """
+    def parse(lines):
+        rows = json.loads("[" + ",".join(lines) + "]")
+        column = lambda key: np.array([np.nan if row.get(key) is None else row[key] for row in rows], dtype=np.float64)
+        price, volume = tick_prices(column("bid"), column("ask"), column("bidVolume"), column("askVolume"))
+        times = column("timestamp")
+        valid = np.isfinite(times)
+        return {"time": times[valid].astype(np.int64), "price": price[valid], "volume": volume[valid]}
+
+    lines = []
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            lines.append(line)
+            if len(lines) >= chunk_size:
+                yield parse(lines)
+                lines = []
+    if lines:
+        yield parse(lines)
+
+
+def aggregate_file(path, timeframes=("M1",), chunk_size=500_000, session=None):
+    """
+    Bars of every timeframe in `timeframes` from a raw tick JSONL file,
+    streaming it in `chunk_size` lines. Returns ({timeframe: columns}, stats).
+    """
+    aggregators = {str(code).upper(): TickAggregator(code, session) for code in timeframes}
+    parts = {code: [] for code in aggregators}
+    chunks = 0
+    for chunk in read_jsonl(path, chunk_size):
+        chunks += 1
+        for code, aggregator in aggregators.items():
+            parts[code].append(aggregator.update(chunk["time"], chunk["price"], chunk["volume"]))
+    bars = {}
+    for code, aggregator in aggregators.items():
+        parts[code].append(aggregator.flush())
+        bars[code] = merge(parts[code])
+    first = next(iter(aggregators.values()), None)
+    stats = {"chunks": chunks, "ticks": first.ticks if first else 0, "late": first.late if first else 0}
+    return bars, stats
+
+
+def main():
+    server_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--asset", required=True)
+    parser.add_argument("--ticks", default=None, help="raw tick JSONL (default: server/data/raw/<asset>-ticks.jsonl)")
+    parser.add_argument("--store", default=os.environ.get("THELAB_COLUMN_STORE_DIR")
+                        or os.path.join(server_dir, "data", "columns"))
+    parser.add_argument("--timeframes", nargs="+", default=["M1"])
+    parser.add_argument("--chunk", type=int, default=500_000, help="ticks per chunk")
+    parser.add_argument("--session", default=None, help="session for D1/W1/MN buckets, see thelab.resample")
+    args = parser.parse_args()
+    path = args.ticks or os.path.join(server_dir, "data", "raw", f"{args.asset.lower()}-ticks.jsonl")
+
+    started = time.perf_counter()
+    try:
+        bars, stats = aggregate_file(path, args.timeframes, max(1, args.chunk), args.session)
+    except (OSError, ValueError) as exc:
+        print(f"ticks: {exc}", file=sys.stderr)
+        sys.exit(1)
+    for code, columns in bars.items():
+        store.write_columns(args.store, args.asset, code, columns, source={"ticks": os.path.basename(path)})
+        print(f"{args.asset} {code}: {columns['time'].size} bars")
+    print(
+        f"{stats['ticks']} ticks in {stats['chunks']} chunks ({stats['late']} late) "
+        f"in {(time.perf_counter() - started) * 1000.0:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
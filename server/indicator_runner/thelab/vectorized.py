@@ -0,0 +1,213 @@
+"""
+Vectorized backtests from signal arrays.
+
+For strategies that reduce to entry/exit conditions, define `signals`
+instead of (or next to) `handle_data`:
+
+    def signals(inputs, params):
+        fast = ta.sma(inputs["close"], params.get("fast", 9))
+        slow = ta.sma(inputs["close"], params.get("slow", 21))
+        above = fast > slow
+        return {"entries": above & ~np.roll(above, 1), "exits": ~above & np.roll(above, 1)}
+
+Accepted keys: boolean arrays "entries" / "exits" (long) and
+"short_entries" / "short_exits", or a "target" array whose sign is the
+desired direction on each bar. Optional: "size" (scalar or per-bar array,
+read on the signal bar), "size_type" ("units", default, or "percent" of
+equity at entry, compounding), "fill" ("open": next bar's open, the
+default; "close": the signal bar's close) and "metadata".
+
+Signals are read on the bar's close. An entry opens (or reverses into) its
+side and re-firing while in position is a no-op; an exit only closes its own
+side. An entry and an exit of the same side on one bar resolve to the entry;
+opposite entries on one bar cancel out. Fills, slippage and fees follow
+`thelab.backtest` (market orders), so a strategy expressed both ways yields
+the same trades and equity.
+
+Everything is O(n) numpy: directions come from running maxima of signal
+indices, positions from segment lookups and cash from one cumulative sum.
+Only the trade list is built in Python, one dict per closed trade.
+"""
+
+import numpy as np
+
+from .backtest import _max_drawdown
+
+__all__ = ["run_signals"]
+
+
+def _signal(values, count, name):
+    if values is None:
+        return np.zeros(count, dtype=bool)
+    array = np.asarray(values).reshape(-1)
+    if array.size != count:
+        raise ValueError(f"{name!r} has {array.size} values, expected {count}")
+    if array.dtype.kind == "f":
+        return np.isfinite(array) & (array != 0.0)
+    return array.astype(bool)
+
+
+def _per_bar(values, count, name):
+    array = np.asarray(values, dtype=np.float64)
+    if array.ndim == 0:
+        return np.full(count, float(array))
+    array = array.reshape(-1)
+    if array.size != count:
+        raise ValueError(f"{name!r} has {array.size} values, expected {count}")
+    return array
+
+
+def _directions(entries, exits, short_entries, short_exits):
+    """Desired direction (-1, 0, 1) after each bar's close."""
+    count = entries.size
+    index = np.arange(count)
+    long_in = entries & ~short_entries
+    short_in = short_entries & ~entries
+
+    last_entry = np.maximum.accumulate(np.where(long_in | short_in, index, -1))
+    side = np.where(long_in, 1, -1).astype(np.int8)
+    current = np.where(last_entry >= 0, side[np.maximum(last_entry, 0)], 0).astype(np.int8)
+
+    long_exit = np.maximum.accumulate(np.where(exits & ~long_in, index, -1))
+    short_exit = np.maximum.accumulate(np.where(short_exits & ~short_in, index, -1))
+    exited = np.where(current > 0, long_exit, short_exit) > last_entry
+    current[exited] = 0
+    return current
+
+
+def run_signals(
+    inputs,
+    entries=None,
+    exits=None,
+    short_entries=None,
+    short_exits=None,
+    target=None,
+    size=1.0,
+    size_type="units",
+    fill="open",
+    cash=100000.0,
+    fee_bps=0.5,
+    slippage_bps=1.0,
+    trade_from=0,
+):
+    """
+    Backtest signal arrays over the columnar bars in `inputs`. Returns the
+    same dict as `thelab.backtest.run` (statistics, `trades` keyed by bar
+    index, per-bar `equity`, `stats`). The position is held flat before bar
+    `trade_from`; the direction wanted at that point is entered on it.
+    """
+    for name in ("open", "close"):
+        if name not in inputs:
+            raise ValueError(f"inputs must include a {name!r} column")
+    closes = np.asarray(inputs["close"], dtype=np.float64)
+    count = closes.size
+    if fill not in ("open", "close"):
+        raise ValueError(f"fill must be 'open' or 'close', got {fill!r}")
+    if size_type not in ("units", "percent"):
+        raise ValueError(f"size_type must be 'units' or 'percent', got {size_type!r}")
+    base = closes if fill == "close" else np.asarray(inputs["open"], dtype=np.float64)
+    fee_rate = float(fee_bps) / 1e4
+    slippage = float(slippage_bps) / 1e4
+    cash = float(cash)
+
+    if target is not None:
+        desired = np.sign(np.nan_to_num(_per_bar(target, count, "target"))).astype(np.int8)
+    else:
+        desired = _directions(
+            _signal(entries, count, "entries"),
+            _signal(exits, count, "exits"),
+            _signal(short_entries, count, "short_entries"),
+            _signal(short_exits, count, "short_exits"),
+        )
+
+    # Direction held after each bar's fills; with fill="open" a signal on
+    # bar i is traded at bar i + 1.
+    held = desired.copy() if fill == "close" else np.r_[np.int8(0), desired[:-1]]
+    held[: max(int(trade_from), 0)] = 0
+    previous = np.r_[np.int8(0), held[:-1]]
+    changes = np.flatnonzero(held != previous)
+
+    starts = changes[held[changes] != 0]
+    following = np.searchsorted(changes, starts, side="right")
+    closed = following < changes.size
+    ends = np.where(closed, changes[np.minimum(following, changes.size - 1)], count)
+    sides = held[starts].astype(np.float64)
+    entry_prices = base[starts] * (1.0 + slippage * sides)
+    exit_prices = np.where(closed, base[np.minimum(ends, count - 1)] * (1.0 - slippage * sides), np.nan)
+
+    signal_bars = starts if fill == "close" else starts - 1
+    sizes = np.abs(_per_bar(size, count, "size")[signal_bars])
+    if size_type == "percent":
+        # Equity before trade k is cash * prod(growth of trades < k); only
+        # an open last trade has no growth.
+        ratio = exit_prices / entry_prices
+        growth = 1.0 + sizes * (sides * (ratio - 1.0) - fee_rate * (1.0 + ratio))
+        before = cash * np.cumprod(np.r_[1.0, np.where(closed, growth, 1.0)[:-1]])
+        quantities = sizes * before / entry_prices
+    else:
+        quantities = sizes
+
+    segment = np.searchsorted(starts, np.arange(count), side="right") - 1
+    active = segment >= 0
+    active[active] = np.arange(count)[active] < ends[segment[active]]
+    position = np.zeros(count)
+    position[active] = (sides * quantities)[segment[active]]
+
+    deltas = position[changes] - np.r_[0.0, position[:-1]][changes]
+    fill_prices = base[changes] * (1.0 + slippage * np.sign(deltas))
+    flows = np.zeros(count)
+    flows[changes] = deltas * fill_prices + np.abs(deltas) * fill_prices * fee_rate
+    cash_path = cash - np.cumsum(flows)
+    equity = cash_path + position * closes
+
+    done = np.flatnonzero(closed)
+    qty = quantities[done]
+    entry_done = entry_prices[done]
+    exit_done = exit_prices[done]
+    profits = (exit_done - entry_done) * qty * sides[done] - (entry_done + exit_done) * qty * fee_rate
+    costs = entry_done * qty
+    percents = np.divide(profits, costs, out=np.zeros_like(profits), where=costs != 0.0)
+    trades = [
+        {
+            "id": f"TRD-{k}",
+            "entryIndex": entry_index,
+            "exitIndex": exit_index,
+            "entryPrice": entry_price,
+            "exitPrice": exit_price,
+            "direction": "long" if direction > 0 else "short",
+            "quantity": quantity,
+            "profit": profit,
+            "profitPercent": percent,
+        }
+        for k, (entry_index, exit_index, entry_price, exit_price, direction, quantity, profit, percent) in enumerate(
+            zip(
+                starts[done].tolist(),
+                ends[done].tolist(),
+                entry_done.tolist(),
+                exit_done.tolist(),
+                sides[done].tolist(),
+                qty.tolist(),
+                profits.tolist(),
+                percents.tolist(),
+            )
+        )
+    ]
+
+    wins = int(np.count_nonzero(profits > 0.0))
+    final_equity = float(equity[-1]) if count else cash
+    return {
+        "totalTrades": len(trades),
+        "winRate": wins / len(trades) if trades else 0.0,
+        "totalProfit": final_equity - cash,
+        "drawdown": _max_drawdown(equity),
+        "trades": trades,
+        "equity": equity,
+        "stats": {
+            "bars": count,
+            "fills": int(changes.size),
+            "workingOrders": 0,
+            "openPosition": float(position[-1]) if count else 0.0,
+            "finalEquity": final_equity,
+            "cash": float(cash_path[-1]) if count else cash,
+        },
+    }
@@ -0,0 +1,269 @@
+"""
+Walk-forward analysis for strategies.
+
+    walk_forward(script_path, inputs, {"fast": [5, 9, 13], "slow": [20, 40]},
+                 in_sample=20000, out_of_sample=5000, objective="sharpe", emit=print)
+
+The bars are cut into folds. In each fold the parameter space is swept
+over the in-sample bars [start, split) (same samplers and objectives as
+`thelab.optimize`), and the best parameters are then traded over the
+out-of-sample bars [split, stop). The out-of-sample run still sees the
+in-sample bars as warm-up (`trade_from` in `thelab.backtest`), so
+indicators are primed but nothing trades before `split`.
+
+Rolling folds move forward by `step` bars (default `out_of_sample`);
+anchored folds all start at bar 0. Out-of-sample windows never overlap, so
+their equity is stitched into one curve: each fold's P&L is added to the
+equity the previous fold ended with.
+
+Folds run in parallel on a `ProcessPoolExecutor` with the candles in shared
+memory (see `thelab.optimize`). Every worker keeps a
+`thelab.indicators.IndicatorCache` across the folds it runs: a sweep
+computes each (indicator, settings) once per fold and the out-of-sample run
+reuses the in-sample columns as a prefix. Anchored folds all start at bar 0,
+so causal columns are computed once per worker up to the last fold's end
+and every later fold is served as a prefix of them. Rolling folds each
+start at a different bar and indicators depend on where they start
+(warm-up, seeded recurrences), so they only reuse columns within a fold.
+
+Events handed to `emit`: "start", one "fold" per fold as it completes
+
+    {"type": "fold", "index": k, "start", "split", "stop", "params": {...}, "score": s,
+     "inSample": {...}, "outOfSample": {...}, "evaluations": n, "failed": f, "cache": {...}}
+
+(or with "error" when no parameter set could be scored), and "done" with
+the stitched out-of-sample metrics, `equity` / `equityIndex` (bar index of
+every stitched point) and the summed cache statistics.
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .backtest import _max_drawdown, run_strategy, strategy_mode
+from .indicators import IndicatorCache
+from .optimize import (
+    OBJECTIVES,
+    _attach,
+    _default_workers,
+    _drain,
+    _evaluate_with,
+    _metrics,
+    _periods_per_year,
+    _share,
+    _shutdown,
+    _stop_event,
+    load_strategy,
+    sample_space,
+)
+
+__all__ = ["make_folds", "walk_forward"]
+
+_worker = {}
+
+
+def make_folds(count, in_sample, out_of_sample, step=None, anchored=False):
+    """Fold boundaries as [{"index", "start", "split", "stop"}] over `count` bars."""
+    in_sample, out_of_sample = int(in_sample), int(out_of_sample)
+    step = int(step or out_of_sample)
+    if in_sample < 1 or out_of_sample < 1:
+        raise ValueError("in_sample and out_of_sample must be positive bar counts")
+    if step < out_of_sample:
+        raise ValueError("step must be >= out_of_sample so out-of-sample windows do not overlap")
+    folds = []
+    split = in_sample
+    while split + out_of_sample <= count:
+        start = 0 if anchored else split - in_sample
+        folds.append({"index": len(folds), "start": start, "split": split, "stop": split + out_of_sample})
+        split += step
+    if not folds:
+        raise ValueError(f"{count} bars are too few for one fold of {in_sample} + {out_of_sample} bars")
+    return folds
+
+
+def _run_fold(module, inputs, cache, fold, sweep, mode, costs, periods_per_year, horizon=None):
+    start, split, stop = fold["start"], fold["split"], fold["stop"]
+    space, sampler, samples, seed, objective = sweep
+    before = dict(cache.stats)
+    in_sample = {name: values[start:split] for name, values in inputs.items()}
+    total, combos = sample_space(space, sampler, samples, seed)
+    event = dict(fold, type="fold", evaluations=total, failed=0)
+    best = None
+    first_error = None
+
+    with cache.scope(horizon=max(stop, horizon or stop)):
+        for index, params in enumerate(combos):
+            result = _evaluate_with(module, in_sample, index, params, objective, mode, costs, periods_per_year)
+            if "error" in result:
+                event["failed"] += 1
+                first_error = first_error or result["error"]
+            elif result["score"] is not None and (best is None or result["score"] > best["score"]):
+                best = result
+        if best is not None:
+            try:
+                window = {name: values[start:stop] for name, values in inputs.items()}
+                traded = run_strategy(module, window, best["params"], mode=mode, trade_from=split - start, **costs)
+            except Exception as exc:
+                best, first_error = None, {"type": exc.__class__.__name__, "message": str(exc)}
+
+    event["cache"] = {key: cache.stats[key] - before.get(key, 0) for key in cache.stats}
+    if best is None:
+        event["error"] = first_error or {"type": "NoResult", "message": "no parameter set produced a score"}
+        return event
+
+    equity = traded["equity"][split - start:]
+    wins = sum(1 for trade in traded["trades"] if trade["profit"] > 0.0)
+    event.update(
+        params=best["params"],
+        score=best["score"],
+        inSample=best["metrics"],
+        outOfSample=_metrics(dict(traded, equity=equity), periods_per_year),
+        wins=wins,
+        equity=equity,
+    )
+    return event
+
+
+def _init_worker(block_name, layout, stop, script_path, workspace, indicators_workspace, sweep, mode, costs,
+                 periods_per_year, horizon):
+    block, inputs = _attach(block_name, layout, stop)
+    _worker.update(
+        block=block,
+        inputs=inputs,
+        cache=IndicatorCache(inputs, indicators_workspace),
+        module=load_strategy(script_path, workspace),
+        args=(sweep, mode, costs, periods_per_year, horizon),
+    )
+
+
+def _fold_task(fold):
+    return _run_fold(_worker["module"], _worker["inputs"], _worker["cache"], fold, *_worker["args"])
+
+
+def _stitch(folds, cash, periods_per_year):
+    pieces, index = [], []
+    carry = cash
+    trades = wins = 0
+    for fold in folds:
+        piece = fold["equity"] - cash + carry
+        pieces.append(piece)
+        index.append(np.arange(fold["split"], fold["stop"]))
+        carry = float(piece[-1])
+        trades += fold["outOfSample"]["totalTrades"]
+        wins += fold["wins"]
+    equity = np.concatenate(pieces) if pieces else np.empty(0)
+    stitched = {
+        "equity": equity,
+        "totalProfit": carry - cash,
+        "drawdown": _max_drawdown(equity),
+        "winRate": wins / trades if trades else 0.0,
+        "totalTrades": trades,
+    }
+    return _metrics(stitched, periods_per_year), equity, (np.concatenate(index) if index else np.empty(0, np.int64))
+
+
+def walk_forward(
+    script_path,
+    inputs,
+    space,
+    in_sample,
+    out_of_sample,
+    step=None,
+    anchored=False,
+    sampler="grid",
+    samples=None,
+    seed=None,
+    objective="totalProfit",
+    max_workers=None,
+    mode=None,
+    workspace=None,
+    indicators_workspace=None,
+    emit=None,
+    cancelled=None,
+    **costs,
+):
+    """
+    Run a walk-forward analysis of `script_path` and stream fold results to
+    `emit`. Workers and cancellation behave as in `thelab.optimize.optimize`.
+
+    Returns the "done" event: {"folds", "completed", "failed", "cancelled",
+    "outOfSample", "equity", "equityIndex", "cache", "workers", "totalMs"}.
+    """
+    started = time.time()
+    emit = emit or (lambda event: None)
+    cancelled = cancelled or (lambda: False)
+    if objective not in OBJECTIVES:
+        raise ValueError(f"unknown objective {objective!r}; expected one of {sorted(OBJECTIVES)}")
+    folds = make_folds(len(inputs["close"]), in_sample, out_of_sample, step, anchored)
+    evaluations, _ = sample_space(space, sampler, samples, seed)
+    sweep = (space, sampler, samples, seed, objective)
+    # Anchored folds share their first bar: precompute columns up to the last fold's end.
+    horizon = folds[-1]["stop"] if anchored else None
+
+    module = load_strategy(script_path, workspace)
+    if strategy_mode(module, mode) is None:
+        raise TypeError("strategy must define 'handle_data(context, data)' or 'signals(inputs, params)'")
+    periods_per_year = _periods_per_year(inputs)
+    cash = float(costs.get("cash", 100000.0))
+    limit = _default_workers()
+    workers = max(1, min(int(max_workers or limit), limit, len(folds)))
+    emit({"type": "start", "folds": len(folds), "evaluations": evaluations, "workers": workers, "objective": objective})
+
+    finished = {}
+    cache_stats = {}
+
+    def record(event):
+        finished[event["index"]] = event
+        for key, value in event["cache"].items():
+            cache_stats[key] = cache_stats.get(key, 0) + value
+        emit({key: value for key, value in event.items() if key not in ("equity", "wins")})
+
+    stopped = False
+    if workers == 1:
+        cache = IndicatorCache(inputs, indicators_workspace)
+        for fold in folds:
+            if cancelled():
+                stopped = True
+                break
+            record(_run_fold(module, inputs, cache, fold, sweep, mode, costs, periods_per_year, horizon))
+    else:
+        block, layout = _share(inputs)
+        stop = _stop_event()
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(block.name, layout, stop, script_path, workspace, indicators_workspace, sweep, mode, costs,
+                      periods_per_year, horizon),
+        )
+        try:
+            stopped = _drain(executor, _fold_task, iter(folds), workers, record, cancelled)
+        finally:
+            _shutdown(executor, block, stop, stopped)
+
+    # Stitch only the unbroken run of scored folds from the first one, so a
+    # cancelled or failed fold never leaves a silent gap in the curve.
+    stitched = []
+    for fold in folds:
+        event = finished.get(fold["index"])
+        if event is None or "error" in event:
+            break
+        stitched.append(event)
+    metrics, equity, equity_index = _stitch(stitched, cash, periods_per_year)
+
+    summary = {
+        "type": "done",
+        "folds": len(folds),
+        "completed": len(finished),
+        "failed": sum(1 for event in finished.values() if "error" in event),
+        "stitchedFolds": len(stitched),
+        "cancelled": stopped,
+        "outOfSample": metrics,
+        "equity": equity,
+        "equityIndex": equity_index,
+        "cache": cache_stats,
+        "workers": workers,
+        "totalMs": (time.time() - started) * 1000.0,
+    }
+    emit(summary)
+    return summary
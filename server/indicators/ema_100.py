@@ -1,29 +1,14 @@
 import numpy as np
 
+from thelab import ta
+
 try:
     import talib  # type: ignore
 except Exception:  # pragma: no cover - optional dependency
     talib = None
 
 
-def _ema_numpy(values: np.ndarray, period: int) -> np.ndarray:
-    if values.size == 0:
-        return values
-    alpha = 2.0 / (period + 1.0)
-    ema = np.empty_like(values, dtype=float)
-    ema[0] = float(values[0])
-    for i in range(1, values.size):
-        ema[i] = alpha * float(values[i]) + (1.0 - alpha) * ema[i - 1]
-    return ema
-
-
-def calculate(inputs, settings=None):
-    """
-    Calculate EMA 100 indicator using The Lab indicator API v1.
-
-    This implementation prefers TA-Lib when available, but gracefully falls back
-    to a NumPy-based EMA to avoid hard dependency issues.
-    """
+def _parse_settings(settings):
     settings = settings or {}
 
     raw_length = settings.get("length") if isinstance(settings, dict) else None
@@ -40,14 +25,74 @@ def calculate(inputs, settings=None):
     if source_key not in {"open", "high", "low", "close"}:
         source_key = "close"
 
-    close = np.asarray(inputs.get(source_key, inputs.get("close", [])), dtype=float)
+    return length, source_key
+
+
+def _source(inputs, source_key):
+    return np.asarray(inputs.get(source_key, inputs.get("close", [])), dtype=float)
+
+
+def _ema(values, length):
+    if talib is not None:
+        return talib.EMA(values, timeperiod=length)
+    return ta.ema(values, length)
+
+
+def calculate(inputs, settings=None):
+    """
+    Calculate EMA 100 indicator using The Lab indicator API v1.
+
+    This implementation prefers TA-Lib when available and otherwise uses the
+    bundled `thelab.ta` kernel, which matches TA-Lib's output.
+    """
+    length, source_key = _parse_settings(settings)
+    close = _source(inputs, source_key)
 
     if close.size == 0:
         return {"series": {"main": []}, "markers": [], "levels": []}
 
-    if talib is not None:
-        ema = talib.EMA(close, timeperiod=length)
-    else:
-        ema = _ema_numpy(close, period=length)
+    ema = _ema(close, length)
 
     return {"series": {"main": ema}, "markers": [], "levels": []}
+
+
+def calculate_incremental(state, inputs, settings=None):
+    """
+    Incremental EMA used by warm runner workers.
+
+    A fresh start (state=None) runs the same kernel as `calculate`; afterwards
+    each new bar only advances the recurrence, so appending a bar is O(1).
+    The state keeps the last EMA value and, until the SMA seed is complete,
+    the warm-up count and sum.
+    """
+    length, source_key = _parse_settings(settings)
+    values = _source(inputs, source_key)
+
+    if state is None:
+        ema = _ema(values, length) if values.size else values
+        seeded = ema.size > 0 and np.isfinite(ema[-1])
+        state = {
+            "ema": float(ema[-1]) if seeded else None,
+            "count": int(values.size),
+            "sum": float(values.sum()) if not seeded else 0.0,
+        }
+        return state, {"series": {"main": ema}, "markers": [], "levels": []}
+
+    alpha = 2.0 / (length + 1.0)
+    ema_value = state["ema"]
+    count = state["count"]
+    seed_sum = state["sum"]
+    out = np.empty(values.size, dtype=float)
+    for i, value in enumerate(values.tolist()):
+        count += 1
+        if ema_value is None:
+            # The EMA is seeded with the SMA of the first `length` bars.
+            seed_sum += value
+            if count == length:
+                ema_value = seed_sum / length
+        else:
+            ema_value = alpha * value + (1.0 - alpha) * ema_value
+        out[i] = np.nan if ema_value is None else ema_value
+
+    next_state = {"ema": ema_value, "count": count, "sum": seed_sum}
+    return next_state, {"series": {"main": out}, "markers": [], "levels": []}
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 def is_valid_high_break(open_price, close_price, high_price, level):
     if high_price < level:
         return False
@@ -19,3 +22,117 @@ def is_valid_low_break(open_price, close_price, low_price, level):
         return True
     return False
 
+
+def valid_high_break_mask(open_, close, high, level):
+    """Versao vetorizada de is_valid_high_break (mesma semantica, inclusive com NaN)."""
+    # max(open, close) do Python devolve close apenas se close > open.
+    cmax = np.where(close > open_, close, open_)
+    return ~(high < level) & ((cmax > level) | ((cmax == level) & (high > level)))
+
+
+def valid_low_break_mask(open_, close, low, level):
+    """Versao vetorizada de is_valid_low_break (mesma semantica, inclusive com NaN)."""
+    cmin = np.where(close < open_, close, open_)
+    return ~(low > level) & ((cmin < level) | ((cmin == level) & (low < level)))
+
+
+def _break_thresholds(body_edge, wick):
+    """
+    Reduz is_valid_high_break a um unico limiar por candle:
+    is_valid_high_break(open, close, high, level) <=> level < limiar.
+    (Lows usam a mesma formula sobre valores negados.)
+    """
+    thresholds = np.full(body_edge.shape, -np.inf)
+    body_ok = ~np.isnan(body_edge)
+    wick_ok = ~np.isnan(wick)
+
+    # Pavio NaN: so o corpo decide, de forma estrita.
+    mask = body_ok & ~wick_ok
+    thresholds[mask] = body_edge[mask]
+
+    # Corpo dentro do pavio: rompe abaixo do corpo, ou no corpo se o pavio passar dele.
+    mask = body_ok & wick_ok & (wick >= body_edge)
+    edge = body_edge[mask]
+    thresholds[mask] = np.where(wick[mask] > edge, np.nextafter(edge, np.inf), edge)
+
+    # Dados inconsistentes (pavio aquem do corpo): basta o pavio alcancar o nivel.
+    mask = body_ok & wick_ok & (wick < body_edge)
+    thresholds[mask] = np.nextafter(wick[mask], np.inf)
+    return thresholds
+
+
+def _max_pyramid(values):
+    """
+    Piramide de maximos por blocos alinhados de 2^k (padding com -inf ate
+    potencia de 2). Usa ~2x a memoria de `values`.
+    """
+    size = 1
+    while size < values.size:
+        size *= 2
+    base = np.full(size, -np.inf)
+    base[: values.size] = values
+    levels = [base]
+    while levels[-1].size > 1:
+        prev = levels[-1]
+        levels.append(np.maximum(prev[0::2], prev[1::2]))
+    return levels
+
+
+def _first_above(levels, n, starts, thresholds):
+    """
+    Para cada consulta q, primeiro j >= starts[q] com values[j] > thresholds[q]
+    (n quando nao existe). Todas as consultas andam juntas pela piramide:
+    O(len(starts) * log n) sem loop Python por candle.
+    """
+    top = len(levels) - 1
+    size = levels[0].size
+    pos = np.asarray(starts, dtype=np.int64).copy()
+    thresholds = np.asarray(thresholds, dtype=float)
+    pending = (pos < n) & ~np.isnan(thresholds)
+    # Nivel do bloco que contem a resposta (top + 1: ainda nao localizado).
+    stop = np.full(pos.shape, top + 1)
+
+    # Subida: pula blocos alinhados inteiros sem rompimento.
+    for k in range(top + 1):
+        check = pending & (stop > top) & (((pos >> k) & 1) == 1) & (pos < size)
+        block = levels[k][np.minimum(pos >> k, levels[k].size - 1)]
+        skip = check & (block <= thresholds)
+        pos = pos + (skip.astype(np.int64) << k)
+        stop[check & ~skip] = k
+
+    # Descida: dentro do bloco localizado, escolhe o filho esquerdo sempre que possivel.
+    for k in range(top, -1, -1):
+        check = pending & (k < stop) & (pos < size)
+        block = levels[k][np.minimum(pos >> k, levels[k].size - 1)]
+        skip = check & (block <= thresholds)
+        pos = pos + (skip.astype(np.int64) << k)
+
+    return np.where(pending & (pos < n), pos, n)
+
+
+class BreakIndex:
+    """
+    Indice pre-computado de "primeiro BOS valido em j >= i para o nivel p".
+    Equivalente a varrer is_valid_high_break/is_valid_low_break candle a
+    candle, mas cada consulta custa O(log n).
+    """
+
+    def __init__(self, open_, high, low, close):
+        open_ = np.asarray(open_, dtype=float)
+        high = np.asarray(high, dtype=float)
+        low = np.asarray(low, dtype=float)
+        close = np.asarray(close, dtype=float)
+        self.n = close.size
+        # max/min como no Python (max(a, b) devolve b apenas se b > a).
+        body_max = np.where(close > open_, close, open_)
+        body_min = np.where(close < open_, close, open_)
+        self._high_levels = _max_pyramid(_break_thresholds(body_max, high))
+        self._low_levels = _max_pyramid(_break_thresholds(-body_min, -low))
+
+    def first_high_breaks(self, starts, levels):
+        """Primeiro j >= start com is_valid_high_break(..., level); n se nenhum."""
+        return _first_above(self._high_levels, self.n, starts, levels)
+
+    def first_low_breaks(self, starts, levels):
+        """Primeiro j >= start com is_valid_low_break(..., level); n se nenhum."""
+        return _first_above(self._low_levels, self.n, starts, -np.asarray(levels, dtype=float))
@@ -1,6 +1,7 @@
 import numpy as np
 
-from .swings import detect_swings, extract_external_structure
+from .breaks import BreakIndex
+from .swings import detect_swing_array, extract_external_structure_array, swings_to_dicts
 from .structure import build_levels_and_markers, enrich_with_structure
 
 
@@ -18,10 +19,16 @@ def calculate(inputs):
             "levels": [],
         }
 
-    swings = detect_swings(high, low)
-    structural_swings = extract_external_structure(swings)
-    levels, markers, break_map = build_levels_and_markers(open_, high, low, close, structural_swings)
-    levels, markers = enrich_with_structure(structural_swings, levels, markers, open_, high, low, close, break_map)
+    swings = detect_swing_array(high, low)
+    structural_swings = swings_to_dicts(extract_external_structure_array(swings))
+    # Mesmo indice de rompimentos para BOS, origens e MSS.
+    break_index = BreakIndex(open_, high, low, close)
+    levels, markers, break_map = build_levels_and_markers(
+        open_, high, low, close, structural_swings, break_index=break_index
+    )
+    levels, markers = enrich_with_structure(
+        structural_swings, levels, markers, open_, high, low, close, break_map, break_index=break_index
+    )
 
     return {
         "series": {},
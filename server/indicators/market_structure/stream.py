@@ -0,0 +1,726 @@
+"""
+Versao incremental (barra a barra) do pipeline de market structure.
+
+MarketStructureState.update(bar) processa um candle por vez e devolve apenas
+os markers/levels novos, alterados ou removidos naquele candle; snapshot()
+reconstroi a saida completa, identica a core.calculate sobre os mesmos candles.
+
+Estado mantido entre candles:
+- os 3 ultimos candles para confirmar swings (o swing em i so e confirmado em i + 1);
+- a estrutura externa: swings finalizados + o candidato da sequencia aberta
+  (o unico swing que ainda pode ser substituido por um extremo mais novo);
+- heaps de swings ainda nao rompidos (cada swing entra e sai uma unica vez);
+- recordes de minimos/maximos finalizados para escolher origens de pernas;
+- janelas abertas de sweep (HSH/LSL), sweep do nivel protegido e busca de MSS.
+
+Custo amortizado por candle: O(log S) (heaps/bisect), sem reprocessar o historico.
+"""
+
+import heapq
+from bisect import bisect_left, bisect_right
+
+from .breaks import is_valid_high_break, is_valid_low_break
+from .structure import limit_levels
+
+HIGH = "swing-high"
+LOW = "swing-low"
+
+_PROTECTED_STYLE = {
+    "protected-low": {"shape": "arrowUp", "color": "#166534", "position": "belowBar", "size": 2},
+    "protected-high": {"shape": "arrowDown", "color": "#000000", "position": "aboveBar", "size": 2},
+}
+
+
+class _Swing:
+    __slots__ = ("pos", "index", "kind", "price", "alive", "break_index", "promoted", "event")
+
+    def __init__(self, pos, index, kind, price):
+        self.pos = pos
+        self.index = index
+        self.kind = kind
+        self.price = price
+        self.alive = True
+        self.break_index = None
+        self.promoted = False
+        self.event = None
+
+
+class _Event:
+    """BOS estrutural (swing rompido) com a origem da perna impulsiva."""
+
+    __slots__ = ("swing", "break_index", "origin", "via_candidate")
+
+    def __init__(self, swing, origin, via_candidate):
+        self.swing = swing
+        self.break_index = swing.break_index
+        self.origin = origin
+        self.via_candidate = via_candidate
+
+
+class _Segment:
+    """Eventos do segmento de tendencia atual, ordenados por posicao do swing."""
+
+    def __init__(self, side, start, events):
+        self.side = side
+        self.start = start
+        self.events = sorted(events, key=lambda e: e.swing.pos)
+        self.positions = [e.swing.pos for e in self.events]
+        self.best_all = None
+        self.best_promoted = None
+        for event in self.events:
+            self._consider(event)
+
+    def _key(self, event):
+        # Bullish: menor origem; bearish: maior origem. Empate: primeiro swing.
+        price = event.origin.price if self.side == "bull" else -event.origin.price
+        return (price, event.swing.pos)
+
+    def _consider(self, event):
+        if self.best_all is None or self._key(event) < self._key(self.best_all):
+            self.best_all = event
+        if event.swing.promoted and (
+            self.best_promoted is None or self._key(event) < self._key(self.best_promoted)
+        ):
+            self.best_promoted = event
+
+    def add(self, event):
+        """Insere mantendo a ordem por posicao; retorna o indice de insercao."""
+        at = bisect_left(self.positions, event.swing.pos)
+        self.events.insert(at, event)
+        self.positions.insert(at, event.swing.pos)
+        self._consider(event)
+        return at
+
+    def best(self):
+        return self.best_promoted or self.best_all
+
+
+class MarketStructureState:
+    """
+    Market structure em streaming (feeds M1 ao vivo, backtests barra a barra).
+
+    update(bar) recebe um mapping com open/high/low/close e retorna
+    {"markers": {id: marker | None}, "levels": {id: level | None}} apenas com o
+    que mudou (None = removido). Os ids sao estaveis entre candles.
+    """
+
+    def __init__(self):
+        self._open = []
+        self._high = []
+        self._low = []
+        self._close = []
+
+        # Estrutura externa; o ultimo swing e o candidato da sequencia aberta.
+        self._swings = []
+        self._swing_index = []
+        # Recordes (pos crescente) de swings finalizados: lows estritamente menores
+        # que todos os lows seguintes / highs estritamente maiores que os seguintes.
+        self._records = {HIGH: ([], []), LOW: ([], [])}
+        self._last_hsh_final = None
+        self._last_lsl_final = None
+
+        self._pending_highs = []
+        self._pending_lows = []
+        self._serial = 0
+
+        self._events = {"bull": [], "bear": []}
+        self._event_breaks = {"bull": [], "bear": []}
+        self._dependents = []  # eventos cuja origem e o candidato atual
+        self._events_version = 0
+        self._segment = None
+        self._segment_key = None
+        self._segment_seen = 0
+        self._msc_ids = set()
+
+        self._open_levels = set()  # posicoes com hsh/lsl-level ainda sem break
+        self._sweep_windows = {HIGH: None, LOW: None}
+        self._protected_sweep = None
+        self._mss_scan = None
+        self._derived = {}
+
+        self._markers = {}
+        self._levels = {}
+        self._changes = None
+
+    # ------------------------------------------------------------------ API
+
+    def update(self, bar):
+        self._changes = {"markers": {}, "levels": {}}
+        self._open.append(float(bar["open"]))
+        self._high.append(float(bar["high"]))
+        self._low.append(float(bar["low"]))
+        self._close.append(float(bar["close"]))
+
+        t = len(self._close) - 1
+        if t >= 2:
+            self._detect_swings(t - 1)
+        self._check_breaks(t)
+        for kind in (HIGH, LOW):
+            self._advance_sweep_window(kind)
+        self._refresh_derived()
+
+        changes, self._changes = self._changes, None
+        return changes
+
+    def snapshot(self):
+        """Saida completa, no mesmo formato/ordem de core.calculate."""
+        if len(self._close) < 3:
+            return {"series": {}, "markers": [], "levels": []}
+        markers = [item for _, item in sorted(self._markers.values(), key=lambda entry: entry[0])]
+        levels = [item for _, item in sorted(self._levels.values(), key=lambda entry: entry[0])]
+        return {"series": {}, "markers": markers, "levels": limit_levels(levels)}
+
+    # ------------------------------------------------------------ emissao
+
+    def _set(self, table, item_id, order, item):
+        current = table.get(item_id)
+        if item is None:
+            if current is None:
+                return
+            del table[item_id]
+        else:
+            if current is not None and current[1] == item:
+                return
+            table[item_id] = (order, item)
+        name = "markers" if table is self._markers else "levels"
+        self._changes[name][item_id] = item
+
+    def _set_marker(self, item_id, order, item):
+        self._set(self._markers, item_id, order, item)
+
+    def _set_level(self, item_id, order, item):
+        self._set(self._levels, item_id, order, item)
+
+    # ------------------------------------------------------------ swings
+
+    def _detect_swings(self, mid):
+        high, low = self._high, self._low
+        left, center, right = high[mid - 1], high[mid], high[mid + 1]
+        # Mesmo padrao de 3 candles de detect_swing_array (high antes do low).
+        if center >= left and center >= right and (center > left or center > right):
+            self._add_swing(HIGH, mid, center)
+        left, center, right = low[mid - 1], low[mid], low[mid + 1]
+        if center <= left and center <= right and (center < left or center < right):
+            self._add_swing(LOW, mid, center)
+
+    def _add_swing(self, kind, index, price):
+        last = self._swings[-1] if self._swings else None
+        if last is not None and last.kind == kind:
+            # Mesma sequencia: so o extremo (ultima ocorrencia) permanece.
+            if not (price >= last.price if kind == HIGH else price <= last.price):
+                return
+            pos = last.pos
+            self._retract_candidate(last)
+        else:
+            if last is not None:
+                self._finalize(last)
+            pos = len(self._swings)
+            self._swings.append(None)
+            self._swing_index.append(index)
+
+        swing = _Swing(pos, index, kind, price)
+        self._swings[pos] = swing
+        self._swing_index[pos] = index
+        best = self._last_hsh_final if kind == HIGH else self._last_lsl_final
+        swing.promoted = best is None or (price > best.price if kind == HIGH else price < best.price)
+
+        self._serial += 1
+        if kind == HIGH:
+            heapq.heappush(self._pending_highs, (price, self._serial, swing))
+        else:
+            heapq.heappush(self._pending_lows, (-price, self._serial, swing))
+
+        self._set_marker(f"swing:{pos}", (1, pos), {"index": index, "kind": kind, "value": price})
+        if swing.promoted:
+            label = "hsh" if kind == HIGH else "lsl"
+            self._set_marker(f"{label}:{pos}", (2, pos), {"index": index, "kind": label, "value": price})
+            self._open_levels.add(pos)
+        self._refresh_tail_levels()
+
+    def _finalize(self, swing):
+        records, positions = self._records[swing.kind]
+        if swing.kind == HIGH:
+            while records and records[-1].price <= swing.price:
+                records.pop()
+                positions.pop()
+            if swing.promoted:
+                self._last_hsh_final = swing
+        else:
+            while records and records[-1].price >= swing.price:
+                records.pop()
+                positions.pop()
+            if swing.promoted:
+                self._last_lsl_final = swing
+        records.append(swing)
+        positions.append(swing.pos)
+        # Swings futuros tem indice >= break de qualquer evento ja criado:
+        # origens que dependiam deste candidato ficam definitivas.
+        self._dependents = []
+
+    def _retract_candidate(self, swing):
+        swing.alive = False
+        pos = swing.pos
+        label = "hsh" if swing.kind == HIGH else "lsl"
+        self._set_marker(f"swing:{pos}", None, None)
+        self._set_marker(f"bos:{pos}", None, None)
+        self._set_marker(f"{label}:{pos}", None, None)
+        self._set_level(f"{label}-level:{pos}", None, None)
+        self._open_levels.discard(pos)
+        if swing.event is not None:
+            self._remove_event(swing.event)
+
+        # O novo candidato tem indice >= break desses eventos: sai da perna.
+        dependents, self._dependents = self._dependents, []
+        for event in dependents:
+            if event.origin is not swing or event.swing.event is not event:
+                continue
+            origin = self._origin(event.swing, include_candidate=False)
+            if origin is None:
+                self._remove_event(event)
+            else:
+                event.origin = origin
+                event.via_candidate = False
+                self._touch_segment(event)
+
+    # ------------------------------------------------------------ breaks
+
+    def _check_breaks(self, t):
+        op, hi, lo, cl = self._open[t], self._high[t], self._low[t], self._close[t]
+        broken = []
+        heap = self._pending_highs
+        while heap:
+            price, _, swing = heap[0]
+            if not swing.alive:
+                heapq.heappop(heap)
+                continue
+            # Rompimento e monotono no nivel: se o menor nao rompe, nenhum rompe.
+            if not is_valid_high_break(op, cl, hi, price):
+                break
+            heapq.heappop(heap)
+            broken.append(swing)
+        heap = self._pending_lows
+        while heap:
+            neg_price, _, swing = heap[0]
+            if not swing.alive:
+                heapq.heappop(heap)
+                continue
+            if not is_valid_low_break(op, cl, lo, -neg_price):
+                break
+            heapq.heappop(heap)
+            broken.append(swing)
+
+        for swing in sorted(broken, key=lambda s: s.pos):
+            swing.break_index = t
+            if swing.kind == HIGH:
+                marker = {"index": t, "kind": "bos-bullish", "value": hi}
+            else:
+                marker = {"index": t, "kind": "bos-bearish", "value": lo}
+            self._set_marker(f"bos:{swing.pos}", (0, swing.pos), marker)
+            self._refresh_level(swing.pos)
+            if swing.pos > 0:
+                self._refresh_level(swing.pos - 1)
+            self._add_event(swing)
+
+    def _origin(self, swing, include_candidate=True):
+        """
+        Extremo oposto (ultima ocorrencia) entre o swing e o break; sem swing
+        oposto interno, o swing anterior (a estrutura externa alterna tipos).
+        """
+        pos = swing.pos
+        opposite = LOW if swing.kind == HIGH else HIGH
+        records, positions = self._records[opposite]
+        # Primeiro recorde depois do swing = extremo dos finalizados na perna.
+        i = bisect_right(positions, pos)
+        base = records[i] if i < len(records) else None
+
+        candidate = self._swings[-1] if include_candidate else None
+        if candidate is not None and (candidate.kind == swing.kind or candidate.pos <= pos):
+            candidate = None
+
+        if candidate is not None and base is not None:
+            wins = candidate.price <= base.price if swing.kind == HIGH else candidate.price >= base.price
+            return candidate if wins else base
+        if candidate is not None:
+            return candidate
+        if base is not None:
+            return base
+        return self._swings[pos - 1] if pos > 0 else None
+
+    def _add_event(self, swing):
+        origin = self._origin(swing)
+        if origin is None:
+            return
+        event = _Event(swing, origin, origin is self._swings[-1])
+        swing.event = event
+        if event.via_candidate:
+            self._dependents.append(event)
+        side = "bull" if swing.kind == HIGH else "bear"
+        # Eventos nascem no candle do break: a lista segue ordenada por (break, pos).
+        self._events[side].append(event)
+        self._event_breaks[side].append(event.break_index)
+
+    def _remove_event(self, event):
+        side = "bull" if event.swing.kind == HIGH else "bear"
+        events = self._events[side]
+        # Eventos removidos sao do candidato (recentes): busca a partir do fim.
+        i = len(events) - 1
+        while events[i] is not event:
+            i -= 1
+        del events[i]
+        del self._event_breaks[side][i]
+        event.swing.event = None
+        if self._segment is not None and self._segment.side == side and i < self._segment_seen:
+            self._segment_seen -= 1
+        self._touch_segment(event)
+
+    def _touch_segment(self, event):
+        # So eventos do segmento atual forcam reconstruir o segmento.
+        segment = self._segment
+        side = "bull" if event.swing.kind == HIGH else "bear"
+        if segment is not None and segment.side == side and event.break_index >= segment.start:
+            self._events_version += 1
+
+    # ------------------------------------------------------------ levels HSH/LSL
+
+    def _level_to(self, pos):
+        # Mesmo lookup de break_map: em swings no mesmo candle vale o ultimo.
+        swing = self._swings[pos]
+        after = self._swings[pos + 1] if pos + 1 < len(self._swings) else None
+        owner = after if after is not None and after.index == swing.index else swing
+        return owner.break_index
+
+    def _refresh_level(self, pos):
+        swing = self._swings[pos]
+        if not swing.promoted:
+            return
+        to = self._level_to(pos)
+        if to is None:
+            self._open_levels.add(pos)
+            to = self._swings[-1].index
+        else:
+            self._open_levels.discard(pos)
+        label = "hsh" if swing.kind == HIGH else "lsl"
+        price = swing.price
+        refined = self._derived.get("refined")
+        if refined is not None and refined[0] is swing:
+            price = refined[1]
+        self._set_level(
+            f"{label}-level:{pos}",
+            (0, pos),
+            {"from": swing.index, "to": to, "price": price, "kind": f"{label}-level"},
+        )
+
+    def _refresh_tail_levels(self):
+        last = len(self._swings) - 1
+        for pos in sorted(self._open_levels | {p for p in (last - 1, last) if p >= 0}):
+            self._refresh_level(pos)
+
+    # ------------------------------------------------------------ janelas
+
+    def _current_extreme(self, kind):
+        candidate = self._swings[-1] if self._swings else None
+        if candidate is not None and candidate.kind == kind and candidate.promoted:
+            return candidate
+        return self._last_hsh_final if kind == HIGH else self._last_lsl_final
+
+    def _advance_sweep_window(self, kind):
+        """Sweeps de estrutura do HSH/LSL vigente (ver _refine_hsh_with_sweeps)."""
+        swing = self._current_extreme(kind)
+        window = self._sweep_windows[kind]
+        if swing is None:
+            self._sweep_windows[kind] = None
+            return
+        if window is None or window["swing"] is not swing:
+            self._serial += 1
+            window = {
+                "serial": self._serial,
+                "swing": swing,
+                "next": swing.index + 1,
+                "sweeps": [],
+                "best": None,
+                "closed": False,
+            }
+            self._sweep_windows[kind] = window
+
+        level = swing.price
+        n = len(self._close)
+        while not window["closed"] and window["next"] < n:
+            j = window["next"]
+            op, cl = self._open[j], self._close[j]
+            if kind == HIGH:
+                hi = self._high[j]
+                cmax = op if op > cl else cl
+                if hi > level and cmax < level:
+                    window["sweeps"].append((j, hi))
+                    if window["best"] is None or hi > window["best"]:
+                        window["best"] = hi
+                elif is_valid_high_break(op, cl, hi, level):
+                    window["closed"] = True
+            else:
+                lo = self._low[j]
+                cmin = op if op < cl else cl
+                if lo < level and cmin > level:
+                    window["sweeps"].append((j, lo))
+                    if window["best"] is None or lo < window["best"]:
+                        window["best"] = lo
+                elif is_valid_low_break(op, cl, lo, level):
+                    window["closed"] = True
+            window["next"] = j + 1
+
+    def _refine_protected(self, protected, last_break, side):
+        """Sweep do nivel protegido entre a origem e o ultimo BOS (cache incremental)."""
+        index, price = protected
+        n = len(self._close)
+        start = index + 1
+        if start >= n:
+            return protected
+        end = min(max(start, last_break + 1), n)
+
+        cache = self._protected_sweep
+        if cache is None or cache["key"] != (side, index, price) or cache["end"] > end:
+            cache = {"key": (side, index, price), "end": start, "best": None}
+            self._protected_sweep = cache
+        for j in range(cache["end"], end):
+            op, cl = self._open[j], self._close[j]
+            if side == "bull":
+                lo = self._low[j]
+                cmin = op if op < cl else cl
+                if lo < price and cmin > price and (cache["best"] is None or lo < cache["best"][1]):
+                    cache["best"] = (j, lo)
+            else:
+                hi = self._high[j]
+                cmax = op if op > cl else cl
+                if hi > price and cmax < price and (cache["best"] is None or hi > cache["best"][1]):
+                    cache["best"] = (j, hi)
+        cache["end"] = max(cache["end"], end)
+        return cache["best"] or protected
+
+    def _find_mss(self, protected, last_break, side):
+        """Primeiro rompimento valido do nivel protegido apos o ultimo BOS."""
+        index, price = protected
+        start = max(index + 1, last_break + 1)
+        scan = self._mss_scan
+        if scan is None or scan["key"] != (side, index, price, start):
+            scan = {"key": (side, index, price, start), "next": start, "found": None}
+            self._mss_scan = scan
+        n = len(self._close)
+        while scan["found"] is None and scan["next"] < n:
+            j = scan["next"]
+            if side == "bull":
+                hit = is_valid_low_break(self._open[j], self._close[j], self._low[j], price)
+            else:
+                hit = is_valid_high_break(self._open[j], self._close[j], self._high[j], price)
+            if hit:
+                scan["found"] = j
+            scan["next"] = j + 1
+        return scan["found"]
+
+    def _last_swing_until(self, bar, kind):
+        pos = bisect_right(self._swing_index, bar) - 1
+        while pos >= 0 and self._swings[pos].kind != kind:
+            pos -= 1
+        return self._swings[pos] if pos >= 0 else None
+
+    # ------------------------------------------------------------ derivados
+
+    def _refresh_segment(self, trend, last_bull, last_bear):
+        if trend == "bullish":
+            side, start = "bull", last_bear.break_index + 1 if last_bear else 0
+        elif trend == "bearish":
+            side, start = "bear", last_bull.break_index + 1 if last_bull else 0
+        else:
+            side = start = None
+
+        key = (side, start, self._events_version)
+        if self._segment_key != key:
+            if side is None:
+                self._segment = None
+            else:
+                first = bisect_left(self._event_breaks[side], start)
+                self._segment = _Segment(side, start, self._events[side][first:])
+                self._segment_seen = len(self._events[side])
+            self._segment_key = key
+            self._refresh_msc()
+            return self._segment
+
+        if side is not None:
+            events = self._events[side]
+            for event in events[self._segment_seen :]:
+                previous_first = self._segment.events[0] if self._segment.events else None
+                # O primeiro BOS do segmento estabelece a estrutura; os demais sao MSC.
+                if self._segment.add(event) == 0:
+                    if previous_first is not None:
+                        self._emit_msc(previous_first)
+                else:
+                    self._emit_msc(event)
+            self._segment_seen = len(events)
+        return self._segment
+
+    def _refresh_msc(self):
+        segment = self._segment
+        wanted = {e.swing.pos: e for e in segment.events[1:]} if segment is not None else {}
+        for pos in self._msc_ids - wanted.keys():
+            self._set_marker(f"msc:{pos}", None, None)
+            self._set_level(f"msc-leg:{pos}", None, None)
+        self._msc_ids = set()
+        for event in wanted.values():
+            self._emit_msc(event)
+
+    def _emit_msc(self, event):
+        pos, j = event.swing.pos, event.break_index
+        if event.swing.kind == HIGH:
+            marker = {
+                "index": j,
+                "kind": "msc-bullish",
+                "value": self._high[j],
+                "shape": "arrowUp",
+                "color": "#22c55e",
+                "position": "belowBar",
+            }
+        else:
+            marker = {
+                "index": j,
+                "kind": "msc-bearish",
+                "value": self._low[j],
+                "shape": "arrowDown",
+                "color": "#ef4444",
+                "position": "aboveBar",
+            }
+        self._set_marker(f"msc:{pos}", (4, pos), marker)
+        self._set_level(
+            f"msc-leg:{pos}",
+            (4, pos),
+            {"from": event.origin.index, "to": j, "price": event.origin.price, "kind": "msc-leg"},
+        )
+        self._msc_ids.add(pos)
+
+    def _refresh_derived(self):
+        if not self._swings:
+            return
+        last_to = self._swings[-1].index
+        bull, bear = self._events["bull"], self._events["bear"]
+        last_bull = bull[-1] if bull else None
+        last_bear = bear[-1] if bear else None
+
+        trend = None
+        if last_bull and (not last_bear or last_bull.break_index >= last_bear.break_index):
+            trend = "bullish"
+        elif last_bear:
+            trend = "bearish"
+
+        segment = self._refresh_segment(trend, last_bull, last_bear)
+
+        protected_low = protected_high = None
+        best = segment.best() if segment is not None and segment.events else None
+        if best is not None:
+            origin = (best.origin.index, best.origin.price)
+            if segment.side == "bull":
+                protected_low = origin
+            else:
+                protected_high = origin
+        elif trend == "bullish":
+            protected_low = (last_bull.origin.index, last_bull.origin.price)
+        elif trend == "bearish":
+            protected_high = (last_bear.origin.index, last_bear.origin.price)
+
+        if protected_low is not None:
+            protected_low = self._refine_protected(protected_low, last_bull.break_index, "bull")
+        if protected_high is not None:
+            protected_high = self._refine_protected(protected_high, last_bear.break_index, "bear")
+
+        # Sweeps de HSH (tendencia de alta) ou LSL (tendencia de baixa).
+        refined = None
+        sweeps, sweep_kind, sweep_serial = [], None, None
+        if trend in ("bullish", "bearish"):
+            kind = HIGH if trend == "bullish" else LOW
+            window = self._sweep_windows[kind]
+            if window is not None:
+                sweeps, sweep_serial = window["sweeps"], window["serial"]
+                sweep_kind = "hsh-sweep" if kind == HIGH else "lsl-sweep"
+                if window["best"] is not None:
+                    refined = (window["swing"], window["best"])
+        previous = self._derived.get("refined")
+        self._derived["refined"] = refined
+        if previous != refined:
+            for extreme in {item[0] for item in (previous, refined) if item is not None}:
+                if extreme.alive:
+                    self._refresh_level(extreme.pos)
+
+        sweep_state = (sweep_kind, sweep_serial, len(sweeps), last_to)
+        if self._derived.get("sweep_state") != sweep_state:
+            for item_id in self._derived.get("sweep_ids", ()):
+                self._set_level(item_id, None, None)
+            ids = []
+            for j, price in sweeps:
+                item_id = f"{sweep_kind}:{j}"
+                order = (1 if sweep_kind == "hsh-sweep" else 2, j)
+                self._set_level(item_id, order, {"from": j, "to": last_to, "price": price, "kind": sweep_kind})
+                ids.append(item_id)
+            self._derived["sweep_ids"] = ids
+            self._derived["sweep_state"] = sweep_state
+
+        # MSS: quebra valida do nivel protegido vigente.
+        mss = None
+        if protected_low is not None and last_bull is not None:
+            j = self._find_mss(protected_low, last_bull.break_index, "bull")
+            if j is not None:
+                mss = ("bull", j, self._last_swing_until(j, HIGH))
+        elif protected_high is not None and last_bear is not None:
+            j = self._find_mss(protected_high, last_bear.break_index, "bear")
+            if j is not None:
+                mss = ("bear", j, self._last_swing_until(j, LOW))
+        else:
+            self._mss_scan = None
+
+        emit_state = (last_to, protected_low, protected_high, mss)
+        if self._derived.get("emit_state") != emit_state:
+            self._derived["emit_state"] = emit_state
+            self._emit_protected(last_to, protected_low, protected_high, mss)
+
+    def _emit_protected(self, last_to, protected_low, protected_high, mss):
+        for kind, protected, order in (
+            ("protected-low", protected_low, (3, 0)),
+            ("protected-high", protected_high, (3, 1)),
+        ):
+            if protected is None:
+                self._set_marker(kind, None, None)
+                self._set_level(kind, None, None)
+                continue
+            index, price = protected
+            self._set_marker(kind, order, {"index": index, "kind": kind, "value": price, **_PROTECTED_STYLE[kind]})
+            self._set_level(kind, order, {"from": index, "to": last_to, "price": price, "kind": kind})
+
+        if mss is None:
+            for item_id in ("mss", "mss-cut", "mss-protected"):
+                self._set_marker(item_id, None, None)
+                self._set_level(item_id, None, None)
+            return
+
+        side, j, swing = mss
+        if side == "bull":
+            # Contexto bullish -> MSS bearish ao perder o Protected Low.
+            cut_kind, new_kind = "protected-low", "protected-high"
+            index, price = protected_low
+            marker = {"index": j, "kind": "mss-bearish", "value": self._low[j]}
+        else:
+            cut_kind, new_kind = "protected-high", "protected-low"
+            index, price = protected_high
+            marker = {"index": j, "kind": "mss-bullish", "value": self._high[j]}
+        self._set_marker("mss", (5, 0), marker)
+        # Versao "truncada" do nivel protegido ate a vela do MSS.
+        self._set_level("mss-cut", (5, 0), {"from": index, "to": j, "price": price, "kind": cut_kind})
+        if swing is None:
+            self._set_marker("mss-protected", None, None)
+            self._set_level("mss-protected", None, None)
+            return
+        # Novo nivel protegido: ultimo swing oposto antes do MSS.
+        self._set_marker(
+            "mss-protected",
+            (6, 0),
+            {"index": swing.index, "kind": new_kind, "value": swing.price, **_PROTECTED_STYLE[new_kind]},
+        )
+        self._set_level(
+            "mss-protected",
+            (6, 0),
+            {"from": swing.index, "to": last_to, "price": swing.price, "kind": new_kind},
+        )
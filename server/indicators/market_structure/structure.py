@@ -1,10 +1,59 @@
-from .breaks import is_valid_high_break, is_valid_low_break
+import numpy as np
+
+from .breaks import BreakIndex, valid_high_break_mask, valid_low_break_mask
 
 # Limite apenas para niveis auxiliares (HSH/LSL, BOS etc.).
 # Protected High/Low mantem historico completo.
 MAX_LEVELS_PER_KIND = 24
 
 
+# Tamanho do primeiro bloco na busca de sweeps de estrutura (dobra a cada bloco).
+SWEEP_SCAN_CHUNK = 256
+
+
+def _window(values, start, end):
+    return np.asarray(values[start:end], dtype=float)
+
+
+def _structure_sweeps(level, start_idx, open_, wick, close, above):
+    """
+    Sweeps de estrutura de `level` a partir de start_idx, ate o primeiro BOS
+    valido (exclusivo). Varre em blocos crescentes com mascaras numpy, para
+    parar cedo sem pagar um loop Python por candle.
+    Retorna (indices, precos) dos sweeps.
+    """
+    n = len(close)
+    indices, prices = [], []
+    pos, chunk = start_idx, SWEEP_SCAN_CHUNK
+    while pos < n:
+        end = min(n, pos + chunk)
+        op, cl, wk = _window(open_, pos, end), _window(close, pos, end), _window(wick, pos, end)
+        if above:
+            # Pavio acima do nivel, corpo abaixo.
+            body = np.where(op > cl, op, cl)
+            sweep = (wk > level) & (body < level)
+            stop = ~sweep & valid_high_break_mask(op, cl, wk, level)
+        else:
+            body = np.where(op < cl, op, cl)
+            sweep = (wk < level) & (body > level)
+            stop = ~sweep & valid_low_break_mask(op, cl, wk, level)
+
+        broken = stop.any()
+        if broken:
+            limit = int(np.argmax(stop))
+            sweep = sweep[:limit]
+        hits = np.flatnonzero(sweep)
+        indices.append(hits + pos)
+        prices.append(wk[hits])
+        if broken:
+            break
+        pos, chunk = end, chunk * 2
+
+    if not indices:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=float)
+    return np.concatenate(indices), np.concatenate(prices)
+
+
 def _refine_hsh_with_sweeps(last_hsh, open_, high, close):
     """
     Refina o HSH (Higher Swing High) com base em sweeps de estrutura:
@@ -25,29 +74,15 @@ def _refine_hsh_with_sweeps(last_hsh, open_, high, close):
     if n == 0 or start_idx >= n:
         return last_hsh, []
 
-    best_sweep_price = None
-    sweeps = []
-
-    for j in range(start_idx, n):
-        hi = float(high[j])
-        op = float(open_[j])
-        cl = float(close[j])
-        cmax = op if op > cl else cl
-        # Sweep de estrutura acima do HSH: pavio acima, corpo abaixo.
-        if hi > level and cmax < level:
-            sweeps.append({"index": int(j), "price": float(hi)})
-            if best_sweep_price is None or hi > best_sweep_price:
-                best_sweep_price = hi
-        # BOS valido acima do HSH original: apos isso, nao consideramos mais sweeps.
-        elif is_valid_high_break(op, cl, hi, level):
-            break
-
-    if best_sweep_price is None:
+    # BOS valido acima do HSH original encerra a busca de sweeps.
+    indices, prices = _structure_sweeps(level, start_idx, open_, high, close, above=True)
+    sweeps = [{"index": j, "price": price} for j, price in zip(indices.tolist(), prices.tolist())]
+    if not sweeps:
         return last_hsh, sweeps
 
     updated_hsh = {
         "index": int(last_hsh["index"]),
-        "price": float(best_sweep_price),
+        "price": float(prices.max()),
     }
     return updated_hsh, sweeps
 
@@ -72,29 +107,15 @@ def _refine_lsl_with_sweeps(last_lsl, open_, low, close):
     if n == 0 or start_idx >= n:
         return last_lsl, []
 
-    best_sweep_price = None
-    sweeps = []
-
-    for j in range(start_idx, n):
-        lo = float(low[j])
-        op = float(open_[j])
-        cl = float(close[j])
-        cmin = op if op < cl else cl
-        # Sweep de estrutura abaixo do LSL: pavio abaixo, corpo acima.
-        if lo < level and cmin > level:
-            sweeps.append({"index": int(j), "price": float(lo)})
-            if best_sweep_price is None or lo < best_sweep_price:
-                best_sweep_price = lo
-        # BOS valido abaixo do LSL original: apos isso, nao consideramos mais sweeps.
-        elif is_valid_low_break(op, cl, lo, level):
-            break
-
-    if best_sweep_price is None:
+    # BOS valido abaixo do LSL original encerra a busca de sweeps.
+    indices, prices = _structure_sweeps(level, start_idx, open_, low, close, above=False)
+    sweeps = [{"index": j, "price": price} for j, price in zip(indices.tolist(), prices.tolist())]
+    if not sweeps:
         return last_lsl, sweeps
 
     updated_lsl = {
         "index": int(last_lsl["index"]),
-        "price": float(best_sweep_price),
+        "price": float(prices.min()),
     }
     return updated_lsl, sweeps
 
@@ -120,26 +141,18 @@ def _refine_protected_low_with_sweeps(protected_low, last_bull_break, open_, low
 
     end_idx = min(max(start_idx, end_idx), n)
 
-    best_sweep_index = None
-    best_sweep_price = None
-
-    for j in range(start_idx, end_idx):
-        lo = float(low[j])
-        op = float(open_[j])
-        cl = float(close[j])
-        cmin = op if op < cl else cl
-        # Sweep de Protected Low: low < L e corpo acima de L.
-        if lo < level and cmin > level:
-            if best_sweep_price is None or lo < best_sweep_price:
-                best_sweep_price = lo
-                best_sweep_index = j
-
-    if best_sweep_index is None:
+    lo = _window(low, start_idx, end_idx)
+    op, cl = _window(open_, start_idx, end_idx), _window(close, start_idx, end_idx)
+    # Sweep de Protected Low: low < L e corpo acima de L.
+    sweep = (lo < level) & (np.where(op < cl, op, cl) > level)
+    if not sweep.any():
         return protected_low
 
+    # argmin devolve a primeira ocorrencia do menor low, como o loop original.
+    best = int(np.argmin(np.where(sweep, lo, np.inf)))
     return {
-        "index": int(best_sweep_index),
-        "price": float(best_sweep_price),
+        "index": start_idx + best,
+        "price": float(lo[best]),
     }
 
 
@@ -163,66 +176,69 @@ def _refine_protected_high_with_sweeps(protected_high, last_bear_break, open_, h
 
     end_idx = min(max(start_idx, end_idx), n)
 
-    best_sweep_index = None
-    best_sweep_price = None
-
-    for j in range(start_idx, end_idx):
-        hi = float(high[j])
-        op = float(open_[j])
-        cl = float(close[j])
-        cmax = op if op > cl else cl
-        # Sweep de Protected High: high > H e corpo abaixo de H.
-        if hi > level and cmax < level:
-            if best_sweep_price is None or hi > best_sweep_price:
-                best_sweep_price = hi
-                best_sweep_index = j
-
-    if best_sweep_index is None:
+    hi = _window(high, start_idx, end_idx)
+    op, cl = _window(open_, start_idx, end_idx), _window(close, start_idx, end_idx)
+    # Sweep de Protected High: high > H e corpo abaixo de H.
+    sweep = (hi > level) & (np.where(op > cl, op, cl) < level)
+    if not sweep.any():
         return protected_high
 
+    best = int(np.argmax(np.where(sweep, hi, -np.inf)))
     return {
-        "index": int(best_sweep_index),
-        "price": float(best_sweep_price),
+        "index": start_idx + best,
+        "price": float(hi[best]),
     }
 
 
-def build_levels_and_markers(open_, high, low, close, swings):
+def _first_breaks(swings, n, break_index):
+    """
+    Primeiro BOS valido de cada swing (n quando nao rompe), consultando
+    BreakIndex em lote em vez de varrer candle a candle.
+    """
+    starts = np.array([int(s["index"]) + 1 for s in swings], dtype=np.int64)
+    prices = np.array([float(s["price"]) for s in swings], dtype=float)
+    is_high = np.array([s["kind"] == "swing-high" for s in swings], dtype=bool)
+
+    found = np.full(len(swings), n, dtype=np.int64)
+    if is_high.any():
+        found[is_high] = break_index.first_high_breaks(starts[is_high], prices[is_high])
+    if (~is_high).any():
+        found[~is_high] = break_index.first_low_breaks(starts[~is_high], prices[~is_high])
+    return found
+
+
+def build_levels_and_markers(open_, high, low, close, swings, break_index=None):
     """
     Marca swings (swing-high / swing-low) e BOS (break of swing).
     Retorna tambem um mapa de break por swing:
-      { swing_index -> break_index ou None }.
+      { (swing_index, kind) -> break_index ou None }.
+    `break_index` (BreakIndex) pode ser reaproveitado entre chamadas.
     """
     n = len(close)
     levels = []
     markers = []
     break_map = {}
 
-    for swing in swings:
+    if swings:
+        if break_index is None:
+            break_index = BreakIndex(open_, high, low, close)
+        first_breaks = [j if j < n else None for j in _first_breaks(swings, n, break_index).tolist()]
+    else:
+        first_breaks = []
+
+    for swing, j in zip(swings, first_breaks):
         idx = swing["index"]
-        price = swing["price"]
-        kind = swing["kind"]
         if idx >= n:
-            break_map[idx] = None
+            break_map[(idx, swing["kind"])] = None
             continue
 
-        break_index = None
-
-        if kind == "swing-high":
-            bos_kind = "bos-bullish"
-            for j in range(idx + 1, n):
-                if is_valid_high_break(open_[j], close[j], high[j], price):
-                    break_index = j
-                    markers.append({"index": int(j), "kind": bos_kind, "value": float(high[j])})
-                    break
-        else:
-            bos_kind = "bos-bearish"
-            for j in range(idx + 1, n):
-                if is_valid_low_break(open_[j], close[j], low[j], price):
-                    break_index = j
-                    markers.append({"index": int(j), "kind": bos_kind, "value": float(low[j])})
-                    break
+        if j is not None:
+            if swing["kind"] == "swing-high":
+                markers.append({"index": int(j), "kind": "bos-bullish", "value": float(high[j])})
+            else:
+                markers.append({"index": int(j), "kind": "bos-bearish", "value": float(low[j])})
 
-        break_map[idx] = break_index
+        break_map[(idx, swing["kind"])] = j
 
     for swing in swings:
         markers.append(
@@ -236,13 +252,83 @@ def build_levels_and_markers(open_, high, low, close, swings):
     return levels, markers, break_map
 
 
-def enrich_with_structure(swings, levels, markers, open_, high, low, close, break_map):
+def _argextreme_table(values):
+    """
+    Sparse table de argmin sobre `values`: table[k, i] e a posicao do menor
+    valor em [i, i + 2^k), preferindo a ultima ocorrencia em empates.
+    """
+    size = values.size
+    table = [np.arange(size, dtype=np.int64)]
+    width = 1
+    while width * 2 <= size:
+        prev = table[-1]
+        left, right = prev[: size - width], prev[width:]
+        # Padding no fim so para manter as linhas retangulares (nunca consultado).
+        table.append(np.r_[np.where(values[right] <= values[left], right, left), prev[size - width :]])
+        width *= 2
+    return np.vstack(table)
+
+
+def _range_argextreme(values, table, lo, hi):
+    """Posicao do menor valor em cada faixa [lo, hi) (faixas nao vazias)."""
+    k = np.log2(hi - lo).astype(np.int64)
+    left = table[k, lo]
+    right = table[k, hi - (1 << k)]
+    return np.where(values[right] <= values[left], right, left)
+
+
+def _previous_of_kind(mask):
+    """prev[p] = ultima posicao q < p com mask[q] (ou -1); tamanho len(mask) + 1."""
+    positions = np.where(mask, np.arange(mask.size), -1)
+    return np.r_[-1, np.maximum.accumulate(positions)] if mask.size else np.array([-1])
+
+
+def _origins(bar_index, kinds, prices, breaks, n, kind):
+    """
+    Origem da perna impulsiva de cada swing `kind` rompido: o extremo oposto
+    (low mais baixo / high mais alto, ultima ocorrencia) entre o swing e a
+    candle de break; sem swing oposto interno, o ultimo swing oposto anterior.
+    Retorna {posicao_do_swing: posicao_da_origem}.
+    """
+    # Lows: menor preco; highs: maior preco (negado para reaproveitar o argmin).
+    if kind == "swing-high":
+        opposite, sign = kinds == "swing-low", 1.0
+    else:
+        opposite, sign = kinds == "swing-high", -1.0
+    values = np.where(opposite, sign * prices, np.inf)
+    opposite_count = np.r_[0, np.cumsum(opposite)]
+    previous = _previous_of_kind(opposite)
+
+    positions = np.flatnonzero((breaks < n) & (kinds == kind))
+    if positions.size == 0:
+        return {}
+    break_at = breaks[positions]
+    lo = positions + 1
+    hi = np.maximum(np.searchsorted(bar_index, break_at, side="left"), lo)
+    inside = opposite_count[hi] - opposite_count[lo] > 0
+
+    origin = previous[positions]
+    if inside.any():
+        table = _argextreme_table(values)
+        origin[inside] = _range_argextreme(values, table, lo[inside], hi[inside])
+    return {p: o for p, o in zip(positions.tolist(), origin.tolist()) if o >= 0}
+
+
+def _last_swing_until(bar_index, kinds, bar, kind):
+    """Posicao do ultimo swing `kind` com indice <= bar (None se nao houver)."""
+    matches = np.flatnonzero(kinds[: np.searchsorted(bar_index, bar, side="right")] == kind)
+    return int(matches[-1]) if matches.size else None
+
+
+def enrich_with_structure(swings, levels, markers, open_, high, low, close, break_map, break_index=None):
     """
     Estrutura externa simplificada:
     - HSH / LSL
     - Protected Low / Protected High
 
     A tendencia e o nivel protegido sao derivados do BOS estrutural mais recente.
+    `swings` deve estar ordenado por indice; `break_index` (BreakIndex) pode
+    ser o mesmo usado em build_levels_and_markers.
     """
     if not swings:
         return levels, markers
@@ -251,6 +337,9 @@ def enrich_with_structure(swings, levels, markers, open_, high, low, close, brea
     if n == 0:
         return levels, markers
 
+    if break_index is None:
+        break_index = BreakIndex(open_, high, low, close)
+
     structural_levels = []
     structural_markers = []
 
@@ -267,10 +356,25 @@ def enrich_with_structure(swings, levels, markers, open_, high, low, close, brea
     last_bull_break = None
     last_bear_break = None
 
+    # Breaks e origens de todos os swings resolvidos em lote (O(S log S));
+    # o loop abaixo so percorre os swings uma vez, em ordem.
+    bar_index = np.array([int(s["index"]) for s in swings], dtype=np.int64)
+    prices = np.array([float(s["price"]) for s in swings], dtype=float)
+    kinds = np.array([s["kind"] for s in swings])
+    # Breaks ja resolvidos em build_levels_and_markers; `to` dos niveis usa o
+    # break do ultimo swing de cada candle (high e low no mesmo candle).
+    swing_breaks = [break_map.get((s["index"], s["kind"])) for s in swings]
+    breaks = np.array([n if j is None else int(j) for j in swing_breaks], dtype=np.int64)
+    level_to = {s["index"]: j for s, j in zip(swings, swing_breaks)}
+    origins = _origins(bar_index, kinds, prices, breaks, n, "swing-high")
+    origins.update(_origins(bar_index, kinds, prices, breaks, n, "swing-low"))
+    last_to = swings[-1]["index"]
+
     for idx, swing in enumerate(swings):
         swing_index = swing["index"]
         price = swing["price"]
         kind = swing["kind"]
+        break_at = level_to.get(swing_index)
 
         if kind == "swing-high":
             if last_hsh is None or price > last_hsh["price"]:
@@ -280,51 +384,11 @@ def enrich_with_structure(swings, levels, markers, open_, high, low, close, brea
                 structural_levels.append(
                     {
                         "from": swing_index,
-                        "to": break_map.get(swing_index) if break_map.get(swing_index) is not None else swings[-1]["index"],
+                        "to": break_at if break_at is not None else last_to,
                         "price": price,
                         "kind": "hsh-level",
                     }
                 )
-
-            break_index = None
-            for j in range(swing_index + 1, n):
-                if is_valid_high_break(open_[j], close[j], high[j], price):
-                    break_index = j
-                    break
-            if break_index is not None:
-                origin_low = None
-                # Swing low de origem da perna impulsiva:
-                # procura lows ENTRE o swing-high atual e a candle de break,
-                # escolhendo o low mais baixo da perna.
-                for k in range(idx + 1, len(swings)):
-                    candidate = swings[k]
-                    if candidate["index"] >= break_index:
-                        break
-                    if candidate["kind"] == "swing-low":
-                        if origin_low is None or candidate["price"] <= origin_low["price"]:
-                            origin_low = candidate
-                # Fallback: se nao houver low interno entre o high e o break,
-                # usa o ultimo swing-low anterior na estrutura.
-                if origin_low is None:
-                    for k in range(idx - 1, -1, -1):
-                        candidate = swings[k]
-                        if candidate["kind"] == "swing-low":
-                            origin_low = candidate
-                            break
-                if origin_low is not None:
-                    event = {
-                        "swing_index": swing_index,
-                        "swing_price": price,
-                        "break_index": break_index,
-                        "origin": {
-                            "index": origin_low["index"],
-                            "price": origin_low["price"],
-                        },
-                    }
-                    bull_break_events.append(event)
-                    if last_bull_break is None or break_index >= last_bull_break["break_index"]:
-                        last_bull_break = {"protected": event["origin"], "break_index": break_index}
-
         elif kind == "swing-low":
             if last_lsl is None or price < last_lsl["price"]:
                 last_lsl = {"index": swing_index, "price": price}
@@ -333,50 +397,35 @@ def enrich_with_structure(swings, levels, markers, open_, high, low, close, brea
                 structural_levels.append(
                     {
                         "from": swing_index,
-                        "to": break_map.get(swing_index) if break_map.get(swing_index) is not None else swings[-1]["index"],
+                        "to": break_at if break_at is not None else last_to,
                         "price": price,
                         "kind": "lsl-level",
                     }
                 )
+        else:
+            continue
 
-            break_index = None
-            for j in range(swing_index + 1, n):
-                if is_valid_low_break(open_[j], close[j], low[j], price):
-                    break_index = j
-                    break
-            if break_index is not None:
-                origin_high = None
-                # Swing high de origem da perna impulsiva de baixa:
-                # procura highs ENTRE o swing-low atual e a candle de break,
-                # escolhendo o high mais alto da perna.
-                for k in range(idx + 1, len(swings)):
-                    candidate = swings[k]
-                    if candidate["index"] >= break_index:
-                        break
-                    if candidate["kind"] == "swing-high":
-                        if origin_high is None or candidate["price"] >= origin_high["price"]:
-                            origin_high = candidate
-                # Fallback: se nao houver high interno entre o low e o break,
-                # usa o ultimo swing-high anterior na estrutura.
-                if origin_high is None:
-                    for k in range(idx - 1, -1, -1):
-                        candidate = swings[k]
-                        if candidate["kind"] == "swing-high":
-                            origin_high = candidate
-                            break
-                if origin_high is not None:
-                    event = {
-                        "swing_index": swing_index,
-                        "swing_price": price,
-                        "break_index": break_index,
-                        "origin": {
-                            "index": origin_high["index"],
-                            "price": origin_high["price"],
-                        },
-                    }
-                    bear_break_events.append(event)
-                    if last_bear_break is None or break_index >= last_bear_break["break_index"]:
-                        last_bear_break = {"protected": event["origin"], "break_index": break_index}
+        origin_pos = origins.get(idx)
+        if origin_pos is None:
+            continue
+        origin_swing = swings[origin_pos]
+        event = {
+            "swing_index": swing_index,
+            "swing_price": price,
+            "break_index": int(breaks[idx]),
+            "origin": {
+                "index": origin_swing["index"],
+                "price": origin_swing["price"],
+            },
+        }
+        if kind == "swing-high":
+            bull_break_events.append(event)
+            if last_bull_break is None or event["break_index"] >= last_bull_break["break_index"]:
+                last_bull_break = {"protected": event["origin"], "break_index": event["break_index"]}
+        else:
+            bear_break_events.append(event)
+            if last_bear_break is None or event["break_index"] >= last_bear_break["break_index"]:
+                last_bear_break = {"protected": event["origin"], "break_index": event["break_index"]}
 
     protected_low = None
     protected_high = None
@@ -388,15 +437,17 @@ def enrich_with_structure(swings, levels, markers, open_, high, low, close, brea
     elif last_bear_break and (not last_bull_break or last_bear_break["break_index"] > last_bull_break["break_index"]):
         trend = "bearish"
 
+    # Eventos do segmento de tendencia atual (reaproveitados para MSC).
+    segment_events = []
     if trend == "bullish":
         # Considera apenas BOS bullish apos o ultimo BOS bearish (segmento atual)
         segment_start = last_bear_break["break_index"] + 1 if last_bear_break else 0
-        bull_segment_events = [e for e in bull_break_events if e["break_index"] >= segment_start]
-        if bull_segment_events:
+        segment_events = [e for e in bull_break_events if e["break_index"] >= segment_start]
+        if segment_events:
             # Idealmente MSCs relevantes sao aqueles que rompem HSH; se nao houver,
             # caimos para todos os BOS bullish do segmento.
-            hsh_events = [e for e in bull_segment_events if e["swing_index"] in hsh_indices]
-            candidate_events = hsh_events or bull_segment_events
+            hsh_events = [e for e in segment_events if e["swing_index"] in hsh_indices]
+            candidate_events = hsh_events or segment_events
             best_origin = candidate_events[0]["origin"]
             for e in candidate_events[1:]:
                 origin = e["origin"]
@@ -405,10 +456,10 @@ def enrich_with_structure(swings, levels, markers, open_, high, low, close, brea
             protected_low = {"index": int(best_origin["index"]), "price": float(best_origin["price"])}
     elif trend == "bearish":
         segment_start = last_bull_break["break_index"] + 1 if last_bull_break else 0
-        bear_segment_events = [e for e in bear_break_events if e["break_index"] >= segment_start]
-        if bear_segment_events:
-            lsl_events = [e for e in bear_segment_events if e["swing_index"] in lsl_indices]
-            candidate_events = lsl_events or bear_segment_events
+        segment_events = [e for e in bear_break_events if e["break_index"] >= segment_start]
+        if segment_events:
+            lsl_events = [e for e in segment_events if e["swing_index"] in lsl_indices]
+            candidate_events = lsl_events or segment_events
             best_origin = candidate_events[0]["origin"]
             for e in candidate_events[1:]:
                 origin = e["origin"]
@@ -540,11 +591,9 @@ def enrich_with_structure(swings, levels, markers, open_, high, low, close, brea
     # vigente, sem violar o nivel protegido oposto.
     # Aqui marcamos explicitamente todos os MSCs do segmento de tendencia atual.
     if trend == "bullish":
-        segment_start = last_bear_break["break_index"] + 1 if last_bear_break else 0
-        bull_segment_events = [e for e in bull_break_events if e["break_index"] >= segment_start]
         # Primeiro BOS do segmento estabelece a estrutura; MSCs sao continuacoes
         # subsequentes dentro da mesma tendencia.
-        msc_events = bull_segment_events[1:]
+        msc_events = segment_events[1:]
         for e in msc_events:
             idx = e["break_index"]
             if not isinstance(idx, int) or idx < 0 or idx >= n:
@@ -570,9 +619,7 @@ def enrich_with_structure(swings, levels, markers, open_, high, low, close, brea
                     }
                 )
     elif trend == "bearish":
-        segment_start = last_bull_break["break_index"] + 1 if last_bull_break else 0
-        bear_segment_events = [e for e in bear_break_events if e["break_index"] >= segment_start]
-        msc_events = bear_segment_events[1:]
+        msc_events = segment_events[1:]
         for e in msc_events:
             idx = e["break_index"]
             if not isinstance(idx, int) or idx < 0 or idx >= n:
@@ -606,52 +653,42 @@ def enrich_with_structure(swings, levels, markers, open_, high, low, close, brea
         # Contexto bullish -> MSS bearish ao perder o Protected Low.
         level = float(protected_low["price"])
         start_idx = max(int(protected_low["index"]) + 1, last_bull_break["break_index"] + 1)
-        for j in range(start_idx, n):
-            if is_valid_low_break(open_[j], close[j], low[j], level):
-                mss_marker = {"index": j, "kind": "mss-bearish", "value": float(low[j])}
-                # Novo Protected High passa a ser o ultimo swing-high estrutural antes do MSS.
-                prev_high = None
-                for swing in reversed(swings):
-                    if swing["index"] <= j and swing["kind"] == "swing-high":
-                        prev_high = swing
-                        break
-                if prev_high is not None:
-                    new_protected_from_mss = ("high", prev_high)
-                # Adiciona uma versao "truncada" do protected-low ate a vela do MSS.
-                structural_levels.append(
-                    {
-                        "from": int(protected_low["index"]),
-                        "to": j,
-                        "price": float(protected_low["price"]),
-                        "kind": "protected-low",
-                    }
-                )
-                break
+        j = int(break_index.first_low_breaks([start_idx], [level])[0])
+        if j < n:
+            mss_marker = {"index": j, "kind": "mss-bearish", "value": float(low[j])}
+            # Novo Protected High passa a ser o ultimo swing-high estrutural antes do MSS.
+            prev_high = _last_swing_until(bar_index, kinds, j, "swing-high")
+            if prev_high is not None:
+                new_protected_from_mss = ("high", swings[prev_high])
+            # Adiciona uma versao "truncada" do protected-low ate a vela do MSS.
+            structural_levels.append(
+                {
+                    "from": int(protected_low["index"]),
+                    "to": j,
+                    "price": float(protected_low["price"]),
+                    "kind": "protected-low",
+                }
+            )
 
     if protected_high is not None and last_bear_break is not None and mss_marker is None:
         # Contexto bearish -> MSS bullish ao romper o Protected High.
         level = float(protected_high["price"])
         start_idx = max(int(protected_high["index"]) + 1, last_bear_break["break_index"] + 1)
-        for j in range(start_idx, n):
-            if is_valid_high_break(open_[j], close[j], high[j], level):
-                mss_marker = {"index": j, "kind": "mss-bullish", "value": float(high[j])}
-                # Novo Protected Low passa a ser o ultimo swing-low estrutural antes do MSS.
-                prev_low = None
-                for swing in reversed(swings):
-                    if swing["index"] <= j and swing["kind"] == "swing-low":
-                        prev_low = swing
-                        break
-                if prev_low is not None:
-                    new_protected_from_mss = ("low", prev_low)
-                structural_levels.append(
-                    {
-                        "from": int(protected_high["index"]),
-                        "to": j,
-                        "price": float(protected_high["price"]),
-                        "kind": "protected-high",
-                    }
-                )
-                break
+        j = int(break_index.first_high_breaks([start_idx], [level])[0])
+        if j < n:
+            mss_marker = {"index": j, "kind": "mss-bullish", "value": float(high[j])}
+            # Novo Protected Low passa a ser o ultimo swing-low estrutural antes do MSS.
+            prev_low = _last_swing_until(bar_index, kinds, j, "swing-low")
+            if prev_low is not None:
+                new_protected_from_mss = ("low", swings[prev_low])
+            structural_levels.append(
+                {
+                    "from": int(protected_high["index"]),
+                    "to": j,
+                    "price": float(protected_high["price"]),
+                    "kind": "protected-high",
+                }
+            )
 
     if mss_marker is not None:
         structural_markers.append(mss_marker)
@@ -699,7 +736,14 @@ def enrich_with_structure(swings, levels, markers, open_, high, low, close, brea
                 }
             )
 
-    all_levels = levels + structural_levels
+    return limit_levels(levels + structural_levels), markers + structural_markers
+
+
+def limit_levels(all_levels):
+    """
+    Mantem apenas os MAX_LEVELS_PER_KIND niveis mais recentes de cada tipo
+    (na ordem original). Protected High/Low nao possuem limite.
+    """
     limited_levels = []
     per_kind_counts = {}
 
@@ -717,5 +761,4 @@ def enrich_with_structure(swings, levels, markers, open_, high, low, close, brea
         limited_levels.append(level)
 
     limited_levels.reverse()
-
-    return limited_levels, markers + structural_markers
+    return limited_levels
@@ -1,24 +1,99 @@
-def detect_swings(high, low):
+import numpy as np
+
+# Codigos de tipo usados nos arrays estruturados de swings.
+KIND_SWING_HIGH = 0
+KIND_SWING_LOW = 1
+KIND_NAMES = ("swing-high", "swing-low")
+KIND_CODES = {name: code for code, name in enumerate(KIND_NAMES)}
+
+SWING_DTYPE = np.dtype([("index", np.int64), ("kind", np.int8), ("price", np.float64)])
+
+
+def detect_swing_array(high, low):
     """
-    Detect swing highs/lows using a 3-candle pattern.
-    Permite plateaus de maximas/minimas compartilhadas.
-    Retorna lista de dicts: { index, kind, price }.
+    Versao vetorizada de detect_swings.
+    Retorna um array estruturado (SWING_DTYPE) ordenado por indice; quando um
+    candle e swing-high e swing-low ao mesmo tempo, o high vem primeiro.
     """
-    swings = []
-    n = len(high)
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    n = high.size
     if n < 3:
+        return np.empty(0, dtype=SWING_DTYPE)
+
+    mid, left, right = high[1:-1], high[:-2], high[2:]
+    # Swing high: maxima local, com pelo menos um vizinho mais baixo.
+    is_high = (mid >= left) & (mid >= right) & ((mid > left) | (mid > right))
+    mid, left, right = low[1:-1], low[:-2], low[2:]
+    # Swing low: minima local, com pelo menos um vizinho mais alto.
+    is_low = (mid <= left) & (mid <= right) & ((mid < left) | (mid < right))
+
+    high_idx = np.flatnonzero(is_high) + 1
+    low_idx = np.flatnonzero(is_low) + 1
+
+    swings = np.empty(high_idx.size + low_idx.size, dtype=SWING_DTYPE)
+    swings["index"] = np.concatenate([high_idx, low_idx])
+    swings["kind"] = np.concatenate(
+        [
+            np.full(high_idx.size, KIND_SWING_HIGH, dtype=np.int8),
+            np.full(low_idx.size, KIND_SWING_LOW, dtype=np.int8),
+        ]
+    )
+    swings["price"] = np.concatenate([high[high_idx], low[low_idx]])
+    return swings[np.lexsort((swings["kind"], swings["index"]))]
+
+
+def _external_positions(swings):
+    kinds = swings["kind"]
+    starts = np.flatnonzero(np.r_[True, kinds[1:] != kinds[:-1]])
+
+    # Lows sao negados para que o extremo de qualquer sequencia seja um maximo.
+    score = np.where(kinds == KIND_SWING_HIGH, swings["price"], -swings["price"])
+    run_lengths = np.diff(np.r_[starts, kinds.size])
+    run_best = np.repeat(np.maximum.reduceat(score, starts), run_lengths)
+    positions = np.where(score == run_best, np.arange(kinds.size), -1)
+    return np.maximum.reduceat(positions, starts)
+
+
+def extract_external_structure_array(swings):
+    """
+    Versao vetorizada de extract_external_structure sobre SWING_DTYPE.
+    Cada sequencia de swings do mesmo tipo vira um unico swing: a ultima
+    ocorrencia do extremo (maior high / menor low) da sequencia.
+    """
+    if swings.size == 0:
         return swings
+    return swings[_external_positions(swings)]
+
+
+def swings_to_dicts(swings):
+    """
+    Converte um array SWING_DTYPE para a lista de dicts { index, kind, price }
+    usada pelo restante do pipeline.
+    """
+    return [
+        {"index": index, "kind": KIND_NAMES[kind], "price": price}
+        for index, kind, price in zip(
+            swings["index"].tolist(), swings["kind"].tolist(), swings["price"].tolist()
+        )
+    ]
+
+
+def swings_from_dicts(swings):
+    array = np.empty(len(swings), dtype=SWING_DTYPE)
+    array["index"] = [int(s["index"]) for s in swings]
+    array["kind"] = [KIND_CODES[s["kind"]] for s in swings]
+    array["price"] = [float(s["price"]) for s in swings]
+    return array
 
-    for i in range(1, n - 1):
-        # Swing high: maxima local, com pelo menos um vizinho mais baixo.
-        if high[i] >= high[i - 1] and high[i] >= high[i + 1] and (high[i] > high[i - 1] or high[i] > high[i + 1]):
-            swings.append({"index": i, "kind": "swing-high", "price": float(high[i])})
-        # Swing low: minima local, com pelo menos um vizinho mais alto.
-        if low[i] <= low[i - 1] and low[i] <= low[i + 1] and (low[i] < low[i - 1] or low[i] < low[i + 1]):
-            swings.append({"index": i, "kind": "swing-low", "price": float(low[i])})
 
-    swings.sort(key=lambda s: s["index"])
-    return swings
+def detect_swings(high, low):
+    """
+    Detect swing highs/lows using a 3-candle pattern.
+    Permite plateaus de maximas/minimas compartilhadas.
+    Retorna lista de dicts: { index, kind, price }.
+    """
+    return swings_to_dicts(detect_swing_array(high, low))
 
 
 def extract_external_structure(swings):
@@ -26,22 +101,10 @@ def extract_external_structure(swings):
     Reduz a lista de swings para uma estrutura externa:
     - Mantem alternancia high/low.
     - Para sequencias do mesmo tipo, conserva apenas o extremo (mais alto/mais baixo).
+    Aceita lista de dicts (retorna lista) ou array SWING_DTYPE (retorna array).
     """
+    if isinstance(swings, np.ndarray):
+        return extract_external_structure_array(swings)
     if not swings:
         return []
-
-    external = [swings[0]]
-    for swing in swings[1:]:
-        last = external[-1]
-        if swing["kind"] == last["kind"]:
-            if swing["kind"] == "swing-high":
-                if swing["price"] >= last["price"]:
-                    external[-1] = swing
-            else:
-                if swing["price"] <= last["price"]:
-                    external[-1] = swing
-        else:
-            external.append(swing)
-
-    return external
-
+    return [swings[i] for i in _external_positions(swings_from_dicts(swings)).tolist()]
@@ -10,6 +10,9 @@
 //     cl-1mo.csv
 //
 // This script is idempotent: re-running will overwrite existing CL1! files.
+//
+// For SQLite + column store (and optionally these JSON segments) in one
+// vectorized pass, see `python -m thelab.ingest` in server/indicator_runner.
 
 const fs = require('fs');
 const path = require('path');
@@ -236,4 +239,5 @@ if (require.main === module) {
 
 module.exports = {
   run,
+  parseCsvLine,
 };
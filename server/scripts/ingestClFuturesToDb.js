@@ -1,11 +1,13 @@
 /* eslint-disable no-console */
 // Ingest CL futures JSON segments (generated from CSV) into SQLite market.db.
 // This script is offline and can be re-run to refresh CL1! data in the DB.
+// `python -m thelab.ingest` (server/indicator_runner) loads the DB straight
+// from the vendor CSVs with batched inserts and is much faster for full history.
 
 const fs = require('fs');
 const path = require('path');
 const { DATA_DIR } = require('../src/services/dukascopy/paths');
-const { getDb, upsertBars } = require('../src/services/marketStoreSqlite');
+const { getDb, upsertBars, deleteBars } = require('../src/services/marketStoreSqlite');
 
 const ASSET = 'CL1!';
 const TIMEFRAMES = ['M1', 'M5', 'M15', 'M30', 'H1', 'H4', 'D1'];
@@ -35,7 +37,7 @@ const clearAssetFromDb = (asset) => {
   }
   console.log(`[cl-db] Clearing existing rows for ${asset}...`);
   try {
-    db.prepare('DELETE FROM bars WHERE asset = ?').run(asset);
+    deleteBars({ asset });
     console.log('[cl-db] Existing rows cleared.');
   } catch (error) {
     console.warn('[cl-db] Failed to clear existing rows for asset', asset, error);
@@ -8,6 +8,12 @@ const LEAN_WORKSPACE_DIR = path.join(ROOT_DIR, 'lean_workspace');
 const LEAN_DATA_DIR = path.join(LEAN_WORKSPACE_DIR, 'data');
 const LEAN_RESULTS_DIR = path.join(LEAN_WORKSPACE_DIR, 'results');
 const LEAN_ALGORITHMS_DIR = path.join(LEAN_WORKSPACE_DIR, 'algorithms');
+// Cache de resultados de indicadores (ver indicatorResultCache).
+const INDICATOR_CACHE_DIR =
+  process.env.THELAB_INDICATOR_CACHE_DIR || path.join(ROOT_DIR, 'data', 'indicator-cache');
+// Colunas de candles em disco (np.memmap no runner, ver columnStoreService).
+const COLUMN_STORE_DIR =
+  process.env.THELAB_COLUMN_STORE_DIR || path.join(ROOT_DIR, 'data', 'columns');
 
 module.exports = {
   ROOT_DIR,
@@ -17,4 +23,6 @@ module.exports = {
   LEAN_DATA_DIR,
   LEAN_RESULTS_DIR,
   LEAN_ALGORITHMS_DIR,
+  INDICATOR_CACHE_DIR,
+  COLUMN_STORE_DIR,
 };
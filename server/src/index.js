@@ -9,6 +9,8 @@ const dataRoutes = require('./routes/dataRoutes');
 const indicatorRoutes = require('./routes/indicatorRoutes');
 const strategyRoutes = require('./routes/strategyRoutes');
 const leanRoutes = require('./routes/leanRoutes');
+const backtestRoutes = require('./routes/backtestRoutes');
+const optimizerRoutes = require('./routes/optimizerRoutes');
 const licenseRoutes = require('./routes/licenseRoutes');
 const pathsRoutes = require('./routes/pathsRoutes');
 const indicatorExecutionRoutes = require('./routes/indicatorExecutionRoutes');
@@ -38,6 +40,8 @@ app.use('/api/indicators', indicatorRoutes);
 app.use('/api/indicator-exec', indicatorExecutionRoutes);
 app.use('/api/strategies', strategyRoutes);
 app.use('/api/lean', leanRoutes);
+app.use('/api/backtest', backtestRoutes);
+app.use('/api/optimize', optimizerRoutes);
 app.use('/api/license', licenseRoutes);
 app.use('/api/paths', pathsRoutes);
 app.use('/api/debug', debugRoutes);
@@ -0,0 +1,45 @@
+const express = require('express');
+const { runStrategyBacktest } = require('../services/strategyBacktestService');
+
+/**
+ * Backtests nativos (engine Python em processo, sem Lean CLI).
+ *
+ * - POST /api/backtest/run -> executa a estrategia e retorna { result } (BacktestResult).
+ *   body: { asset, timeframe, strategyId? | code?, startDate?, endDate?, cash?, feeBps?, slippageBps?, settings?, mode? }
+ */
+const router = express.Router();
+
+const statusForError = (error) =>
+  error.type === 'NotFound' || error.type === 'NoData' ? 404 : error.type === 'InputError' ? 400 : 500;
+
+router.post('/run', async (req, res) => {
+  const { asset, timeframe, strategyId, code, startDate, endDate, cash, feeBps, slippageBps, settings, mode } =
+    req.body || {};
+  if (!asset || !timeframe) {
+    return res.status(400).json({ error: 'asset and timeframe are required' });
+  }
+
+  try {
+    const outcome = await runStrategyBacktest({
+      asset,
+      timeframe,
+      strategyId,
+      code,
+      startDate,
+      endDate,
+      cash,
+      feeBps,
+      slippageBps,
+      settings,
+      mode,
+    });
+    if (!outcome.ok) {
+      return res.status(statusForError(outcome.error)).json({ error: outcome.error });
+    }
+    res.json({ result: outcome.result });
+  } catch (err) {
+    res.status(500).json({ error: { type: 'InternalError', message: err.message } });
+  }
+});
+
+module.exports = router;
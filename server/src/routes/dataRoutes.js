@@ -48,7 +48,9 @@ router.get('/:asset/:timeframe', (req, res) => {
     return res.json(window);
   }
 
-  const data = readCandles(asset, timeframe);
+  // Safety limit to avoid gigantic JSON responses.
+  const MAX_CANDLES_RESPONSE = 50_000;
+  const data = readCandles(asset, timeframe, { limit: MAX_CANDLES_RESPONSE });
   if (!data) {
     return res.status(404).json({ error: 'dataset not found' });
   }
@@ -56,8 +58,6 @@ router.get('/:asset/:timeframe', (req, res) => {
   const payload = { ...data };
   const candles = Array.isArray(payload.candles) ? payload.candles : [];
 
-  // Safety limit to avoid gigantic JSON responses.
-  const MAX_CANDLES_RESPONSE = 50_000;
   if (candles.length > MAX_CANDLES_RESPONSE) {
     const sliced = candles.slice(candles.length - MAX_CANDLES_RESPONSE);
     const first = sliced[0];
@@ -1,4 +1,5 @@
 const express = require('express');
+const path = require('path');
 const { getLogs, logInfo } = require('../services/logger');
 const { getWindow, getSummary } = require('../services/marketWindowService');
 const { listIndicators, readIndicator } = require('../services/indicatorFileService');
@@ -86,7 +87,7 @@ router.post('/terminal', async (req, res) => {
         write('- health');
         write('- list indicators');
         write('- inspect indicator <id>');
-        write('- run indicator <id> [--asset=CL1!] [--tf=M15] [--len=1000]');
+        write('- run indicator <id> [--asset=CL1!] [--tf=M15] [--len=1000] [--profile[=20]] [--memory]');
         write('- inspect dataset <asset> <timeframe>');
         return res.json(buildResponse(lines));
       }
@@ -159,18 +160,21 @@ router.post('/terminal', async (req, res) => {
       case 'run': {
         const target = (args[0] || '').toLowerCase();
         if (target !== 'indicator') {
-          write('Usage: run indicator <id> [--asset=CL1!] [--tf=M15] [--len=1000]');
+          write('Usage: run indicator <id> [--asset=CL1!] [--tf=M15] [--len=1000] [--profile[=20]] [--memory]');
           return res.json(buildResponse(lines));
         }
         const id = args[1];
         if (!id) {
-          write('Usage: run indicator <id> [--asset=CL1!] [--tf=M15] [--len=1000]');
+          write('Usage: run indicator <id> [--asset=CL1!] [--tf=M15] [--len=1000] [--profile[=20]] [--memory]');
           return res.json(buildResponse(lines));
         }
         let asset = 'cl1!';
         let timeframe = 'm15';
         let length = 1000;
+        const diagnostics = {};
         args.slice(2).forEach((token) => {
+          if (token === '--profile') diagnostics.profile = true;
+          if (token === '--memory') diagnostics.traceMemory = true;
           const m = /^--([^=]+)=(.+)$/.exec(token);
           if (!m) return;
           const key = m[1].toLowerCase();
@@ -181,6 +185,10 @@ router.post('/terminal', async (req, res) => {
             const n = Number(value);
             if (Number.isFinite(n) && n > 0) length = Math.floor(n);
           }
+          if (key === 'profile') {
+            const n = Number(value);
+            if (Number.isFinite(n) && n > 0) diagnostics.profile = Math.floor(n);
+          }
         });
         const window = getWindow({ asset, timeframe, limit: length });
         if (!window || !Array.isArray(window.candles) || !window.candles.length) {
@@ -188,7 +196,7 @@ router.post('/terminal', async (req, res) => {
           return res.json(buildResponse(lines));
         }
         write(`Running indicator ${id} on ${asset}/${timeframe} with ${window.candles.length} candles...`);
-        const result = await runIndicatorById(id, window.candles);
+        const result = await runIndicatorById(id, window.candles, diagnostics);
         if (!result.ok) {
           write(`ERROR: ${result.error?.type || 'IndicatorError'} - ${result.error?.message || ''}`);
           return res.json(buildResponse(lines, { result }));
@@ -202,7 +210,23 @@ router.post('/terminal', async (req, res) => {
           const last = main[main.length - 1];
           write(`last: time=${last.time} value=${last.value}`);
         }
-        return res.json(buildResponse(lines, { resultSummary: { mainLength: main.length } }));
+        const meta = result.meta || {};
+        if (meta.phases) {
+          const phases = Object.entries(meta.phases).map(([name, ms]) => `${name}=${ms.toFixed(2)}ms`);
+          write(`phases: ${phases.join(' ')} total=${Number(meta.totalMs || 0).toFixed(2)}ms`);
+        }
+        if (meta.memory) {
+          write(`memory: peak=${(meta.memory.peakBytes / 1024).toFixed(1)}KiB retained=${(meta.memory.retainedBytes / 1024).toFixed(1)}KiB`);
+        }
+        if (meta.profile) {
+          write(`profile: ${meta.profile.totalCalls} calls, top by cumulative time:`);
+          meta.profile.top.forEach((row) => {
+            write(
+              `  ${row.cumulativeMs.toFixed(2)}ms cum ${row.selfMs.toFixed(2)}ms self ${row.calls}x ${row.function} (${path.basename(row.file)}:${row.line})`
+            );
+          });
+        }
+        return res.json(buildResponse(lines, { resultSummary: { mainLength: main.length, meta } }));
       }
       default: {
         write(`Unknown command: ${cmd}`);
@@ -1,12 +1,63 @@
 const express = require('express');
-const { runIndicatorById } = require('../services/indicatorExecutionService');
+const {
+  runIndicatorById,
+  runIndicatorOnStore,
+  runIndicatorBatch,
+} = require('../services/indicatorExecutionService');
 const { logInfo } = require('../services/logger');
 
 const router = express.Router();
 
+const statusForError = (error) => (error.type === 'NotFound' ? 404 : error.type === 'InputError' ? 400 : 500);
+
+const toResponse = (result) => ({
+  series: result.series.main || [],
+  overlay: {
+    series: result.series,
+    markers: result.markers || [],
+    levels: result.levels || [],
+    plots: result.plots || [],
+  },
+  meta: result.meta || {},
+});
+
+const streamOptions = ({ asset, timeframe }) => ({
+  asset: typeof asset === 'string' ? asset : undefined,
+  timeframe: typeof timeframe === 'string' ? timeframe : undefined,
+});
+
+// `profile: true | N` and `traceMemory: true` add meta.profile / meta.memory.
+const diagnosticOptions = ({ profile, traceMemory }) => ({ profile, traceMemory });
+
+// Either `candles` inline, or `source: { asset, timeframe, from?, to?, limit? }`
+// to run over the stored bars (the runner reads them from the column store).
 router.post('/:id/run', async (req, res) => {
   try {
-    const { candles, settings } = req.body || {};
+    const { candles, source, settings, asset, timeframe, profile, traceMemory } = req.body || {};
+    if (source && typeof source === 'object' && !Array.isArray(candles)) {
+      if (typeof source.asset !== 'string' || typeof source.timeframe !== 'string') {
+        return res.status(400).json({ error: { type: 'InputError', message: 'source requires asset and timeframe' } });
+      }
+      logInfo('indicatorExecutionRoutes: /:id/run called on stored bars', {
+        module: 'indicatorExecutionRoute',
+        id: req.params.id,
+        source,
+      });
+      const result = await runIndicatorOnStore(req.params.id, {
+        asset: source.asset,
+        timeframe: source.timeframe,
+        from: source.from,
+        to: source.to,
+        limit: Number(source.limit) > 0 ? Number(source.limit) : undefined,
+        settings,
+        ...diagnosticOptions({ profile, traceMemory }),
+      });
+      if (!result.ok) {
+        const error = result.error || { type: 'IndicatorError', message: 'indicator execution failed' };
+        return res.status(statusForError(error)).json({ error });
+      }
+      return res.json(toResponse(result));
+    }
     if (!Array.isArray(candles) || candles.length === 0) {
       return res.status(400).json({ error: { type: 'InputError', message: 'candles array is required' } });
     }
@@ -15,23 +66,16 @@ router.post('/:id/run', async (req, res) => {
       id: req.params.id,
       candles: candles.length,
     });
-    const result = await runIndicatorById(req.params.id, candles, { settings });
+    const result = await runIndicatorById(req.params.id, candles, {
+      settings,
+      ...streamOptions({ asset, timeframe }),
+      ...diagnosticOptions({ profile, traceMemory }),
+    });
     if (!result.ok) {
       const error = result.error || { type: 'IndicatorError', message: 'indicator execution failed' };
-      const status = error.type === 'NotFound' ? 404 : error.type === 'InputError' ? 400 : 500;
-      return res.status(status).json({ error });
+      return res.status(statusForError(error)).json({ error });
     }
-    const response = {
-      series: result.series.main || [],
-      overlay: {
-        series: result.series,
-        markers: result.markers || [],
-        levels: result.levels || [],
-        plots: result.plots || [],
-      },
-      meta: result.meta || {},
-    };
-    return res.json(response);
+    return res.json(toResponse(result));
   } catch (error) {
     // Fallback error handler
     // eslint-disable-next-line no-console
@@ -45,4 +89,48 @@ router.post('/:id/run', async (req, res) => {
   }
 });
 
+// Runs every indicator in `indicators: [{ id, settings }]` over one copy of the
+// candles. Per-indicator failures are reported inline; the request itself
+// only fails on bad input.
+router.post('/batch', async (req, res) => {
+  try {
+    const { candles, indicators, asset, timeframe, profile, traceMemory } = req.body || {};
+    if (!Array.isArray(candles) || candles.length === 0) {
+      return res.status(400).json({ error: { type: 'InputError', message: 'candles array is required' } });
+    }
+    if (!Array.isArray(indicators) || indicators.length === 0) {
+      return res.status(400).json({ error: { type: 'InputError', message: 'indicators array is required' } });
+    }
+    logInfo('indicatorExecutionRoutes: /batch called', {
+      module: 'indicatorExecutionRoute',
+      indicators: indicators.length,
+      candles: candles.length,
+    });
+    const batch = await runIndicatorBatch(indicators, candles, {
+      ...streamOptions({ asset, timeframe }),
+      ...diagnosticOptions({ profile, traceMemory }),
+    });
+    if (!batch.ok) {
+      return res.status(statusForError(batch.error)).json({ error: batch.error });
+    }
+    const results = batch.results.map((result, index) => {
+      const id = indicators[index] && indicators[index].id;
+      if (!result.ok) {
+        return { id, ok: false, error: result.error || { type: 'IndicatorError', message: 'indicator execution failed' } };
+      }
+      return { id, ok: true, ...toResponse(result) };
+    });
+    return res.json({ results });
+  } catch (error) {
+    // eslint-disable-next-line no-console
+    console.error('[indicatorExecutionRoutes] unexpected batch error', error);
+    return res.status(500).json({
+      error: {
+        type: 'ServerError',
+        message: 'unexpected error while running indicators',
+      },
+    });
+  }
+});
+
 module.exports = router;
@@ -0,0 +1,84 @@
+const express = require('express');
+const {
+  startOptimization,
+  startWalkForward,
+  getOptimization,
+  cancelOptimization,
+} = require('../services/optimizerService');
+
+/**
+ * Otimizacao de parametros de estrategias (sweep paralelo no engine nativo).
+ *
+ * - POST /api/optimize/run -> enfileira o job e retorna { job } (202).
+ *   body: { asset, timeframe, strategyId? | code?, space, sampler?, samples?, seed?, objective?,
+ *           maxWorkers?, mode?, startDate?, endDate?, cash?, feeBps?, slippageBps? }
+ * - POST /api/optimize/walkforward -> walk-forward: mesmo body mais { inSample, outOfSample, step?, anchored? }
+ *   (tamanhos em barras); o job traz os folds e a equity out-of-sample costurada.
+ * - GET /api/optimize/jobs/:id?limit=50 -> progresso e ranking parcial (melhores primeiro).
+ * - POST /api/optimize/jobs/:id/cancel -> cancela; o ranking ja calculado e mantido.
+ */
+const router = express.Router();
+
+const SWEEP_FIELDS = [
+  'asset',
+  'timeframe',
+  'strategyId',
+  'code',
+  'space',
+  'sampler',
+  'samples',
+  'seed',
+  'objective',
+  'maxWorkers',
+  'mode',
+  'startDate',
+  'endDate',
+  'cash',
+  'feeBps',
+  'slippageBps',
+];
+
+const pickFields = (body, fields) =>
+  fields.reduce((picked, field) => (body[field] === undefined ? picked : { ...picked, [field]: body[field] }), {});
+
+const sweepError = (body) => {
+  if (!body.asset || !body.timeframe) return 'asset and timeframe are required';
+  const { space } = body;
+  if (!space || typeof space !== 'object' || Array.isArray(space) || !Object.keys(space).length) {
+    return 'space must map parameter names to values or ranges';
+  }
+  return null;
+};
+
+router.post('/run', (req, res) => {
+  const body = req.body || {};
+  const error = sweepError(body);
+  if (error) return res.status(400).json({ error });
+  const job = startOptimization(pickFields(body, SWEEP_FIELDS));
+  res.status(202).json({ job });
+});
+
+router.post('/walkforward', (req, res) => {
+  const body = req.body || {};
+  const error =
+    sweepError(body) ||
+    (Number(body.inSample) > 0 && Number(body.outOfSample) > 0 ? null : 'inSample and outOfSample must be positive bar counts');
+  if (error) return res.status(400).json({ error });
+  const job = startWalkForward(pickFields(body, [...SWEEP_FIELDS, 'inSample', 'outOfSample', 'step', 'anchored']));
+  res.status(202).json({ job });
+});
+
+router.get('/jobs/:id', (req, res) => {
+  const limit = Number(req.query.limit);
+  const job = getOptimization(req.params.id, Number.isInteger(limit) && limit >= 0 ? { limit } : undefined);
+  if (!job) return res.status(404).json({ error: 'job not found' });
+  res.json({ job });
+});
+
+router.post('/jobs/:id/cancel', (req, res) => {
+  const job = cancelOptimization(req.params.id);
+  if (!job) return res.status(404).json({ error: 'job not found' });
+  res.json({ job });
+});
+
+module.exports = router;
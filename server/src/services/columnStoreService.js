@@ -0,0 +1,253 @@
+const crypto = require('crypto');
+const fs = require('fs');
+const path = require('path');
+const { COLUMN_STORE_DIR } = require('../constants/paths');
+const { readCandles, datasetStamp } = require('./dataCacheService');
+const { logInfo, logWarn } = require('./logger');
+
+/**
+ * Store colunar de candles por asset/timeframe (mesmo layout de
+ * indicator_runner/thelab/store.py, que abre as colunas com np.memmap).
+ *
+ * `<COLUMN_STORE_DIR>/<asset>-<timeframe>/`:
+ *   - manifest.json: { version, asset, timeframe, length, start, end, revision, columns, source }
+ *   - time.i64 (epoch ms, crescente e sem repeticao) e open/high/low/close/volume.f64,
+ *     little-endian e contiguos.
+ *
+ * O store e gerado a partir dos segmentos JSON (`dataCacheService.readCandles`)
+ * e refeito quando o dataset de origem muda (`source.stamp` = mtime do meta).
+ * Stores gravados pelo Python (`thelab.store.write_columns`: ingest do CSV,
+ * resample, ticks) trazem `source.writtenAt` e valem enquanto o JSON nao for
+ * mais novo que eles.
+ * As colunas sao gravadas antes do manifest, cada arquivo via rename atomico.
+ * Assim o runner recebe so { asset, timeframe, offset, length } e le os
+ * candles direto do disco, sem passar por stdin.
+ */
+
+const MANIFEST = 'manifest.json';
+const VALUE_BYTES = 8;
+const COLUMNS = [
+  { name: 'time', dtype: '<i8', file: 'time.i64' },
+  ...['open', 'high', 'low', 'close', 'volume'].map((name) => ({ name, dtype: '<f8', file: `${name}.f64` })),
+];
+
+const storeDir = (asset, timeframe, root = COLUMN_STORE_DIR) =>
+  path.join(root, `${String(asset).toLowerCase()}-${String(timeframe).toLowerCase()}`);
+
+const readManifest = (asset, timeframe, root = COLUMN_STORE_DIR) => {
+  const file = path.join(storeDir(asset, timeframe, root), MANIFEST);
+  if (!fs.existsSync(file)) return null;
+  try {
+    return JSON.parse(fs.readFileSync(file, 'utf8'));
+  } catch (err) {
+    logWarn('failed to read column store manifest', { module: 'columnStore', file, error: err && err.message });
+    return null;
+  }
+};
+
+const replaceFile = (file, data) => {
+  const temp = `${file}.${process.pid}.tmp`;
+  fs.writeFileSync(temp, data);
+  fs.renameSync(temp, file);
+};
+
+/**
+ * Grava `candles` ({ time, open, high, low, close, volume? }) como o store de
+ * asset/timeframe. Ordena por tempo; tempos repetidos ficam com o ultimo candle.
+ * Retorna o manifest.
+ */
+const writeColumnStore = ({ asset, timeframe, candles, source, root = COLUMN_STORE_DIR }) => {
+  const rows = [];
+  (Array.isArray(candles) ? candles : []).forEach((candle, index) => {
+    const time = typeof candle.time === 'number' ? candle.time : new Date(candle.time).getTime();
+    if (Number.isFinite(time)) rows.push({ time: Math.trunc(time), index, candle });
+  });
+  rows.sort((a, b) => a.time - b.time || a.index - b.index);
+  const unique = rows.filter((row, i) => i === rows.length - 1 || rows[i + 1].time !== row.time);
+
+  const dir = storeDir(asset, timeframe, root);
+  fs.mkdirSync(dir, { recursive: true });
+  const n = unique.length;
+  COLUMNS.forEach(({ name, file }) => {
+    const buffer = Buffer.alloc(n * VALUE_BYTES);
+    unique.forEach((row, i) => {
+      if (name === 'time') buffer.writeBigInt64LE(BigInt(row.time), i * VALUE_BYTES);
+      else buffer.writeDoubleLE(Number(row.candle[name] || 0), i * VALUE_BYTES);
+    });
+    replaceFile(path.join(dir, file), buffer);
+  });
+
+  const manifest = {
+    version: 1,
+    asset: String(asset).toLowerCase(),
+    timeframe: String(timeframe).toLowerCase(),
+    length: n,
+    start: n ? unique[0].time : null,
+    end: n ? unique[n - 1].time : null,
+    revision: crypto.randomBytes(8).toString('hex'),
+    columns: COLUMNS,
+    ...(source ? { source } : {}),
+  };
+  replaceFile(path.join(dir, MANIFEST), JSON.stringify(manifest, null, 2));
+  return manifest;
+};
+
+/**
+ * Manifest de um store atualizado para asset/timeframe, gerando (ou
+ * refazendo) o store a partir do cache JSON quando necessario. Retorna null
+ * se nao ha dataset.
+ */
+const ensureColumnStore = (asset, timeframe) => {
+  const stamp = datasetStamp(asset, timeframe);
+  const manifest = readManifest(asset, timeframe);
+  const current =
+    manifest &&
+    (stamp === null ||
+      (manifest.source && (manifest.source.stamp === stamp || Number(manifest.source.writtenAt) >= stamp)));
+  if (current) return manifest;
+  if (stamp === null) return null;
+
+  const data = readCandles(asset, timeframe);
+  if (!data || !Array.isArray(data.candles) || !data.candles.length) return manifest;
+  const started = Date.now();
+  const built = writeColumnStore({ asset, timeframe, candles: data.candles, source: { stamp } });
+  logInfo('column store built', {
+    module: 'columnStore',
+    asset,
+    timeframe,
+    bars: built.length,
+    ms: Date.now() - started,
+  });
+  return built;
+};
+
+const readTime = (fd, index) => {
+  const buffer = Buffer.alloc(VALUE_BYTES);
+  fs.readSync(fd, buffer, 0, VALUE_BYTES, index * VALUE_BYTES);
+  return Number(buffer.readBigInt64LE(0));
+};
+
+// First index whose time is > target (right) or >= target (left), by binary search on disk.
+const searchTime = (fd, length, target, right) => {
+  let lo = 0;
+  let hi = length;
+  while (lo < hi) {
+    const mid = (lo + hi) >> 1;
+    const time = readTime(fd, mid);
+    if (time < target || (right && time === target)) lo = mid + 1;
+    else hi = mid;
+  }
+  return lo;
+};
+
+const toEpochMs = (value) => {
+  if (value === undefined || value === null || value === '') return null;
+  const t = typeof value === 'number' ? value : new Date(value).getTime();
+  return Number.isFinite(t) ? t : null;
+};
+
+/**
+ * Faixa { offset, length } dos candles com from <= time <= to (ambos
+ * opcionais), mantendo os ultimos `limit`. Mesma regra de `thelab.store.select`.
+ */
+const resolveRange = (manifest, { from, to, limit } = {}, root = COLUMN_STORE_DIR) => {
+  const count = manifest.length;
+  const fromMs = toEpochMs(from);
+  const toMs = toEpochMs(to);
+  let start = 0;
+  let stop = count;
+  if (count && (fromMs !== null || toMs !== null)) {
+    const fd = fs.openSync(path.join(storeDir(manifest.asset, manifest.timeframe, root), 'time.i64'), 'r');
+    try {
+      if (fromMs !== null) start = searchTime(fd, count, fromMs, false);
+      if (toMs !== null) stop = searchTime(fd, count, toMs, true);
+    } finally {
+      fs.closeSync(fd);
+    }
+  }
+  const safeLimit = Number(limit) > 0 ? Math.floor(Number(limit)) : 0;
+  if (safeLimit) start = Math.max(start, stop - safeLimit);
+  return { offset: start, length: Math.max(0, stop - start) };
+};
+
+/**
+ * Le `length` candles a partir de `offset` (so as colunas em `fields`, alem de
+ * `time` em ISO), no formato usado pelo resto do backend.
+ */
+const readColumnRange = (dir, file, offset, length) => {
+  const buffer = Buffer.alloc(length * VALUE_BYTES);
+  const fd = fs.openSync(path.join(dir, file), 'r');
+  try {
+    fs.readSync(fd, buffer, 0, buffer.length, offset * VALUE_BYTES);
+  } finally {
+    fs.closeSync(fd);
+  }
+  return buffer;
+};
+
+const readStoredCandles = (
+  manifest,
+  { offset, length },
+  fields = ['open', 'high', 'low', 'close', 'volume'],
+  root = COLUMN_STORE_DIR
+) => {
+  const dir = storeDir(manifest.asset, manifest.timeframe, root);
+  const times = readColumnRange(dir, 'time.i64', offset, length);
+  const columns = fields.map((name) => [name, readColumnRange(dir, `${name}.f64`, offset, length)]);
+  return Array.from({ length }, (_, i) => {
+    const candle = { time: new Date(Number(times.readBigInt64LE(i * VALUE_BYTES))).toISOString() };
+    columns.forEach(([name, buffer]) => {
+      candle[name] = buffer.readDoubleLE(i * VALUE_BYTES);
+    });
+    return candle;
+  });
+};
+
+/**
+ * Mesmo resultado de readStoredCandles, mas preguicoso: as colunas sao lidas
+ * como buffers e `candles[i]` so vira { time, ...fields } no primeiro acesso.
+ * Serve para alinhar a saida do runner sem materializar um objeto (e uma
+ * string ISO) por barra do range; continua sendo um Array para quem chama.
+ */
+const storedCandleView = (
+  manifest,
+  { offset, length },
+  fields = ['open', 'high', 'low', 'close', 'volume'],
+  root = COLUMN_STORE_DIR
+) => {
+  const dir = storeDir(manifest.asset, manifest.timeframe, root);
+  const times = readColumnRange(dir, 'time.i64', offset, length);
+  const columns = fields.map((name) => [name, readColumnRange(dir, `${name}.f64`, offset, length)]);
+  const indexOf = (key) => {
+    if (typeof key !== 'string') return -1;
+    const i = Number(key);
+    return Number.isInteger(i) && i >= 0 && i < length && String(i) === key ? i : -1;
+  };
+  return new Proxy(new Array(length), {
+    get(target, key, receiver) {
+      const i = indexOf(key);
+      if (i < 0) return Reflect.get(target, key, receiver);
+      if (target[i] === undefined) {
+        const candle = { time: new Date(Number(times.readBigInt64LE(i * VALUE_BYTES))).toISOString() };
+        columns.forEach(([name, buffer]) => {
+          candle[name] = buffer.readDoubleLE(i * VALUE_BYTES);
+        });
+        target[i] = candle;
+      }
+      return target[i];
+    },
+    has(target, key) {
+      return indexOf(key) >= 0 || Reflect.has(target, key);
+    },
+  });
+};
+
+module.exports = {
+  storeDir,
+  readManifest,
+  writeColumnStore,
+  ensureColumnStore,
+  resolveRange,
+  readStoredCandles,
+  storedCandleView,
+};
@@ -1,7 +1,69 @@
 const fs = require('fs');
 const path = require('path');
 
-const DATA_DIR = path.join(__dirname, '../../data');
+const DATA_DIR = process.env.THELAB_DATA_DIR || path.join(__dirname, '../../data');
+
+// Segmentos JSON ja parseados (LRU por bytes do arquivo, invalidado por mtime/size).
+// THELAB_SEGMENT_CACHE_MB=0 desliga o cache.
+const SEGMENT_CACHE_BYTES = (() => {
+  const fromEnv = Number(process.env.THELAB_SEGMENT_CACHE_MB);
+  return (Number.isFinite(fromEnv) && fromEnv >= 0 ? fromEnv : 256) * 1024 * 1024;
+})();
+// filepath -> { mtimeMs, size, candles }, oldest first
+const segmentCache = new Map();
+let segmentCacheBytes = 0;
+const segmentCounters = { hits: 0, misses: 0, evictions: 0 };
+
+function dropSegment(filepath) {
+  const entry = segmentCache.get(filepath);
+  if (!entry) return;
+  segmentCache.delete(filepath);
+  segmentCacheBytes -= entry.size;
+}
+
+// Candles de um segmento ({ candles } em JSON). Os arrays sao compartilhados
+// com o cache: quem chama nao deve altera-los.
+function readSegmentCandles(filepath) {
+  let stat;
+  try {
+    stat = fs.statSync(filepath);
+  } catch {
+    dropSegment(filepath);
+    return null;
+  }
+  const cached = segmentCache.get(filepath);
+  if (cached && cached.mtimeMs === stat.mtimeMs && cached.size === stat.size) {
+    segmentCache.delete(filepath);
+    segmentCache.set(filepath, cached);
+    segmentCounters.hits += 1;
+    return cached.candles;
+  }
+  dropSegment(filepath);
+  segmentCounters.misses += 1;
+  const json = JSON.parse(fs.readFileSync(filepath, 'utf-8'));
+  const candles = Array.isArray(json && json.candles) ? json.candles : [];
+  if (stat.size <= SEGMENT_CACHE_BYTES) {
+    segmentCache.set(filepath, { mtimeMs: stat.mtimeMs, size: stat.size, candles });
+    segmentCacheBytes += stat.size;
+    while (segmentCacheBytes > SEGMENT_CACHE_BYTES) {
+      dropSegment(segmentCache.keys().next().value);
+      segmentCounters.evictions += 1;
+    }
+  }
+  return candles;
+}
+
+function segmentCacheStats() {
+  return { ...segmentCounters, entries: segmentCache.size, bytes: segmentCacheBytes, maxBytes: SEGMENT_CACHE_BYTES };
+}
+
+function clearSegmentCache() {
+  segmentCache.clear();
+  segmentCacheBytes = 0;
+  Object.keys(segmentCounters).forEach((key) => {
+    segmentCounters[key] = 0;
+  });
+}
 
 function ensureDataDir() {
   if (!fs.existsSync(DATA_DIR)) {
@@ -80,7 +142,51 @@ function listAssets() {
   }));
 }
 
-function readCandles(asset, timeframe) {
+const toEpochMs = (value) => {
+  if (value === undefined || value === null || value === '') return null;
+  const t = typeof value === 'number' ? value : new Date(value).getTime();
+  return Number.isFinite(t) ? t : null;
+};
+
+/**
+ * Segmentos do meta que cobrem a janela pedida, em ordem de tempo. Usa so o
+ * start/end/count de cada segmento no meta: com `to`, descarta os que comecam
+ * depois; com `from`, os que terminam antes; com `limit`, volta a partir do
+ * ultimo ate juntar `limit` candles inteiramente ate `to`.
+ */
+function selectSegments(segments, { from, to, limit } = {}) {
+  const fromMs = toEpochMs(from);
+  const toMs = toEpochMs(to);
+  const ordered = segments
+    .map((segment) => ({ segment, start: toEpochMs(segment.start), end: toEpochMs(segment.end) }))
+    .sort((a, b) => (a.start || 0) - (b.start || 0))
+    .filter(({ start, end }) => {
+      if (toMs !== null && start !== null && start > toMs) return false;
+      if (fromMs !== null && end !== null && end < fromMs) return false;
+      return true;
+    });
+  const safeLimit = Number(limit) > 0 ? Math.floor(Number(limit)) : 0;
+  if (!safeLimit) return ordered.map(({ segment }) => segment);
+
+  let needed = safeLimit;
+  let first = ordered.length;
+  while (first > 0 && needed > 0) {
+    first -= 1;
+    const { segment, end } = ordered[first];
+    // Um segmento que passa de `to` (ou sem end/count) nao garante candles suficientes.
+    if (end !== null && (toMs === null || end <= toMs)) needed -= Number(segment.count) || 0;
+  }
+  return ordered.slice(first).map(({ segment }) => segment);
+}
+
+/**
+ * Candles de asset/timeframe. Sem `options`, o dataset inteiro. Com
+ * `{ from?, to?, limit? }` le so os segmentos anuais que podem conter a janela
+ * (o recorte exato fica com quem chama: `marketWindowService.getWindow`).
+ * Segmentos parseados ficam no cache LRU acima; `range` vem do start/end dos
+ * segmentos lidos.
+ */
+function readCandles(asset, timeframe, options) {
   ensureDataDir();
 
   const lowerAsset = asset.toLowerCase();
@@ -93,41 +199,29 @@ function readCandles(asset, timeframe) {
     try {
       const meta = JSON.parse(fs.readFileSync(metaPath, 'utf-8'));
       const segments = Array.isArray(meta.segments) ? meta.segments : [];
-      const all = [];
+      const parts = [];
       let start = null;
       let end = null;
 
-      segments
-        .slice()
-        .sort((a, b) => {
-          const ta = new Date(a.start || 0).getTime();
-          const tb = new Date(b.start || 0).getTime();
-          return ta - tb;
-        })
-        .forEach((segment) => {
-          const filename = segment.file || `${base}-${segment.segment}.json`;
-          const filepath = path.join(DATA_DIR, filename);
-          if (!fs.existsSync(filepath)) return;
-          try {
-            const json = JSON.parse(fs.readFileSync(filepath, 'utf-8'));
-            const candles = Array.isArray(json && json.candles) ? json.candles : [];
-            candles.forEach((candle) => {
-              all.push(candle);
-              if (candle.time) {
-                const d = new Date(candle.time);
-                if (!Number.isNaN(d.getTime())) {
-                  const iso = d.toISOString();
-                  if (!start || iso < start) start = iso;
-                  if (!end || iso > end) end = iso;
-                }
-              }
-            });
-          } catch (error) {
-            console.error('[dataCache] failed to parse segment file', filepath, error);
-          }
-        });
-
-      if (!all.length) {
+      selectSegments(segments, options).forEach((segment) => {
+        const filename = segment.file || `${base}-${segment.segment}.json`;
+        const filepath = path.join(DATA_DIR, filename);
+        let candles;
+        try {
+          candles = readSegmentCandles(filepath);
+        } catch (error) {
+          console.error('[dataCache] failed to parse segment file', filepath, error);
+          return;
+        }
+        if (!candles || !candles.length) return;
+        parts.push(candles);
+        const first = segment.start || candles[0].time;
+        const last = segment.end || candles[candles.length - 1].time;
+        if (first && (!start || first < start)) start = first;
+        if (last && (!end || last > end)) end = last;
+      });
+
+      if (!parts.length) {
         return null;
       }
 
@@ -135,7 +229,7 @@ function readCandles(asset, timeframe) {
         asset,
         timeframe,
         range: start && end ? { start, end } : meta.range || {},
-        candles: all,
+        candles: parts.length === 1 ? parts[0].slice() : [].concat(...parts),
         lastUpdated: meta.lastUpdated,
       };
     } catch (error) {
@@ -157,8 +251,21 @@ function readCandles(asset, timeframe) {
   }
 }
 
+// mtime (ms) of the file(s) backing asset/timeframe, or null when there is no dataset.
+function datasetStamp(asset, timeframe) {
+  const base = `${asset.toLowerCase()}-${timeframe.toLowerCase()}`;
+  const candidates = [`${base}-meta.json`, `${base}.json`].map((file) => path.join(DATA_DIR, file));
+  const existing = candidates.filter((file) => fs.existsSync(file));
+  if (!existing.length) return null;
+  return Math.max(...existing.map((file) => fs.statSync(file).mtimeMs));
+}
+
 module.exports = {
   listAssets,
   readCandles,
+  selectSegments,
+  datasetStamp,
+  segmentCacheStats,
+  clearSegmentCache,
 };
 
@@ -1,7 +1,7 @@
 const fs = require('fs');
 const path = require('path');
 
-const DATA_DIR = path.join(__dirname, '../../../data');
+const DATA_DIR = process.env.THELAB_DATA_DIR || path.join(__dirname, '../../../data');
 const CONFIG_DIR = path.join(DATA_DIR, 'config');
 const JOBS_FILE = path.join(CONFIG_DIR, 'jobs.json');
 const RAW_DIR = path.join(DATA_DIR, 'raw');
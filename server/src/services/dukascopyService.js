@@ -94,32 +94,31 @@ const derivePrice = (tick) => {
   return null;
 };
 
+// Ticks from one download are already in time order; copy and sort only when they are not.
+const inTimeOrder = (ticks) => ticks.every((tick, i) => i === 0 || ticks[i - 1].timestamp <= tick.timestamp);
+
+// Running OHLC per bucket (no per-bucket price list). For tick history too large
+// for memory, `python -m thelab.ticks` streams the raw JSONL in chunks instead.
 const convertTicksToCandles = (ticks, timeframe) => {
   const frameMs = timeframeToMs(timeframe);
   if (!frameMs || !Array.isArray(ticks) || ticks.length === 0) return [];
 
-  const ordered = [...ticks].sort((a, b) => a.timestamp - b.timestamp);
+  const ordered = inTimeOrder(ticks) ? ticks : [...ticks].sort((a, b) => a.timestamp - b.timestamp);
   const candles = [];
   let bucketStart = null;
-  let bucketPrices = [];
-  let volume = 0;
+  let bucket = null;
 
   const flushBucket = () => {
-    if (!bucketPrices.length || bucketStart === null) return;
-    const open = bucketPrices[0];
-    const close = bucketPrices[bucketPrices.length - 1];
-    const high = Math.max(...bucketPrices);
-    const low = Math.min(...bucketPrices);
+    if (!bucket || bucketStart === null) return;
     candles.push({
       time: new Date(bucketStart).toISOString(),
-      open,
-      high,
-      low,
-      close,
-      volume: Number(volume.toFixed(6)),
+      open: bucket.open,
+      high: bucket.high,
+      low: bucket.low,
+      close: bucket.close,
+      volume: Number(bucket.volume.toFixed(6)),
     });
-    bucketPrices = [];
-    volume = 0;
+    bucket = null;
   };
 
   ordered.forEach((tick) => {
@@ -127,17 +126,21 @@ const convertTicksToCandles = (ticks, timeframe) => {
     if (price === null || Number.isNaN(tick.timestamp)) {
       return;
     }
-    const bucket = Math.floor(tick.timestamp / frameMs) * frameMs;
-    if (bucketStart === null) {
-      bucketStart = bucket;
-    } else if (bucket !== bucketStart) {
+    const bucketTime = Math.floor(tick.timestamp / frameMs) * frameMs;
+    if (bucketStart !== null && bucketTime !== bucketStart) {
       flushBucket();
-      bucketStart = bucket;
     }
-    bucketPrices.push(price);
+    bucketStart = bucketTime;
+    if (!bucket) {
+      bucket = { open: price, high: price, low: price, close: price, volume: 0 };
+    } else {
+      if (price > bucket.high) bucket.high = price;
+      if (price < bucket.low) bucket.low = price;
+      bucket.close = price;
+    }
     const tickVolume = Number(tick.askVolume || tick.bidVolume || 0);
     if (!Number.isNaN(tickVolume)) {
-      volume += tickVolume;
+      bucket.volume += tickVolume;
     }
   });
 
@@ -0,0 +1,161 @@
+const os = require('os');
+
+/**
+ * Binary columnar transport for indicator inputs ("TLB1").
+ *
+ * Layout (all integers little-endian):
+ *   magic      4 bytes  "TLB1"
+ *   headerLen  uint32   byte length of the JSON header (space padded so the
+ *                       first column starts on an 8-byte boundary)
+ *   header     JSON     { apiVersion, length, columns: [{ name, dtype }], settings }
+ *   columns    length * 8 bytes each, in header order
+ *
+ * `time` is int64 epoch milliseconds (`<i8`); OHLCV columns are float64
+ * (`<f8`). runner.py maps the columns with `np.frombuffer`, so no per-bar
+ * Python objects are created.
+ *
+ * In the other direction, requests carrying `output: 'packed'` get numeric
+ * series back as float64 columns plus a validity bitmap (`SeriesPacker` in
+ * runner.py), decoded here straight into Float64Arrays.
+ */
+
+const MAGIC = Buffer.from('TLB1', 'ascii');
+const PREAMBLE_BYTES = 8;
+const VALUE_BYTES = 8;
+
+const PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'volume'];
+
+const toEpochMs = (value) => {
+  if (typeof value === 'number') return Number.isFinite(value) ? value : null;
+  if (typeof value === 'string') {
+    const t = Date.parse(value);
+    return Number.isNaN(t) ? null : t;
+  }
+  return null;
+};
+
+const padTo8 = (buffer, offset) => {
+  const pad = (VALUE_BYTES - ((offset + buffer.length) % VALUE_BYTES)) % VALUE_BYTES;
+  return pad ? Buffer.concat([buffer, Buffer.alloc(pad, 0x20)]) : buffer;
+};
+
+const buildTimeColumn = (candles) => {
+  const times = new Array(candles.length);
+  for (let i = 0; i < candles.length; i += 1) {
+    const t = toEpochMs(candles[i].time);
+    if (t === null) return null;
+    times[i] = t;
+  }
+  return times;
+};
+
+/**
+ * Encode candles (+ optional extra header fields such as `settings`) into a
+ * TLB1 buffer. The `time` column is only sent when every candle has a
+ * parseable timestamp.
+ */
+const encodeCandleColumns = (candles, extraHeader = {}) => {
+  const n = candles.length;
+  const times = buildTimeColumn(candles);
+  const columns = [];
+  if (times) columns.push({ name: 'time', dtype: '<i8' });
+  PRICE_COLUMNS.forEach((name) => columns.push({ name, dtype: '<f8' }));
+
+  const header = padTo8(
+    Buffer.from(JSON.stringify({ apiVersion: 1, ...extraHeader, length: n, columns }), 'utf8'),
+    PREAMBLE_BYTES
+  );
+  const dataOffset = PREAMBLE_BYTES + header.length;
+  const out = Buffer.alloc(dataOffset + columns.length * n * VALUE_BYTES);
+  MAGIC.copy(out, 0);
+  out.writeUInt32LE(header.length, 4);
+  header.copy(out, PREAMBLE_BYTES);
+
+  const view = new DataView(out.buffer, out.byteOffset, out.byteLength);
+  let offset = dataOffset;
+  columns.forEach(({ name }) => {
+    if (name === 'time') {
+      for (let i = 0; i < n; i += 1) {
+        view.setBigInt64(offset + i * VALUE_BYTES, BigInt(Math.trunc(times[i])), true);
+      }
+    } else {
+      for (let i = 0; i < n; i += 1) {
+        const raw = candles[i][name];
+        const value = typeof raw === 'number' ? raw : name === 'volume' ? 0 : Number(raw);
+        view.setFloat64(offset + i * VALUE_BYTES, value, true);
+      }
+    }
+    offset += n * VALUE_BYTES;
+  });
+
+  return out;
+};
+
+const LITTLE_ENDIAN_HOST = os.endianness() === 'LE';
+
+const readFloat64Column = (bytes, length) => {
+  if (LITTLE_ENDIAN_HOST && bytes.byteOffset % VALUE_BYTES === 0) {
+    return new Float64Array(bytes.buffer, bytes.byteOffset, length);
+  }
+  const values = new Float64Array(length);
+  const view = new DataView(bytes.buffer, bytes.byteOffset, length * VALUE_BYTES);
+  for (let i = 0; i < length; i += 1) {
+    values[i] = view.getFloat64(i * VALUE_BYTES, true);
+  }
+  return values;
+};
+
+/**
+ * Decode one `{ $packed: {...} }` series descriptor emitted by runner.py's
+ * `SeriesPacker` into a Float64Array. Slots cleared in the validity bitmap
+ * come back as NaN, which `alignSeriesWithCandles` skips.
+ */
+const decodePackedSeries = (descriptor, attachment) => {
+  const packed = descriptor && descriptor.$packed;
+  if (!packed || packed.dtype !== '<f8') return null;
+  const length = Number(packed.length) || 0;
+
+  let data;
+  let valid;
+  if (typeof packed.data === 'string') {
+    data = Buffer.from(packed.data, 'base64');
+    valid = Buffer.from(packed.valid || '', 'base64');
+  } else {
+    if (!attachment) return null;
+    data = attachment.subarray(packed.offset, packed.offset + length * VALUE_BYTES);
+    valid = attachment.subarray(packed.validOffset, packed.validOffset + Math.ceil(length / 8));
+  }
+  if (data.length < length * VALUE_BYTES) return null;
+
+  const values = readFloat64Column(data, length);
+  for (let byte = 0; byte < valid.length; byte += 1) {
+    const bits = valid[byte];
+    if (bits === 0xff) continue;
+    const base = byte * 8;
+    for (let bit = 0; bit < 8 && base + bit < length; bit += 1) {
+      if (!(bits & (1 << bit))) values[base + bit] = NaN;
+    }
+  }
+  return values;
+};
+
+const isPackedSeries = (value) => Boolean(value && typeof value === 'object' && value.$packed);
+
+/**
+ * Replace packed descriptors in a runner `series` object with Float64Arrays.
+ */
+const decodeSeriesMap = (series, attachment) => {
+  if (!series || typeof series !== 'object' || Array.isArray(series)) return series;
+  const decoded = {};
+  Object.entries(series).forEach(([key, value]) => {
+    decoded[key] = isPackedSeries(value) ? decodePackedSeries(value, attachment) : value;
+  });
+  return decoded;
+};
+
+module.exports = {
+  MAGIC,
+  encodeCandleColumns,
+  decodePackedSeries,
+  decodeSeriesMap,
+};
@@ -1,66 +1,57 @@
 const { spawn } = require('child_process');
+const fs = require('fs');
 const path = require('path');
-const { ROOT_DIR, INDICATORS_DIR } = require('../constants/paths');
+const { ROOT_DIR, INDICATORS_DIR, INDICATOR_CACHE_DIR, COLUMN_STORE_DIR } = require('../constants/paths');
 const { readIndicator } = require('./indicatorFileService');
-const { logDebug, logError, logWarn } = require('./logger');
+const { logDebug, logError, logInfo, logWarn } = require('./logger');
 const { adaptLegacyToPlots, normalizePlots } = require('./indicatorOverlayAdapter');
 const {
   alignSeriesWithCandles,
   alignMarkerWithCandles,
   alignLevelWithCandles,
 } = require('./indicatorOverlayAlign');
+const { createWorkerPool, defaultPoolSize } = require('./indicatorWorkerPool');
+const { encodeCandleColumns, decodeSeriesMap } = require('./indicatorBinaryCodec');
+const { isSeriesArray } = require('./indicatorOverlayUtils');
+const { createIndicatorResultCache, fingerprintInputs } = require('./indicatorResultCache');
+const { ensureColumnStore, resolveRange, storedCandleView } = require('./columnStoreService');
 
 const PYTHON_BIN = process.env.THELAB_PYTHON_PATH || 'python';
 const RUNNER_PATH = path.join(ROOT_DIR, 'indicator_runner', 'runner.py');
 
 const DEFAULT_TIMEOUT_MS = 5000;
 
-const runIndicatorById = (id, candles, options = {}) => {
-  const timeoutMs = typeof options.timeoutMs === 'number' ? options.timeoutMs : DEFAULT_TIMEOUT_MS;
-  const settings = options && typeof options.settings === 'object' ? options.settings : null;
+const workerPoolSize = defaultPoolSize();
+// THELAB_INDICATOR_WORKERS=0 falls back to one Python process per run.
+const workerPool =
+  workerPoolSize > 0
+    ? createWorkerPool({ pythonBin: PYTHON_BIN, runnerPath: RUNNER_PATH, size: workerPoolSize })
+    : null;
 
-  if (!Array.isArray(candles) || candles.length === 0) {
-    logWarn('runIndicatorById called with empty candles', { module: 'indicatorExecution', id });
-    return Promise.resolve({
-      ok: false,
-      error: { type: 'InputError', message: 'candles array is required and must be non-empty' },
-    });
-  }
+if (workerPool) {
+  process.once('exit', () => workerPool.shutdown());
+}
 
-  const meta = readIndicator(id);
-  if (!meta || !meta.filePath) {
-    logWarn('indicator not found for id', { module: 'indicatorExecution', id });
-    return Promise.resolve({
-      ok: false,
-      error: { type: 'NotFound', message: `indicator not found for id: ${id}` },
-    });
-  }
+const megabytesFromEnv = (name, fallback) => {
+  const fromEnv = Number(process.env[name]);
+  return (Number.isFinite(fromEnv) && fromEnv >= 0 ? fromEnv : fallback) * 1024 * 1024;
+};
 
-  const scriptPath = meta.filePath.includes(INDICATORS_DIR)
-    ? meta.filePath
-    : path.join(INDICATORS_DIR, meta.filePath);
+// THELAB_INDICATOR_CACHE_MB=0 keeps results in memory only.
+const resultCache = createIndicatorResultCache({
+  dir: INDICATOR_CACHE_DIR,
+  maxDiskBytes: megabytesFromEnv('THELAB_INDICATOR_CACHE_MB', 256),
+  maxMemoryBytes: megabytesFromEnv('THELAB_INDICATOR_CACHE_MEMORY_MB', 64),
+  extraPaths: [RUNNER_PATH, path.join(ROOT_DIR, 'indicator_runner', 'thelab')],
+});
 
-  const payload = {
-    apiVersion: 1,
-    inputs: {
-      open: candles.map((c) => c.open),
-      high: candles.map((c) => c.high),
-      low: candles.map((c) => c.low),
-      close: candles.map((c) => c.close),
-      volume: candles.map((c) => (typeof c.volume === 'number' ? c.volume : 0)),
-    },
-    settings: settings || undefined,
-  };
+const runWithPool = (scriptPath, payload, timeoutMs, affinity) =>
+  workerPool.run(scriptPath, payload, timeoutMs, { affinity });
 
-  return new Promise((resolve) => {
-    logDebug('runIndicatorById: spawning runner', {
-      module: 'indicatorExecution',
-      id,
-      filePath: scriptPath,
-      candles: candles.length,
-      timeoutMs,
-    });
-    const child = spawn(PYTHON_BIN, [RUNNER_PATH, scriptPath], {
+// `modeArgs` go before the script path (e.g. ['--backtest']).
+const runOneShot = (scriptPath, payload, timeoutMs, modeArgs = []) =>
+  new Promise((resolve) => {
+    const child = spawn(PYTHON_BIN, [RUNNER_PATH, ...modeArgs, scriptPath], {
       stdio: ['pipe', 'pipe', 'pipe'],
     });
 
@@ -98,7 +89,7 @@ const runIndicatorById = (id, candles, options = {}) => {
       clearTimeout(timer);
       logError('indicator runner spawn error', {
         module: 'indicatorExecution',
-        id,
+        scriptPath,
         error: err && err.message,
       });
       finalize({
@@ -112,7 +103,7 @@ const runIndicatorById = (id, candles, options = {}) => {
       if (!stdout.trim()) {
         logError('indicator runner produced no output', {
           module: 'indicatorExecution',
-          id,
+          scriptPath,
           stderr,
         });
         finalize({
@@ -130,7 +121,7 @@ const runIndicatorById = (id, candles, options = {}) => {
         if (!raw || typeof raw !== 'object') {
           logError('invalid JSON from indicator runner', {
             module: 'indicatorExecution',
-            id,
+            scriptPath,
             stdout,
           });
           finalize({
@@ -139,66 +130,11 @@ const runIndicatorById = (id, candles, options = {}) => {
           });
           return;
         }
-        if (raw.ok === false) {
-          logWarn('indicator execution returned error', {
-            module: 'indicatorExecution',
-            id,
-            error: raw.error,
-          });
-          finalize({
-            ok: false,
-            error: raw.error || { type: 'RunnerError', message: 'indicator execution failed' },
-          });
-          return;
-        }
-        const rawSeries = raw.series || {};
-        const normalizedSeries = {};
-        const entries = Object.entries(rawSeries);
-        if (entries.length === 0 && Array.isArray(rawSeries)) {
-          normalizedSeries.main = alignSeriesWithCandles(rawSeries, candles);
-        } else {
-          entries.forEach(([key, value]) => {
-            if (!Array.isArray(value)) return;
-            const first = value[0];
-            if (first && typeof first === 'object' && first.time !== undefined && first.value !== undefined) {
-              normalizedSeries[key] = value;
-            } else {
-              normalizedSeries[key] = alignSeriesWithCandles(value, candles);
-            }
-          });
-          if (!normalizedSeries.main && Array.isArray(rawSeries.main)) {
-            normalizedSeries.main = alignSeriesWithCandles(rawSeries.main, candles);
-          }
-        }
-        const normalizedMarkers = Array.isArray(raw.markers)
-          ? raw.markers
-              .map((marker) => alignMarkerWithCandles(marker, candles))
-              .filter((m) => m && m.time !== undefined)
-          : [];
-
-        const normalizedLevels = Array.isArray(raw.levels)
-          ? raw.levels
-              .map((level) => alignLevelWithCandles(level, candles))
-              .filter((l) => l && l.timeStart !== undefined && l.timeEnd !== undefined)
-          : [];
-
-        const rawPlots = Array.isArray(raw.plots) ? raw.plots : null;
-        const plots = rawPlots
-          ? normalizePlots(rawPlots, candles)
-          : adaptLegacyToPlots(rawSeries, raw.markers, raw.levels, candles);
-
-        finalize({
-          ok: true,
-          series: normalizedSeries,
-          markers: normalizedMarkers,
-          levels: normalizedLevels,
-          plots,
-          meta: raw.meta || {},
-        });
+        finalize(raw);
       } catch (err) {
         logError('failed to parse indicator runner output', {
           module: 'indicatorExecution',
-          id,
+          scriptPath,
           error: err && err.message,
           stdout,
         });
@@ -214,7 +150,7 @@ const runIndicatorById = (id, candles, options = {}) => {
     });
 
     try {
-      child.stdin.write(JSON.stringify(payload));
+      child.stdin.write(payload);
       child.stdin.end();
     } catch (err) {
       clearTimeout(timer);
@@ -224,8 +160,386 @@ const runIndicatorById = (id, candles, options = {}) => {
       });
     }
   });
+
+const normalizeRunnerOutput = (raw, candles) => {
+  const rawSeries = decodeSeriesMap(raw.series || {}, raw.attachment);
+  const normalizedSeries = {};
+  const entries = Object.entries(rawSeries);
+  if (entries.length === 0 && Array.isArray(rawSeries)) {
+    normalizedSeries.main = alignSeriesWithCandles(rawSeries, candles);
+  } else {
+    entries.forEach(([key, value]) => {
+      if (!isSeriesArray(value)) return;
+      const first = value[0];
+      if (first && typeof first === 'object' && first.time !== undefined && first.value !== undefined) {
+        normalizedSeries[key] = value;
+      } else {
+        normalizedSeries[key] = alignSeriesWithCandles(value, candles);
+      }
+    });
+    if (!normalizedSeries.main && isSeriesArray(rawSeries.main)) {
+      normalizedSeries.main = alignSeriesWithCandles(rawSeries.main, candles);
+    }
+  }
+  const normalizedMarkers = Array.isArray(raw.markers)
+    ? raw.markers
+        .map((marker) => alignMarkerWithCandles(marker, candles))
+        .filter((m) => m && m.time !== undefined)
+    : [];
+
+  const normalizedLevels = Array.isArray(raw.levels)
+    ? raw.levels
+        .map((level) => alignLevelWithCandles(level, candles))
+        .filter((l) => l && l.timeStart !== undefined && l.timeEnd !== undefined)
+    : [];
+
+  const rawPlots = Array.isArray(raw.plots) ? raw.plots : null;
+  const plots = rawPlots
+    ? normalizePlots(rawPlots, candles)
+    : adaptLegacyToPlots(rawSeries, raw.markers, raw.levels, candles);
+
+  return {
+    ok: true,
+    series: normalizedSeries,
+    markers: normalizedMarkers,
+    levels: normalizedLevels,
+    plots,
+    meta: raw.meta || {},
+  };
+};
+
+const resolveScriptPath = (id) => {
+  const meta = readIndicator(id);
+  if (!meta || !meta.filePath) return null;
+  return meta.filePath.includes(INDICATORS_DIR) ? meta.filePath : path.join(INDICATORS_DIR, meta.filePath);
+};
+
+// Identifies the candle stream so warm workers can carry calculate_incremental state.
+const streamKey = (options) =>
+  options.asset || options.timeframe ? `${options.asset || ''}|${options.timeframe || ''}` : undefined;
+
+// Opt-in runner diagnostics: `profile` (true or the number of functions to
+// report, via cProfile) and `traceMemory` (tracemalloc peak). Diagnostic runs
+// bypass the result cache so they always measure a real execution.
+const diagnosticsFor = (options) => {
+  const profile = Number.isInteger(options.profile) && options.profile > 0 ? options.profile : options.profile === true;
+  return {
+    ...(profile ? { profile } : {}),
+    ...(options.traceMemory === true ? { traceMemory: true } : {}),
+  };
+};
+
+const logRunnerMeta = (id, meta) => {
+  if (!meta || !meta.phases) return;
+  logDebug('indicator runner phases', { module: 'indicatorExecution', id, totalMs: meta.totalMs, phases: meta.phases });
+  if (!meta.profile && !meta.memory) return;
+  logInfo('indicator runner diagnostics', {
+    module: 'indicatorExecution',
+    id,
+    executionMs: meta.executionMs,
+    peakBytes: meta.memory ? meta.memory.peakBytes : undefined,
+    totalCalls: meta.profile ? meta.profile.totalCalls : undefined,
+    top: meta.profile
+      ? meta.profile.top.slice(0, 5).map((row) => `${row.function} (${row.cumulativeMs.toFixed(2)}ms)`)
+      : undefined,
+  });
+};
+
+const notFoundError = (id) => ({
+  ok: false,
+  error: { type: 'NotFound', message: `indicator not found for id: ${id}` },
+});
+
+const emptyCandlesError = () => ({
+  ok: false,
+  error: { type: 'InputError', message: 'candles array is required and must be non-empty' },
+});
+
+// scriptPath -> { mtimeMs, incremental }
+const incrementalScripts = new Map();
+
+// Whether the script defines calculate_incremental (cached per mtime).
+const definesIncremental = (scriptPath) => {
+  const { mtimeMs } = fs.statSync(scriptPath);
+  const known = incrementalScripts.get(scriptPath);
+  if (known && known.mtimeMs === mtimeMs) return known.incremental;
+  const incremental = /^def\s+calculate_incremental\s*\(/m.test(fs.readFileSync(scriptPath, 'utf8'));
+  incrementalScripts.set(scriptPath, { mtimeMs, incremental });
+  return incremental;
+};
+
+// Scripts with calculate_incremental run differently on a stream (state fed
+// chunk by chunk) than without one (calculate()), so the stream is part of
+// their key; for every other script it does not change the result.
+const cacheKeyFor = (id, scriptPath, settings, fingerprint, stream) => {
+  try {
+    const input = stream && definesIncremental(scriptPath) ? `${fingerprint}|stream:${stream}` : fingerprint;
+    return resultCache.keyFor(scriptPath, settings, input);
+  } catch (err) {
+    logWarn('indicator result cache key failed', { module: 'indicatorExecution', id, error: err && err.message });
+    return null;
+  }
+};
+
+/**
+ * Turn one runner response into a normalized result; successes are cached
+ * (in the background) under `cacheKey`. With `revision`, a result the runner
+ * computed from another store revision (`meta.source.revision`) is returned
+ * but not cached: the key was built from the revision read before dispatch.
+ */
+const settleRunnerResult = (id, raw, candles, cacheKey, revision) => {
+  if (!raw || raw.ok === false) {
+    logWarn('indicator execution returned error', {
+      module: 'indicatorExecution',
+      id,
+      error: raw && raw.error,
+    });
+    return {
+      ok: false,
+      error: (raw && raw.error) || { type: 'RunnerError', message: 'indicator execution failed' },
+    };
+  }
+  let result;
+  try {
+    result = normalizeRunnerOutput(raw, candles);
+  } catch (err) {
+    logError('failed to normalize indicator runner output', {
+      module: 'indicatorExecution',
+      id,
+      error: err && err.message,
+    });
+    return {
+      ok: false,
+      error: {
+        type: 'ParseError',
+        message: `failed to parse runner output: ${(err && err.message) || String(err)}`,
+      },
+    };
+  }
+  logRunnerMeta(id, result.meta);
+  const source = result.meta && result.meta.source;
+  if (revision !== undefined && (!source || source.revision !== revision)) {
+    logWarn('column store rewritten during indicator run; result not cached', {
+      module: 'indicatorExecution',
+      id,
+      expected: revision,
+      revision: source && source.revision,
+    });
+    return result;
+  }
+  resultCache.set(cacheKey, result);
+  return result;
+};
+
+const runIndicatorById = (id, candles, options = {}) => {
+  const timeoutMs = typeof options.timeoutMs === 'number' ? options.timeoutMs : DEFAULT_TIMEOUT_MS;
+  const settings = options && typeof options.settings === 'object' ? options.settings : null;
+  const stream = streamKey(options);
+  const diagnostics = diagnosticsFor(options);
+
+  if (!Array.isArray(candles) || candles.length === 0) {
+    logWarn('runIndicatorById called with empty candles', { module: 'indicatorExecution', id });
+    return Promise.resolve(emptyCandlesError());
+  }
+
+  const scriptPath = resolveScriptPath(id);
+  if (!scriptPath) {
+    logWarn('indicator not found for id', { module: 'indicatorExecution', id });
+    return Promise.resolve(notFoundError(id));
+  }
+
+  const payload = encodeCandleColumns(candles, {
+    ...(settings ? { settings } : {}),
+    ...(stream ? { stream } : {}),
+    ...diagnostics,
+    output: 'packed',
+  });
+  const affinity = `${scriptPath}|${stream || ''}|${settings ? JSON.stringify(settings) : ''}`;
+  const cacheKey = Object.keys(diagnostics).length
+    ? null
+    : cacheKeyFor(id, scriptPath, settings, fingerprintInputs(payload, candles), stream);
+
+  return resultCache.get(cacheKey).then((cached) => {
+    if (cached) {
+      logDebug('runIndicatorById: cache hit', { module: 'indicatorExecution', id, tier: cached.meta.cache });
+      return cached;
+    }
+    logDebug('runIndicatorById: executing runner', {
+      module: 'indicatorExecution',
+      id,
+      filePath: scriptPath,
+      candles: candles.length,
+      timeoutMs,
+      mode: workerPool ? 'pool' : 'spawn',
+    });
+    const execute = workerPool ? runWithPool : runOneShot;
+    return execute(scriptPath, payload, timeoutMs, affinity).then((raw) =>
+      settleRunnerResult(id, raw, candles, cacheKey)
+    );
+  });
 };
 
+/**
+ * Run an indicator over stored bars without shipping them through stdin.
+ *
+ * `options` names the bars: `{ asset, timeframe, from?, to?, limit? }` (plus
+ * the `runIndicatorById` options). The range is resolved against the column
+ * store (`columnStoreService`, built from the JSON cache on first use) and
+ * the runner maps those columns with `np.memmap`; only time and close are
+ * read here, to align the output. Resolves like `runIndicatorById`, with
+ * `meta.source` describing the range.
+ */
+const runIndicatorOnStore = (id, options = {}) => {
+  const timeoutMs = typeof options.timeoutMs === 'number' ? options.timeoutMs : DEFAULT_TIMEOUT_MS;
+  const settings = options && typeof options.settings === 'object' ? options.settings : null;
+  const stream = streamKey(options);
+  const diagnostics = diagnosticsFor(options);
+
+  const scriptPath = resolveScriptPath(id);
+  if (!scriptPath) {
+    logWarn('indicator not found for id', { module: 'indicatorExecution', id });
+    return Promise.resolve(notFoundError(id));
+  }
+  const manifest = options.asset && options.timeframe ? ensureColumnStore(options.asset, options.timeframe) : null;
+  const range = manifest ? resolveRange(manifest, options) : null;
+  if (!range || !range.length) {
+    return Promise.resolve({
+      ok: false,
+      error: { type: 'InputError', message: `no stored bars for ${options.asset} ${options.timeframe} in range` },
+    });
+  }
+
+  // Times are only formatted for the bars the result actually points at.
+  const candles = storedCandleView(manifest, range, ['close']);
+  const payload = {
+    source: { store: COLUMN_STORE_DIR, asset: manifest.asset, timeframe: manifest.timeframe, ...range },
+    ...(settings ? { settings } : {}),
+    ...(stream ? { stream } : {}),
+    ...diagnostics,
+    output: 'packed',
+  };
+  const affinity = `${scriptPath}|${stream || ''}|${settings ? JSON.stringify(settings) : ''}`;
+  // The store revision changes on every rewrite, so it stands in for the input bytes.
+  const cacheKey = Object.keys(diagnostics).length
+    ? null
+    : cacheKeyFor(id, scriptPath, settings, `${manifest.revision}:${range.offset}:${range.length}`, stream);
+
+  return resultCache.get(cacheKey).then((cached) => {
+    if (cached) {
+      logDebug('runIndicatorOnStore: cache hit', { module: 'indicatorExecution', id, tier: cached.meta.cache });
+      return cached;
+    }
+    logDebug('runIndicatorOnStore: executing runner', {
+      module: 'indicatorExecution',
+      id,
+      filePath: scriptPath,
+      ...range,
+      timeoutMs,
+      mode: workerPool ? 'pool' : 'spawn',
+    });
+    const raw = workerPool
+      ? runWithPool(scriptPath, payload, timeoutMs, affinity)
+      : runOneShot(scriptPath, JSON.stringify(payload), timeoutMs);
+    return raw.then((result) => settleRunnerResult(id, result, candles, cacheKey, manifest.revision));
+  });
+};
+
+/**
+ * Run several indicators over the same candles in one runner request.
+ *
+ * `requests` is a list of `{ id, settings }`. The candles are encoded once and
+ * the runner's batch mode (`execute_batch` in runner.py) shares the columns
+ * between indicators and runs them on a thread pool. Cached results are served
+ * without a run. Resolves to `{ ok: true, results }` with one
+ * `runIndicatorById`-shaped result per request, in order. `options.profile` /
+ * `options.traceMemory` work as in `runIndicatorById` (the runner then runs
+ * the batch on one thread).
+ */
+const runIndicatorBatch = async (requests, candles, options = {}) => {
+  if (!Array.isArray(candles) || candles.length === 0) {
+    logWarn('runIndicatorBatch called with empty candles', { module: 'indicatorExecution' });
+    return emptyCandlesError();
+  }
+  if (!Array.isArray(requests) || requests.length === 0) {
+    return { ok: false, error: { type: 'InputError', message: 'indicators array is required and must be non-empty' } };
+  }
+  const stream = streamKey(options);
+  const diagnostics = diagnosticsFor(options);
+  const useCache = !Object.keys(diagnostics).length;
+
+  const results = new Array(requests.length);
+  const jobs = [];
+  requests.forEach((request, index) => {
+    const id = request && request.id;
+    const scriptPath = typeof id === 'string' && id ? resolveScriptPath(id) : null;
+    if (!scriptPath) {
+      logWarn('indicator not found for id', { module: 'indicatorExecution', id });
+      results[index] = notFoundError(id);
+      return;
+    }
+    const settings = request.settings && typeof request.settings === 'object' ? request.settings : null;
+    jobs.push({ index, id, scriptPath, settings });
+  });
+  if (!jobs.length) return { ok: true, results };
+
+  const encode = (batch) =>
+    encodeCandleColumns(candles, {
+      ...(stream ? { stream } : {}),
+      ...diagnostics,
+      output: 'packed',
+      batch: batch.map(({ scriptPath, settings }) => ({ scriptPath, ...(settings ? { settings } : {}) })),
+    });
+  let payload = encode(jobs);
+  const fingerprint = fingerprintInputs(payload, candles);
+  jobs.forEach((job) => {
+    job.cacheKey = useCache ? cacheKeyFor(job.id, job.scriptPath, job.settings, fingerprint, stream) : null;
+  });
+
+  const cached = await Promise.all(jobs.map((job) => resultCache.get(job.cacheKey)));
+  const misses = jobs.filter((job, i) => {
+    if (!cached[i]) return true;
+    results[job.index] = cached[i];
+    return false;
+  });
+  if (!misses.length) return { ok: true, results };
+  if (misses.length !== jobs.length) payload = encode(misses);
+
+  // Indicators share the runner; by default each one gets the single-run budget.
+  const timeoutMs = typeof options.timeoutMs === 'number' ? options.timeoutMs : DEFAULT_TIMEOUT_MS * misses.length;
+  logDebug('runIndicatorBatch: executing runner', {
+    module: 'indicatorExecution',
+    ids: misses.map((job) => job.id),
+    cached: jobs.length - misses.length,
+    candles: candles.length,
+    timeoutMs,
+    mode: workerPool ? 'pool' : 'spawn',
+  });
+  const raw = workerPool
+    ? await runWithPool(null, payload, timeoutMs, `batch|${stream || ''}`)
+    : await runOneShot('--batch', payload, timeoutMs);
+
+  const rawResults = raw && raw.ok !== false && Array.isArray(raw.results) ? raw.results : null;
+  misses.forEach((job, i) => {
+    let itemRaw = rawResults ? rawResults[i] : raw;
+    if (rawResults && itemRaw && raw.attachment) {
+      // Packed series of every item point into the batch attachment.
+      Object.defineProperty(itemRaw, 'attachment', { value: raw.attachment, enumerable: false });
+    }
+    if (!itemRaw) itemRaw = { ok: false, error: { type: 'RunnerError', message: 'batch result missing' } };
+    results[job.index] = settleRunnerResult(job.id, itemRaw, candles, job.cacheKey);
+  });
+  return { ok: true, results };
+};
+
+const getResultCacheStats = () => resultCache.stats();
+
+const getWorkerPoolStats = () => (workerPool ? workerPool.stats() : { size: 0, workers: 0, busy: 0, queued: 0 });
+
 module.exports = {
   runIndicatorById,
+  runIndicatorOnStore,
+  runIndicatorBatch,
+  runOneShot,
+  getWorkerPoolStats,
+  getResultCacheStats,
 };
@@ -1,4 +1,5 @@
 const { alignMarkerWithCandles, alignLevelWithCandles, alignSeriesWithCandles } = require('./indicatorOverlayAlign');
+const { isSeriesArray } = require('./indicatorOverlayUtils');
 
 /**
  * Build plots from the legacy series/markers/levels fields returned by indicators.
@@ -13,7 +14,7 @@ const adaptLegacyToPlots = (rawSeries, rawMarkers, rawLevels, candles) => {
 
   // Series -> line plots
   Object.entries(series).forEach(([key, value]) => {
-    if (!Array.isArray(value)) return;
+    if (!isSeriesArray(value)) return;
     const data = alignSeriesWithCandles(value, candles);
     if (!data.length) return;
     plots.push({
@@ -1,9 +1,9 @@
-const { clampIndex } = require('./indicatorOverlayUtils');
+const { clampIndex, isSeriesArray } = require('./indicatorOverlayUtils');
 
 const alignSeriesWithCandles = (values, candles) => {
-  if (!Array.isArray(values)) return [];
+  if (!isSeriesArray(values)) return [];
   if (!Array.isArray(candles) || candles.length === 0) {
-    return values.map((value, index) => ({ time: index, value }));
+    return Array.from(values, (value, index) => ({ time: index, value }));
   }
   const n = values.length;
   const offset = Math.max(0, candles.length - n);
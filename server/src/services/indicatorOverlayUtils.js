@@ -7,7 +7,11 @@ const clampIndex = (index, length) => {
   return i;
 };
 
+// Series values arrive as plain arrays (JSON) or Float64Arrays (packed output).
+const isSeriesArray = (value) => Array.isArray(value) || value instanceof Float64Array;
+
 module.exports = {
   clampIndex,
+  isSeriesArray,
 };
 
@@ -0,0 +1,370 @@
+const crypto = require('crypto');
+const fs = require('fs');
+const path = require('path');
+const { logDebug, logWarn } = require('./logger');
+
+/**
+ * Content-addressed cache for normalized indicator results.
+ *
+ * The key is a sha256 over:
+ *   - the script and every workspace module it imports (transitively; an
+ *     imported package such as `market_structure/` contributes all of its
+ *     `.py` files), plus the runner and its bundled `thelab` helpers,
+ *   - the settings (serialized with sorted keys),
+ *   - a fingerprint of the input columns (see `fingerprintInputs`).
+ *
+ * Editing any of those produces a new key, so entries never need explicit
+ * invalidation; stale ones simply age out.
+ *
+ * Two tiers: an in-memory LRU (Map insertion order) bounded by serialized
+ * bytes, backed by one JSON file per key under `dir`, bounded by total bytes
+ * and evicted least-recently-used first. Disk hits bump the file mtime so the
+ * order survives restarts.
+ */
+
+const HASH_ALGORITHM = 'sha256';
+const ENTRY_SUFFIX = '.json';
+const TEMP_SUFFIX = '.tmp';
+// Eviction trims to this fraction of the budget so writes don't evict on every call.
+const EVICT_TARGET_RATIO = 0.9;
+
+const IMPORT_RE = /^[ \t]*(?:from[ \t]+([\w.]+)[ \t]+import\b|import[ \t]+([\w.]+(?:[ \t]+as[ \t]+\w+)?(?:[ \t]*,[ \t]*[\w.]+(?:[ \t]+as[ \t]+\w+)?)*))/gm;
+
+const sha256 = () => crypto.createHash(HASH_ALGORITHM);
+
+const stableStringify = (value) => {
+  if (Array.isArray(value)) return `[${value.map(stableStringify).join(',')}]`;
+  if (value && typeof value === 'object') {
+    const keys = Object.keys(value).sort();
+    return `{${keys.map((key) => `${JSON.stringify(key)}:${stableStringify(value[key])}`).join(',')}}`;
+  }
+  return JSON.stringify(value === undefined ? null : value);
+};
+
+const withCacheMeta = (result, tier) => ({ ...result, meta: { ...(result.meta || {}), cache: tier } });
+
+/**
+ * Top-level module names imported by a Python source. Relative imports are
+ * ignored: they stay inside a package, which is hashed as a whole.
+ */
+const parseImports = (source) => {
+  const names = new Set();
+  let match;
+  IMPORT_RE.lastIndex = 0;
+  while ((match = IMPORT_RE.exec(source))) {
+    if (match[1]) {
+      if (!match[1].startsWith('.')) names.add(match[1].split('.')[0]);
+    } else {
+      match[2].split(',').forEach((part) => {
+        const name = part.trim().split(/[ \t]+/)[0];
+        if (name) names.add(name.split('.')[0]);
+      });
+    }
+  }
+  return Array.from(names);
+};
+
+const isDirectory = (target) => {
+  try {
+    return fs.statSync(target).isDirectory();
+  } catch {
+    return false;
+  }
+};
+
+const listPythonFiles = (dir) => {
+  let entries;
+  try {
+    entries = fs.readdirSync(dir, { withFileTypes: true });
+  } catch {
+    return [];
+  }
+  const files = [];
+  entries
+    .sort((a, b) => (a.name < b.name ? -1 : a.name > b.name ? 1 : 0))
+    .forEach((entry) => {
+      const full = path.join(dir, entry.name);
+      if (entry.isDirectory()) {
+        if (entry.name !== '__pycache__' && !entry.name.startsWith('.')) files.push(...listPythonFiles(full));
+      } else if (entry.isFile() && entry.name.endsWith('.py')) {
+        files.push(full);
+      }
+    });
+  return files;
+};
+
+/**
+ * Hash the TLB1 payload produced by `encodeCandleColumns`. Only the column
+ * data plus `length`/`columns` from the header take part: settings are keyed
+ * separately and `stream`/`output` don't change the result. Without a `time`
+ * column, results are aligned on the raw candle times, so those are mixed in.
+ */
+const fingerprintInputs = (payload, candles) => {
+  const headerLength = payload.readUInt32LE(4);
+  const header = JSON.parse(payload.subarray(8, 8 + headerLength).toString('utf8'));
+  const hash = sha256();
+  hash.update(JSON.stringify({ length: header.length, columns: header.columns }));
+  hash.update(payload.subarray(8 + headerLength));
+  if (!header.columns.some((column) => column.name === 'time')) {
+    hash.update(JSON.stringify(candles.map((candle) => (candle ? candle.time : null))));
+  }
+  return hash.digest('hex');
+};
+
+const createIndicatorResultCache = ({
+  dir,
+  maxDiskBytes = 256 * 1024 * 1024,
+  maxMemoryBytes = 64 * 1024 * 1024,
+  extraPaths = [],
+} = {}) => {
+  const diskEnabled = Boolean(dir) && maxDiskBytes > 0;
+  // path -> { mtimeMs, size, hash, imports }
+  const fileHashes = new Map();
+  // key -> { text, bytes }, oldest first
+  const memory = new Map();
+  let memoryBytes = 0;
+  // key -> { bytes, atime }; loaded from `dir` on first use.
+  let diskIndex = null;
+  let diskBytes = 0;
+  const counters = { memoryHits: 0, diskHits: 0, misses: 0, writes: 0, evictions: 0 };
+
+  const hashFile = (filePath) => {
+    let stat;
+    try {
+      stat = fs.statSync(filePath);
+    } catch {
+      return null;
+    }
+    const cached = fileHashes.get(filePath);
+    if (cached && cached.mtimeMs === stat.mtimeMs && cached.size === stat.size) return cached;
+    const source = fs.readFileSync(filePath);
+    const entry = {
+      mtimeMs: stat.mtimeMs,
+      size: stat.size,
+      hash: sha256().update(source).digest('hex'),
+      imports: filePath.endsWith('.py') ? parseImports(source.toString('utf8')) : [],
+    };
+    fileHashes.set(filePath, entry);
+    return entry;
+  };
+
+  /**
+   * Files whose content determines the output of `scriptPath`: the script,
+   * then every module/package of its workspace reachable through imports.
+   * Imports that don't resolve inside the workspace (numpy, stdlib) are skipped.
+   */
+  const collectDependencies = (scriptPath) => {
+    const workspace = path.dirname(scriptPath);
+    const files = [];
+    const seenFiles = new Set();
+    const seenModules = new Set();
+    const pending = [scriptPath];
+
+    const addFile = (filePath) => {
+      if (seenFiles.has(filePath)) return;
+      seenFiles.add(filePath);
+      pending.push(filePath);
+    };
+
+    while (pending.length) {
+      const filePath = pending.pop();
+      const entry = hashFile(filePath);
+      if (!entry) {
+        if (filePath === scriptPath) return null;
+        continue;
+      }
+      files.push([filePath, entry.hash]);
+      entry.imports.forEach((name) => {
+        if (seenModules.has(name)) return;
+        seenModules.add(name);
+        const packageDir = path.join(workspace, name);
+        const modulePath = `${packageDir}.py`;
+        if (fs.existsSync(modulePath)) {
+          addFile(modulePath);
+        } else {
+          listPythonFiles(packageDir).forEach(addFile);
+        }
+      });
+    }
+    return files.sort((a, b) => (a[0] < b[0] ? -1 : a[0] > b[0] ? 1 : 0));
+  };
+
+  /**
+   * Cache key for a run, or null when the script can't be read.
+   */
+  const keyFor = (scriptPath, settings, inputFingerprint) => {
+    const dependencies = collectDependencies(scriptPath);
+    if (!dependencies) return null;
+    const hash = sha256();
+    const workspace = path.dirname(scriptPath);
+    dependencies.forEach(([filePath, fileHash]) => {
+      hash.update(`${path.relative(workspace, filePath)}\0${fileHash}\n`);
+    });
+    extraPaths.forEach((extraPath) => {
+      const files = isDirectory(extraPath) ? listPythonFiles(extraPath) : [extraPath];
+      files.forEach((filePath) => {
+        const entry = hashFile(filePath);
+        hash.update(`${path.relative(path.dirname(extraPath), filePath)}\0${entry ? entry.hash : ''}\n`);
+      });
+    });
+    hash.update(`settings\0${stableStringify(settings || {})}\n`);
+    hash.update(`inputs\0${inputFingerprint}\n`);
+    return hash.digest('hex');
+  };
+
+  const entryPath = (key) => path.join(dir, `${key}${ENTRY_SUFFIX}`);
+
+  const loadDiskIndex = () => {
+    if (diskIndex) return diskIndex;
+    diskIndex = new Map();
+    diskBytes = 0;
+    if (!diskEnabled) return diskIndex;
+    try {
+      fs.mkdirSync(dir, { recursive: true });
+      fs.readdirSync(dir).forEach((name) => {
+        if (name.endsWith(TEMP_SUFFIX) && !name.endsWith(`.${process.pid}${TEMP_SUFFIX}`)) {
+          // Left behind by a process killed mid-write.
+          fs.promises.unlink(path.join(dir, name)).catch(() => {});
+          return;
+        }
+        if (!name.endsWith(ENTRY_SUFFIX)) return;
+        try {
+          const stat = fs.statSync(path.join(dir, name));
+          diskIndex.set(name.slice(0, -ENTRY_SUFFIX.length), { bytes: stat.size, atime: stat.mtimeMs });
+          diskBytes += stat.size;
+        } catch {
+          /* removed concurrently */
+        }
+      });
+    } catch (err) {
+      logWarn('indicator result cache directory unavailable', {
+        module: 'indicatorResultCache',
+        dir,
+        error: err && err.message,
+      });
+    }
+    return diskIndex;
+  };
+
+  const evictDisk = () => {
+    if (diskBytes <= maxDiskBytes) return;
+    const target = maxDiskBytes * EVICT_TARGET_RATIO;
+    const oldestFirst = Array.from(diskIndex.entries()).sort((a, b) => a[1].atime - b[1].atime);
+    for (const [key, info] of oldestFirst) {
+      if (diskBytes <= target) break;
+      diskIndex.delete(key);
+      diskBytes -= info.bytes;
+      counters.evictions += 1;
+      fs.promises.unlink(entryPath(key)).catch(() => {});
+    }
+  };
+
+  const remember = (key, text) => {
+    const bytes = Buffer.byteLength(text);
+    if (bytes > maxMemoryBytes) return;
+    const previous = memory.get(key);
+    if (previous) {
+      memory.delete(key);
+      memoryBytes -= previous.bytes;
+    }
+    memory.set(key, { text, bytes });
+    memoryBytes += bytes;
+    for (const [oldKey, entry] of memory) {
+      if (memoryBytes <= maxMemoryBytes) break;
+      memory.delete(oldKey);
+      memoryBytes -= entry.bytes;
+    }
+  };
+
+  /**
+   * Resolve to the cached result for `key` ({ ...result, meta.cache }) or null.
+   * Entries are kept serialized, so every hit hands out a fresh object.
+   */
+  const get = async (key) => {
+    if (!key) return null;
+    const hot = memory.get(key);
+    if (hot) {
+      memory.delete(key);
+      memory.set(key, hot);
+      counters.memoryHits += 1;
+      return withCacheMeta(JSON.parse(hot.text), 'memory');
+    }
+    if (diskEnabled && loadDiskIndex().has(key)) {
+      try {
+        const text = await fs.promises.readFile(entryPath(key), 'utf8');
+        const result = JSON.parse(text);
+        const now = Date.now();
+        const info = diskIndex.get(key);
+        if (info) info.atime = now;
+        fs.promises.utimes(entryPath(key), now / 1000, now / 1000).catch(() => {});
+        remember(key, text);
+        counters.diskHits += 1;
+        return withCacheMeta(result, 'disk');
+      } catch (err) {
+        const info = diskIndex.get(key);
+        if (info) {
+          diskIndex.delete(key);
+          diskBytes -= info.bytes;
+        }
+        logDebug('dropping unreadable indicator cache entry', {
+          module: 'indicatorResultCache',
+          key,
+          error: err && err.message,
+        });
+      }
+    }
+    counters.misses += 1;
+    return null;
+  };
+
+  /**
+   * Store a successful result. The disk write is best-effort and atomic
+   * (temp file + rename); the returned promise never rejects.
+   */
+  const set = async (key, result) => {
+    if (!key || !result || result.ok !== true) return;
+    const text = JSON.stringify(result);
+    remember(key, text);
+    if (!diskEnabled) return;
+    const bytes = Buffer.byteLength(text);
+    if (bytes > maxDiskBytes) return;
+    loadDiskIndex();
+    const target = entryPath(key);
+    const temp = `${target}.${process.pid}${TEMP_SUFFIX}`;
+    try {
+      await fs.promises.writeFile(temp, text);
+      await fs.promises.rename(temp, target);
+    } catch (err) {
+      fs.promises.unlink(temp).catch(() => {});
+      logWarn('failed to write indicator cache entry', {
+        module: 'indicatorResultCache',
+        key,
+        error: err && err.message,
+      });
+      return;
+    }
+    const previous = diskIndex.get(key);
+    if (previous) diskBytes -= previous.bytes;
+    diskIndex.set(key, { bytes, atime: Date.now() });
+    diskBytes += bytes;
+    counters.writes += 1;
+    evictDisk();
+  };
+
+  const stats = () => ({
+    ...counters,
+    memoryEntries: memory.size,
+    memoryBytes,
+    diskEntries: diskEnabled ? loadDiskIndex().size : 0,
+    diskBytes: diskEnabled ? diskBytes : 0,
+  });
+
+  return { keyFor, get, set, stats };
+};
+
+module.exports = {
+  createIndicatorResultCache,
+  fingerprintInputs,
+  parseImports,
+  stableStringify,
+};
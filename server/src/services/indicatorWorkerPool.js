@@ -0,0 +1,288 @@
+const { spawn } = require('child_process');
+const os = require('os');
+const { logDebug, logError, logWarn } = require('./logger');
+
+/**
+ * Pool of warm `runner.py --worker` processes.
+ *
+ * Each worker keeps numpy/talib and the indicator modules imported between
+ * runs, so a chart refresh only pays for `calculate()`. Messages are framed
+ * as `uint32 frameLen | uint32 jsonLen | JSON envelope | binary attachment`
+ * (little-endian, see `worker_main` in `indicator_runner/runner.py`). The
+ * attachment carries TLB1 columnar inputs when the payload is a Buffer.
+ *
+ * A worker handles one request at a time. A request's timeout counts from
+ * `run()`, so time spent queued behind busy workers is part of it: a request
+ * still queued at its deadline resolves with a Timeout without running, and
+ * a dispatched one gets what is left. Hanging workers are killed when a
+ * request exceeds its timeout and are replaced lazily on the next dispatch.
+ * Runs sharing an `affinity` key prefer the worker that served the previous
+ * one, so `calculate_incremental` state kept by that worker can be reused.
+ */
+
+const UINT32_BYTES = 4;
+const STDERR_TAIL_BYTES = 8 * 1024;
+
+const encodeFrame = (message, attachment = null) => {
+  const envelope = Buffer.from(JSON.stringify(message), 'utf8');
+  const extra = attachment ? attachment.length : 0;
+  // Pad the envelope so the attachment starts on an 8-byte boundary of the
+  // frame body; runner.py maps its columns without copying.
+  const pad = extra ? (8 - ((UINT32_BYTES + envelope.length) % 8)) % 8 : 0;
+  const header = Buffer.alloc(UINT32_BYTES * 2);
+  header.writeUInt32LE(UINT32_BYTES + envelope.length + pad + extra, 0);
+  header.writeUInt32LE(envelope.length + pad, UINT32_BYTES);
+  const parts = [header, envelope];
+  if (pad) parts.push(Buffer.alloc(pad, 0x20));
+  if (extra) parts.push(attachment);
+  return Buffer.concat(parts);
+};
+
+const createFrameDecoder = (onFrame) => {
+  let pending = Buffer.alloc(0);
+  return (chunk) => {
+    pending = pending.length ? Buffer.concat([pending, chunk]) : chunk;
+    while (pending.length >= UINT32_BYTES) {
+      const length = pending.readUInt32LE(0);
+      if (pending.length < UINT32_BYTES + length) break;
+      const body = pending.subarray(UINT32_BYTES, UINT32_BYTES + length);
+      pending = pending.subarray(UINT32_BYTES + length);
+      const jsonLength = body.readUInt32LE(0);
+      onFrame(
+        body.subarray(UINT32_BYTES, UINT32_BYTES + jsonLength),
+        body.subarray(UINT32_BYTES + jsonLength)
+      );
+    }
+  };
+};
+
+const defaultPoolSize = () => {
+  const fromEnv = Number(process.env.THELAB_INDICATOR_WORKERS);
+  if (Number.isFinite(fromEnv) && fromEnv >= 0) return Math.floor(fromEnv);
+  const cpus = (os.cpus() || []).length || 1;
+  return Math.max(1, Math.min(4, cpus - 1));
+};
+
+const spawnWorker = ({ pythonBin, runnerPath, onIdle, onExit }) => {
+  const child = spawn(pythonBin, [runnerPath, '--worker'], {
+    stdio: ['pipe', 'pipe', 'pipe'],
+  });
+
+  const worker = {
+    pid: child.pid,
+    busy: false,
+    dead: false,
+    stderrTail: '',
+    current: null,
+  };
+
+  const settle = (result) => {
+    const current = worker.current;
+    if (!current) return;
+    worker.current = null;
+    worker.busy = false;
+    clearTimeout(current.timer);
+    current.resolve(result);
+  };
+
+  const markDead = () => {
+    if (worker.dead) return;
+    worker.dead = true;
+    onExit(worker);
+  };
+
+  child.stdout.on(
+    'data',
+    createFrameDecoder((envelope, attachment) => {
+      let message;
+      try {
+        message = JSON.parse(envelope.toString('utf8'));
+      } catch (err) {
+        logError('invalid frame from indicator worker', {
+          module: 'indicatorWorkerPool',
+          pid: worker.pid,
+          error: err && err.message,
+        });
+        settle({
+          ok: false,
+          error: { type: 'ParseError', message: `failed to parse worker frame: ${err.message}` },
+        });
+        worker.kill();
+        return;
+      }
+      if (!worker.current || message.id !== worker.current.id) {
+        logWarn('indicator worker replied to unknown request', {
+          module: 'indicatorWorkerPool',
+          pid: worker.pid,
+          id: message && message.id,
+        });
+        return;
+      }
+      delete message.id;
+      if (attachment.length) {
+        // Packed series (see SeriesPacker in runner.py) reference this buffer.
+        Object.defineProperty(message, 'attachment', { value: attachment, enumerable: false });
+      }
+      settle(message);
+      onIdle(worker);
+    })
+  );
+
+  child.stderr.on('data', (chunk) => {
+    worker.stderrTail = (worker.stderrTail + chunk.toString('utf8')).slice(-STDERR_TAIL_BYTES);
+  });
+
+  child.on('error', (err) => {
+    logError('indicator worker spawn error', {
+      module: 'indicatorWorkerPool',
+      error: err && err.message,
+    });
+    settle({ ok: false, error: { type: 'SpawnError', message: err.message } });
+    markDead();
+  });
+
+  child.on('exit', (code, signal) => {
+    logDebug('indicator worker exited', { module: 'indicatorWorkerPool', pid: worker.pid, code, signal });
+    settle({
+      ok: false,
+      error: {
+        type: 'RunnerError',
+        message: `indicator worker exited unexpectedly (code=${code}, signal=${signal})`,
+        stderr: worker.stderrTail,
+      },
+    });
+    markDead();
+  });
+
+  // `remainingMs` is what is left of `timeoutMs` after the request waited in the queue.
+  worker.run = (request, attachment, timeoutMs, resolve, remainingMs = timeoutMs) => {
+    worker.busy = true;
+    worker.stderrTail = '';
+    const timer = setTimeout(() => {
+      logWarn('indicator worker timed out; killing', {
+        module: 'indicatorWorkerPool',
+        pid: worker.pid,
+        timeoutMs,
+      });
+      settle({
+        ok: false,
+        error: { type: 'Timeout', message: `indicator execution exceeded ${timeoutMs}ms` },
+      });
+      worker.kill();
+    }, remainingMs);
+    worker.current = { id: request.id, resolve, timer };
+    try {
+      child.stdin.write(encodeFrame(request, attachment));
+    } catch (err) {
+      settle({ ok: false, error: { type: 'StdinError', message: (err && err.message) || String(err) } });
+      worker.kill();
+    }
+  };
+
+  worker.kill = () => {
+    markDead();
+    try {
+      child.kill('SIGKILL');
+    } catch {
+      /* ignore */
+    }
+  };
+
+  child.stdin.on('error', () => {
+    /* surfaced through 'exit' */
+  });
+
+  return worker;
+};
+
+const createWorkerPool = ({ pythonBin, runnerPath, size = defaultPoolSize() }) => {
+  const workers = new Set();
+  const queue = [];
+  const affinityWorkers = new Map();
+  let nextId = 1;
+
+  const pickIdle = (affinity) => {
+    const preferred = affinity !== undefined ? affinityWorkers.get(affinity) : null;
+    if (preferred && !preferred.busy && !preferred.dead) return preferred;
+    return Array.from(workers).find((w) => !w.busy && !w.dead);
+  };
+
+  const dispatch = () => {
+    while (queue.length) {
+      let worker = pickIdle(queue[0].affinity);
+      if (!worker) {
+        if (workers.size >= size) return;
+        // eslint-disable-next-line no-use-before-define
+        worker = spawnWorker({ pythonBin, runnerPath, onIdle: dispatch, onExit: handleExit });
+        workers.add(worker);
+        logDebug('indicator worker started', { module: 'indicatorWorkerPool', pid: worker.pid, size });
+      }
+      const job = queue.shift();
+      clearTimeout(job.queueTimer);
+      if (job.affinity !== undefined) affinityWorkers.set(job.affinity, worker);
+      worker.run(job.request, job.attachment, job.timeoutMs, job.resolve, Math.max(1, job.deadline - Date.now()));
+    }
+  };
+
+  const handleExit = (worker) => {
+    workers.delete(worker);
+    affinityWorkers.forEach((owner, key) => {
+      if (owner === worker) affinityWorkers.delete(key);
+    });
+    // Replacement workers are spawned lazily by the next dispatch.
+    setImmediate(dispatch);
+  };
+
+  /**
+   * Queue a run. `payload` is either a JSON-serializable `{ inputs, settings }`
+   * object or a TLB1 Buffer from `encodeCandleColumns`.
+   */
+  const run = (scriptPath, payload, timeoutMs, { affinity } = {}) =>
+    new Promise((resolve) => {
+      const binary = Buffer.isBuffer(payload);
+      const job = {
+        request: binary ? { id: nextId++, scriptPath } : { id: nextId++, scriptPath, payload },
+        attachment: binary ? payload : null,
+        affinity,
+        timeoutMs,
+        deadline: Date.now() + timeoutMs,
+        resolve,
+      };
+      job.queueTimer = setTimeout(() => {
+        const index = queue.indexOf(job);
+        if (index < 0) return;
+        queue.splice(index, 1);
+        logWarn('indicator request timed out in the queue', { module: 'indicatorWorkerPool', timeoutMs });
+        resolve({
+          ok: false,
+          error: { type: 'Timeout', message: `indicator execution exceeded ${timeoutMs}ms (queued behind busy workers)` },
+        });
+      }, timeoutMs);
+      queue.push(job);
+      dispatch();
+    });
+
+  const shutdown = () => {
+    workers.forEach((worker) => worker.kill());
+    workers.clear();
+  };
+
+  return {
+    size,
+    run,
+    shutdown,
+    stats: () => ({
+      size,
+      workers: workers.size,
+      busy: Array.from(workers).filter((w) => w.busy).length,
+      queued: queue.length,
+    }),
+  };
+};
+
+module.exports = {
+  createWorkerPool,
+  defaultPoolSize,
+  encodeFrame,
+  createFrameDecoder,
+};
@@ -1,5 +1,6 @@
 const fs = require('fs');
 const path = require('path');
+const { logWarn } = require('./logger');
 
 let Database;
 try {
@@ -9,11 +10,72 @@ try {
   Database = null;
 }
 
-const DB_DIR = path.join(__dirname, '../../db');
-const DB_PATH = path.join(DB_DIR, 'market.db');
+// THELAB_MARKET_DB overrides the path (thelab.marketdb reads the same variable).
+const DB_PATH = process.env.THELAB_MARKET_DB || path.join(__dirname, '../../db', 'market.db');
+const DB_DIR = path.dirname(DB_PATH);
 
 let dbInstance = null;
 
+/**
+ * Schema 2 (mesmo DDL de indicator_runner/thelab/marketdb.py): `bars` e
+ * WITHOUT ROWID, clusterizada em (asset, timeframe, time), entao janelas
+ * `to`/`limit` sao um range scan coberto pela chave primaria e nao ha indice
+ * secundario para manter nas escritas. `bars_summary` guarda inicio/fim/count
+ * por asset/timeframe e e atualizada por todo writer (upsertBars, deleteBars,
+ * thelab.ingest), evitando MIN/MAX/COUNT sobre `bars` a cada resumo.
+ * Bancos no layout antigo (rowid + idx_bars_asset_tf_time) continuam legiveis;
+ * `python -m thelab.marketdb migrate` converte.
+ */
+const SCHEMA_VERSION = 2;
+const BARS_TABLE = `
+  CREATE TABLE IF NOT EXISTS bars (
+    asset TEXT NOT NULL,
+    timeframe TEXT NOT NULL,
+    time INTEGER NOT NULL,
+    open REAL NOT NULL,
+    high REAL NOT NULL,
+    low REAL NOT NULL,
+    close REAL NOT NULL,
+    volume REAL NOT NULL,
+    PRIMARY KEY (asset, timeframe, time)
+  ) WITHOUT ROWID;
+`;
+const SUMMARY_TABLE = `
+  CREATE TABLE IF NOT EXISTS bars_summary (
+    asset TEXT NOT NULL,
+    timeframe TEXT NOT NULL,
+    start_time INTEGER,
+    end_time INTEGER,
+    bar_count INTEGER NOT NULL,
+    PRIMARY KEY (asset, timeframe)
+  ) WITHOUT ROWID;
+`;
+
+const hasTable = (db, name) =>
+  Boolean(db.prepare("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?").get(name));
+
+const ensureSchema = (db) => {
+  const bars = db.prepare("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'bars'").get();
+  if (!bars) {
+    db.exec(BARS_TABLE + SUMMARY_TABLE);
+    db.pragma(`user_version = ${SCHEMA_VERSION}`);
+    return;
+  }
+  if (!hasTable(db, 'bars_summary')) {
+    db.exec(SUMMARY_TABLE);
+    db.exec(
+      'INSERT OR REPLACE INTO bars_summary(asset, timeframe, start_time, end_time, bar_count) ' +
+        'SELECT asset, timeframe, MIN(time), MAX(time), COUNT(*) FROM bars GROUP BY asset, timeframe'
+    );
+  }
+  if (!/WITHOUT\s+ROWID/i.test(bars.sql)) {
+    logWarn('market.db uses the legacy bars layout; run `python -m thelab.marketdb migrate` to convert it', {
+      module: 'marketStoreSqlite',
+      path: DB_PATH,
+    });
+  }
+};
+
 const getDb = () => {
   if (!Database) return null;
   if (dbInstance) return dbInstance;
@@ -24,26 +86,22 @@ const getDb = () => {
 
   const db = new Database(DB_PATH);
   db.pragma('journal_mode = WAL');
-  db.exec(`
-    CREATE TABLE IF NOT EXISTS bars (
-      asset TEXT NOT NULL,
-      timeframe TEXT NOT NULL,
-      time INTEGER NOT NULL,
-      open REAL NOT NULL,
-      high REAL NOT NULL,
-      low REAL NOT NULL,
-      close REAL NOT NULL,
-      volume REAL NOT NULL,
-      PRIMARY KEY (asset, timeframe, time)
-    );
-    CREATE INDEX IF NOT EXISTS idx_bars_asset_tf_time
-      ON bars(asset, timeframe, time);
-  `);
+  ensureSchema(db);
 
   dbInstance = db;
   return dbInstance;
 };
 
+// Incremental summary update: extends the range and adds the rows actually inserted.
+const SUMMARY_UPSERT = `
+  INSERT INTO bars_summary(asset, timeframe, start_time, end_time, bar_count)
+  VALUES (@asset, @timeframe, @start, @end, @count)
+  ON CONFLICT(asset, timeframe) DO UPDATE SET
+    start_time = min(coalesce(start_time, excluded.start_time), excluded.start_time),
+    end_time = max(coalesce(end_time, excluded.end_time), excluded.end_time),
+    bar_count = bar_count + excluded.bar_count
+`;
+
 const upsertBars = ({ asset, timeframe, candles }) => {
   const db = getDb();
   if (!db || !Array.isArray(candles) || !candles.length) return 0;
@@ -51,12 +109,17 @@ const upsertBars = ({ asset, timeframe, candles }) => {
   const stmt = db.prepare(
     'INSERT OR IGNORE INTO bars(asset, timeframe, time, open, high, low, close, volume) VALUES (@asset, @timeframe, @time, @open, @high, @low, @close, @volume)'
   );
+  const summary = db.prepare(SUMMARY_UPSERT);
   const insertMany = db.transaction((rows) => {
     let count = 0;
+    let start = Infinity;
+    let end = -Infinity;
     rows.forEach((row) => {
-      stmt.run(row);
-      count += 1;
+      count += stmt.run(row).changes;
+      if (row.time < start) start = row.time;
+      if (row.time > end) end = row.time;
     });
+    if (rows.length) summary.run({ asset, timeframe, start, end, count });
     return count;
   });
 
@@ -81,6 +144,19 @@ const upsertBars = ({ asset, timeframe, candles }) => {
   return insertMany(rows);
 };
 
+// Deletes the bars of `asset` (only `timeframe`, when given) together with their summary rows.
+const deleteBars = ({ asset, timeframe }) => {
+  const db = getDb();
+  if (!db) return 0;
+  const where = timeframe ? 'asset = ? AND timeframe = ?' : 'asset = ?';
+  const params = timeframe ? [asset, timeframe] : [asset];
+  return db.transaction(() => {
+    const { changes } = db.prepare(`DELETE FROM bars WHERE ${where}`).run(...params);
+    db.prepare(`DELETE FROM bars_summary WHERE ${where}`).run(...params);
+    return changes;
+  })();
+};
+
 const getWindowFromDb = ({ asset, timeframe, to, limit }) => {
   const db = getDb();
   if (!db) return null;
@@ -147,7 +223,7 @@ const getSummaryFromDb = ({ asset, timeframe }) => {
 
   const row = db
     .prepare(
-      'SELECT MIN(time) as start, MAX(time) as end, COUNT(*) as count FROM bars WHERE asset = ? AND timeframe = ?'
+      'SELECT start_time as start, end_time as end, bar_count as count FROM bars_summary WHERE asset = ? AND timeframe = ?'
     )
     .get(assetKey, tf);
 
@@ -164,8 +240,10 @@ const getSummaryFromDb = ({ asset, timeframe }) => {
 };
 
 module.exports = {
+  SCHEMA_VERSION,
   getDb,
   upsertBars,
+  deleteBars,
   getWindowFromDb,
   getSummaryFromDb,
 };
@@ -29,11 +29,30 @@ const buildWindow = (base, fromIndex, toIndex) => {
   };
 };
 
+// Ultimo indice com time <= targetEpoch (candles em ordem de tempo), ou -1.
+const lastIndexAtOrBefore = (candles, targetEpoch) => {
+  let lo = 0;
+  let hi = candles.length - 1;
+  let found = -1;
+  while (lo <= hi) {
+    const mid = (lo + hi) >> 1;
+    const c = candles[mid];
+    const t = toEpochMs(c.time || c.timestamp);
+    if (t !== null && t <= targetEpoch) {
+      found = mid;
+      lo = mid + 1;
+    } else {
+      hi = mid - 1;
+    }
+  }
+  return found;
+};
+
 const getWindow = ({ asset, timeframe, to, limit }) => {
   const fromDb = getWindowFromDb({ asset, timeframe, to, limit });
   if (fromDb) return fromDb;
 
-  const base = readCandles(asset, timeframe);
+  const base = readCandles(asset, timeframe, { to, limit });
   if (!base || !Array.isArray(base.candles) || !base.candles.length) return null;
 
   const all = base.candles;
@@ -42,14 +61,9 @@ const getWindow = ({ asset, timeframe, to, limit }) => {
   let endIndex = all.length - 1;
   const targetEpoch = toEpochMs(to);
   if (targetEpoch !== null) {
-    for (let i = all.length - 1; i >= 0; i -= 1) {
-      const c = all[i];
-      const t = toEpochMs(c.time || c.timestamp);
-      if (t !== null && t <= targetEpoch) {
-        endIndex = i;
-        break;
-      }
-    }
+    endIndex = lastIndexAtOrBefore(all, targetEpoch);
+    // Nenhum candle ate `to`: mesmo resultado do caminho SQLite.
+    if (endIndex < 0) return null;
   }
 
   const fromIndex = endIndex - (safeLimit - 1);
@@ -0,0 +1,329 @@
+const crypto = require('crypto');
+const os = require('os');
+const path = require('path');
+const readline = require('readline');
+const { spawn } = require('child_process');
+const { INDICATORS_DIR, ROOT_DIR, STRATEGIES_DIR } = require('../constants/paths');
+const { encodeCandleColumns, decodeSeriesMap } = require('./indicatorBinaryCodec');
+const { loadCandles, resolveStrategy, sampleEquity, DEFAULT_PARAMS } = require('./strategyBacktestService');
+const { logInfo, logError } = require('./logger');
+
+/**
+ * Otimizacao de parametros de estrategias (runner.py --optimize, thelab/optimize.py)
+ * e walk-forward (runner.py --walkforward, thelab/walkforward.py).
+ *
+ * Cada job varre um espaco de parametros (grid ou random) em um
+ * ProcessPoolExecutor no Python, com os candles em shared memory. O runner
+ * emite um evento NDJSON por avaliacao; aqui os resultados sao mantidos
+ * ordenados por score (maior = melhor) enquanto chegam, entao o ranking
+ * parcial pode ser consultado a qualquer momento.
+ *
+ * No walk-forward cada evento e um fold (parametros escolhidos no
+ * in-sample, metricas in/out-of-sample); ao final o runner envia a equity
+ * out-of-sample costurada, convertida aqui para pontos com tempo de candle.
+ *
+ * Limites: THELAB_OPTIMIZER_JOBS jobs simultaneos (padrao 1, os demais ficam
+ * em fila) e THELAB_OPTIMIZER_WORKERS processos por job (padrao: CPUs).
+ * Jobs ficam apenas em memoria, como os jobs Lean.
+ */
+
+const PYTHON_BIN = process.env.THELAB_PYTHON_PATH || 'python';
+const RUNNER_PATH = path.join(ROOT_DIR, 'indicator_runner', 'runner.py');
+const MAX_RANKED = 500;
+const STDERR_LINES = 50;
+
+const jobs = new Map();
+const queue = [];
+let activeJobs = 0;
+
+const positiveIntFromEnv = (name, fallback) => {
+  const value = Number(process.env[name]);
+  return Number.isInteger(value) && value > 0 ? value : fallback;
+};
+
+const maxActiveJobs = () => positiveIntFromEnv('THELAB_OPTIMIZER_JOBS', 1);
+const maxWorkers = () => positiveIntFromEnv('THELAB_OPTIMIZER_WORKERS', os.cpus().length || 1);
+
+const touch = (job) => {
+  job.updatedAt = Date.now();
+};
+
+// Binary insertion by descending score; unscored (null) results go last.
+const insertRanked = (ranked, entry) => {
+  const score = entry.score === null || entry.score === undefined ? -Infinity : entry.score;
+  let lo = 0;
+  let hi = ranked.length;
+  while (lo < hi) {
+    const mid = (lo + hi) >> 1;
+    const other = ranked[mid].score === null || ranked[mid].score === undefined ? -Infinity : ranked[mid].score;
+    if (other >= score) lo = mid + 1;
+    else hi = mid;
+  }
+  if (lo >= MAX_RANKED) return;
+  ranked.splice(lo, 0, entry);
+  if (ranked.length > MAX_RANKED) ranked.pop();
+};
+
+const summarizeJob = (job, { limit = 50 } = {}) => {
+  if (!job) return null;
+  const walkForward =
+    job.kind === 'walkforward'
+      ? {
+          folds: job.folds.slice(),
+          outOfSample: job.outOfSample,
+          stitchedFolds: job.stitchedFolds,
+          equityCurve: job.equityCurve,
+          cache: job.cache,
+        }
+      : {};
+  return {
+    id: job.id,
+    kind: job.kind,
+    status: job.status,
+    strategy: job.strategy,
+    asset: job.asset,
+    timeframe: job.timeframe,
+    objective: job.objective,
+    workers: job.workers,
+    progress: { ...job.progress },
+    best: job.ranked[0] || null,
+    results: job.ranked.slice(0, Math.max(0, limit)),
+    error: job.error,
+    firstFailure: job.firstFailure,
+    totalMs: job.totalMs,
+    createdAt: job.createdAt,
+    updatedAt: job.updatedAt,
+    ...walkForward,
+  };
+};
+
+const insertFold = (folds, fold) => {
+  let at = folds.length;
+  while (at > 0 && folds[at - 1].index > fold.index) at -= 1;
+  folds.splice(at, 0, fold);
+};
+
+const handleEvent = (job, event) => {
+  if (!event || typeof event !== 'object') return;
+  touch(job);
+  if (event.type === 'start') {
+    job.status = 'running';
+    job.progress.total = job.kind === 'walkforward' ? event.folds : event.total;
+    job.workers = event.workers;
+  } else if (event.type === 'fold') {
+    job.progress.completed += 1;
+    if (event.error) {
+      job.progress.failed += 1;
+      if (!job.firstFailure) job.firstFailure = { fold: event.index, error: event.error };
+    }
+    const { type, ...fold } = event;
+    insertFold(job.folds, fold);
+  } else if (event.type === 'result') {
+    job.progress.completed += 1;
+    if (event.error) {
+      job.progress.failed += 1;
+      if (!job.firstFailure) job.firstFailure = { params: event.params, error: event.error };
+      return;
+    }
+    insertRanked(job.ranked, { index: event.index, params: event.params, score: event.score, metrics: event.metrics });
+  } else if (event.type === 'done') {
+    job.status = event.cancelled ? 'cancelled' : 'completed';
+    job.totalMs = event.totalMs;
+    if (job.kind === 'walkforward') {
+      const series = decodeSeriesMap(event.series || {});
+      job.outOfSample = event.outOfSample;
+      job.stitchedFolds = event.stitchedFolds;
+      job.cache = event.cache;
+      job.equityCurve = sampleEquity(series.equity, job.candles, series.equityIndex);
+    }
+  } else if (event.type === 'error' || event.ok === false) {
+    job.status = 'error';
+    job.error = event.error || { type: 'OptimizeError', message: 'optimizer failed' };
+  }
+};
+
+const finish = (job) => {
+  activeJobs -= 1;
+  job.child = null;
+  job.candles = null;
+  logInfo('optimization finished', {
+    module: 'optimizer',
+    jobId: job.id,
+    kind: job.kind,
+    status: job.status,
+    completed: job.progress.completed,
+    total: job.progress.total,
+    totalMs: job.totalMs,
+  });
+  // eslint-disable-next-line no-use-before-define
+  pump();
+};
+
+const launch = (job, options) => {
+  activeJobs += 1;
+  job.status = 'running';
+  touch(job);
+
+  const candles = Array.isArray(options.candles) && options.candles.length ? options.candles : loadCandles(options);
+  const strategy = candles.length ? resolveStrategy(options) : null;
+  job.candles = candles;
+  if (!strategy) {
+    job.status = 'error';
+    job.error = candles.length
+      ? { type: 'NotFound', message: `strategy not found: ${options.strategyId}` }
+      : { type: 'NoData', message: `No cached candles for ${options.asset} ${options.timeframe}` };
+    finish(job);
+    return;
+  }
+
+  const pick = (key) =>
+    options[key] !== undefined && options[key] !== null && Number.isFinite(Number(options[key]))
+      ? Number(options[key])
+      : DEFAULT_PARAMS[key];
+  const payload = encodeCandleColumns(candles, {
+    space: options.space,
+    sampler: options.sampler || 'grid',
+    samples: options.samples,
+    seed: options.seed,
+    objective: job.objective,
+    maxWorkers: Math.min(Number(options.maxWorkers) > 0 ? Number(options.maxWorkers) : maxWorkers(), maxWorkers()),
+    mode: options.mode === 'vectorized' ? 'vectorized' : 'event',
+    workspace: STRATEGIES_DIR,
+    indicatorsWorkspace: INDICATORS_DIR,
+    cash: pick('cash'),
+    feeBps: pick('feeBps'),
+    slippageBps: pick('slippageBps'),
+    ...(job.kind === 'walkforward'
+      ? {
+          inSample: options.inSample,
+          outOfSample: options.outOfSample,
+          step: options.step,
+          anchored: Boolean(options.anchored),
+        }
+      : {}),
+  });
+
+  const child = spawn(PYTHON_BIN, [RUNNER_PATH, `--${job.kind}`, strategy.scriptPath], {
+    stdio: ['pipe', 'pipe', 'pipe'],
+  });
+  job.child = child;
+  const stderr = [];
+
+  readline.createInterface({ input: child.stdout }).on('line', (line) => {
+    if (!line.trim()) return;
+    try {
+      handleEvent(job, JSON.parse(line));
+    } catch (err) {
+      logError('failed to parse optimizer output', { module: 'optimizer', jobId: job.id, line });
+    }
+  });
+  readline.createInterface({ input: child.stderr }).on('line', (line) => {
+    stderr.push(line);
+    if (stderr.length > STDERR_LINES) stderr.shift();
+  });
+
+  let settled = false;
+  const settle = (fallbackError) => {
+    if (settled) return;
+    settled = true;
+    strategy.cleanup();
+    if (job.status === 'running' || job.status === 'queued') {
+      job.status = job.cancelRequested ? 'cancelled' : 'error';
+      if (!job.cancelRequested) job.error = fallbackError;
+    }
+    touch(job);
+    finish(job);
+  };
+
+  child.on('error', (err) => settle({ type: 'SpawnError', message: err.message }));
+  child.on('close', (code) =>
+    settle({
+      type: 'RunnerError',
+      message: `optimizer exited with code ${code} before finishing`,
+      stderr: stderr.join('\n'),
+    })
+  );
+  child.stdin.on('error', () => {});
+  child.stdin.end(payload);
+};
+
+const pump = () => {
+  while (activeJobs < maxActiveJobs() && queue.length) {
+    const { job, options } = queue.shift();
+    if (job.status === 'queued') launch(job, options);
+  }
+};
+
+const enqueue = (kind, options) => {
+  const createdAt = Date.now();
+  const job = {
+    id: crypto.randomUUID(),
+    kind,
+    status: 'queued',
+    strategy: options.strategyId || (options.code ? 'inline' : 'main'),
+    asset: options.asset,
+    timeframe: options.timeframe,
+    objective: options.objective || 'totalProfit',
+    workers: null,
+    progress: { completed: 0, failed: 0, total: null },
+    ranked: [],
+    folds: [],
+    outOfSample: null,
+    stitchedFolds: 0,
+    equityCurve: [],
+    cache: null,
+    candles: null,
+    error: null,
+    firstFailure: null,
+    totalMs: null,
+    createdAt,
+    updatedAt: createdAt,
+    child: null,
+    cancelRequested: false,
+  };
+  jobs.set(job.id, job);
+  queue.push({ job, options });
+  pump();
+  return summarizeJob(job);
+};
+
+/**
+ * Enfileira uma otimizacao e retorna o snapshot do job.
+ * options: { asset, timeframe, strategyId? | code?, candles?, space, sampler?, samples?, seed?,
+ *            objective?, maxWorkers?, mode?, startDate?, endDate?, cash?, feeBps?, slippageBps? }
+ */
+const startOptimization = (options = {}) => enqueue('optimize', options);
+
+/**
+ * Enfileira um walk-forward: as mesmas opcoes da otimizacao (o espaco e
+ * varrido no in-sample de cada fold) mais
+ * { inSample, outOfSample, step?, anchored? } em barras.
+ */
+const startWalkForward = (options = {}) => enqueue('walkforward', options);
+
+const getOptimization = (jobId, options) => summarizeJob(jobs.get(jobId), options);
+
+/**
+ * Cancela um job: remove da fila ou envia SIGTERM ao runner, que para de
+ * agendar avaliacoes, encerra os workers e reporta o ranking parcial.
+ */
+const cancelOptimization = (jobId) => {
+  const job = jobs.get(jobId);
+  if (!job) return null;
+  if (job.status === 'queued') {
+    job.status = 'cancelled';
+    touch(job);
+  } else if (job.status === 'running' && job.child) {
+    job.cancelRequested = true;
+    job.child.kill('SIGTERM');
+  }
+  return summarizeJob(job);
+};
+
+module.exports = {
+  startOptimization,
+  startWalkForward,
+  getOptimization,
+  cancelOptimization,
+  insertRanked,
+};
@@ -0,0 +1,174 @@
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const crypto = require('crypto');
+const { INDICATORS_DIR, STRATEGIES_DIR } = require('../constants/paths');
+const { getWindow } = require('./marketWindowService');
+const { decodeId } = require('./strategyFileService');
+const { encodeCandleColumns, decodeSeriesMap } = require('./indicatorBinaryCodec');
+const { runOneShot } = require('./indicatorExecutionService');
+const { logDebug } = require('./logger');
+
+/**
+ * Backtests nativos: executa `init(context)` / `handle_data(context, data)`
+ * de uma estrategia no engine Python em processo (runner.py --backtest,
+ * thelab/backtest.py), sem exportar CSV nem subir o Lean CLI.
+ *
+ * O resultado segue o mesmo formato BacktestResult do leanService, com
+ * source = 'native'.
+ */
+
+const DEFAULT_PARAMS = { cash: 100000, feeBps: 0.5, slippageBps: 1 };
+const DEFAULT_TIMEOUT_MS = 120000;
+const MAX_BARS = 5000000;
+// The chart only needs a few thousand points; drawdown is computed on every bar in Python.
+const MAX_EQUITY_POINTS = 5000;
+
+const toEpochMs = (value) => {
+  if (value === undefined || value === null || value === '') return null;
+  const t = typeof value === 'number' ? value : Date.parse(value);
+  return Number.isFinite(t) ? t : null;
+};
+
+const resolveStrategy = ({ strategyId, code }) => {
+  if (typeof code === 'string' && code.trim()) {
+    const tempPath = path.join(os.tmpdir(), `thelab-strategy-${crypto.randomUUID()}.py`);
+    fs.writeFileSync(tempPath, code, 'utf-8');
+    return { scriptPath: tempPath, cleanup: () => fs.rmSync(tempPath, { force: true }) };
+  }
+  const rel = decodeId(strategyId || 'main');
+  const scriptPath = path.join(STRATEGIES_DIR, rel.endsWith('.py') ? rel : `${rel}.py`);
+  if (!fs.existsSync(scriptPath)) return null;
+  return { scriptPath, cleanup: () => {} };
+};
+
+const loadCandles = ({ asset, timeframe, startDate, endDate }) => {
+  const window = getWindow({ asset, timeframe, to: endDate, limit: MAX_BARS });
+  const candles = window && Array.isArray(window.candles) ? window.candles : [];
+  const startEpoch = toEpochMs(startDate);
+  if (startEpoch === null) return candles;
+  let lo = 0;
+  let hi = candles.length;
+  while (lo < hi) {
+    const mid = (lo + hi) >> 1;
+    if (toEpochMs(candles[mid].time) < startEpoch) lo = mid + 1;
+    else hi = mid;
+  }
+  return lo ? candles.slice(lo) : candles;
+};
+
+// `barIndex` maps each value to its candle when the curve does not cover every bar (walk-forward).
+const sampleEquity = (values, candles, barIndex) => {
+  if (!values || !values.length) return [];
+  const step = Math.max(1, Math.ceil(values.length / MAX_EQUITY_POINTS));
+  const timeAt = (i) => candles[barIndex ? barIndex[i] : i].time;
+  const points = [];
+  for (let i = step - 1; i < values.length; i += step) {
+    points.push({ time: timeAt(i), value: values[i] });
+  }
+  const last = values.length - 1;
+  if ((last + 1) % step !== 0) points.push({ time: timeAt(last), value: values[last] });
+  return points;
+};
+
+/**
+ * Converte a resposta do runner (trades por indice de barra, curva de equity
+ * compactada) em BacktestResult com tempos dos candles.
+ */
+const toBacktestResult = (raw, candles) => {
+  const timeAt = (index) => (candles[index] ? candles[index].time : null);
+  const trades = (Array.isArray(raw.trades) ? raw.trades : []).map((trade) => ({
+    id: trade.id,
+    entryTime: timeAt(trade.entryIndex),
+    exitTime: timeAt(trade.exitIndex),
+    entryPrice: trade.entryPrice,
+    exitPrice: trade.exitPrice,
+    direction: trade.direction,
+    profit: trade.profit,
+    profitPercent: trade.profitPercent,
+    quantity: trade.quantity,
+  }));
+  const series = decodeSeriesMap(raw.series || {}, raw.attachment);
+  const stats = raw.stats || {};
+  return {
+    totalTrades: raw.totalTrades || 0,
+    winRate: raw.winRate || 0,
+    totalProfit: raw.totalProfit || 0,
+    drawdown: raw.drawdown || 0,
+    trades,
+    equityCurve: sampleEquity(series.equity, candles),
+    rawStatistics: {
+      Bars: stats.bars || 0,
+      Fills: stats.fills || 0,
+      'Open Position': stats.openPosition || 0,
+      'Final Equity': stats.finalEquity || 0,
+      'Execution Ms': raw.meta && Number.isFinite(raw.meta.executionMs) ? Math.round(raw.meta.executionMs) : 0,
+      Mode: (raw.meta && raw.meta.mode) || 'event',
+    },
+    metadata: raw.metadata || null,
+    source: 'native',
+  };
+};
+
+/**
+ * Executa um backtest nativo.
+ * options: { asset, timeframe, strategyId? | code?, startDate?, endDate?, cash?, feeBps?, slippageBps?, settings?, mode? }
+ * mode = 'vectorized' forca o caminho `signals(inputs, params)` quando a estrategia define os dois.
+ * Retorna { ok: true, result } ou { ok: false, error }.
+ */
+const runStrategyBacktest = async (options = {}) => {
+  const { asset, timeframe, startDate, endDate, settings } = options;
+  const candles = loadCandles({ asset, timeframe, startDate, endDate });
+  if (!candles.length) {
+    return { ok: false, error: { type: 'NoData', message: `No cached candles for ${asset} ${timeframe}` } };
+  }
+
+  const strategy = resolveStrategy(options);
+  if (!strategy) {
+    return { ok: false, error: { type: 'NotFound', message: `strategy not found: ${options.strategyId}` } };
+  }
+
+  const pick = (key) =>
+    options[key] !== undefined && options[key] !== null && Number.isFinite(Number(options[key]))
+      ? Number(options[key])
+      : DEFAULT_PARAMS[key];
+  const payload = encodeCandleColumns(candles, {
+    cash: pick('cash'),
+    feeBps: pick('feeBps'),
+    slippageBps: pick('slippageBps'),
+    settings: settings && typeof settings === 'object' ? settings : {},
+    workspace: STRATEGIES_DIR,
+    indicatorsWorkspace: INDICATORS_DIR,
+    mode: options.mode === 'vectorized' ? 'vectorized' : 'event',
+    output: 'packed',
+  });
+  const timeoutMs = Number(options.timeoutMs) > 0 ? Number(options.timeoutMs) : DEFAULT_TIMEOUT_MS;
+
+  try {
+    const started = Date.now();
+    const raw = await runOneShot(strategy.scriptPath, payload, timeoutMs, ['--backtest']);
+    if (!raw || raw.ok !== true) {
+      return { ok: false, error: (raw && raw.error) || { type: 'RunnerError', message: 'backtest failed' } };
+    }
+    logDebug('native backtest finished', {
+      module: 'strategyBacktest',
+      asset,
+      timeframe,
+      bars: candles.length,
+      trades: raw.totalTrades,
+      totalMs: Date.now() - started,
+    });
+    return { ok: true, result: toBacktestResult(raw, candles) };
+  } finally {
+    strategy.cleanup();
+  }
+};
+
+module.exports = {
+  DEFAULT_PARAMS,
+  loadCandles,
+  resolveStrategy,
+  runStrategyBacktest,
+  sampleEquity,
+  toBacktestResult,
+};
@@ -17,7 +17,8 @@ const toBucketStart = (timestamp, bucketMinutes) =>
 const convertTicksToMinuteCandles = (ticks, bucketMinutes = 1) => {
   if (!Array.isArray(ticks) || !ticks.length) return [];
 
-  const ordered = [...ticks].sort((a, b) => a.timestamp - b.timestamp);
+  const sorted = ticks.every((tick, i) => i === 0 || ticks[i - 1].timestamp <= tick.timestamp);
+  const ordered = sorted ? ticks : [...ticks].sort((a, b) => a.timestamp - b.timestamp);
   const candles = [];
   let bucketTime = null;
   let open = null;
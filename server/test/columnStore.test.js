@@ -0,0 +1,128 @@
+const assert = require('assert');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+
+const storeRoot = fs.mkdtempSync(path.join(os.tmpdir(), 'thelab-columns-'));
+process.env.THELAB_COLUMN_STORE_DIR = storeRoot;
+process.env.THELAB_INDICATOR_CACHE_MB = '0';
+const {
+  writeColumnStore,
+  readManifest,
+  resolveRange,
+  readStoredCandles,
+  storedCandleView,
+} = require('../src/services/columnStoreService');
+const { runIndicatorById, runIndicatorOnStore, getResultCacheStats } = require('../src/services/indicatorExecutionService');
+const { runPythonFixture } = require('./helpers/python');
+
+const start = Date.UTC(2024, 0, 1);
+const candles = Array.from({ length: 2000 }, (_, i) => {
+  const close = 100 + 5 * Math.sin(i / 30) + i / 100;
+  return {
+    time: new Date(start + i * 15 * 60000).toISOString(),
+    open: close - 0.25,
+    high: close + 0.5,
+    low: close - 0.5,
+    close,
+    volume: i,
+  };
+});
+// Out of order with one duplicate time: the store sorts and keeps the last bar.
+const shuffled = [...candles.slice(1000), ...candles.slice(0, 1000), { ...candles[10], close: 1 }];
+writeColumnStore({ asset: 'TEST', timeframe: 'M15', candles: shuffled });
+const stored = { ...candles[10], close: 1 };
+const manifest = readManifest('test', 'm15');
+assert.strictEqual(manifest.length, 2000);
+assert.strictEqual(manifest.start, start);
+assert.deepStrictEqual(readStoredCandles(manifest, { offset: 10, length: 1 }), [stored]);
+
+// The lazy view reads the same bars, one object per accessed index.
+const view = storedCandleView(manifest, { offset: 5, length: 100 }, ['close']);
+const eager = readStoredCandles(manifest, { offset: 5, length: 100 }, ['close']);
+assert.ok(Array.isArray(view));
+assert.strictEqual(view.length, 100);
+assert.deepStrictEqual(view[5], { time: stored.time, close: 1 });
+assert.strictEqual(view[5], view[5]);
+assert.strictEqual(view[100], undefined);
+assert.deepStrictEqual(view.map((candle) => candle), eager);
+
+// Ranges resolve identically in Node (binary search on disk) and thelab.store.select.
+const ranges = [
+  {},
+  { limit: 300 },
+  { from: candles[500].time, to: candles[899].time },
+  { from: new Date(start + 500 * 15 * 60000 + 1).toISOString(), limit: 50 },
+  { to: new Date(start - 1).toISOString() },
+];
+// Python also writes the same bars (reversed, so it has to sort too) as the PY store.
+const python = runPythonFixture('column_store_checks', [storeRoot, JSON.stringify(ranges)]);
+const summary = python.pop();
+assert.strictEqual(summary.close10, 1);
+assert.strictEqual(summary.volume, (1999 * 2000) / 2);
+ranges.forEach((range, i) => {
+  const node = resolveRange(manifest, range);
+  assert.deepStrictEqual(node, { offset: python[i].offset, length: python[i].length }, JSON.stringify(range));
+  if (python[i].length) assert.ok(python[i].memmap && !python[i].writeable, 'columns should be read-only memmaps');
+});
+assert.deepStrictEqual(resolveRange(manifest, ranges[2]), { offset: 500, length: 400 });
+assert.deepStrictEqual(resolveRange(manifest, ranges[3]), { offset: 1950, length: 50 });
+const pyManifest = readManifest('py', 'm15');
+assert.strictEqual(pyManifest.length, 2000);
+assert.deepStrictEqual(
+  readStoredCandles(pyManifest, { offset: 0, length: 2000 }),
+  readStoredCandles(manifest, { offset: 0, length: 2000 })
+);
+
+(async () => {
+  // A stored run matches the same run with the candles inline.
+  const onStore = await runIndicatorOnStore('ema_100.py', {
+    asset: 'TEST',
+    timeframe: 'M15',
+    from: candles[500].time,
+    to: candles[1499].time,
+    settings: { length: 20 },
+  });
+  assert.strictEqual(onStore.ok, true, JSON.stringify(onStore.error));
+  assert.deepStrictEqual(onStore.meta.source, {
+    asset: 'test',
+    timeframe: 'm15',
+    revision: manifest.revision,
+    offset: 500,
+    length: 1000,
+  });
+  const inline = await runIndicatorById('ema_100.py', candles.slice(500, 1500), { settings: { length: 20 } });
+  assert.deepStrictEqual(onStore.series.main, inline.series.main);
+  assert.strictEqual(onStore.series.main[0].time, candles[519].time);
+
+  // ema_100 has calculate_incremental: a stream run is cached apart from the plain one.
+  const window = candles.slice(500, 1500);
+  const streamed = await runIndicatorById('ema_100.py', window, { settings: { length: 20 }, asset: 'TEST', timeframe: 'M15' });
+  assert.strictEqual(streamed.meta.cache, undefined, 'stream run must not reuse the plain result');
+  assert.ok(streamed.meta.incremental, 'stream run goes through calculate_incremental');
+  const again = await runIndicatorById('ema_100.py', window, { settings: { length: 20 }, asset: 'TEST', timeframe: 'M15' });
+  assert.strictEqual(again.meta.cache, 'memory');
+  assert.strictEqual((await runIndicatorById('ema_100.py', window, { settings: { length: 20 } })).meta.cache, 'memory');
+
+  // The store is rewritten while the run is in flight: the runner reads the
+  // new revision, so the result must not be cached under the old one.
+  const entriesBefore = getResultCacheStats().memoryEntries;
+  const racing = runIndicatorOnStore('ema_100.py', { asset: 'TEST', timeframe: 'M15', settings: { length: 30 } });
+  const rewritten = writeColumnStore({ asset: 'TEST', timeframe: 'M15', candles });
+  const raced = await racing;
+  assert.strictEqual(raced.ok, true, JSON.stringify(raced.error));
+  assert.strictEqual(raced.meta.source.revision, rewritten.revision);
+  assert.notStrictEqual(rewritten.revision, manifest.revision);
+  assert.strictEqual(getResultCacheStats().memoryEntries, entriesBefore);
+
+  const missing = await runIndicatorOnStore('ema_100.py', { asset: 'NOPE', timeframe: 'M15' });
+  assert.strictEqual(missing.ok, false);
+  assert.strictEqual(missing.error.type, 'InputError');
+
+  fs.rmSync(storeRoot, { recursive: true, force: true });
+  console.log('columnStore tests passed');
+  process.exit(0);
+})().catch((err) => {
+  console.error(err);
+  process.exit(1);
+});
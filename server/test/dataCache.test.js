@@ -0,0 +1,130 @@
+const assert = require('assert');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+
+const workDir = fs.mkdtempSync(path.join(os.tmpdir(), 'thelab-datacache-'));
+process.env.THELAB_DATA_DIR = workDir;
+process.env.THELAB_MARKET_DB = path.join(workDir, 'market.db');
+
+const {
+  readCandles,
+  selectSegments,
+  segmentCacheStats,
+  clearSegmentCache,
+} = require('../src/services/dataCacheService');
+const { getWindow } = require('../src/services/marketWindowService');
+
+const HOUR = 3600 * 1000;
+const base = 'cl1!-h1';
+
+// Three yearly H1 segments in the importer's format (see candleWriter).
+const segments = [];
+const all = [];
+[2021, 2022, 2023].forEach((year) => {
+  const candles = [];
+  for (let t = Date.UTC(year, 0, 1); t < Date.UTC(year + 1, 0, 1); t += HOUR) {
+    if (new Date(t).getUTCDay() === 6) continue;
+    const close = 50 + Math.sin(t / (24 * HOUR)) * 5 + (year - 2021);
+    candles.push({ time: new Date(t).toISOString(), open: close - 0.1, high: close + 0.4, low: close - 0.4, close, volume: 1 });
+  }
+  const file = `${base}-${year}.json`;
+  fs.writeFileSync(path.join(workDir, file), JSON.stringify({ segment: year, candles }));
+  segments.push({ segment: year, file, start: candles[0].time, end: candles[candles.length - 1].time, count: candles.length });
+  all.push(...candles);
+});
+const metaPath = path.join(workDir, `${base}-meta.json`);
+fs.writeFileSync(
+  metaPath,
+  JSON.stringify({
+    asset: 'CL1!',
+    timeframe: 'H1',
+    range: { start: segments[0].start, end: segments[2].end },
+    totalCount: all.length,
+    segments,
+    lastUpdated: new Date().toISOString(),
+  })
+);
+
+// Segment selection from the meta alone.
+const years = (picked) => picked.map((segment) => segment.segment);
+assert.deepStrictEqual(years(selectSegments(segments)), [2021, 2022, 2023]);
+assert.deepStrictEqual(years(selectSegments(segments, { to: '2022-06-01T00:00:00Z' })), [2021, 2022]);
+assert.deepStrictEqual(years(selectSegments(segments, { from: '2022-06-01T00:00:00Z' })), [2022, 2023]);
+assert.deepStrictEqual(years(selectSegments(segments, { limit: 100 })), [2023]);
+assert.deepStrictEqual(years(selectSegments(segments, { limit: segments[2].count + 1 })), [2022, 2023]);
+// The segment containing `to` is cut by it, so it never counts toward `limit`.
+assert.deepStrictEqual(years(selectSegments(segments, { to: '2022-06-01T00:00:00Z', limit: 10 })), [2021, 2022]);
+assert.deepStrictEqual(years(selectSegments(segments, { to: '2020-06-01T00:00:00Z' })), []);
+
+// Full read: same candles as the segments, range from the meta, one parse per segment.
+clearSegmentCache();
+const full = readCandles('CL1!', 'H1');
+assert.strictEqual(full.candles.length, all.length);
+assert.deepStrictEqual(full.candles[1234], all[1234]);
+assert.deepStrictEqual(full.range, { start: segments[0].start, end: segments[2].end });
+assert.strictEqual(segmentCacheStats().misses, 3);
+
+// Cached segments are reused; pruned reads only touch the years they need.
+readCandles('CL1!', 'H1');
+assert.strictEqual(segmentCacheStats().misses, 3);
+assert.strictEqual(segmentCacheStats().hits, 3);
+clearSegmentCache();
+const tail = readCandles('CL1!', 'H1', { limit: 500 });
+assert.strictEqual(tail.candles.length, segments[2].count);
+assert.deepStrictEqual(tail.range, { start: segments[2].start, end: segments[2].end });
+assert.strictEqual(segmentCacheStats().misses, 1);
+assert.strictEqual(readCandles('CL1!', 'H1', { to: '2019-01-01T00:00:00Z' }), null);
+
+// Callers get their own array: trimming it does not touch the cache.
+tail.candles.length = 0;
+assert.strictEqual(readCandles('CL1!', 'H1', { limit: 1 }).candles.length, segments[2].count);
+
+// A rewritten segment file is parsed again.
+const lastFile = path.join(workDir, segments[2].file);
+const rewritten = JSON.parse(fs.readFileSync(lastFile, 'utf-8'));
+rewritten.candles[rewritten.candles.length - 1].close = 999;
+fs.writeFileSync(lastFile, JSON.stringify(rewritten));
+const future = new Date(Date.now() + 60 * 1000);
+fs.utimesSync(lastFile, future, future);
+const missesBefore = segmentCacheStats().misses;
+const refreshed = readCandles('CL1!', 'H1', { limit: 1 });
+assert.strictEqual(refreshed.candles[refreshed.candles.length - 1].close, 999);
+assert.strictEqual(segmentCacheStats().misses, missesBefore + 1);
+all[all.length - 1] = rewritten.candles[rewritten.candles.length - 1];
+
+// getWindow matches a linear scan over the whole dataset.
+const linearWindow = (to, limit) => {
+  const target = to ? new Date(to).getTime() : null;
+  let endIndex = all.length - 1;
+  if (target !== null) {
+    endIndex = -1;
+    for (let i = all.length - 1; i >= 0; i -= 1) {
+      if (Date.parse(all[i].time) <= target) {
+        endIndex = i;
+        break;
+      }
+    }
+  }
+  if (endIndex < 0) return null;
+  return all.slice(Math.max(0, endIndex - limit + 1), endIndex + 1);
+};
+
+[
+  [undefined, 300],
+  ['2023-03-15T12:30:00Z', 500],
+  ['2022-01-01T00:00:00Z', 50],
+  ['2022-01-01T05:00:00Z', 2000],
+  [all[0].time, 10],
+  ['2030-01-01T00:00:00Z', 100],
+  ['2021-01-01T00:00:00Z', 100],
+].forEach(([to, limit]) => {
+  const window = getWindow({ asset: 'CL1!', timeframe: 'H1', to, limit });
+  const expected = linearWindow(to, limit);
+  assert.deepStrictEqual(window.candles, expected, `window to=${to} limit=${limit}`);
+  assert.deepStrictEqual(window.range, { start: expected[0].time, end: expected[expected.length - 1].time });
+});
+assert.strictEqual(getWindow({ asset: 'CL1!', timeframe: 'H1', to: '2020-12-31T00:00:00Z', limit: 10 }), null);
+
+fs.rmSync(workDir, { recursive: true, force: true });
+console.log('dataCache tests passed');
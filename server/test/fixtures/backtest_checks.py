@@ -0,0 +1,118 @@
+"""Fill rules and accounting of thelab.backtest against hand-computed values.
+
+Prints the list of failures as JSON (run by test/helpers/python.js).
+"""
+
+import json, types
+import numpy as np
+from thelab import backtest, vectorized
+
+failures = []
+def close_to(name, got, want, tol=1e-9):
+    if abs(got - want) > tol * max(1.0, abs(want)):
+        failures.append(f"{name}: got {got!r}, want {want!r}")
+
+def script(**plan):
+    # plan: bar index -> order list returned from handle_data on that bar
+    return types.SimpleNamespace(handle_data=lambda context, data: plan.get(f"b{data.index}"))
+
+bars = {
+    "open":  np.array([100.0, 101.0, 102.0, 104.0, 103.0, 99.0]),
+    "high":  np.array([101.0, 103.0, 105.0, 106.0, 104.0, 100.0]),
+    "low":   np.array([ 99.0, 100.0, 101.0, 103.0,  98.0,  97.0]),
+    "close": np.array([100.5, 102.0, 104.0, 105.0,  99.0,  98.0]),
+}
+
+# Market round trip: fills at the next open, slippage against the order, fee on both legs.
+r = backtest.run(script(b0=[{"side": "buy", "quantity": 2}], b2=[{"side": "sell", "quantity": 2}]),
+                 bars, cash=1000.0, fee_bps=10.0, slippage_bps=100.0)
+entry, exit_ = 101.0 * 1.01, 104.0 * 0.99
+fees = 2 * entry * 0.001 + 2 * exit_ * 0.001
+(trade,) = r["trades"]
+close_to("entry", trade["entryPrice"], entry)
+close_to("exit", trade["exitPrice"], exit_)
+close_to("profit", trade["profit"], 2 * (exit_ - entry) - fees)
+close_to("totalProfit", r["totalProfit"], trade["profit"])
+if (trade["entryIndex"], trade["exitIndex"], trade["direction"]) != (1, 3, "long"):
+    failures.append(f"trade bars {trade}")
+close_to("equity on fill bar", float(r["equity"][1]), 1000.0 - 2 * entry - 2 * entry * 0.001 + 2 * 102.0)
+
+# Limit buys fill at the better open on a gap; stops fill at the worse open plus slippage.
+r = backtest.run(script(b3=[{"side": "buy", "quantity": 1, "type": "limit", "price": 100.0}],
+                        b4=[{"side": "sell", "quantity": 1, "type": "stop", "price": 101.0}]),
+                 bars, fee_bps=0.0, slippage_bps=100.0)
+(trade,) = r["trades"]
+close_to("limit fill", trade["entryPrice"], 100.0)
+close_to("stop gap fill", trade["exitPrice"], 99.0 * 0.99)
+
+# Untouched limit orders keep working; target orders reverse and split into trades.
+r = backtest.run(script(b0=[{"type": "limit", "price": 50.0, "quantity": 1}]), bars)
+if r["stats"]["workingOrders"] != 1 or r["trades"]:
+    failures.append("unfilled limit order should stay working")
+r = backtest.run(script(b0=[{"target": 3}], b1=[{"target": -1}], b3=[{"target": 0}]), bars, fee_bps=0.0, slippage_bps=0.0)
+sides = [(t["direction"], t["quantity"], t["entryIndex"], t["exitIndex"]) for t in r["trades"]]
+if sides != [("long", 3.0, 1, 2), ("short", 1.0, 2, 4)]:
+    failures.append(f"reversal trades {sides}")
+
+# A run that ends flat realizes all of its P&L in trades, fees included.
+rng = np.random.default_rng(5)
+n = 5000
+close = 100 + np.cumsum(rng.normal(size=n))
+opens = np.r_[close[0], close[:-1]]
+noisy = {"open": opens, "high": np.maximum(opens, close) + 0.3, "low": np.minimum(opens, close) - 0.3, "close": close}
+signals = rng.integers(-2, 3, size=n)
+def handle(context, data):
+    if data.index == n - 2:
+        context.order_target(0)
+    elif data.index % 7 == 0:
+        context.order_target(float(signals[data.index]))
+r = backtest.run(types.SimpleNamespace(handle_data=handle), noisy, fee_bps=1.0, slippage_bps=2.0)
+if r["stats"]["openPosition"] != 0:
+    failures.append("run should end flat")
+close_to("realized", sum(t["profit"] for t in r["trades"]), r["totalProfit"], 1e-9)
+peak = np.maximum.accumulate(r["equity"])
+close_to("drawdown", r["drawdown"], float(((peak - r["equity"]) / peak).max()))
+if not 0 < r["winRate"] < 1:
+    failures.append("winRate should be a fraction")
+
+# Signal arrays give the same trades and equity as the equivalent event-driven strategy.
+above = np.r_[False, np.diff(close) > 0] & (rng.random(n) > 0.3)
+entries, exits = above, rng.random(n) > 0.8
+for kwargs in ({"entries": entries, "exits": exits}, {"entries": entries, "short_entries": exits}, {"target": signals}):
+    fast = vectorized.run_signals(noisy, size=2.0, fee_bps=1.0, slippage_bps=2.0, **kwargs)
+    if "target" in kwargs:
+        wanted = np.sign(signals)
+    else:
+        wanted = vectorized._directions(entries, kwargs.get("exits", np.zeros(n, bool)), kwargs.get("short_entries", np.zeros(n, bool)), np.zeros(n, bool))
+    slow = backtest.run(types.SimpleNamespace(handle_data=lambda context, data: context.order_target(2.0 * wanted[data.index])),
+                        noisy, fee_bps=1.0, slippage_bps=2.0)
+    tag = "vectorized " + ",".join(kwargs)
+    if [(t["entryIndex"], t["exitIndex"], t["direction"]) for t in fast["trades"]] != [(t["entryIndex"], t["exitIndex"], t["direction"]) for t in slow["trades"]]:
+        failures.append(tag + ": trades differ")
+    close_to(tag + " equity", float(np.max(np.abs(fast["equity"] - slow["equity"]))), 0.0, 1e-9)
+    close_to(tag + " drawdown", fast["drawdown"], slow["drawdown"])
+
+# Same-bar conflicts: entry beats its own exit, opposite entries cancel; fill="close" trades the signal bar.
+flags = lambda *bars: np.isin(np.arange(6), bars)
+r = vectorized.run_signals(bars, entries=flags(0, 3), exits=flags(0, 2), short_entries=flags(3), fill="close")
+if [(t["entryIndex"], t["exitIndex"]) for t in r["trades"]] != [(0, 2)] or r["stats"]["openPosition"] != 0:
+    failures.append(f"signal conflicts {r['trades']}")
+
+# Percent sizing compounds: each trade is sized from the equity left by the previous ones.
+r = vectorized.run_signals(bars, target=np.array([1, 0, 1, 0, 0, 0]), size=0.5, size_type="percent",
+                           cash=1000.0, fee_bps=10.0, slippage_bps=0.0)
+first, second = r["trades"]
+close_to("percent first size", first["quantity"], 0.5 * 1000.0 / 101.0)
+close_to("percent second size", second["quantity"], 0.5 * (1000.0 + first["profit"]) / 104.0)
+close_to("percent total", r["totalProfit"], first["profit"] + second["profit"])
+
+# Windows are read-only views.
+def mutate(context, data):
+    data.close[-1] = 0.0
+try:
+    backtest.run(types.SimpleNamespace(handle_data=mutate), bars)
+    failures.append("bar windows should be read-only")
+except ValueError:
+    pass
+
+print(json.dumps(failures))
@@ -0,0 +1,23 @@
+"""Ranges resolved by thelab.store.select, for comparison with the Node store.
+
+Usage: column_store_checks.py STORE_ROOT RANGES_JSON
+
+Prints one entry per range, then a summary of the stored columns, as JSON.
+Also writes the same bars (reversed) as the PY/M15 store.
+"""
+
+import json, sys
+import numpy as np
+from thelab import store
+root, ranges = sys.argv[1], json.loads(sys.argv[2])
+columns, manifest = store.open_columns(root, "TEST", "M15")
+out = []
+for r in ranges:
+    views, offset = store.select(columns, start=r.get("from"), end=r.get("to"), limit=r.get("limit"))
+    out.append({"offset": offset, "length": len(views["close"]),
+                "memmap": isinstance(views["close"].base, np.memmap) or isinstance(views["close"], np.memmap),
+                "writeable": bool(views["close"].flags.writeable)})
+out.append({"close10": float(columns["close"][10]), "volume": float(np.sum(columns["volume"]))})
+# Python writes the same layout (reversed input, so it has to sort too).
+store.write_columns(root, "PY", "M15", {name: values[::-1] for name, values in columns.items()})
+print(json.dumps(out))
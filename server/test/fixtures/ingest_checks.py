@@ -0,0 +1,26 @@
+"""SQLite rows and chunked parsing of thelab.ingest against the column store.
+
+Usage: ingest_checks.py DB STORE_ROOT CSV
+
+Prints the list of failures as JSON (run by test/helpers/python.js).
+"""
+
+import json, sqlite3, sys
+import numpy as np
+from thelab import ingest, store
+db, root, csv = sys.argv[1:4]
+failures = []
+con = sqlite3.connect(db)
+for tf in ("M1", "M5", "H4", "D1"):
+    rows = np.array(con.execute("SELECT time, open, high, low, close, volume FROM bars WHERE asset = 'CL1!' AND timeframe = ? ORDER BY time", (tf,)).fetchall())
+    bars = store.load(root, "cl1!", tf)
+    if rows.shape[0] != bars["time"].size or not np.array_equal(rows[:, 0].astype(np.int64), bars["time"]) or not np.array_equal(rows[:, 4], bars["close"]):
+        failures.append(f"sqlite {tf} differs from the store")
+if con.execute("SELECT COUNT(*) FROM bars WHERE timeframe = 'D7'").fetchone()[0]:
+    failures.append("D7 loaded into sqlite")
+whole = ingest._load_file(csv, -360, 1 << 30)
+small = ingest._load_file(csv, -360, 997)
+for name in whole:
+    if not np.array_equal(whole[name], small[name]):
+        failures.append(f"chunked parse differs on {name}")
+print(json.dumps(failures))
@@ -0,0 +1,43 @@
+"""Windows, multi-asset fetches and read-only connections of thelab.marketdb.
+
+Usage: marketdb_checks.py DB (seeded by marketdb_seed.py)
+
+Prints the list of failures as JSON (run by test/helpers/python.js).
+"""
+
+import json, sqlite3, sys
+import numpy as np
+from thelab import marketdb
+db = sys.argv[1]
+failures = []
+t0 = 1_704_067_200_000
+full = marketdb.window("cl1!", "m1", db_path=db)
+if full["time"].size != 5000 or full["time"].dtype != np.int64 or not np.all(np.diff(full["time"]) > 0):
+    failures.append("full window")
+if not full["close"].flags["C_CONTIGUOUS"] or full["close"].dtype != np.float64:
+    failures.append("columns are not contiguous float64")
+last = marketdb.window("CL1!", "M1", limit=300, db_path=db)
+if last["time"].tolist() != full["time"][-300:].tolist():
+    failures.append("limit keeps the last bars")
+iso = marketdb.window("CL1!", "M1", start="2024-01-01T01:00:00.000Z", end=t0 + 120 * 60_000, limit=10, db_path=db)
+if iso["time"].tolist() != full["time"][111:121].tolist():
+    failures.append(f"from/to/limit window {iso['time'][:2]}")
+if marketdb.window("CL1!", "H4", db_path=db)["time"].size != 0:
+    failures.append("missing timeframe is not empty")
+many = marketdb.windows(["CL1!", "ES1!"], "M1", limit=50, db_path=db)
+if sorted(many) != ["CL1!", "ES1!"] or many["ES1!"]["close"][0] - many["CL1!"]["close"][0] != 4000:
+    failures.append("multi-asset fetch")
+connection = marketdb.connect(db)
+try:
+    connection.execute("DELETE FROM bars")
+    failures.append("connection is writable")
+except sqlite3.OperationalError:
+    pass
+if connection.execute("PRAGMA journal_mode").fetchone()[0] != "wal":
+    failures.append("database is not in WAL mode")
+try:
+    marketdb.connect(db + ".missing")
+    failures.append("missing database opened")
+except FileNotFoundError:
+    pass
+print(json.dumps(failures))
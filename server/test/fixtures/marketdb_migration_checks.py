@@ -0,0 +1,58 @@
+"""Legacy layout (rowid table + secondary index) -> clustered, in place.
+
+Usage: marketdb_migration_checks.py LEGACY_DB BENCH_OUT
+
+Prints the list of failures as JSON (run by test/helpers/python.js).
+"""
+
+import json, sqlite3, subprocess, sys
+import numpy as np
+from thelab import ingest, marketdb
+legacy, bench_out = sys.argv[1:3]
+failures = []
+con = sqlite3.connect(legacy)
+con.executescript(marketdb.LEGACY_SCHEMA)
+rows = [(a, tf, 1_000_000 + i * 60_000, 1.0 + i, 2.0 + i, 0.5 + i, 1.5 + i, float(i)) for a in ("CL1!", "ES1!") for tf in ("M1", "H1") for i in range(700)]
+con.executemany("INSERT INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+con.commit()
+if marketdb.layout_version(con) != 1:
+    failures.append("legacy layout not detected")
+con.close()
+# Readers work on the legacy layout before any migration.
+before = marketdb.window("ES1!", "H1", limit=100, db_path=legacy)
+if marketdb.summary("ES1!", "H1", db_path=legacy) != {"start": 1_000_000, "end": 1_000_000 + 699 * 60_000, "count": 700}:
+    failures.append("summary on the legacy layout")
+run = subprocess.run([sys.executable, "-m", "thelab.marketdb", "migrate", "--db", legacy], capture_output=True, text=True)
+if run.returncode != 0 or "migrated 2800 bars" not in run.stdout:
+    failures.append(f"migrate: {run.stdout} {run.stderr}")
+con = sqlite3.connect(legacy)
+if marketdb.layout_version(con) != 2 or con.execute("PRAGMA user_version").fetchone()[0] != 2:
+    failures.append("not migrated")
+if con.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' AND name = 'idx_bars_asset_tf_time'").fetchone()[0]:
+    failures.append("secondary index survived the migration")
+if sorted(con.execute("SELECT * FROM bars").fetchall()) != sorted(rows):
+    failures.append("rows changed by the migration")
+if con.execute("SELECT * FROM bars_summary ORDER BY asset, timeframe").fetchall() != [(a, tf, 1_000_000, 1_000_000 + 699 * 60_000, 700) for a in ("CL1!", "ES1!") for tf in ("H1", "M1")]:
+    failures.append("summary not rebuilt")
+con.close()
+after = marketdb.window("ES1!", "H1", limit=100, db_path=legacy)
+if any(not np.array_equal(before[k], after[k]) for k in before):
+    failures.append("window differs after the migration")
+run = subprocess.run([sys.executable, "-m", "thelab.marketdb", "migrate", "--db", legacy], capture_output=True, text=True)
+if "already on schema 2" not in run.stdout:
+    failures.append("second migrate is not a no-op")
+# Ingest keeps bars_summary exact when it replaces a timeframe.
+ingest.write_sqlite(legacy, "CL1!", {"M1": {"time": np.array([5, 6, 7], dtype=np.int64), **{k: np.ones(3) for k in ("open", "high", "low", "close", "volume")}}})
+if marketdb.summary("CL1!", "M1", db_path=legacy) != {"start": 5, "end": 7, "count": 3}:
+    failures.append("ingest summary")
+run = subprocess.run([sys.executable, "-m", "thelab.marketdb", "bench", "--rows", "20000", "--queries", "5", "--window", "100", "--out", bench_out], capture_output=True, text=True)
+if run.returncode != 0:
+    failures.append(f"bench: {run.stderr}")
+else:
+    result = json.load(open(bench_out))
+    clustered, legacy_layout = result["layouts"]["clustered"], result["layouts"]["legacy"]
+    if "PRIMARY KEY" not in clustered["windowPlan"] or "idx_bars_asset_tf_time" not in legacy_layout["windowPlan"]:
+        failures.append(f"plans {clustered['windowPlan']} / {legacy_layout['windowPlan']}")
+    if clustered["bytes"] >= legacy_layout["bytes"]:
+        failures.append("clustered database is not smaller")
+print(json.dumps(failures))
@@ -0,0 +1,18 @@
+"""Two assets in the bars table, written the way thelab.ingest loads them.
+
+Usage: marketdb_seed.py DB
+
+Prints an empty JSON list.
+"""
+
+import sys
+import numpy as np
+from thelab import ingest
+n = 5000
+t = 1_704_067_200_000 + np.arange(n, dtype=np.int64) * 60_000
+def bars(shift):
+    close = 100 + shift + np.sin(np.arange(n) / 50)
+    return {"time": t, "open": close - 0.1, "high": close + 0.5, "low": close - 0.5, "close": close, "volume": np.arange(n) * 1.0}
+ingest.write_sqlite(sys.argv[1], "CL1!", {"M1": bars(0), "M5": bars(5)})
+ingest.write_sqlite(sys.argv[1], "ES1!", {"M1": bars(4000)})
+print("[]")
@@ -0,0 +1,58 @@
+"""Space sampling, scoring and the shared-memory pool of thelab.optimize.
+
+Prints the list of failures as JSON (run by test/helpers/python.js).
+"""
+
+import glob, json, os, tempfile
+import numpy as np
+from thelab import optimize
+
+failures = []
+
+total, grid = optimize.sample_space({"fast": [3, 5], "slow": {"min": 10, "max": 30, "step": 10}, "size": 2})
+grid = list(grid)
+if total != 6 or len(grid) != 6 or grid[0] != {"fast": 3, "slow": 10, "size": 2} or grid[-1] != {"fast": 5, "slow": 30, "size": 2}:
+    failures.append(f"grid {total} {grid}")
+_, draws = optimize.sample_space({"fast": {"min": 2, "max": 9}, "k": {"min": 0.5, "max": 1.5}}, "random", samples=50, seed=3)
+draws = list(draws)
+if not all(isinstance(d["fast"], int) and 2 <= d["fast"] <= 9 and 0.5 <= d["k"] <= 1.5 for d in draws):
+    failures.append("random draws out of bounds")
+if draws != list(optimize.sample_space({"fast": {"min": 2, "max": 9}, "k": {"min": 0.5, "max": 1.5}}, "random", samples=50, seed=3)[1]):
+    failures.append("random sampler should be reproducible with a seed")
+
+path = os.path.join(tempfile.mkdtemp(), "cross.py")
+with open(path, "w") as handle:
+    handle.write(
+        "import numpy as np\n"
+        "from thelab import ta\n"
+        "def signals(inputs, params):\n"
+        "    if params['fast'] >= params['slow']:\n"
+        "        raise ValueError('fast must be below slow')\n"
+        "    fast = ta.sma(inputs['close'], params['fast'])\n"
+        "    slow = ta.sma(inputs['close'], params['slow'])\n"
+        "    return {'target': np.where(np.isnan(slow), 0, np.where(fast > slow, 1, -1))}\n"
+    )
+rng = np.random.default_rng(11)
+close = 100 + np.cumsum(rng.normal(size=3000))
+inputs = {"time": np.arange(3000, dtype=np.int64) * 60000, "open": np.r_[close[0], close[:-1]], "close": close}
+space = {"fast": [3, 5, 8, 40], "slow": [20, 30]}
+
+runs = {}
+for workers in (1, 2):
+    events = []
+    os.environ["THELAB_OPTIMIZER_WORKERS"] = str(workers)
+    done = optimize.optimize(path, inputs, space, objective="sharpe", emit=events.append)
+    runs[workers] = {e["index"]: e for e in events if e["type"] == "result"}
+    if events[0]["type"] != "start" or events[-1] is not done or done["workers"] != workers:
+        failures.append(f"event framing with {workers} workers")
+    if done["completed"] != 8 or done["failed"] != 2:
+        failures.append(f"counts with {workers} workers: {done}")
+if {i: r.get("score") for i, r in runs[1].items()} != {i: r.get("score") for i, r in runs[2].items()}:
+    failures.append("pool scores differ from inline scores")
+best = max((r for r in runs[2].values() if "score" in r), key=lambda r: r["score"])
+if done["best"]["params"] != best["params"]:
+    failures.append("best should be the highest score")
+if glob.glob("/dev/shm/psm_*"):
+    failures.append("shared memory block should be unlinked")
+
+print(json.dumps(failures))
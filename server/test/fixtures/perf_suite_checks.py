@@ -0,0 +1,64 @@
+"""thelab.perfsuite: datasets, bar chaining, baselines and a small run of every stage.
+
+Prints the list of failures as JSON (run by test/helpers/python.js).
+"""
+
+import json, os, tempfile
+import numpy as np
+from thelab import perfsuite
+
+failures = []
+
+for regime in ("trending", "ranging", "gaps"):
+    a, b = perfsuite.synthetic(2000, regime, seed=3), perfsuite.synthetic(2000, regime, seed=3)
+    if any(not np.array_equal(a[k], b[k]) for k in a):
+        failures.append(f"{regime}: same seed should give the same bars")
+    if np.any(a["high"] < np.maximum(a["open"], a["close"])) or np.any(a["low"] > np.minimum(a["open"], a["close"])):
+        failures.append(f"{regime}: high/low must bound open/close")
+gaps = perfsuite.synthetic(2000, "gaps")
+if np.mean(gaps["open"][1:] != gaps["close"][:-1]) < 0.2:
+    failures.append("gaps regime should open away from the previous close")
+
+workdir = tempfile.mkdtemp()
+csv = os.path.join(workdir, "bars.csv")
+with open(csv, "w") as handle:
+    for i in range(10):
+        handle.write(f"01/01/2000;00:00:00;{10 + i};{11 + i};{9 + i};{10.5 + i};1\n")
+bars, source = perfsuite.load_recorded(25, data_dir=workdir, csv_path=csv)
+if source != "bars.csv" or bars["close"].size != 25:
+    failures.append(f"recorded bars {source}")
+# Copies are shifted so each one opens where the previous one closed.
+if bars["open"][10] != bars["close"][9] or bars["open"][20] != bars["close"][19]:
+    failures.append("chained copies should continue from the previous close")
+if perfsuite.load_recorded(25, data_dir=workdir, csv_path=None) != (None, None):
+    failures.append("missing recording should return (None, None)")
+
+baseline = {"results": [
+    {"dataset": "trending", "bars": 1000, "stage": "a", "wallMs": 10.0, "peakBytes": 1000},
+    {"dataset": "trending", "bars": 1000, "stage": "b", "wallMs": 1.0, "peakBytes": 1000},
+]}
+current = {"results": [
+    {"dataset": "trending", "bars": 1000, "stage": "a", "wallMs": 14.0, "peakBytes": 1100},
+    {"dataset": "trending", "bars": 1000, "stage": "b", "wallMs": 2.5, "peakBytes": 2000},
+    {"dataset": "trending", "bars": 1000, "stage": "new", "wallMs": 99.0, "peakBytes": 1},
+]}
+flagged = [(r["stage"], r["metric"]) for r in perfsuite.compare(baseline, current, threshold=0.25, min_ms=2.0)]
+# "a" is 40% slower; "b" is slower by less than min_ms but doubles its memory.
+if flagged != [("a", "wallMs"), ("b", "peakBytes")]:
+    failures.append(f"compare flagged {flagged}")
+
+suite = perfsuite.run_suite(sizes=[500], datasets=["trending"], repeat=1)
+stages = [row["stage"] for row in suite["results"]]
+expected = ["ema_100.calculate", "market_structure.swings", "market_structure.breaks", "market_structure.levels",
+            "market_structure.enrich", "market_structure.calculate", "runner.ema_100", "runner.market_structure"]
+if stages != expected:
+    failures.append(f"stages {stages}")
+if not all(row["wallMs"] > 0 and row["peakBytes"] > 0 for row in suite["results"]):
+    failures.append("every stage should report wall time and peak memory")
+if "execute" not in suite["results"][-1]["phases"]:
+    failures.append("runner stages should carry the runner's phases")
+if perfsuite.compare(suite, suite):
+    failures.append("a run should not regress against itself")
+json.loads(json.dumps(suite))
+
+print(json.dumps(failures))
@@ -0,0 +1,63 @@
+"""Session-anchored frames (D1, W1, MN) and resample targets of thelab.resample.
+
+Usage: resample_checks.py STORE_ROOT
+
+Prints the list of failures as JSON (run by test/helpers/python.js).
+"""
+
+import json, sys
+import numpy as np
+from thelab import resample, store
+root = sys.argv[1]
+m1 = store.load(root, "TEST", "M1")
+failures = []
+def iso(ms):
+    return str(np.datetime64(int(ms), "ms"))
+for code in ("D1", "W1", "MN"):
+    bars = store.load(root, "TEST", code)
+    starts = resample.bucket_starts(m1["time"], code, "cme")
+    if sorted(set(starts.tolist())) != bars["time"].tolist():
+        failures.append(f"{code}: bucket starts differ from the stored bars")
+    for i, t in enumerate(bars["time"].tolist()):
+        mask = starts == t
+        if not np.isclose(bars["high"][i], m1["high"][mask].max()) or not np.isclose(bars["low"][i], m1["low"][mask].min()):
+            failures.append(f"{code} {iso(t)}: high/low")
+        if bars["open"][i] != m1["open"][mask][0] or bars["close"][i] != m1["close"][mask][-1]:
+            failures.append(f"{code} {iso(t)}: open/close")
+        if not np.isclose(bars["volume"][i], m1["volume"][mask].sum()):
+            failures.append(f"{code} {iso(t)}: volume")
+daily = store.load(root, "TEST", "D1")["time"]
+if any(iso(t)[11:16] != "23:00" for t in daily.tolist()):
+    failures.append("D1 bars are not stamped at the 23:00 UTC session open")
+weekly = store.load(root, "TEST", "W1")["time"]
+if iso(weekly[1]) != "2024-02-04T23:00:00.000":
+    failures.append(f"second W1 bar starts at {iso(weekly[1])}")
+monthly = store.load(root, "TEST", "MN")["time"]
+if [iso(t) for t in monthly.tolist()] != ["2023-12-31T23:00:00.000", "2024-01-31T23:00:00.000", "2024-02-29T23:00:00.000"]:
+    failures.append(f"MN starts {[iso(t) for t in monthly.tolist()]}")
+if iso(resample.bucket_starts([np.datetime64("2024-01-31T23:30", "ms").astype(np.int64)], "MN", "cme")[0]) != "2024-01-31T23:00:00.000":
+    failures.append("MN bucket of a bar after the January 31 session open")
+try:
+    resample.resample({"time": [2, 1], "open": [1, 1], "high": [1, 1], "low": [1, 1], "close": [1, 1]}, "M5")
+    failures.append("unsorted bars accepted")
+except ValueError:
+    pass
+import tempfile
+with tempfile.TemporaryDirectory() as other:
+    t = np.datetime64("2024-01-02T00:00", "ms").astype(np.int64) + np.arange(600, dtype=np.int64) * 60_000
+    close = 70 + np.arange(600) / 100
+    store.write_columns(other, "SRC", "M1", {"time": t, "open": close, "high": close + 1, "low": close - 1, "close": close})
+    store.write_columns(other, "SRC", "M5", resample.resample(store.load(other, "SRC", "M1"), "M5"))
+    written = resample.resample_store(other, "SRC", None, "M5")
+    if "M1" in written or "M5" in written or sorted(written) != sorted(["M15", "M30", "H1", "H4", "D1", "W1", "MN"]):
+        failures.append(f"default targets from M5: {sorted(written)}")
+    if store.load(other, "SRC", "M1")["time"].size != 600:
+        failures.append("resampling from M5 rewrote the M1 store")
+    if store.load(other, "SRC", "H1")["time"].tolist() != resample.resample(store.load(other, "SRC", "M1"), "H1")["time"].tolist():
+        failures.append("H1 from M5 differs from H1 from M1")
+    try:
+        resample.resample_store(other, "SRC", ["M1"], "M5")
+        failures.append("finer target accepted")
+    except ValueError:
+        pass
+print(json.dumps(failures))
@@ -0,0 +1,81 @@
+"""thelab.ta kernels against per-bar reference loops (TA-Lib definitions).
+
+Prints the list of failures as JSON (run by test/helpers/python.js).
+"""
+
+import json
+import numpy as np
+from thelab import ta
+
+def seeded(x, p, alpha, first):
+    out = np.full(len(x), np.nan)
+    if len(x) - first < p:
+        return out
+    y = float(np.mean(x[first:first + p]))
+    out[first + p - 1] = y
+    for i in range(first + p, len(x)):
+        y = alpha * x[i] + (1 - alpha) * y
+        out[i] = y
+    return out
+
+def windows(x, p, reduce):
+    out = np.full(len(x), np.nan)
+    for i in range(p - 1, len(x)):
+        out[i] = reduce(x[i - p + 1:i + 1])
+    return out
+
+failures = []
+def check(name, ours, ref, tol=1e-9):
+    ours = np.asarray(ours)
+    if ours.shape != ref.shape or not np.array_equal(np.isnan(ours), np.isnan(ref)):
+        failures.append(name + ": warm-up/shape mismatch")
+        return
+    finite = np.isfinite(ref)
+    if finite.any():
+        err = np.max(np.abs(ours[finite] - ref[finite]) / np.maximum(1.0, np.abs(ref[finite])))
+        if err > tol:
+            failures.append(f"{name}: error {err:.3g}")
+
+rng = np.random.default_rng(3)
+for n in (0, 1, 3, 40, 3000):
+    close = 100 + np.cumsum(rng.normal(size=n))
+    high = close + rng.random(n)
+    low = close - rng.random(n)
+    tr = np.full(n, np.nan)
+    for i in range(1, n):
+        tr[i] = max(high[i] - low[i], abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+    for p in (1, 2, 14, 50):
+        tag = f"n={n} p={p}"
+        sma = windows(close, p, np.mean)
+        check("sma " + tag, ta.sma(close, p), sma)
+        check("ema " + tag, ta.ema(close, p), seeded(close, p, 2 / (p + 1), 0))
+        weights = np.arange(1, p + 1)
+        check("wma " + tag, ta.wma(close, p), windows(close, p, lambda w: (w * weights).sum() / weights.sum()))
+        check("max " + tag, ta.rolling_max(high, p), windows(high, p, np.max))
+        check("min " + tag, ta.rolling_min(low, p), windows(low, p, np.min))
+        upper, middle, lower = ta.bollinger(close, p, 2.0)
+        std = windows(close, p, np.std)
+        check("bbands middle " + tag, middle, sma)
+        check("bbands upper " + tag, upper, sma + 2 * std, tol=1e-6)
+        check("bbands lower " + tag, lower, sma - 2 * std, tol=1e-6)
+        check("atr " + tag, ta.atr(high, low, close, p), seeded(tr, p, 1 / p, 1))
+        if p >= 2:
+            change = np.diff(close)
+            gain = seeded(np.maximum(change, 0), p, 1 / p, 0)
+            loss = seeded(np.maximum(-change, 0), p, 1 / p, 0)
+            total = gain + loss
+            with np.errstate(invalid="ignore", divide="ignore"):
+                rsi = np.r_[np.nan, np.where(total != 0, 100 * gain / total, 0.0)][:n]
+            rsi[np.r_[True, np.isnan(gain)][:n]] = np.nan
+            check("rsi " + tag, ta.rsi(close, p), rsi)
+    check("true_range n=" + str(n), ta.true_range(high, low, close), tr)
+
+# Leading NaNs are skipped; a NaN inside the data propagates through recursions.
+gappy = np.r_[np.nan, np.nan, np.arange(1.0, 21.0)]
+check("ema leading nan", ta.ema(gappy, 5), np.r_[np.nan, np.nan, seeded(gappy[2:], 5, 1 / 3, 0)])
+holed = np.arange(1.0, 31.0)
+holed[20] = np.nan
+if not np.isnan(ta.ema(holed, 5)[20:]).all():
+    failures.append("ema should propagate NaN")
+
+print(json.dumps(failures))
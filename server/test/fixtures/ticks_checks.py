@@ -0,0 +1,52 @@
+"""Chunked tick aggregation of thelab.ticks, including late (backfilled) ticks.
+
+Usage: ticks_checks.py TICKS_JSONL BACKFILL_JSONL
+
+Prints the list of failures as JSON (run by test/helpers/python.js).
+"""
+
+import json, sys
+import numpy as np
+from thelab import ticks
+path, backfill = sys.argv[1], sys.argv[2]
+failures = []
+whole, stats = ticks.aggregate_file(path, ["M1"], chunk_size=10**9)
+for size in (1, 50, 4096):
+    bars, s = ticks.aggregate_file(path, ["M1"], chunk_size=size)
+    for name in ("time", "open", "high", "low", "close"):
+        if not np.array_equal(bars["M1"][name], whole["M1"][name]):
+            failures.append(f"chunk {size}: {name} differs")
+    if not np.allclose(bars["M1"]["volume"], whole["M1"]["volume"]):
+        failures.append(f"chunk {size}: volume differs")
+    if s["ticks"] != stats["ticks"] or s["late"]:
+        failures.append(f"chunk {size}: stats {s}")
+for size in (50, 777, 10**9):
+    bars, s = ticks.aggregate_file(backfill, ["M1", "M5"], chunk_size=size)
+    for code in ("M1", "M5"):
+        want = whole["M1"] if code == "M1" else ticks.aggregate_file(path, ["M5"])[0]["M5"]
+        for name in ("time", "open", "high", "low", "close"):
+            if not np.array_equal(bars[code][name], want[name]):
+                failures.append(f"backfill chunk {size} {code}: {name} differs")
+        if not np.allclose(bars[code]["volume"], want["volume"]):
+            failures.append(f"backfill chunk {size} {code}: volume differs")
+    if s["ticks"] != stats["ticks"] or (size < 10**9 and not s["late"]):
+        failures.append(f"backfill chunk {size}: stats {s}")
+agg = ticks.TickAggregator("M1")
+out = agg.update([120_000, 60_000, 61_000], [2.0, 1.0, 3.0], [1, 1, 1])
+if out["time"].tolist() != [60_000] or out["high"].tolist() != [3.0] or out["close"].tolist() != [3.0]:
+    failures.append(f"in-chunk sort: {out}")
+out = agg.update([30_000, 150_000, 170_000], [9.0, 4.0, 5.0])
+if agg.late != 1 or out["time"].size:
+    failures.append(f"late tick: late={agg.late} out={out['time'].tolist()}")
+last = agg.flush()
+if last["time"].tolist() != [0, 120_000] or last["open"].tolist() != [9.0, 2.0] or last["close"].tolist() != [9.0, 5.0]:
+    failures.append(f"flush: {last}")
+merged = ticks.merge([
+    {"time": np.array([60_000]), "open": np.array([1.0]), "high": np.array([3.0]), "low": np.array([1.0]),
+     "close": np.array([3.0]), "volume": np.array([2.0]), "first": np.array([60_000]), "last": np.array([61_000])},
+    {"time": np.array([60_000]), "open": np.array([7.0]), "high": np.array([8.0]), "low": np.array([0.5]),
+     "close": np.array([6.0]), "volume": np.array([1.0]), "first": np.array([60_500]), "last": np.array([62_000])},
+])
+if [merged[k].tolist() for k in ("open", "high", "low", "close", "volume")] != [[1.0], [8.0], [0.5], [6.0], [3.0]]:
+    failures.append(f"merge: {merged}")
+print(json.dumps(failures))
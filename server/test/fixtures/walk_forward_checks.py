@@ -0,0 +1,127 @@
+"""Folds, memoized indicator columns and the walk-forward runner.
+
+Usage: walk_forward_checks.py INDICATORS_DIR
+
+Prints the list of failures as JSON (run by test/helpers/python.js).
+"""
+
+import json, os, sys, tempfile, types
+import numpy as np
+from thelab import backtest, indicators, vectorized, walkforward
+
+failures = []
+
+folds = walkforward.make_folds(100, 40, 20)
+if [(f["start"], f["split"], f["stop"]) for f in folds] != [(0, 40, 60), (20, 60, 80), (40, 80, 100)]:
+    failures.append(f"rolling folds {folds}")
+folds = walkforward.make_folds(100, 40, 20, step=30, anchored=True)
+if [(f["start"], f["split"], f["stop"]) for f in folds] != [(0, 40, 60), (0, 70, 90)]:
+    failures.append(f"anchored folds {folds}")
+for bad in ((100, 40, 20, 10), (50, 40, 20, None)):
+    try:
+        walkforward.make_folds(*bad)
+        failures.append(f"folds {bad} should be rejected")
+    except ValueError:
+        pass
+
+rng = np.random.default_rng(4)
+n = 20000
+close = 100 + np.cumsum(rng.normal(size=n))
+opens = np.r_[close[0], close[:-1]]
+bars = {"time": np.arange(n, dtype=np.int64) * 60000, "open": opens,
+        "high": np.maximum(opens, close) + 0.2, "low": np.minimum(opens, close) - 0.2, "close": close}
+
+# Cached columns (exact, prefix, incremental extension) match a fresh computation.
+indicators.set_workspace(sys.argv[1])
+cache = indicators.IndicatorCache(bars, sys.argv[1])
+window = lambda start, stop: {k: v[start:stop] for k, v in bars.items()}
+for name, settings in (("ta.ema", {"period": 30}), ("ta.atr", {"period": 14}), ("ema_100", {"length": 50})):
+    with cache.scope(horizon=12000):
+        got = [indicators.column(name, window(500, stop), settings) for stop in (8000, 12000, 15000)]
+    for stop, values in zip((8000, 12000, 15000), got):
+        want = indicators.column(name, window(500, stop), settings)
+        if not np.allclose(values, want, equal_nan=True, rtol=0, atol=1e-9):
+            failures.append(f"{name} cached range [500, {stop}) differs")
+    if got[0].flags.writeable:
+        failures.append("cached columns should be read-only")
+# Per indicator: [500, 8000) computes up to the horizon, [500, 12000) is then a hit and
+# [500, 15000) extends ema_100 incrementally but recomputes the stateless ta kernels.
+if (cache.stats["hits"], cache.stats["extended"], cache.stats["computed"]) != (3, 1, 5):
+    failures.append(f"cache stats {cache.stats}")
+try:
+    indicators.column("ta.bollinger", bars, {"period": 20})
+    failures.append("bollinger has no 'main' series")
+except KeyError:
+    pass
+
+# trade_from: nothing trades before it, and both engines still agree.
+target = rng.integers(-1, 2, size=n)
+fast = vectorized.run_signals(bars, target=target, trade_from=5000)
+slow = backtest.run(types.SimpleNamespace(handle_data=lambda context, data: context.order_target(float(target[data.index]))),
+                    bars, trade_from=5000)
+if fast["trades"][0]["entryIndex"] < 5000 or np.any(fast["equity"][:5000] != 100000.0):
+    failures.append("trades before trade_from")
+if float(np.max(np.abs(fast["equity"] - slow["equity"]))) > 1e-6:
+    failures.append("engines disagree with trade_from")
+
+path = os.path.join(tempfile.mkdtemp(), "cross.py")
+with open(path, "w") as handle:
+    handle.write(
+        "import numpy as np\n"
+        "from thelab import indicators, ta\n"
+        "def signals(inputs, params):\n"
+        "    fast = indicators.column('ta.ema', inputs, {'period': params['fast']})\n"
+        "    slow = indicators.column('ta.sma', inputs, {'period': params['slow']})\n"
+        "    return {'target': np.where(np.isnan(slow), 0, np.where(fast > slow, 1, -1))}\n"
+    )
+plain = path.replace("cross.py", "plain.py")
+with open(plain, "w") as handle:
+    handle.write(
+        "import numpy as np\n"
+        "from thelab import ta\n"
+        "def signals(inputs, params):\n"
+        "    fast = ta.ema(inputs['close'], params['fast'])\n"
+        "    slow = ta.sma(inputs['close'], params['slow'])\n"
+        "    return {'target': np.where(np.isnan(slow), 0, np.where(fast > slow, 1, -1))}\n"
+    )
+space = {"fast": [5, 10], "slow": [50, 100]}
+runs = {}
+for label, script, workers, anchored in (("plain", plain, "1", False), ("inline", path, "1", False),
+                                         ("pool", path, "2", False), ("anchored", path, "2", True),
+                                         ("anchored-inline", path, "1", True)):
+    os.environ["THELAB_OPTIMIZER_WORKERS"] = workers
+    events = []
+    done = walkforward.walk_forward(script, bars, space, in_sample=4000, out_of_sample=2000, anchored=anchored,
+                                    objective="sharpe", cash=10000.0, emit=events.append)
+    runs[label] = (done, sorted((e for e in events if e["type"] == "fold"), key=lambda e: e["index"]))
+    if done["folds"] != 8 or done["stitchedFolds"] != 8 or done["failed"]:
+        failures.append(f"{label}: {done['folds']} folds, {done['stitchedFolds']} stitched")
+    if done["equity"].size != 16000 or done["equityIndex"][0] != 4000 or done["equityIndex"][-1] != n - 1:
+        failures.append(f"{label}: stitched equity covers the wrong bars")
+
+for label in ("inline", "pool"):
+    if [f["params"] for f in runs[label][1]] != [f["params"] for f in runs["plain"][1]]:
+        failures.append(f"{label}: memoized indicators changed the chosen params")
+    if not np.allclose(runs[label][0]["equity"], runs["plain"][0]["equity"]):
+        failures.append(f"{label}: memoized indicators changed the equity")
+done, fold_events = runs["inline"]
+if abs(done["outOfSample"]["totalProfit"] - sum(f["outOfSample"]["totalProfit"] for f in fold_events)) > 1e-6:
+    failures.append("stitched profit should be the sum of fold profits")
+if abs(done["equity"][-1] - 10000.0 - done["outOfSample"]["totalProfit"]) > 1e-6:
+    failures.append("stitched equity should end at cash + profit")
+# Per fold: 2 fast + 2 slow columns computed once, the other in-sample requests are
+# prefixes of them and both out-of-sample requests are exact hits.
+if (done["cache"]["computed"], done["cache"]["prefixHits"], done["cache"]["hits"]) != (8 * 4, 8 * 4, 8 * 2):
+    failures.append(f"folds should reuse cached columns: {done['cache']}")
+# Anchored folds share bar 0: the first fold computes the 4 columns up to the last
+# fold's end and every later fold is served from them.
+done, fold_events = runs["anchored-inline"]
+if done["cache"]["computed"] != 4 or any(f["cache"]["computed"] for f in fold_events[1:]):
+    failures.append(f"anchored folds should compute each column once: {[f['cache'] for f in fold_events]}")
+if any(f["cache"]["prefixHits"] < 8 for f in fold_events[1:]):
+    failures.append(f"anchored folds should be prefixes of earlier folds: {[f['cache'] for f in fold_events]}")
+if [f["params"] for f in fold_events] != [f["params"] for f in runs["anchored"][1]] or not np.allclose(
+        done["equity"], runs["anchored"][0]["equity"]):
+    failures.append("anchored: inline and pool runs differ")
+
+print(json.dumps(failures))
@@ -0,0 +1,36 @@
+const assert = require('assert');
+const path = require('path');
+const { spawnSync } = require('child_process');
+const { ROOT_DIR } = require('../../src/constants/paths');
+
+// Python-side checks live in test/fixtures/*.py and run with the runner
+// directory as cwd and on PYTHONPATH, so `thelab` imports as it does in runner.py.
+
+const PYTHON_BIN = process.env.THELAB_PYTHON_PATH || 'python';
+const RUNNER_DIR = path.join(ROOT_DIR, 'indicator_runner');
+const FIXTURES_DIR = path.join(__dirname, '..', 'fixtures');
+
+/**
+ * Run test/fixtures/<name>.py with `args` and return its stdout parsed as JSON.
+ */
+const runPythonFixture = (name, args = []) => {
+  const pythonPath = [RUNNER_DIR, process.env.PYTHONPATH].filter(Boolean).join(path.delimiter);
+  const run = spawnSync(PYTHON_BIN, [path.join(FIXTURES_DIR, `${name}.py`), ...args.map(String)], {
+    cwd: RUNNER_DIR,
+    env: { ...process.env, PYTHONPATH: pythonPath },
+    encoding: 'utf8',
+    maxBuffer: 16 * 1024 * 1024,
+  });
+  assert.strictEqual(run.status, 0, `${name}.py failed: ${run.stderr || (run.error && run.error.message)}`);
+  return JSON.parse(run.stdout);
+};
+
+/**
+ * Run a fixture that prints its list of failures and assert the list is empty.
+ */
+const runPythonChecks = (name, args = []) => {
+  const failures = runPythonFixture(name, args);
+  assert.deepStrictEqual(failures, [], `${name}.py:\n${failures.join('\n')}`);
+};
+
+module.exports = { PYTHON_BIN, RUNNER_DIR, runPythonFixture, runPythonChecks };
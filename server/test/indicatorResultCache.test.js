@@ -0,0 +1,123 @@
+const assert = require('assert');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const {
+  createIndicatorResultCache,
+  fingerprintInputs,
+  parseImports,
+} = require('../src/services/indicatorResultCache');
+const { encodeCandleColumns } = require('../src/services/indicatorBinaryCodec');
+
+const tmp = fs.mkdtempSync(path.join(os.tmpdir(), 'thelab-result-cache-'));
+const workspace = path.join(tmp, 'indicators');
+const cacheDir = path.join(tmp, 'cache');
+fs.mkdirSync(path.join(workspace, 'pkg'), { recursive: true });
+
+const write = (relative, source) => {
+  const file = path.join(workspace, relative);
+  fs.writeFileSync(file, source);
+  // Bump mtime explicitly: rewrites within one clock tick must still rehash.
+  const stamp = new Date(Date.now() + Math.random() * 1e6);
+  fs.utimesSync(file, stamp, stamp);
+  return file;
+};
+
+const scriptPath = write('script.py', 'import numpy as np\nfrom pkg.core import calculate\n');
+write('pkg/__init__.py', '');
+write('pkg/core.py', 'from .helpers import helper\n');
+write('pkg/helpers.py', 'def helper():\n    return 1\n');
+write('unrelated.py', 'x = 1\n');
+
+const candles = [1, 2, 3].map((i) => ({
+  time: `2024-01-0${i}T00:00:00Z`,
+  open: i,
+  high: i + 1,
+  low: i - 1,
+  close: i + 0.5,
+  volume: 10,
+}));
+const fingerprint = fingerprintInputs(encodeCandleColumns(candles, { output: 'packed' }), candles);
+const result = { ok: true, series: { main: [{ time: candles[0].time, value: 1 }] }, markers: [], levels: [], plots: [], meta: {} };
+
+assert.deepStrictEqual(parseImports('import a.b as c, d\nfrom e.f import g\nfrom .h import i\n  import j\n').sort(), [
+  'a',
+  'd',
+  'e',
+  'j',
+]);
+
+// Input fingerprint ignores stream/settings header fields but not the data.
+assert.strictEqual(
+  fingerprintInputs(encodeCandleColumns(candles, { stream: 'CL|M15', settings: { a: 1 } }), candles),
+  fingerprint
+);
+assert.notStrictEqual(
+  fingerprintInputs(encodeCandleColumns([...candles.slice(0, 2), { ...candles[2], close: 9 }]), candles),
+  fingerprint
+);
+
+const run = async () => {
+  const cache = createIndicatorResultCache({ dir: cacheDir, maxDiskBytes: 1024 * 1024, maxMemoryBytes: 1024 * 1024 });
+  const key = cache.keyFor(scriptPath, { length: 5, color: 'red' }, fingerprint);
+  assert.strictEqual(cache.keyFor(scriptPath, { color: 'red', length: 5 }, fingerprint), key, 'settings order is irrelevant');
+  assert.notStrictEqual(cache.keyFor(scriptPath, { color: 'red', length: 6 }, fingerprint), key);
+  assert.strictEqual(cache.keyFor(path.join(workspace, 'missing.py'), {}, fingerprint), null);
+
+  assert.strictEqual(await cache.get(key), null);
+  await cache.set(key, result);
+  const hot = await cache.get(key);
+  assert.strictEqual(hot.meta.cache, 'memory');
+  assert.deepStrictEqual(hot.series, result.series);
+
+  // A fresh instance (server restart) finds the entry on disk.
+  const restarted = createIndicatorResultCache({ dir: cacheDir, maxDiskBytes: 1024 * 1024 });
+  assert.strictEqual(restarted.keyFor(scriptPath, { length: 5, color: 'red' }, fingerprint), key);
+  const cold = await restarted.get(key);
+  assert.strictEqual(cold.meta.cache, 'disk');
+  assert.strictEqual((await restarted.get(key)).meta.cache, 'memory', 'disk hits are promoted to memory');
+
+  // Editing a transitively imported package module changes the key; unrelated files don't.
+  write('unrelated.py', 'x = 2\n');
+  assert.strictEqual(cache.keyFor(scriptPath, { length: 5, color: 'red' }, fingerprint), key);
+  write('pkg/helpers.py', 'def helper():\n    return 2\n');
+  const edited = cache.keyFor(scriptPath, { length: 5, color: 'red' }, fingerprint);
+  assert.notStrictEqual(edited, key);
+  assert.strictEqual(await cache.get(edited), null);
+
+  // Failed runs are not stored.
+  await cache.set(edited, { ok: false, error: { type: 'RunnerError' } });
+  assert.strictEqual(await cache.get(edited), null);
+
+  // Disk and memory tiers stay within their byte budgets, dropping the oldest entries.
+  const entryBytes = Buffer.byteLength(JSON.stringify(result));
+  const small = createIndicatorResultCache({
+    dir: path.join(tmp, 'small'),
+    maxDiskBytes: entryBytes * 3,
+    maxMemoryBytes: entryBytes * 2,
+  });
+  const keys = ['a', 'b', 'c', 'd', 'e'].map((suffix) => small.keyFor(scriptPath, { suffix }, fingerprint));
+  for (const k of keys) {
+    // Distinct mtimes so eviction order is deterministic.
+    await small.set(k, result);
+    await new Promise((resolve) => setTimeout(resolve, 5));
+  }
+  const stats = small.stats();
+  assert.ok(stats.diskBytes <= entryBytes * 3, 'disk tier exceeds its budget');
+  assert.strictEqual(stats.memoryEntries, 2);
+  assert.ok(stats.evictions >= 2);
+  assert.strictEqual(fs.existsSync(path.join(tmp, 'small', `${keys[0]}.json`)), false, 'oldest entry should be evicted');
+  assert.strictEqual((await small.get(keys[4])).meta.cache, 'memory');
+  assert.strictEqual((await small.get(keys[2])).meta.cache, 'disk');
+};
+
+run()
+  .then(() => {
+    fs.rmSync(tmp, { recursive: true, force: true });
+    console.log('indicatorResultCache tests passed');
+  })
+  .catch((err) => {
+    fs.rmSync(tmp, { recursive: true, force: true });
+    console.error(err);
+    process.exit(1);
+  });
@@ -0,0 +1,211 @@
+const assert = require('assert');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { createWorkerPool } = require('../src/services/indicatorWorkerPool');
+const { encodeCandleColumns, decodeSeriesMap } = require('../src/services/indicatorBinaryCodec');
+const { ROOT_DIR } = require('../src/constants/paths');
+
+const PYTHON_BIN = process.env.THELAB_PYTHON_PATH || 'python';
+// Exercise the batch thread pool even on single-core machines.
+process.env.THELAB_INDICATOR_BATCH_THREADS = '3';
+const RUNNER_PATH = path.join(ROOT_DIR, 'indicator_runner', 'runner.py');
+
+const workspace = fs.mkdtempSync(path.join(os.tmpdir(), 'thelab-pool-'));
+const scriptPath = path.join(workspace, 'pool_probe.py');
+const helperDir = path.join(workspace, 'pool_helper');
+fs.mkdirSync(helperDir);
+fs.writeFileSync(path.join(helperDir, '__init__.py'), 'OFFSET = 1\n');
+fs.writeFileSync(
+  scriptPath,
+  [
+    'from pool_helper import OFFSET',
+    '',
+    'def calculate(inputs, settings=None):',
+    '    print("noise on stdout must not break framing")',
+    '    if (settings or {}).get("hang"):',
+    '        import time',
+    '        time.sleep(10)',
+    '    if (settings or {}).get("withGaps"):',
+    '        import numpy as np',
+    '        return np.array([np.nan, 1.5, np.inf, 2.5] * 3)',
+    '    if (settings or {}).get("echoTime"):',
+    '        return {"series": {"main": (inputs["time"] - inputs["time"][0]) / 60000.0}}',
+    '    return {"series": {"main": [float(v) + OFFSET for v in inputs["close"]]}, "markers": [], "levels": []}',
+    '',
+  ].join('\n')
+);
+
+const payload = (settings) => ({ inputs: { close: [1, 2, 3] }, settings });
+
+const run = async () => {
+  const pool = createWorkerPool({ pythonBin: PYTHON_BIN, runnerPath: RUNNER_PATH, size: 1 });
+  try {
+    const first = await pool.run(scriptPath, payload(), 5000);
+    assert.strictEqual(first.ok, true, JSON.stringify(first));
+    assert.deepStrictEqual(first.series.main, [2, 3, 4]);
+    assert.deepStrictEqual(Object.keys(first.meta.phases), ['parse', 'inputs', 'import', 'execute', 'serialize']);
+    assert.ok(!first.meta.profile && !first.meta.memory, 'diagnostics are opt-in');
+
+    const second = await pool.run(scriptPath, payload(), 5000);
+    assert.deepStrictEqual(second.series.main, [2, 3, 4]);
+    assert.strictEqual(pool.stats().workers, 1, 'worker should be reused between runs');
+
+    // Touching a workspace submodule must reload it in the warm worker.
+    const helperFile = path.join(helperDir, '__init__.py');
+    fs.writeFileSync(helperFile, 'OFFSET = 10\n');
+    const future = new Date(Date.now() + 5000);
+    fs.utimesSync(helperFile, future, future);
+    const reloaded = await pool.run(scriptPath, payload(), 5000);
+    assert.deepStrictEqual(reloaded.series.main, [11, 12, 13]);
+
+    const candles = [1, 2, 3].map((close, i) => ({
+      time: new Date(Date.UTC(2024, 0, 1, 0, i)).toISOString(),
+      open: close,
+      high: close,
+      low: close,
+      close,
+    }));
+    const binary = await pool.run(scriptPath, encodeCandleColumns(candles), 5000);
+    assert.deepStrictEqual(binary.series.main, [11, 12, 13]);
+    const times = await pool.run(scriptPath, encodeCandleColumns(candles, { settings: { echoTime: true } }), 5000);
+    assert.deepStrictEqual(times.series.main, [0, 1, 2], 'time column should arrive as epoch ms');
+
+    const packed = await pool.run(
+      scriptPath,
+      encodeCandleColumns(candles, { settings: { withGaps: true }, output: 'packed' }),
+      5000
+    );
+    assert.ok(packed.series.main.$packed, 'numeric series should be packed');
+    const decoded = decodeSeriesMap(packed.series, packed.attachment).main;
+    assert.ok(decoded instanceof Float64Array);
+    assert.strictEqual(decoded.length, 12);
+    assert.ok(Number.isNaN(decoded[0]) && Number.isNaN(decoded[2]), 'invalid slots should decode as NaN');
+    assert.strictEqual(decoded[1], 1.5);
+    assert.strictEqual(decoded[11], 2.5);
+
+    // Batch mode: one attachment, one result per item in request order.
+    const batch = await pool.run(
+      null,
+      encodeCandleColumns(candles, {
+        output: 'packed',
+        batch: [
+          { scriptPath, settings: { withGaps: true } },
+          { scriptPath: path.join(workspace, 'missing.py') },
+          { scriptPath },
+        ],
+      }),
+      5000
+    );
+    assert.strictEqual(batch.ok, true, JSON.stringify(batch));
+    assert.strictEqual(batch.meta.threads, 3);
+    assert.strictEqual(batch.results.length, 3);
+    assert.strictEqual(decodeSeriesMap(batch.results[0].series, batch.attachment).main[11], 2.5);
+    assert.strictEqual(batch.results[1].ok, false);
+    assert.strictEqual(batch.results[1].error.type, 'ImportError');
+    assert.deepStrictEqual(Array.from(decodeSeriesMap(batch.results[2].series, batch.attachment).main), [11, 12, 13]);
+    assert.deepStrictEqual(Object.keys(batch.meta.phases), ['parse', 'inputs', 'import']);
+
+    // Opt-in diagnostics: cProfile rows for the indicator's own code and the tracemalloc peak.
+    const profiled = await pool.run(scriptPath, { ...payload(), profile: 3, traceMemory: true }, 5000);
+    assert.strictEqual(profiled.ok, true, JSON.stringify(profiled));
+    assert.ok(profiled.meta.profile.top.length <= 3 && profiled.meta.profile.totalCalls > 0);
+    assert.strictEqual(profiled.meta.profile.top[0].function, 'calculate');
+    assert.strictEqual(profiled.meta.profile.top[0].file, scriptPath);
+    assert.ok(profiled.meta.profile.top.every((row) => row.file !== RUNNER_PATH), 'runner frames are not reported');
+    assert.ok(profiled.meta.memory.peakBytes > 0);
+    const profiledBatch = await pool.run(
+      null,
+      encodeCandleColumns(candles, { profile: true, batch: [{ scriptPath }, { scriptPath }] }),
+      5000
+    );
+    assert.strictEqual(profiledBatch.meta.threads, 1, 'profiled batches run on one thread');
+    assert.ok(profiledBatch.results.every((result) => result.meta.profile.top[0].function === 'calculate'));
+
+    // ema_100 implements calculate_incremental: a grown window only feeds the new
+    // bar, a shifted one is recomputed. Either way the output is calculate() on
+    // the window that was sent.
+    const emaPath = path.join(ROOT_DIR, 'indicators', 'ema_100.py');
+    const series = Array.from({ length: 60 }, (_, i) => ({
+      time: Date.UTC(2024, 0, 1, 0, i),
+      open: 100 + i,
+      high: 101 + i,
+      low: 99 + i,
+      close: 100 + Math.sin(i),
+    }));
+    const emaRequest = (window) =>
+      encodeCandleColumns(window, { settings: { length: 5 }, stream: 'CL1!|M1', output: 'packed' });
+    // Warm-up bars are NaN (null in JSON). The batch kernel evaluates the
+    // recurrence blockwise, so values agree to rounding, not bit for bit.
+    const assertMatchesCalculate = async (response, window) => {
+      const cold = await pool.run(emaPath, encodeCandleColumns(window, { settings: { length: 5 } }), 5000);
+      const expected = cold.series.main;
+      const actual = decodeSeriesMap(response.series, response.attachment).main;
+      assert.strictEqual(actual.length, expected.length);
+      Array.from(actual).forEach((value, i) => {
+        if (expected[i] === null) {
+          assert.ok(Number.isNaN(value), `bar ${i} should still be warming up`);
+        } else {
+          assert.ok(Math.abs(value - expected[i]) <= 1e-9 * Math.abs(expected[i]), `bar ${i}: ${value} != ${expected[i]}`);
+        }
+      });
+    };
+    const fullRun = await pool.run(emaPath, emaRequest(series.slice(0, 50)), 5000);
+    assert.strictEqual(fullRun.meta.incremental.mode, 'full');
+    const grown = await pool.run(emaPath, emaRequest(series.slice(0, 51)), 5000);
+    assert.strictEqual(grown.meta.incremental.mode, 'append');
+    assert.strictEqual(grown.meta.incremental.newBars, 1);
+    await assertMatchesCalculate(grown, series.slice(0, 51));
+    const shifted = await pool.run(emaPath, emaRequest(series.slice(1, 52)), 5000);
+    assert.strictEqual(shifted.meta.incremental.mode, 'full');
+    await assertMatchesCalculate(shifted, series.slice(1, 52));
+
+    // A chart longer than the UI window: the hook anchors the window start
+    // (useIndicatorExecution), so a new candle is appended, not shifted.
+    const chart = Array.from({ length: 1501 }, (_, i) => ({
+      time: Date.UTC(2024, 0, 1, 0, i),
+      open: 100 + Math.cos(i / 9),
+      high: 102 + Math.cos(i / 9),
+      low: 98 + Math.cos(i / 9),
+      close: 100 + Math.sin(i / 13) + (i % 5) / 10,
+    }));
+    const chartRequest = (window) =>
+      encodeCandleColumns(window, { settings: { length: 5 }, stream: 'CL1!|M5', output: 'packed' });
+    const anchored = await pool.run(emaPath, chartRequest(chart.slice(500, 1500)), 5000);
+    assert.strictEqual(anchored.meta.incremental.mode, 'full');
+    const nextCandle = await pool.run(emaPath, chartRequest(chart.slice(500, 1501)), 5000);
+    assert.strictEqual(nextCandle.meta.incremental.mode, 'append');
+    assert.strictEqual(nextCandle.meta.incremental.newBars, 1);
+    await assertMatchesCalculate(nextCandle, chart.slice(500, 1501));
+
+    const hung = await pool.run(scriptPath, payload({ hang: true }), 500);
+    assert.strictEqual(hung.ok, false);
+    assert.strictEqual(hung.error.type, 'Timeout');
+
+    const recovered = await pool.run(scriptPath, payload(), 5000);
+    assert.strictEqual(recovered.ok, true, 'pool should respawn a worker after a timeout');
+
+    // The timeout counts from run(): a request queued behind a hung one expires on time.
+    const blocking = pool.run(scriptPath, payload({ hang: true }), 1500);
+    const queuedAt = Date.now();
+    const queued = await pool.run(scriptPath, payload(), 300);
+    assert.strictEqual(queued.ok, false);
+    assert.strictEqual(queued.error.type, 'Timeout');
+    assert.ok(Date.now() - queuedAt < 1000, 'queued request should not wait for the busy worker');
+    assert.strictEqual((await blocking).error.type, 'Timeout');
+    assert.strictEqual(pool.stats().queued, 0);
+    assert.strictEqual((await pool.run(scriptPath, payload(), 5000)).ok, true);
+  } finally {
+    pool.shutdown();
+    fs.rmSync(workspace, { recursive: true, force: true });
+  }
+};
+
+run()
+  .then(() => {
+    console.log('indicatorWorkerPool tests passed');
+  })
+  .catch((err) => {
+    console.error(err);
+    process.exit(1);
+  });
@@ -0,0 +1,93 @@
+const assert = require('assert');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { spawnSync } = require('child_process');
+
+const workDir = fs.mkdtempSync(path.join(os.tmpdir(), 'thelab-ingest-'));
+const csvDir = path.join(workDir, 'cl-futures');
+const storeRoot = path.join(workDir, 'columns');
+const segmentsDir = path.join(workDir, 'data');
+const dbPath = path.join(workDir, 'market.db');
+process.env.THELAB_COLUMN_STORE_DIR = storeRoot;
+const { ROOT_DIR } = require('../src/constants/paths');
+const { readManifest, readStoredCandles } = require('../src/services/columnStoreService');
+const { aggregateCandles } = require('../src/services/timeframeBuilder');
+const { parseCsvLine } = require('../scripts/importClFuturesFromCsv');
+const { PYTHON_BIN, RUNNER_DIR, runPythonChecks } = require('./helpers/python');
+
+const pad = (n, width = 2) => String(n).padStart(width, '0');
+const vendorLine = (ms, values) => {
+  const d = new Date(ms);
+  const date = `${pad(d.getUTCDate())}/${pad(d.getUTCMonth() + 1)}/${d.getUTCFullYear()}`;
+  const clock = `${pad(d.getUTCHours())}:${pad(d.getUTCMinutes())}:${pad(d.getUTCSeconds())}`;
+  return [date, clock, ...values].join(';');
+};
+
+// M1 in vendor local time across a year end, with a duplicate bar, a missing
+// volume, a CRLF line and a junk line.
+fs.mkdirSync(csvDir, { recursive: true });
+const m1Lines = [];
+const base = Date.UTC(2023, 11, 31, 17, 0);
+for (let i = 0; i < 4000; i += 1) {
+  if (i % 97 === 5) continue;
+  const close = (70 + Math.sin(i / 40) + (i % 9) / 100).toFixed(2);
+  m1Lines.push(vendorLine(base + i * 60000, [(close - 0.02).toFixed(2), (+close + 0.05).toFixed(2), (close - 0.07).toFixed(2), close, i % 13]));
+}
+m1Lines.splice(100, 0, m1Lines[120].replace(/;[^;]*$/, ';999'));
+m1Lines[200] = m1Lines[200].replace(/;[^;]*$/, '');
+m1Lines[300] = `${m1Lines[300]}\r`;
+m1Lines.splice(400, 0, 'not;a;bar');
+fs.writeFileSync(path.join(csvDir, 'cl-1m.csv'), `${m1Lines.join('\n')}\n`);
+const d1Lines = Array.from({ length: 30 }, (_, i) =>
+  vendorLine(Date.UTC(2024, 0, 2 + i), ['71.1', '72.2', '70.3', `${71 + i / 10}`, '1000'])
+);
+fs.writeFileSync(path.join(csvDir, 'cl-1d.csv'), d1Lines.join('\n'));
+fs.copyFileSync(path.join(ROOT_DIR, '..', 'temp_cl_1w', 'cl-1w.csv'), path.join(csvDir, 'cl-1w.csv'));
+
+const run = spawnSync(
+  PYTHON_BIN,
+  ['-m', 'thelab.ingest', '--csv-dir', csvDir, '--db', dbPath, '--store', storeRoot, '--segments', segmentsDir, '--workers', '2'],
+  { cwd: RUNNER_DIR, encoding: 'utf8' }
+);
+assert.strictEqual(run.status, 0, run.stderr);
+
+// Same bars as the Node importer's parser (sorted, last duplicate wins).
+const expectedFor = (file) => {
+  const byTime = new Map();
+  fs.readFileSync(path.join(csvDir, file), 'utf8')
+    .split(/\r?\n/)
+    .filter((line) => line.trim())
+    .forEach((line) => {
+      const candle = parseCsvLine(line, file);
+      if (candle) byTime.set(candle.timestamp, candle);
+    });
+  return Array.from(byTime.values())
+    .sort((a, b) => a.timestamp - b.timestamp)
+    .map(({ time, open, high, low, close, volume }) => ({ time, open, high, low, close, volume }));
+};
+const storedFor = (timeframe) => {
+  const manifest = readManifest('cl1!', timeframe);
+  assert.ok(manifest, `missing ${timeframe} store`);
+  return readStoredCandles(manifest, { offset: 0, length: manifest.length });
+};
+const m1 = expectedFor('cl-1m.csv');
+assert.deepStrictEqual(storedFor('m1'), m1);
+assert.deepStrictEqual(storedFor('m5'), aggregateCandles(m1, 5));
+assert.deepStrictEqual(storedFor('h4'), aggregateCandles(m1, 240));
+assert.deepStrictEqual(storedFor('d1'), expectedFor('cl-1d.csv'));
+assert.deepStrictEqual(storedFor('d7'), expectedFor('cl-1w.csv'));
+assert.strictEqual(readManifest('cl1!', 'm1').source.csv, 'cl-1m.csv');
+
+// JSON segments in the importer's layout, split by UTC year.
+const meta = JSON.parse(fs.readFileSync(path.join(segmentsDir, 'cl1!-m1-meta.json'), 'utf8'));
+assert.deepStrictEqual(meta.segments.map((s) => s.segment), ['2023', '2024']);
+assert.strictEqual(meta.totalCount, m1.length);
+const segment = JSON.parse(fs.readFileSync(path.join(segmentsDir, meta.segments[1].file), 'utf8'));
+assert.deepStrictEqual(segment.candles, m1.filter((c) => c.time >= '2024'));
+
+// SQLite rows match the store; chunked parsing matches a single chunk.
+runPythonChecks('ingest_checks', [dbPath, storeRoot, path.join(csvDir, 'cl-1m.csv')]);
+
+fs.rmSync(workDir, { recursive: true, force: true });
+console.log('ingest tests passed');
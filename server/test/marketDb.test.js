@@ -0,0 +1,50 @@
+const assert = require('assert');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { spawnSync } = require('child_process');
+const { INDICATORS_DIR } = require('../src/constants/paths');
+const { PYTHON_BIN, RUNNER_DIR, runPythonChecks } = require('./helpers/python');
+
+const workDir = fs.mkdtempSync(path.join(os.tmpdir(), 'thelab-marketdb-'));
+const dbPath = path.join(workDir, 'market.db');
+
+// Two assets in the bars table, written the way thelab.ingest loads them.
+runPythonChecks('marketdb_seed', [dbPath]);
+
+// Windows, multi-asset fetches and read-only connections.
+runPythonChecks('marketdb_checks', [dbPath]);
+
+// The runner reads a `source: { db }` window itself: indicators and backtests.
+const runRunner = (args, payload) => {
+  const run = spawnSync(PYTHON_BIN, [path.join(RUNNER_DIR, 'runner.py'), ...args], {
+    input: JSON.stringify(payload),
+    encoding: 'utf8',
+    maxBuffer: 16 * 1024 * 1024,
+  });
+  assert.strictEqual(run.status, 0, run.stderr);
+  return JSON.parse(run.stdout);
+};
+const source = { asset: 'CL1!', timeframe: 'M5', db: dbPath, limit: 1200 };
+const indicator = runRunner([path.join(INDICATORS_DIR, 'ema_100.py')], { source, settings: { length: 20 } });
+assert.strictEqual(indicator.ok, true, JSON.stringify(indicator.error));
+assert.deepStrictEqual(indicator.meta.source, { asset: 'cl1!', timeframe: 'm5', db: true, length: 1200 });
+assert.strictEqual(indicator.series.main.length, 1200);
+
+const strategyPath = path.join(workDir, 'hold.py');
+fs.writeFileSync(strategyPath, 'def handle_data(context, data):\n    return {"orders": [{"target": 1}]}\n');
+const backtest = runRunner(['--backtest', strategyPath], { source, cash: 1000 });
+assert.strictEqual(backtest.ok, true, JSON.stringify(backtest.error));
+assert.strictEqual(backtest.series.equity.length, 1200);
+
+const missing = runRunner(['--backtest', strategyPath], { source: { ...source, db: `${dbPath}.missing` } });
+assert.strictEqual(missing.ok, false);
+assert.strictEqual(missing.error.type, 'InputError');
+
+// Legacy layout (rowid table + secondary index) -> clustered, in place.
+const legacyPath = path.join(workDir, 'legacy.db');
+const benchOut = path.join(workDir, 'bench.json');
+runPythonChecks('marketdb_migration_checks', [legacyPath, benchOut]);
+
+fs.rmSync(workDir, { recursive: true, force: true });
+console.log('marketDb tests passed');
@@ -0,0 +1,85 @@
+const assert = require('assert');
+const fs = require('fs');
+const path = require('path');
+const { spawnSync } = require('child_process');
+const { ROOT_DIR, INDICATORS_DIR } = require('../src/constants/paths');
+
+// Golden output of the market structure indicator on recorded CL1! data.
+// The fixture was produced by the original scan-based enrich_with_structure;
+// any engine rewrite must reproduce it exactly (markers and levels, in order).
+
+const PYTHON_BIN = process.env.THELAB_PYTHON_PATH || 'python';
+const RUNNER_PATH = path.join(ROOT_DIR, 'indicator_runner', 'runner.py');
+const SCRIPT_PATH = path.join(INDICATORS_DIR, 'market-structure.py');
+const REPO_DIR = path.resolve(ROOT_DIR, '..');
+const golden = require('./fixtures/market_structure_cl1.golden.json');
+
+const loadCsv = (relativePath, tail) => {
+  const rows = fs
+    .readFileSync(path.join(REPO_DIR, relativePath), 'utf8')
+    .split(/\r?\n/)
+    .filter((line) => line.trim());
+  const selected = tail ? rows.slice(-tail) : rows;
+  const inputs = { open: [], high: [], low: [], close: [], volume: [] };
+  selected.forEach((line) => {
+    const [, , open, high, low, close, volume] = line.split(';');
+    inputs.open.push(Number(open));
+    inputs.high.push(Number(high));
+    inputs.low.push(Number(low));
+    inputs.close.push(Number(close));
+    inputs.volume.push(Number(volume) || 0);
+  });
+  return inputs;
+};
+
+golden.cases.forEach(({ name, csv, tail, markers, levels }) => {
+  const proc = spawnSync(PYTHON_BIN, [RUNNER_PATH, SCRIPT_PATH], {
+    input: JSON.stringify({ inputs: loadCsv(csv, tail), settings: {} }),
+    maxBuffer: 64 * 1024 * 1024,
+  });
+  assert.strictEqual(proc.status, 0, proc.stderr && proc.stderr.toString());
+  const result = JSON.parse(proc.stdout.toString('utf8'));
+  assert.strictEqual(result.ok, true, `${name}: ${JSON.stringify(result.error)}`);
+  assert.deepStrictEqual(result.markers, markers, `${name}: markers differ from golden output`);
+  assert.deepStrictEqual(result.levels, levels, `${name}: levels differ from golden output`);
+});
+
+// Streaming: MarketStructureState fed bar by bar must end on the same output,
+// and applying its per-bar deltas must rebuild the same set of items.
+const STREAM_CHECK = [
+  'import json, sys',
+  'from market_structure.stream import MarketStructureState',
+  'bars = json.load(sys.stdin)',
+  'state, markers, levels = MarketStructureState(), {}, {}',
+  'for bar in bars:',
+  '    changes = state.update(bar)',
+  '    for view, delta in ((markers, changes["markers"]), (levels, changes["levels"])):',
+  '        for key, item in delta.items():',
+  '            view.pop(key) if item is None else view.__setitem__(key, item)',
+  'snapshot = state.snapshot()',
+  'json.dump({"snapshot": snapshot, "markers": len(markers), "levels": len(levels)}, sys.stdout)',
+].join('\n');
+
+golden.cases.forEach(({ name, csv, tail, markers, levels }) => {
+  const inputs = loadCsv(csv, tail);
+  const bars = inputs.close.map((close, i) => ({
+    open: inputs.open[i],
+    high: inputs.high[i],
+    low: inputs.low[i],
+    close,
+  }));
+  const proc = spawnSync(PYTHON_BIN, ['-c', STREAM_CHECK], {
+    cwd: INDICATORS_DIR,
+    input: JSON.stringify(bars),
+    maxBuffer: 64 * 1024 * 1024,
+  });
+  assert.strictEqual(proc.status, 0, proc.stderr && proc.stderr.toString());
+  const result = JSON.parse(proc.stdout.toString('utf8'));
+  assert.deepStrictEqual(result.snapshot.markers, markers, `${name}: streamed markers differ from golden output`);
+  assert.deepStrictEqual(result.snapshot.levels, levels, `${name}: streamed levels differ from golden output`);
+  // Deltas cover every item, including levels hidden by MAX_LEVELS_PER_KIND.
+  assert.strictEqual(result.markers, markers.length, `${name}: delta markers out of sync`);
+  assert.ok(result.levels >= levels.length, `${name}: delta levels out of sync`);
+});
+
+console.log('marketStructureGolden tests passed');
@@ -0,0 +1,102 @@
+const assert = require('assert');
+const { runPythonChecks } = require('./helpers/python');
+
+// Two workers even on single-core machines, so the service tests exercise the process pool.
+process.env.THELAB_OPTIMIZER_WORKERS = '2';
+const {
+  startOptimization,
+  getOptimization,
+  cancelOptimization,
+  insertRanked,
+} = require('../src/services/optimizerService');
+
+// Space sampling, scoring and the shared-memory pool of thelab.optimize.
+runPythonChecks('optimizer_checks');
+
+// Ranking keeps descending scores with unscored entries last.
+const ranked = [];
+[3, null, 7, -1, 7, 5].forEach((score, index) => insertRanked(ranked, { index, score }));
+assert.deepStrictEqual(
+  ranked.map((entry) => entry.index),
+  [2, 4, 5, 0, 3, 1]
+);
+
+const candles = Array.from({ length: 2000 }, (_, i) => {
+  const close = 100 + 10 * Math.sin(i / 25) + Math.sin(i / 3);
+  return {
+    time: new Date(Date.UTC(2024, 0, 1) + i * 60000).toISOString(),
+    open: close - 0.1,
+    high: close + 0.5,
+    low: close - 0.5,
+    close,
+    volume: 1,
+  };
+});
+const CROSS = [
+  'import numpy as np',
+  'from thelab import ta',
+  '',
+  'def signals(inputs, params):',
+  '    fast = ta.sma(inputs["close"], params["fast"])',
+  '    slow = ta.sma(inputs["close"], params["slow"])',
+  '    return {"target": np.where(np.isnan(slow), 0, np.where(fast > slow, 1, -1))}',
+  '',
+].join('\n');
+const SLOW = ['import time', '', 'def handle_data(context, data):', '    time.sleep(0.002)', ''].join('\n');
+
+const waitFor = async (jobId, statuses) => {
+  for (let i = 0; i < 600; i += 1) {
+    const job = getOptimization(jobId, { limit: 100 });
+    if (statuses.includes(job.status)) return job;
+    await new Promise((resolve) => setTimeout(resolve, 50));
+  }
+  throw new Error(`job ${jobId} did not reach ${statuses.join('/')}`);
+};
+
+(async () => {
+  // End to end through runner.py --optimize: progress, ranking and the best parameters.
+  const started = startOptimization({
+    asset: 'TEST',
+    timeframe: 'M1',
+    candles,
+    code: CROSS,
+    space: { fast: [3, 5, 8], slow: { min: 20, max: 60, step: 20 } },
+    objective: 'totalProfit',
+  });
+  assert.ok(['queued', 'running'].includes(started.status));
+  const job = await waitFor(started.id, ['completed', 'error']);
+  assert.strictEqual(job.status, 'completed', JSON.stringify(job.error));
+  assert.deepStrictEqual(job.progress, { completed: 9, failed: 0, total: 9 });
+  assert.strictEqual(job.results.length, 9);
+  for (let i = 1; i < job.results.length; i += 1) {
+    assert.ok(job.results[i - 1].score >= job.results[i].score);
+  }
+  assert.deepStrictEqual(job.best, job.results[0]);
+  assert.strictEqual(job.best.score, job.best.metrics.totalProfit);
+
+  // A queued job waits for the running one; cancelling keeps the partial ranking.
+  const slow = startOptimization({ asset: 'TEST', timeframe: 'M1', candles, code: SLOW, space: { n: [1, 2, 3, 4] } });
+  const queued = startOptimization({ asset: 'TEST', timeframe: 'M1', candles, code: CROSS, space: { fast: [3], slow: [20] } });
+  assert.strictEqual(getOptimization(queued.id).status, 'queued');
+  assert.strictEqual(cancelOptimization(queued.id).status, 'cancelled');
+  await waitFor(slow.id, ['running']);
+  await new Promise((resolve) => setTimeout(resolve, 300));
+  const cancelAt = Date.now();
+  cancelOptimization(slow.id);
+  const cancelled = await waitFor(slow.id, ['cancelled', 'completed', 'error']);
+  assert.strictEqual(cancelled.status, 'cancelled', JSON.stringify(cancelled.error));
+  assert.ok(cancelled.progress.completed < 4);
+  assert.ok(Date.now() - cancelAt < 3000, 'cancelling should terminate running workers');
+  assert.strictEqual(getOptimization(queued.id).progress.completed, 0);
+
+  // Strategy errors surface on the job.
+  const missing = startOptimization({ asset: 'TEST', timeframe: 'M1', candles, code: 'x = 1\n', space: { n: [1] } });
+  const failed = await waitFor(missing.id, ['error', 'completed']);
+  assert.strictEqual(failed.status, 'error');
+  assert.strictEqual(failed.error.type, 'OptimizeError');
+
+  console.log('optimizer tests passed');
+})().catch((err) => {
+  console.error(err);
+  process.exit(1);
+});
@@ -0,0 +1,7 @@
+const { runPythonChecks } = require('./helpers/python');
+
+// thelab.perfsuite: seeded datasets, recorded-bar chaining, baseline comparison
+// and one small end-to-end run of every stage.
+runPythonChecks('perf_suite_checks');
+
+console.log('perfSuite tests passed');
@@ -0,0 +1,70 @@
+const assert = require('assert');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { spawnSync } = require('child_process');
+
+const storeRoot = fs.mkdtempSync(path.join(os.tmpdir(), 'thelab-resample-'));
+process.env.THELAB_COLUMN_STORE_DIR = storeRoot;
+const dataDir = fs.mkdtempSync(path.join(os.tmpdir(), 'thelab-resample-json-'));
+process.env.THELAB_DATA_DIR = dataDir;
+const {
+  writeColumnStore,
+  readManifest,
+  readStoredCandles,
+  ensureColumnStore,
+} = require('../src/services/columnStoreService');
+const { aggregateCandles } = require('../src/services/timeframeBuilder');
+const { PYTHON_BIN, RUNNER_DIR, runPythonChecks } = require('./helpers/python');
+
+// Six weeks of M1 bars with a gap every day (22:00-23:59 UTC) and on weekends.
+const start = Date.UTC(2024, 0, 29, 21, 30);
+const candles = [];
+for (let i = 0; i < 42 * 1440; i += 1) {
+  const time = start + i * 60000;
+  const date = new Date(time);
+  if (date.getUTCHours() === 22 || (date.getUTCDay() === 6 && date.getUTCHours() > 3)) continue;
+  const close = 80 + 3 * Math.sin(i / 500) + (i % 17) / 10;
+  candles.push({
+    time: date.toISOString(),
+    open: close - 0.05,
+    high: close + 0.1 + (i % 7) / 100,
+    low: close - 0.1 - (i % 5) / 100,
+    close,
+    volume: i % 11,
+  });
+}
+writeColumnStore({ asset: 'TEST', timeframe: 'M1', candles });
+
+// An older JSON D1 dataset must not replace the session-anchored D1 store.
+const legacyD1 = path.join(dataDir, 'test-d1.json');
+fs.writeFileSync(legacyD1, JSON.stringify({ asset: 'TEST', timeframe: 'D1', candles: candles.slice(0, 2) }));
+const anHourAgo = new Date(Date.now() - 3600 * 1000);
+fs.utimesSync(legacyD1, anHourAgo, anHourAgo);
+
+const run = spawnSync(
+  PYTHON_BIN,
+  ['-m', 'thelab.resample', '--store', storeRoot, '--asset', 'TEST', '--session', 'cme'],
+  { cwd: RUNNER_DIR, encoding: 'utf8' }
+);
+assert.strictEqual(run.status, 0, run.stderr);
+
+// Intraday frames match the JS aggregator bar for bar.
+[['M5', 5], ['M15', 15], ['M30', 30], ['H1', 60], ['H4', 240]].forEach(([code, minutes]) => {
+  const manifest = readManifest('test', code);
+  assert.ok(manifest, `missing ${code} store`);
+  assert.strictEqual(manifest.source.resampledFrom, 'm1');
+  const stored = readStoredCandles(manifest, { offset: 0, length: manifest.length });
+  assert.deepStrictEqual(stored, aggregateCandles(candles, minutes), `${code} differs from aggregateCandles`);
+});
+
+const kept = ensureColumnStore('TEST', 'D1');
+assert.strictEqual(kept.source.resampledFrom, 'm1', 'resampled D1 store was rebuilt from JSON');
+assert.ok(kept.source.writtenAt > anHourAgo.getTime());
+
+// Session frames: the CME day opens at 23:00 UTC and the week on Sunday evening.
+runPythonChecks('resample_checks', [storeRoot]);
+
+fs.rmSync(storeRoot, { recursive: true, force: true });
+fs.rmSync(dataDir, { recursive: true, force: true });
+console.log('resample tests passed');
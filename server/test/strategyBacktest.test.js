@@ -0,0 +1,106 @@
+const assert = require('assert');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { spawnSync } = require('child_process');
+const { encodeCandleColumns } = require('../src/services/indicatorBinaryCodec');
+const { toBacktestResult } = require('../src/services/strategyBacktestService');
+const { PYTHON_BIN, RUNNER_DIR, runPythonChecks } = require('./helpers/python');
+
+// Fill rules and accounting of thelab.backtest, checked against hand-computed values.
+runPythonChecks('backtest_checks');
+
+// End to end through runner.py --backtest and the service's result mapping.
+const tmp = fs.mkdtempSync(path.join(os.tmpdir(), 'thelab-backtest-'));
+const strategyPath = path.join(tmp, 'cross.py');
+fs.writeFileSync(
+  strategyPath,
+  [
+    'def init(context):',
+    '    context.bars = 0',
+    '',
+    'def handle_data(context, data):',
+    '    context.bars += 1',
+    '    if len(data) < context.params["slow"]:',
+    '        return None',
+    '    fast = data.close[-3:].mean()',
+    '    slow = data["close"][-context.params["slow"]:].mean()',
+    '    target = 1 if fast > slow else -1',
+    '    return {"orders": [{"target": target}], "metadata": {"bars": context.bars}}',
+    '',
+  ].join('\n')
+);
+const signalsPath = path.join(tmp, 'signals.py');
+fs.writeFileSync(
+  signalsPath,
+  [
+    'import numpy as np',
+    'from thelab import ta',
+    '',
+    'def signals(inputs, params):',
+    '    fast = ta.sma(inputs["close"], 3)',
+    '    slow = ta.sma(inputs["close"], params["slow"])',
+    '    target = np.where(np.isnan(slow), 0, np.where(fast > slow, 1, -1))',
+    '    return {"target": target, "metadata": {"bars": len(fast)}}',
+    '',
+  ].join('\n')
+);
+const brokenPath = path.join(tmp, 'broken.py');
+fs.writeFileSync(brokenPath, 'def handle_data(context, data):\n    return 1 / 0\n');
+
+const candles = Array.from({ length: 400 }, (_, i) => {
+  const close = 100 + 10 * Math.sin(i / 15);
+  return {
+    time: new Date(Date.UTC(2024, 0, 1) + i * 60000).toISOString(),
+    open: close - 0.1,
+    high: close + 0.5,
+    low: close - 0.5,
+    close,
+    volume: 1,
+  };
+});
+const runBacktest = (scriptPath) => {
+  const payload = encodeCandleColumns(candles, {
+    cash: 10000,
+    feeBps: 1,
+    slippageBps: 1,
+    settings: { slow: 10 },
+    output: 'packed',
+  });
+  const run = spawnSync(PYTHON_BIN, [path.join(RUNNER_DIR, 'runner.py'), '--backtest', scriptPath], {
+    input: payload,
+    maxBuffer: 16 * 1024 * 1024,
+  });
+  assert.strictEqual(run.status, 0, run.stderr && run.stderr.toString());
+  return JSON.parse(run.stdout.toString('utf8'));
+};
+
+const raw = runBacktest(strategyPath);
+assert.strictEqual(raw.ok, true, JSON.stringify(raw.error));
+const result = toBacktestResult(raw, candles);
+assert.strictEqual(result.source, 'native');
+assert.ok(result.totalTrades > 5);
+assert.strictEqual(result.trades.length, result.totalTrades);
+assert.strictEqual(result.trades[0].entryTime, candles[raw.trades[0].entryIndex].time);
+assert.strictEqual(result.equityCurve.length, candles.length);
+assert.strictEqual(result.equityCurve[0].value, 10000);
+assert.strictEqual(result.equityCurve[candles.length - 1].time, candles[candles.length - 1].time);
+assert.deepStrictEqual(result.metadata, { bars: candles.length });
+
+// The same crossover as signal arrays: vectorized mode, identical trades.
+const vectorizedRaw = runBacktest(signalsPath);
+assert.strictEqual(vectorizedRaw.ok, true, JSON.stringify(vectorizedRaw.error));
+assert.strictEqual(vectorizedRaw.meta.mode, 'vectorized');
+assert.deepStrictEqual(
+  vectorizedRaw.trades.map((t) => [t.entryIndex, t.exitIndex, t.direction]),
+  raw.trades.map((t) => [t.entryIndex, t.exitIndex, t.direction])
+);
+assert.ok(Math.abs(vectorizedRaw.totalProfit - raw.totalProfit) < 1e-6);
+
+const broken = runBacktest(brokenPath);
+assert.strictEqual(broken.ok, false);
+assert.strictEqual(broken.error.type, 'ExecutionError');
+assert.strictEqual(broken.error.line, 2);
+
+fs.rmSync(tmp, { recursive: true, force: true });
+console.log('strategyBacktest tests passed');
@@ -0,0 +1,7 @@
+const { runPythonChecks } = require('./helpers/python');
+
+// thelab.ta kernels against straightforward per-bar reference loops written
+// to TA-Lib's definitions (warm-up NaNs, SMA seeds, Wilder smoothing).
+runPythonChecks('thelab_ta_checks');
+
+console.log('thelab.ta tests passed');
@@ -0,0 +1,71 @@
+const assert = require('assert');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { spawnSync } = require('child_process');
+
+const workDir = fs.mkdtempSync(path.join(os.tmpdir(), 'thelab-ticks-'));
+const storeRoot = path.join(workDir, 'columns');
+process.env.THELAB_COLUMN_STORE_DIR = storeRoot;
+const { readManifest, readStoredCandles } = require('../src/services/columnStoreService');
+const { buildTimeframesFromTicks } = require('../src/services/timeframeBuilder');
+const { PYTHON_BIN, RUNNER_DIR, runPythonChecks } = require('./helpers/python');
+
+// Irregular ticks over ~6 hours, some one-sided and some without ask volume.
+const start = Date.UTC(2024, 2, 4, 13, 0);
+const ticks = [];
+let time = start;
+for (let i = 0; i < 20000; i += 1) {
+  time += (i * 7919) % 2100;
+  const mid = 75 + Math.sin(i / 300) + ((i * 31) % 13) / 100;
+  ticks.push({
+    timestamp: time,
+    bidPrice: i % 37 === 0 ? undefined : mid - 0.01,
+    askPrice: i % 41 === 0 ? undefined : mid + 0.01,
+    bidVolume: (i % 5) + 0.25,
+    askVolume: i % 3 === 0 ? 0 : (i % 7) + 0.5,
+  });
+}
+// Same shape as dukascopyService.persistRawTicks.
+const rawFile = path.join(workDir, 'test-ticks.jsonl');
+fs.writeFileSync(
+  rawFile,
+  ticks
+    .map((t) => JSON.stringify({ timestamp: t.timestamp, bid: t.bidPrice, ask: t.askPrice, bidVolume: t.bidVolume, askVolume: t.askVolume }))
+    .join('\n') + '\n'
+);
+
+const run = spawnSync(
+  PYTHON_BIN,
+  ['-m', 'thelab.ticks', '--asset', 'TEST', '--ticks', rawFile, '--store', storeRoot, '--timeframes', 'M1', 'M5', '--chunk', '777'],
+  { cwd: RUNNER_DIR, encoding: 'utf8' }
+);
+assert.strictEqual(run.status, 0, run.stderr);
+
+// Chunked output matches the in-memory JS builder.
+const frames = buildTimeframesFromTicks(ticks, ['M1', 'M5']);
+['M1', 'M5'].forEach((code) => {
+  const manifest = readManifest('test', code);
+  const stored = readStoredCandles(manifest, { offset: 0, length: manifest.length });
+  const expected = frames.get(code);
+  assert.strictEqual(stored.length, expected.length, `${code} bar count`);
+  stored.forEach((bar, i) => {
+    const want = expected[i];
+    assert.strictEqual(bar.time, want.time);
+    ['open', 'high', 'low', 'close', 'volume'].forEach((field) => {
+      assert.ok(Math.abs(bar[field] - want[field]) < 1e-6, `${code} ${bar.time} ${field}: ${bar[field]} != ${want[field]}`);
+    });
+  });
+});
+
+// A backfill appended after newer ticks (split mid-bar): late ticks are merged, not dropped.
+const lines = fs.readFileSync(rawFile, 'utf8').trim().split('\n');
+const backfillFile = path.join(workDir, 'backfill-ticks.jsonl');
+const cut = 12345;
+fs.writeFileSync(backfillFile, [...lines.slice(cut), ...lines.slice(0, cut)].join('\n') + '\n');
+
+// Chunking never changes the bars; late ticks are merged and counted.
+runPythonChecks('ticks_checks', [rawFile, backfillFile]);
+
+fs.rmSync(workDir, { recursive: true, force: true });
+console.log('ticks tests passed');
@@ -0,0 +1,80 @@
+const assert = require('assert');
+const path = require('path');
+const { ROOT_DIR } = require('../src/constants/paths');
+
+// Two workers even on single-core machines, so folds go through the process pool.
+process.env.THELAB_OPTIMIZER_WORKERS = '2';
+const { startWalkForward, getOptimization } = require('../src/services/optimizerService');
+const { runPythonChecks } = require('./helpers/python');
+
+const INDICATORS_DIR = path.join(ROOT_DIR, 'indicators');
+
+// Folds, memoized indicator columns and the walk-forward runner.
+runPythonChecks('walk_forward_checks', [INDICATORS_DIR]);
+
+const candles = Array.from({ length: 3000 }, (_, i) => {
+  const close = 100 + 10 * Math.sin(i / 40) + Math.sin(i / 7);
+  return {
+    time: new Date(Date.UTC(2024, 0, 1) + i * 60000).toISOString(),
+    open: close - 0.1,
+    high: close + 0.5,
+    low: close - 0.5,
+    close,
+    volume: 1,
+  };
+});
+const CROSS = [
+  'import numpy as np',
+  'from thelab import indicators',
+  '',
+  'def signals(inputs, params):',
+  '    fast = indicators.column("ta.ema", inputs, {"period": params["fast"]})',
+  '    trend = indicators.column("ema_100", inputs, {"length": params["slow"]})',
+  '    return {"target": np.where(np.isnan(trend), 0, np.where(fast > trend, 1, -1))}',
+  '',
+].join('\n');
+
+(async () => {
+  // End to end through runner.py --walkforward: folds, stitched curve with candle times.
+  const started = startWalkForward({
+    asset: 'TEST',
+    timeframe: 'M1',
+    candles,
+    code: CROSS,
+    space: { fast: [3, 8], slow: [30, 60] },
+    inSample: 1000,
+    outOfSample: 500,
+  });
+  assert.strictEqual(started.kind, 'walkforward');
+  let job = started;
+  for (let i = 0; i < 600 && !['completed', 'error', 'cancelled'].includes(job.status); i += 1) {
+    await new Promise((resolve) => setTimeout(resolve, 50));
+    job = getOptimization(started.id);
+  }
+  assert.strictEqual(job.status, 'completed', JSON.stringify(job.error || job.firstFailure));
+  assert.deepStrictEqual(job.progress, { completed: 4, failed: 0, total: 4 });
+  assert.deepStrictEqual(
+    job.folds.map((fold) => [fold.index, fold.split, fold.stop]),
+    [
+      [0, 1000, 1500],
+      [1, 1500, 2000],
+      [2, 2000, 2500],
+      [3, 2500, 3000],
+    ]
+  );
+  job.folds.forEach((fold) => {
+    assert.ok(fold.params && Number.isFinite(fold.outOfSample.totalProfit));
+  });
+  assert.strictEqual(job.stitchedFolds, 4);
+  assert.strictEqual(job.equityCurve.length, 2000);
+  assert.strictEqual(job.equityCurve[0].time, candles[1000].time);
+  assert.strictEqual(job.equityCurve[job.equityCurve.length - 1].time, candles[2999].time);
+  const profit = job.folds.reduce((sum, fold) => sum + fold.outOfSample.totalProfit, 0);
+  assert.ok(Math.abs(job.outOfSample.totalProfit - profit) < 1e-6);
+  assert.ok(job.cache.prefixHits > 0);
+
+  console.log('walkForward tests passed');
+})().catch((err) => {
+  console.error(err);
+  process.exit(1);
+});
@@ -167,12 +167,47 @@ export const apiClient = {
       close: number;
       volume?: number;
     }[],
+    settings?: Record<string, unknown>,
+    stream?: { asset?: string; timeframe?: string },
+    // Runner diagnostics: meta.profile (top N functions) and meta.memory (peak bytes).
+    diagnostics?: { profile?: boolean | number; traceMemory?: boolean }
+  ) {
+    const res = await fetch(`${BASE_URL}/api/indicator-exec/${encodeURIComponent(id)}/run`, {
+      method: 'POST',
+      headers,
+      body: JSON.stringify({
+        candles,
+        settings,
+        asset: stream?.asset,
+        timeframe: stream?.timeframe,
+        profile: diagnostics?.profile,
+        traceMemory: diagnostics?.traceMemory,
+      }),
+    });
+    if (!res.ok) {
+      const body = await res.json().catch(() => ({}));
+      const rawError = body && (body.error || body);
+      const message =
+        (rawError && (rawError.message || rawError)) || 'Failed to run indicator';
+      const err = new Error(message) as Error & { details?: any };
+      if (rawError && typeof rawError === 'object') {
+        err.details = rawError;
+      }
+      throw err;
+    }
+    return res.json();
+  },
+
+  // Runs over bars already on the server (column store) instead of shipping candles.
+  async runIndicatorOnStore(
+    id: string,
+    source: { asset: string; timeframe: string; from?: string; to?: string; limit?: number },
     settings?: Record<string, unknown>
   ) {
     const res = await fetch(`${BASE_URL}/api/indicator-exec/${encodeURIComponent(id)}/run`, {
       method: 'POST',
       headers,
-      body: JSON.stringify({ candles, settings }),
+      body: JSON.stringify({ source, settings }),
     });
     if (!res.ok) {
       const body = await res.json().catch(() => ({}));
@@ -188,6 +223,42 @@ export const apiClient = {
     return res.json();
   },
 
+  // One request for several indicators over the same candles; `results` keeps
+  // the order of `indicators`, each entry either ok (runIndicator shape) or
+  // carrying its own `error`.
+  async runIndicatorBatch(
+    indicators: { id: string; settings?: Record<string, unknown> }[],
+    candles: {
+      time: string | number;
+      open: number;
+      high: number;
+      low: number;
+      close: number;
+      volume?: number;
+    }[],
+    stream?: { asset?: string; timeframe?: string }
+  ) {
+    const res = await fetch(`${BASE_URL}/api/indicator-exec/batch`, {
+      method: 'POST',
+      headers,
+      body: JSON.stringify({ candles, indicators, asset: stream?.asset, timeframe: stream?.timeframe }),
+    });
+    if (!res.ok) {
+      const body = await res.json().catch(() => ({}));
+      const rawError = body && (body.error || body);
+      const message =
+        (rawError && (rawError.message || rawError)) || 'Failed to run indicators';
+      const err = new Error(message) as Error & { details?: any };
+      if (rawError && typeof rawError === 'object') {
+        err.details = rawError;
+      }
+      throw err;
+    }
+    return res.json() as Promise<{
+      results: ({ id: string; ok: true; series: any[]; overlay: any; meta: any } | { id: string; ok: false; error: any })[];
+    }>;
+  },
+
   async getIndicator(id: string) {
     const res = await fetch(`${BASE_URL}/api/indicators/${id}`);
     if (!res.ok) throw new Error('Indicator not found');
@@ -366,6 +437,119 @@ export const apiClient = {
     return res.json();
   },
 
+  async runNativeBacktest(payload: {
+    asset: string;
+    timeframe: string;
+    strategyId?: string;
+    code?: string;
+    startDate?: string;
+    endDate?: string;
+    cash?: number;
+    feeBps?: number;
+    slippageBps?: number;
+    settings?: Record<string, unknown>;
+    mode?: 'event' | 'vectorized';
+  }) {
+    const res = await fetch(`${BASE_URL}/api/backtest/run`, {
+      method: 'POST',
+      headers,
+      body: JSON.stringify(payload),
+    });
+    if (!res.ok) {
+      const body = await res.json().catch(() => ({}));
+      const message = body?.error?.message || body?.error || 'Failed to run native backtest';
+      const err = new Error(message) as Error & { details?: any };
+      if (body && typeof body === 'object') {
+        err.details = body;
+      }
+      throw err;
+    }
+    return res.json();
+  },
+
+  async startOptimization(payload: {
+    asset: string;
+    timeframe: string;
+    strategyId?: string;
+    code?: string;
+    space: Record<string, unknown>;
+    sampler?: 'grid' | 'random';
+    samples?: number;
+    seed?: number;
+    objective?: 'totalProfit' | 'sharpe' | 'winRate' | 'drawdown';
+    maxWorkers?: number;
+    mode?: 'event' | 'vectorized';
+    startDate?: string;
+    endDate?: string;
+    cash?: number;
+    feeBps?: number;
+    slippageBps?: number;
+  }) {
+    const res = await fetch(`${BASE_URL}/api/optimize/run`, {
+      method: 'POST',
+      headers,
+      body: JSON.stringify(payload),
+    });
+    if (!res.ok) {
+      const body = await res.json().catch(() => ({}));
+      throw new Error(body?.error?.message || body?.error || 'Failed to start optimization');
+    }
+    return res.json();
+  },
+
+  async startWalkForward(payload: {
+    asset: string;
+    timeframe: string;
+    strategyId?: string;
+    code?: string;
+    space: Record<string, unknown>;
+    inSample: number;
+    outOfSample: number;
+    step?: number;
+    anchored?: boolean;
+    sampler?: 'grid' | 'random';
+    samples?: number;
+    seed?: number;
+    objective?: 'totalProfit' | 'sharpe' | 'winRate' | 'drawdown';
+    maxWorkers?: number;
+    mode?: 'event' | 'vectorized';
+    startDate?: string;
+    endDate?: string;
+    cash?: number;
+    feeBps?: number;
+    slippageBps?: number;
+  }) {
+    const res = await fetch(`${BASE_URL}/api/optimize/walkforward`, {
+      method: 'POST',
+      headers,
+      body: JSON.stringify(payload),
+    });
+    if (!res.ok) {
+      const body = await res.json().catch(() => ({}));
+      throw new Error(body?.error?.message || body?.error || 'Failed to start walk-forward');
+    }
+    return res.json();
+  },
+
+  async getOptimization(jobId: string, limit?: number) {
+    const query = limit !== undefined ? `?limit=${limit}` : '';
+    const res = await fetch(`${BASE_URL}/api/optimize/jobs/${jobId}${query}`);
+    if (!res.ok) {
+      const body = await res.json().catch(() => ({}));
+      throw new Error(body?.error || 'Optimization job not found');
+    }
+    return res.json();
+  },
+
+  async cancelOptimization(jobId: string) {
+    const res = await fetch(`${BASE_URL}/api/optimize/jobs/${jobId}/cancel`, { method: 'POST' });
+    if (!res.ok) {
+      const body = await res.json().catch(() => ({}));
+      throw new Error(body?.error || 'Failed to cancel optimization');
+    }
+    return res.json();
+  },
+
   async getLeanJob(jobId: string) {
     const res = await fetch(`${BASE_URL}/api/lean/jobs/${jobId}`);
     if (!res.ok) {
@@ -13,15 +13,22 @@ export const runBacktest = (data: Candle[]): BacktestResult => {
   let entryPrice = 0;
   let entryIndex = 0;
 
-  // Helper to calculate SMA
-  const getSMA = (index: number, period: number) => {
-    if (index < period) return null;
+  // Rolling SMAs computed once in O(n); getSMA keeps the old warm-up (null until index >= period).
+  const rollingSMA = (period: number) => {
+    const values = new Float64Array(data.length);
     let sum = 0;
-    for (let i = 0; i < period; i++) {
-      sum += data[index - i].close;
+    for (let i = 0; i < data.length; i++) {
+      sum += data[i].close;
+      if (i >= period) sum -= data[i - period].close;
+      values[i] = sum / period;
     }
-    return sum / period;
+    return values;
   };
+  const smas: Record<number, Float64Array> = {
+    [shortPeriod]: rollingSMA(shortPeriod),
+    [longPeriod]: rollingSMA(longPeriod),
+  };
+  const getSMA = (index: number, period: number) => (index < period ? null : smas[period][index]);
 
   let maxPeak = equity;
   let maxDrawdown = 0;
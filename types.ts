@@ -125,7 +125,7 @@ export interface BacktestResult {
   drawdown: number;
   trades: Trade[];
   equityCurve: { time: string | number; value: number }[];
-  source?: 'local' | 'lean';
+  source?: 'local' | 'lean' | 'native';
   jobId?: string;
   rawStatistics?: Record<string, string | number>;
 }
@@ -35,11 +35,18 @@ export const AnalysisView: React.FC<AnalysisViewProps> = ({ backtestResult, acti
     );
   }
 
-  const sourceLabel = backtestResult.source === 'lean' ? 'Lean Engine' : 'Local Simulation';
+  const sourceLabel =
+    backtestResult.source === 'lean'
+      ? 'Lean Engine'
+      : backtestResult.source === 'native'
+        ? 'Native Engine'
+        : 'Local Simulation';
   const sourceTone =
     backtestResult.source === 'lean'
       ? 'bg-indigo-50 text-indigo-700 border-indigo-100'
-      : 'bg-slate-100 text-slate-700 border-slate-200';
+      : backtestResult.source === 'native'
+        ? 'bg-emerald-50 text-emerald-700 border-emerald-100'
+        : 'bg-slate-100 text-slate-700 border-slate-200';
 
   return (
     <div className="w-full h-full flex flex-col space-y-6">
@@ -57,7 +64,7 @@ export const AnalysisView: React.FC<AnalysisViewProps> = ({ backtestResult, acti
           onClick={onRunBacktest}
           className="text-xs font-medium text-slate-700 hover:text-slate-900 underline underline-offset-4"
         >
-          Run local simulation
+          Run simulation
         </button>
       </div>
 
@@ -270,8 +270,9 @@ export const ApiDocsView: React.FC = () => {
             <ul className="list-decimal list-inside text-sm text-slate-600 space-y-1">
               <li>The frontend collects the current window of candles.</li>
               <li>
-                It calls <span className="font-mono">POST /api/indicator-exec/:id/run</span> with that window and an optional{' '}
-                <span className="font-mono">settings</span> object describing the current values chosen in the Indicator Settings panel.
+                It calls <span className="font-mono">POST /api/indicator-exec/batch</span> once with that window and the list of active
+                indicators, each with an optional <span className="font-mono">settings</span> object describing the current values chosen in
+                the Indicator Settings panel (<span className="font-mono">POST /api/indicator-exec/:id/run</span> runs a single indicator).
               </li>
               <li>The backend resolves the indicator file and spawns the Python runner.</li>
               <li>
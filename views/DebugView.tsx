@@ -9,6 +9,7 @@ export const DebugView: React.FC = () => {
   const [healthSummary, setHealthSummary] = useState<string>('');
   const [loadingHealth, setLoadingHealth] = useState(false);
   const [lastIndicatorOverlay, setLastIndicatorOverlay] = useState<IndicatorOverlay | null>(null);
+  const [lastIndicatorMeta, setLastIndicatorMeta] = useState<Record<string, any> | null>(null);
 
   useEffect(() => {
     // Best-effort initial health fetch; ignore errors
@@ -44,12 +45,17 @@ export const DebugView: React.FC = () => {
         });
         const candles = Array.isArray(coverage?.candles) ? coverage.candles : [];
         if (!candles.length) return;
-        const result = await apiClient.runIndicator(first.id || first.name || 'ema_100.py', candles, {});
+        const result = await apiClient.runIndicator(first.id || first.name || 'ema_100.py', candles, {}, undefined, {
+          profile: 8,
+          traceMemory: true,
+        });
         if (result && result.overlay) {
           setLastIndicatorOverlay(result.overlay);
         }
+        setLastIndicatorMeta(result?.meta || null);
       } catch {
         setLastIndicatorOverlay(null);
+        setLastIndicatorMeta(null);
       }
     };
     fetchSampleOverlay();
@@ -107,6 +113,12 @@ export const DebugView: React.FC = () => {
               </span>
               <span className="ml-1 text-slate-500">– run EMA 100 on the current instrument/timeframe.</span>
             </li>
+            <li>
+              <span className="font-mono text-[11px] bg-slate-50 px-1.5 py-0.5 rounded border border-slate-200">
+                run indicator ema_100.py --profile --memory
+              </span>
+              <span className="ml-1 text-slate-500">– same run with phase timings, top functions and peak memory.</span>
+            </li>
           </ul>
           <p className="text-[11px] text-slate-500 mt-2">
             All commands execute locally against your current environment. Use this console to debug issues like missing indicators,
@@ -129,6 +141,26 @@ export const DebugView: React.FC = () => {
               </pre>
             </div>
           )}
+          {lastIndicatorMeta?.phases && (
+            <div className="mt-3 border-t border-slate-200 pt-2">
+              <h3 className="text-[11px] font-semibold text-slate-900 mb-1">Sample run profile (debug)</h3>
+              <pre className="text-[10px] leading-snug bg-slate-50 rounded p-2 max-h-40 overflow-auto">
+                {[
+                  Object.entries(lastIndicatorMeta.phases as Record<string, number>)
+                    .map(([name, ms]) => `${name} ${ms.toFixed(2)}ms`)
+                    .join(' · '),
+                  lastIndicatorMeta.memory
+                    ? `peak memory ${(lastIndicatorMeta.memory.peakBytes / 1024).toFixed(1)} KiB`
+                    : '',
+                  ...((lastIndicatorMeta.profile?.top || []) as any[]).map(
+                    (row) => `${row.cumulativeMs.toFixed(2)}ms  ${row.calls}x  ${row.function}`
+                  ),
+                ]
+                  .filter(Boolean)
+                  .join('\n')}
+              </pre>
+            </div>
+          )}
         </div>
       </div>
     </div>